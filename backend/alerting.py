@@ -0,0 +1,195 @@
+"""
+Alertas com estado (deduplicação + histerese) do RSM
+Cada regra tem limiar de disparo e limiar de normalização separados; o alerta é
+aberto uma única vez, acumula last_seen/occurrences e só é resolvido depois que a
+condição fica normalizada por ALERT_CLEAR_WINDOW segundos.
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tempo com a condição normalizada antes de resolver o alerta (segundos)
+ALERT_CLEAR_WINDOW = float(os.getenv("ALERT_CLEAR_WINDOW", "300"))
+# Alertas abertos têm last_seen/occurrences gravados no máximo a cada N segundos
+ALERT_TOUCH_INTERVAL = float(os.getenv("ALERT_TOUCH_INTERVAL", "300"))
+
+@dataclass
+class AlertRule:
+    """Regra de alerta sobre uma métrica; direction='above' dispara acima de raise_threshold"""
+    key: str
+    alert_type: str
+    severity: str
+    metric: str
+    raise_threshold: float
+    clear_threshold: float
+    message: str
+    direction: str = 'above'
+
+    def __post_init__(self):
+        # Limiares sobrescrevíveis: ALERT_<KEY>_RAISE / ALERT_<KEY>_CLEAR
+        prefix = f"ALERT_{self.key.upper()}"
+        self.raise_threshold = float(os.getenv(f"{prefix}_RAISE", self.raise_threshold))
+        self.clear_threshold = float(os.getenv(f"{prefix}_CLEAR", self.clear_threshold))
+
+    def is_triggered(self, value: float) -> bool:
+        if self.direction == 'below':
+            return value < self.raise_threshold
+        return value > self.raise_threshold
+
+    def is_cleared(self, value: float) -> bool:
+        if self.direction == 'below':
+            return value >= self.clear_threshold
+        return value <= self.clear_threshold
+
+DEFAULT_RULES: List[AlertRule] = [
+    AlertRule('cpu_high', 'system', 'warning', 'cpu_percent', 80, 70, 'CPU usage alto: {value:.1f}%'),
+    AlertRule('memory_critical', 'system', 'critical', 'memory_percent', 85, 80, 'Memória crítica: {value:.1f}%'),
+    AlertRule('disk_full', 'system', 'critical', 'disk_percent', 90, 85, 'Disco quase cheio: {value:.1f}%'),
+    AlertRule('error_rate_high', 'application', 'warning', 'error_rate', 5, 2, 'Taxa de erro alta: {value:.1f}%'),
+    AlertRule('response_time_slow', 'application', 'warning', 'average_response_time', 2.0, 1.0,
+              'Tempo de resposta lento: {value:.2f}s'),
+    AlertRule('p95_slow', 'application', 'warning', 'p95_response_time', 2.0, 1.0, 'Latência p95 alta: {value:.2f}s'),
+    AlertRule('conversion_low', 'business', 'warning', 'conversion_rate', 70, 75,
+              'Taxa de conversão baixa: {value:.1f}%', direction='below'),
+    AlertRule('pending_high', 'business', 'info', 'pending_approvals', 50, 40, 'Muitos laudos pendentes: {value:.0f}'),
+]
+
+def init_alert_schema(cursor):
+    """Colunas de estado na tabela alerts + no máximo um alerta aberto por regra"""
+    cursor.execute("PRAGMA table_info(alerts)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if 'alert_key' not in columns:
+        cursor.execute("ALTER TABLE alerts ADD COLUMN alert_key TEXT")
+        # Linhas antigas (uma por ciclo) não têm regra associada: ficam como histórico resolvido
+        cursor.execute('''
+            UPDATE alerts SET is_resolved = 1, resolved_at = datetime('now', 'localtime')
+            WHERE is_resolved = 0
+        ''')
+    for column, definition in (('last_seen', 'TIMESTAMP'), ('occurrences', 'INTEGER DEFAULT 1'),
+                               ('last_value', 'REAL')):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE alerts ADD COLUMN {column} {definition}")
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_open_key
+        ON alerts(alert_key) WHERE is_resolved = 0
+    ''')
+
+class AlertManager:
+    """Máquina de estados dos alertas; grava apenas em aberturas, resoluções e toques periódicos"""
+
+    def __init__(self, connection_factory: Callable, rules: Optional[List[AlertRule]] = None,
+                 clear_window: float = ALERT_CLEAR_WINDOW, touch_interval: float = ALERT_TOUCH_INTERVAL,
+                 clock: Callable[[], datetime] = datetime.now):
+        self._connection = connection_factory
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.clear_window = timedelta(seconds=clear_window)
+        self.touch_interval = timedelta(seconds=touch_interval)
+        self.clock = clock
+        # alert_key -> estado do alerta aberto (None = ainda não carregado do banco)
+        self._open: Optional[Dict[str, Dict[str, Any]]] = None
+        self.writes = 0
+
+    def reset(self):
+        """Descarta o estado em memória (ex.: ao assumir a liderança)"""
+        self._open = None
+
+    def _load_open(self, cursor) -> Dict[str, Dict[str, Any]]:
+        cursor.execute('''
+            SELECT id, alert_key, occurrences, last_seen FROM alerts
+            WHERE is_resolved = 0 AND alert_key IS NOT NULL
+        ''')
+        now = self.clock()
+        return {
+            row[1]: {
+                'id': row[0],
+                'occurrences': row[2] or 1,
+                'last_seen': now,
+                'last_value': None,
+                'flushed_at': now,
+                'clear_since': None,
+                'dirty': False
+            }
+            for row in cursor.fetchall()
+        }
+
+    def evaluate(self, values: Dict[str, float]) -> Dict[str, List[str]]:
+        """Aplica as regras aos valores coletados; retorna as transições do ciclo"""
+        now = self.clock()
+        changes: Dict[str, List[str]] = {'opened': [], 'resolved': []}
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            if self._open is None:
+                self._open = self._load_open(cursor)
+
+            for rule in self.rules:
+                value = values.get(rule.metric)
+                if value is None:
+                    continue
+                state = self._open.get(rule.key)
+
+                if rule.is_triggered(value):
+                    if state is None:
+                        self._open[rule.key] = self._open_alert(cursor, rule, value, now)
+                        changes['opened'].append(rule.key)
+                    else:
+                        state['occurrences'] += 1
+                        state['last_seen'] = now
+                        state['last_value'] = value
+                        state['clear_since'] = None
+                        state['dirty'] = True
+                        if now - state['flushed_at'] >= self.touch_interval:
+                            self._flush(cursor, state, now)
+                elif state is not None:
+                    if rule.is_cleared(value):
+                        state['clear_since'] = state['clear_since'] or now
+                        if now - state['clear_since'] >= self.clear_window:
+                            self._resolve(cursor, state, now)
+                            del self._open[rule.key]
+                            changes['resolved'].append(rule.key)
+                    else:
+                        # Faixa de histerese: nem dispara de novo nem conta como normalizado
+                        state['clear_since'] = None
+            conn.commit()
+
+        for key in changes['opened']:
+            logger.warning(f"Alerta aberto: {key}")
+        for key in changes['resolved']:
+            logger.info(f"Alerta resolvido: {key}")
+        return changes
+
+    def _open_alert(self, cursor, rule: AlertRule, value: float, now: datetime) -> Dict[str, Any]:
+        cursor.execute('''
+            INSERT INTO alerts (alert_type, severity, message, created_at, alert_key, last_seen, occurrences, last_value)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+        ''', (rule.alert_type, rule.severity, rule.message.format(value=value), now, rule.key, now, value))
+        self.writes += 1
+        return {
+            'id': cursor.lastrowid,
+            'occurrences': 1,
+            'last_seen': now,
+            'last_value': value,
+            'flushed_at': now,
+            'clear_since': None,
+            'dirty': False
+        }
+
+    def _flush(self, cursor, state: Dict[str, Any], now: datetime):
+        if not state['dirty']:
+            return
+        cursor.execute('''
+            UPDATE alerts SET last_seen = ?, occurrences = ?, last_value = COALESCE(?, last_value)
+            WHERE id = ?
+        ''', (state['last_seen'], state['occurrences'], state['last_value'], state['id']))
+        state['flushed_at'] = now
+        state['dirty'] = False
+        self.writes += 1
+
+    def _resolve(self, cursor, state: Dict[str, Any], now: datetime):
+        self._flush(cursor, state, now)
+        cursor.execute("UPDATE alerts SET is_resolved = 1, resolved_at = ? WHERE id = ?", (now, state['id']))
+        self.writes += 1
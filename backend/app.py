@@ -5,18 +5,21 @@ Sistema de geração de laudos técnicos com IA
 
 import os
 import json
+import asyncio
 import tempfile
 import logging
 import hashlib
 import secrets
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List, Optional
 from enum import Enum
 
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Body, Query
+from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Body, Query, Request, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, validator
 from jose import JWTError, jwt
 import io
@@ -25,13 +28,41 @@ import traceback
 import sys
 
 # Importar sistema de banco de dados
-from database import LaudoDatabase, get_db_connection, init_database
+from database import DB_PATH, LaudoDatabase, db_connection, get_pool_stats, init_database
+from laudo_models import LaudoSimples, LaudoAvancado, sanitize_string
+from laudo_counters import read_counters, count_status, PENDING_STATUSES, APPROVED_STATUSES
+from defect_categories import get_defect_rules, replace_defect_rules, store_defect_category
+from laudo_search import search_laudos as search_laudos_fts
+from battery_records import store_baterias
+from battery_analytics import fleet_analytics
+from laudo_export import EXPORT_FORMATS, build_export_query, iter_export
+from laudo_import import run_import
+from user_cache import user_cache, load_user
+from token_revocation import token_revocations, user_from_claims
+from login_limiter import client_ip, login_limiter
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, InvalidCursorError, fetch_keyset_page
+)
 
 # Importar configuração da OpenAI
 from config_openai import get_openai_key, is_openai_configured, get_status
 
 # Importar sistema de monitoramento
 from monitoring import health_checker
+from request_metrics import RequestMetricsMiddleware, request_metrics
+from metrics_exporter import render_metrics
+from prometheus import Exposition
+import anyio
+
+# Importar sistema de notificações (eventos com fan-out na leitura)
+from notifications import (
+    publish_event, get_user_notifications, mark_read,
+    EVENT_TAG_UPDATE, EVENT_LAUDO_APROVADO, EVENT_LAUDO_FINALIZADO
+)
+from event_stream import event_stream
+from pdf_renderer import pdf_service
+from laudo_html import render_laudo_html
+from http_cache import laudo_etag, laudo_last_modified, is_not_modified, cache_headers, not_modified_response
 
 # === CONFIGURAÇÃO DE LOGGING PROFISSIONAL ===
 logging.basicConfig(
@@ -47,7 +78,13 @@ logger = logging.getLogger(__name__)
 # === CONFIGURAÇÕES DE SEGURANÇA ===
 SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# Access token curto (revogação por claims fica limitada a este prazo); refresh token renova
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Login: atraso após falha (sem ocupar thread), executor próprio e limite de logins na fila
+LOGIN_FAILURE_DELAY = float(os.getenv("LOGIN_FAILURE_DELAY", "1"))
+LOGIN_WORKERS = int(os.getenv("LOGIN_WORKERS", "4"))
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", "64"))
 
 # Validar se SECRET_KEY não é o padrão em produção
 if SECRET_KEY == "your-secret-key-here-change-in-production":
@@ -91,8 +128,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Métricas por rota (contagem, status, latência) lidas pelo monitoramento
+app.add_middleware(RequestMetricsMiddleware)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 # === MODELOS DE DADOS COM VALIDAÇÃO ===
@@ -105,6 +146,11 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TranscriptionRequest(BaseModel):
     transcription: str
@@ -117,40 +163,6 @@ class TranscriptionRequest(BaseModel):
             raise ValueError('Transcrição muito curta')
         return v.strip()
 
-class LaudoSimples(BaseModel):
-    cliente: str
-    equipamento: str
-    problema_relatado: str
-    diagnostico: str
-    solucao: str
-    
-    @validator('cliente', 'equipamento', 'diagnostico')
-    def validate_required_fields(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Campo obrigatório não pode estar vazio')
-        return v.strip()
-
-class LaudoAvancado(BaseModel):
-    nomeCliente: str
-    data: str
-    baterias: List[Dict[str, Any]]
-    tecnicoResponsavel: str
-    manutencaoPreventiva: Optional[List[str]] = []
-    manutencaoCorretiva: Optional[List[str]] = []
-    conclusaoFinal: str
-    
-    @validator('nomeCliente', 'tecnicoResponsavel', 'conclusaoFinal')
-    def validate_required_fields(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Campo obrigatório não pode estar vazio')
-        return v.strip()
-    
-    @validator('baterias')
-    def validate_baterias(cls, v):
-        if not v or len(v) == 0:
-            raise ValueError('Pelo menos uma bateria deve ser informada')
-        return v
-
 class TagUpdate(BaseModel):
     tag: str
     description: Optional[str] = None
@@ -163,6 +175,18 @@ class TagUpdate(BaseModel):
             raise ValueError('Tag deve ter no máximo 50 caracteres')
         return v.strip()
 
+class DefectRule(BaseModel):
+    category: str
+    pattern: str
+    priority: int = 100
+    active: bool = True
+    
+    @validator('category', 'pattern')
+    def validate_not_empty(cls, v):
+        if not v or not v.strip('% ').strip():
+            raise ValueError('Categoria e padrão não podem estar vazios')
+        return v.strip()
+
 # === FUNÇÕES DE SEGURANÇA ===
 def hash_password(password: str) -> str:
     """Gera hash seguro da senha"""
@@ -172,22 +196,6 @@ def verify_password(password: str, hashed: str) -> bool:
     """Verifica senha contra hash"""
     return hash_password(password) == hashed
 
-def sanitize_string(value: str, max_length: int = 1000) -> str:
-    """Sanitiza string removendo caracteres perigosos"""
-    if not isinstance(value, str):
-        return ""
-    
-    # Remove caracteres potencialmente perigosos
-    import re
-    cleaned = re.sub(r'[<>"\']', '', value)
-    cleaned = cleaned.strip()
-    
-    # Limita tamanho
-    if len(cleaned) > max_length:
-        cleaned = cleaned[:max_length]
-    
-    return cleaned
-
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Cria token JWT seguro"""
     to_encode = data.copy()
@@ -216,32 +224,60 @@ def authenticate_user(username: str, password: str) -> Optional[Dict[str, Any]]:
     # Sanitizar inputs
     username = sanitize_string(username, 50)
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_connection() as conn:
+        cursor = conn.cursor()
     
-    try:
-        cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-        user = cursor.fetchone()
-        
-        if user and verify_password(password, user['password_hash']):
-            logger.info(f"Login bem-sucedido para usuário: {username}")
-            return {
-                'id': user['id'],
-                'username': user['username'],
-                'is_admin': bool(user['is_admin']),
-                'user_type': user['user_type'] if 'user_type' in user.keys() else 'tecnico'
-            }
+        try:
+            cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
+            user = cursor.fetchone()
+        
+            if user and verify_password(password, user['password_hash']):
+                logger.info(f"Login bem-sucedido para usuário: {username}")
+                return {
+                    'id': user['id'],
+                    'username': user['username'],
+                    'is_admin': bool(user['is_admin']),
+                    'user_type': user['user_type'] if 'user_type' in user.keys() else 'tecnico'
+                }
         
-        logger.warning(f"Tentativa de login falhada para usuário: {username}")
-        return None
-    except Exception as e:
-        logger.error(f"Erro na autenticação: {e}")
-        return None
-    finally:
-        conn.close()
+            logger.warning(f"Tentativa de login falhada para usuário: {username}")
+            return None
+        except Exception as e:
+            logger.error(f"Erro na autenticação: {e}")
+            return None
+
+def issue_tokens(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Access token com as claims de papel/privilégios e refresh token, ambos com a versão atual"""
+    access_token = create_access_token(
+        data={
+            "sub": str(user['id']),
+            "type": "access",
+            "username": user['username'],
+            "is_admin": user['is_admin'],
+            "user_type": user['user_type'],
+            "privileges": user['privileges'],
+            "tv": user['token_version']
+        },
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_access_token(
+        data={"sub": str(user['id']), "type": "refresh", "tv": user['token_version']},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    }
+
+def invalidate_user(user_id: int):
+    """Descarta o usuário dos caches deste worker (chamar após o commit da alteração)"""
+    user_cache.invalidate(user_id)
+    token_revocations.mark_stale()
 
 def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
-    """Obtém usuário atual do token"""
+    """Obtém usuário atual do token (claims do JWT; banco só para tokens antigos ou usuários novos)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token inválido ou expirado",
@@ -250,65 +286,149 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
     
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
+        user_id = payload.get("sub")
+        if user_id is None or payload.get("type", "access") != "access":
             raise credentials_exception
-    except JWTError as e:
+        user_id = int(user_id)
+    except (JWTError, ValueError) as e:
         logger.warning(f"Token JWT inválido: {e}")
         raise credentials_exception
     
-    # Buscar usuário no banco
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    token_version = payload.get("tv")
+    if token_version is not None:
+        try:
+            valid = token_revocations.check(user_id, token_version)
+        except Exception as e:
+            logger.error(f"Erro ao verificar revogação de token: {e}")
+            raise credentials_exception
+        if valid:
+            return user_from_claims(payload)
+        if valid is False:
+            logger.warning(f"Token revogado para usuário ID: {user_id}")
+            raise credentials_exception
     
+    # Token emitido antes das claims, ou usuário ainda fora da lista de revogação
     try:
-        cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-        user = cursor.fetchone()
-        
-        if user is None:
-            logger.warning(f"Usuário não encontrado para ID: {user_id}")
-            raise credentials_exception
-        
-        return {
-            'id': user['id'],
-            'username': user['username'],
-            'is_admin': bool(user['is_admin']),
-            'user_type': user['user_type'] if 'user_type' in user.keys() else 'tecnico'
-        }
+        user = user_cache.get(user_id)
     except Exception as e:
         logger.error(f"Erro ao buscar usuário: {e}")
         raise credentials_exception
-    finally:
-        conn.close()
+    
+    if user is None:
+        logger.warning(f"Usuário não encontrado para ID: {user_id}")
+        raise credentials_exception
+    if token_version is not None and token_version != user['token_version']:
+        logger.warning(f"Token revogado para usuário ID: {user_id}")
+        raise credentials_exception
+    
+    return user
 
 # === ENDPOINTS DE AUTENTICAÇÃO ===
+# Verificação de senha e leitura do usuário fora do threadpool dos endpoints
+login_executor = ThreadPoolExecutor(max_workers=LOGIN_WORKERS, thread_name_prefix="login")
+login_pending = 0
+
+def check_login(username: str, password: str) -> Dict[str, Any]:
+    """Parte cara do login (roda no login_executor): senha e emissão dos tokens"""
+    user = authenticate_user(username, password)
+    if not user:
+        return {'status': 'failed'}
+    
+    # Claims lidas do banco na emissão: o restante das requisições não consulta users
+    with db_connection() as conn:
+        user = load_user(conn.cursor(), user['id'])
+    if user is None:
+        return {'status': 'failed'}
+    return {'status': 'ok', 'tokens': issue_tokens(user)}
+
 @app.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends()) -> Dict[str, str]:
-    """Endpoint de login com validação robusta"""
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> Dict[str, Any]:
+    """Endpoint de login com validação robusta e limite de tentativas por IP e usuário"""
+    global login_pending
+    
+    # Atrás do proxy do Railway request.client é sempre o proxy
+    ip = client_ip(request.headers.get('X-Forwarded-For'), request.client.host if request.client else None)
+    
+    # Limite verificado antes de ocupar o login_executor: quem está bloqueado recebe 429
+    # sem tomar o lugar de logins legítimos (primeiro em memória, depois no SQLite)
     try:
-        user = authenticate_user(form_data.username, form_data.password)
-        if not user:
-            # Delay para prevenir ataques de força bruta
-            import time
-            time.sleep(1)
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Credenciais inválidas",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": str(user['id'])}, expires_delta=access_token_expires
+        retry_after = login_limiter.blocked(ip, form_data.username)
+        if retry_after is None:
+            retry_after = await run_in_threadpool(login_limiter.retry_after, ip, form_data.username)
+    except Exception as e:
+        logger.error(f"Erro ao verificar limite de login: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+    
+    if retry_after is not None:
+        logger.warning(f"Login bloqueado por excesso de tentativas: {form_data.username} ({ip})")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente mais tarde.",
+            headers={"Retry-After": str(retry_after)},
+        )
+    
+    if login_pending >= LOGIN_MAX_PENDING:
+        logger.warning("Fila de login cheia; tentativa recusada")
+        raise HTTPException(status_code=503, detail="Serviço ocupado, tente novamente", headers={"Retry-After": "1"})
+    
+    login_pending += 1
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(
+            login_executor, check_login, form_data.username, form_data.password
         )
-        
-        return {"access_token": access_token, "token_type": "bearer"}
-
-    except HTTPException:
-        raise
     except Exception as e:
         logger.error(f"Erro no endpoint de login: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
+    finally:
+        login_pending -= 1
+    
+    if result['status'] == 'failed':
+        try:
+            await run_in_threadpool(login_limiter.record_failure, ip, form_data.username)
+        except Exception as e:
+            logger.error(f"Erro ao registrar tentativa de login falha: {e}")
+        # Delay para prevenir ataques de força bruta (não bloqueia threads)
+        await asyncio.sleep(LOGIN_FAILURE_DELAY)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciais inválidas",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return result['tokens']
+
+@app.post("/token/refresh", response_model=Token)
+def refresh_access_token(request_data: RefreshRequest) -> Dict[str, Any]:
+    """Troca um refresh token válido por um novo par de tokens (claims relidas do banco)"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token inválido ou expirado",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    try:
+        payload = jwt.decode(request_data.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("type") != "refresh" or payload.get("sub") is None:
+            raise credentials_exception
+        user_id = int(payload["sub"])
+    except (JWTError, ValueError) as e:
+        logger.warning(f"Refresh token inválido: {e}")
+        raise credentials_exception
+    
+    try:
+        with db_connection() as conn:
+            user = load_user(conn.cursor(), user_id)
+    except Exception as e:
+        logger.error(f"Erro ao renovar token: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+    
+    # Senha alterada ou usuário removido desde a emissão: exige novo login.
+    # Papel e privilégios não revogam: o par novo leva as claims atuais do banco
+    if user is None or user['token_version'] != payload.get("tv"):
+        logger.warning(f"Refresh token revogado para usuário ID: {user_id}")
+        raise credentials_exception
+    
+    return issue_tokens(user)
 
 @app.get("/me", response_model=UserResponse)
 def get_user_info(current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
@@ -316,109 +436,152 @@ def get_user_info(current_user: Dict[str, Any] = Depends(get_current_user)) -> D
     return current_user
 
 # === ENDPOINTS DE LAUDOS ===
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """Publica o cursor da próxima página no cabeçalho (corpo continua sendo a lista)"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
 @app.get("/laudos")
-def get_laudos(current_user: Dict[str, Any] = Depends(get_current_user)) -> List[Dict[str, Any]]:
-    """Lista laudos baseado no tipo de usuário"""
+def get_laudos(
+    response: Response,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)")
+) -> List[Dict[str, Any]]:
+    """Lista laudos baseado no tipo de usuário (paginado por cursor)"""
     try:
         if current_user['is_admin']:
             # Admin vê todos os laudos
-            laudos = LaudoDatabase.get_all_laudos()
+            laudos, next_cursor = LaudoDatabase.get_laudos_page(limit=limit, page_cursor=cursor)
         else:
             # Usuários comuns veem apenas seus próprios laudos
-            laudos = LaudoDatabase.get_laudos_by_user(current_user['id'])
+            laudos, next_cursor = LaudoDatabase.get_laudos_page(current_user['id'], limit=limit, page_cursor=cursor)
         
+        set_next_cursor(response, next_cursor)
         logger.info(f"Usuário {current_user['username']} acessou {len(laudos)} laudos")
         return laudos or []
     
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao buscar laudos: {e}")
         raise HTTPException(status_code=500, detail="Erro ao buscar laudos")
 
 @app.get("/laudos/approval")
-def get_laudos_for_approval(current_user: Dict[str, Any] = Depends(get_current_user)) -> List[Dict[str, Any]]:
-    """Lista laudos para aprovação baseado no tipo de usuário"""
+def get_laudos_for_approval(
+    response: Response,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)")
+) -> List[Dict[str, Any]]:
+    """Lista laudos para aprovação baseado no tipo de usuário (paginado por cursor)"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        base_query = """
+            SELECT l.*, u.username as user_name 
+            FROM laudos l 
+            LEFT JOIN users u ON l.user_id = u.id 
+        """
         
         # Filtrar laudos baseado no tipo de usuário
         if current_user['is_admin']:
             # Admin vê todos os laudos
-            cursor.execute("""
-                SELECT l.*, u.username as user_name 
-                FROM laudos l 
-                LEFT JOIN users u ON l.user_id = u.id 
-                WHERE l.status != 'finalizado'
-                ORDER BY l.created_at DESC
-            """)
+            base_query += " WHERE l.status != 'finalizado'"
         elif current_user['user_type'] == 'encarregado':
             # Encarregado vê laudos que podem ser aprovados para manutenção
-            cursor.execute("""
-                SELECT l.*, u.username as user_name 
-                FROM laudos l 
-                LEFT JOIN users u ON l.user_id = u.id 
-                WHERE l.status IN ('em_andamento', 'aprovado_vendas') AND l.status != 'finalizado'
-                ORDER BY l.created_at DESC
-            """)
+            base_query += " WHERE l.status IN ('em_andamento', 'aprovado_vendas')"
         elif current_user['user_type'] == 'vendedor':
             # Vendedor vê laudos que podem ser aprovados para vendas
-            cursor.execute("""
-                SELECT l.*, u.username as user_name 
-                FROM laudos l 
-                LEFT JOIN users u ON l.user_id = u.id 
-                WHERE l.status IN ('em_andamento', 'aprovado_manutencao') AND l.status != 'finalizado'
-                ORDER BY l.created_at DESC
-            """)
+            base_query += " WHERE l.status IN ('em_andamento', 'aprovado_manutencao')"
         else:
             # Usuários sem permissão de aprovação
             logger.warning(f"Usuário {current_user['username']} tentou acessar painel de aprovação sem permissão")
-            conn.close()
             return []
         
-        laudos = []
-        for row in cursor.fetchall():
-            laudo_dict = dict(row)
-            laudos.append(laudo_dict)
-        
-        conn.close()
+        with db_connection() as conn:
+            laudos, next_cursor = fetch_keyset_page(
+                conn.cursor(), base_query, [], "l.created_at", limit=limit, page_cursor=cursor
+            )
         
+        set_next_cursor(response, next_cursor)
         logger.info(f"Usuário {current_user['username']} ({current_user['user_type']}) acessou {len(laudos)} laudos para aprovação")
         return laudos
     
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao buscar laudos para aprovação: {e}")
         raise HTTPException(status_code=500, detail="Erro ao buscar laudos para aprovação")
 
 @app.get("/laudos/finalized")
-def get_finalized_laudos(current_user: Dict[str, Any] = Depends(get_current_user)) -> List[Dict[str, Any]]:
-    """Retorna todos os laudos finalizados - acesso para todos os usuários"""
+def get_finalized_laudos(
+    response: Response,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)")
+) -> List[Dict[str, Any]]:
+    """Retorna os laudos finalizados - acesso para todos os usuários (paginado por cursor)"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Todos os usuários podem ver laudos finalizados
-        cursor.execute("""
-            SELECT l.*, u.username as user_name 
-            FROM laudos l 
-            LEFT JOIN users u ON l.user_id = u.id 
-            WHERE l.status = 'finalizado'
-            ORDER BY l.updated_at DESC, l.created_at DESC
-        """)
-        
-        laudos = []
-        for row in cursor.fetchall():
-            laudo_dict = dict(row)
-            laudos.append(laudo_dict)
-        
-        conn.close()
+        with db_connection() as conn:
+            laudos, next_cursor = fetch_keyset_page(
+                conn.cursor(),
+                """
+                SELECT l.*, u.username as user_name 
+                FROM laudos l 
+                LEFT JOIN users u ON l.user_id = u.id 
+                WHERE l.status = 'finalizado'
+                """,
+                [], "l.updated_at", limit=limit, page_cursor=cursor
+            )
         
+        set_next_cursor(response, next_cursor)
         logger.info(f"Usuário {current_user['username']} ({current_user['user_type']}) acessou {len(laudos)} laudos finalizados")
         return laudos
         
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao buscar laudos finalizados: {e}")
         raise HTTPException(status_code=500, detail="Erro ao buscar laudos finalizados")
 
+@app.get("/laudos/search")
+def search_laudos(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Texto a buscar"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Status do laudo"),
+    date_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Criado a partir de (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Criado até (YYYY-MM-DD)"),
+    tecnico_id: Optional[int] = Query(None, description="ID do técnico responsável"),
+    tag: Optional[str] = Query(None, max_length=50, description="Tag exata"),
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página (X-Next-Cursor)")
+) -> List[Dict[str, Any]]:
+    """Busca textual nos laudos com filtros (mesma visibilidade de /laudos, paginado por cursor até SEARCH_MAX_RESULTS)"""
+    # Admin busca em todos os laudos; demais usuários apenas nos próprios
+    if current_user['is_admin']:
+        user_id = tecnico_id
+    elif tecnico_id is not None and tecnico_id != current_user['id']:
+        return []
+    else:
+        user_id = current_user['id']
+    
+    try:
+        with db_connection() as conn:
+            results, next_cursor = search_laudos_fts(
+                conn.cursor(), q, user_id=user_id, status=status_filter, date_from=date_from,
+                date_to=date_to, tag=tag, limit=limit, page_cursor=cursor
+            )
+        
+        set_next_cursor(response, next_cursor)
+        return results
+    
+    except (InvalidCursorError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro na busca de laudos: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao buscar laudos")
+
 @app.post("/laudos", status_code=201)
 def create_laudo(laudo: LaudoSimples, current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
     """Cria um novo laudo simples"""
@@ -451,37 +614,35 @@ def create_laudo(laudo: LaudoSimples, current_user: Dict[str, Any] = Depends(get
 def get_laudo_by_id(laudo_id: int, current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
     """Busca um laudo específico por ID"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Buscar o laudo
-        cursor.execute("""
-            SELECT l.*, u.username as user_name 
-            FROM laudos l 
-            LEFT JOIN users u ON l.user_id = u.id 
-            WHERE l.id = ?
-        """, (laudo_id,))
-        
-        laudo = cursor.fetchone()
+            # Buscar o laudo
+            cursor.execute("""
+                SELECT l.*, u.username as user_name 
+                FROM laudos l 
+                LEFT JOIN users u ON l.user_id = u.id 
+                WHERE l.id = ?
+            """, (laudo_id,))
         
-        if not laudo:
-            raise HTTPException(status_code=404, detail="Laudo não encontrado")
+            laudo = cursor.fetchone()
         
-        # Verificar permissões
-        if not current_user['is_admin'] and laudo['user_id'] != current_user['id']:
-            raise HTTPException(status_code=403, detail="Acesso negado")
+            if not laudo:
+                raise HTTPException(status_code=404, detail="Laudo não encontrado")
         
-        # Converter para dicionário
-        laudo_dict = dict(laudo)
+            # Verificar permissões
+            if not current_user['is_admin'] and laudo['user_id'] != current_user['id']:
+                raise HTTPException(status_code=403, detail="Acesso negado")
         
-        # Buscar informações de aprovação se houver
-        if laudo['approved_by']:
-            cursor.execute("SELECT username FROM users WHERE id = ?", (laudo['approved_by'],))
-            approved_user = cursor.fetchone()
-            if approved_user:
-                laudo_dict['approved_by_name'] = approved_user['username']
+            # Converter para dicionário
+            laudo_dict = dict(laudo)
         
-        conn.close()
+            # Buscar informações de aprovação se houver
+            if laudo['approved_by']:
+                cursor.execute("SELECT username FROM users WHERE id = ?", (laudo['approved_by'],))
+                approved_user = cursor.fetchone()
+                if approved_user:
+                    laudo_dict['approved_by_name'] = approved_user['username']
         
         logger.info(f"Laudo {laudo_id} acessado pelo usuário {current_user['username']}")
         return laudo_dict
@@ -500,32 +661,31 @@ def get_all_privileges(current_user: Dict[str, Any] = Depends(get_current_user))
         if not current_user['is_admin']:
             raise HTTPException(status_code=403, detail="Acesso negado")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute("""
+                SELECT up.id, up.user_id, up.privilege_type, up.granted_by, up.granted_at, up.is_active,
+                       u.username as user_name, g.username as granted_by_name
+                FROM user_privileges up
+                JOIN users u ON up.user_id = u.id
+                JOIN users g ON up.granted_by = g.id
+                ORDER BY up.granted_at DESC
+            """)
+        
+            privileges = []
+            for row in cursor.fetchall():
+                privileges.append({
+                    'id': row[0],
+                    'user_id': row[1],
+                    'privilege_type': row[2],
+                    'granted_by': row[3],
+                    'granted_at': row[4],
+                    'is_active': bool(row[5]),
+                    'user_name': row[6],
+                    'granted_by_name': row[7]
+                })
         
-        cursor.execute("""
-            SELECT up.id, up.user_id, up.privilege_type, up.granted_by, up.granted_at, up.is_active,
-                   u.username as user_name, g.username as granted_by_name
-            FROM user_privileges up
-            JOIN users u ON up.user_id = u.id
-            JOIN users g ON up.granted_by = g.id
-            ORDER BY up.granted_at DESC
-        """)
-        
-        privileges = []
-        for row in cursor.fetchall():
-            privileges.append({
-                'id': row[0],
-                'user_id': row[1],
-                'privilege_type': row[2],
-                'granted_by': row[3],
-                'granted_at': row[4],
-                'is_active': bool(row[5]),
-                'user_name': row[6],
-                'granted_by_name': row[7]
-            })
-        
-        conn.close()
         return privileges
         
     except HTTPException:
@@ -541,39 +701,39 @@ def create_privilege(privilege_data: dict, current_user: Dict[str, Any] = Depend
         if not current_user['is_admin'] and current_user.get('user_type') != 'encarregado':
             raise HTTPException(status_code=403, detail="Acesso negado")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Verificar se o usuário existe
-        cursor.execute('SELECT id, user_type FROM users WHERE id = ?', (privilege_data['user_id'],))
-        user = cursor.fetchone()
+            # Verificar se o usuário existe
+            cursor.execute('SELECT id, user_type FROM users WHERE id = ?', (privilege_data['user_id'],))
+            user = cursor.fetchone()
         
-        if not user:
-            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+            if not user:
+                raise HTTPException(status_code=404, detail="Usuário não encontrado")
         
-        user_id, user_type = user
+            user_id, user_type = user
         
-        if user_type != 'tecnico':
-            raise HTTPException(status_code=400, detail="Privilégios só podem ser concedidos a técnicos")
+            if user_type != 'tecnico':
+                raise HTTPException(status_code=400, detail="Privilégios só podem ser concedidos a técnicos")
         
-        # Verificar se já tem o privilégio ativo
-        cursor.execute('''
-            SELECT id FROM user_privileges 
-            WHERE user_id = ? AND privilege_type = ? AND is_active = TRUE
-        ''', (user_id, privilege_data['privilege_type']))
+            # Verificar se já tem o privilégio ativo
+            cursor.execute('''
+                SELECT id FROM user_privileges 
+                WHERE user_id = ? AND privilege_type = ? AND is_active = TRUE
+            ''', (user_id, privilege_data['privilege_type']))
         
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Usuário já possui este privilégio")
+            if cursor.fetchone():
+                raise HTTPException(status_code=400, detail="Usuário já possui este privilégio")
         
-        # Criar privilégio
-        cursor.execute('''
-            INSERT INTO user_privileges (user_id, privilege_type, granted_by)
-            VALUES (?, ?, ?)
-        ''', (user_id, privilege_data['privilege_type'], current_user['id']))
+            # Criar privilégio
+            cursor.execute('''
+                INSERT INTO user_privileges (user_id, privilege_type, granted_by)
+                VALUES (?, ?, ?)
+            ''', (user_id, privilege_data['privilege_type'], current_user['id']))
         
-        conn.commit()
-        conn.close()
+            conn.commit()
         
+        invalidate_user(user_id)
         logger.info(f"Privilégio {privilege_data['privilege_type']} concedido ao usuário {user_id} por {current_user['username']}")
         
         return {"message": "Privilégio concedido com sucesso"}
@@ -591,22 +751,22 @@ def revoke_privilege(user_id: int, privilege_type: str, current_user: Dict[str,
         if not current_user['is_admin'] and current_user.get('user_type') != 'encarregado':
             raise HTTPException(status_code=403, detail="Acesso negado")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Revogar privilégio
-        cursor.execute('''
-            UPDATE user_privileges 
-            SET is_active = FALSE 
-            WHERE user_id = ? AND privilege_type = ? AND is_active = TRUE
-        ''', (user_id, privilege_type))
+            # Revogar privilégio
+            cursor.execute('''
+                UPDATE user_privileges 
+                SET is_active = FALSE 
+                WHERE user_id = ? AND privilege_type = ? AND is_active = TRUE
+            ''', (user_id, privilege_type))
         
-        if cursor.rowcount == 0:
-            raise HTTPException(status_code=404, detail="Privilégio não encontrado ou já revogado")
+            if cursor.rowcount == 0:
+                raise HTTPException(status_code=404, detail="Privilégio não encontrado ou já revogado")
         
-        conn.commit()
-        conn.close()
+            conn.commit()
         
+        invalidate_user(user_id)
         logger.info(f"Privilégio {privilege_type} revogado do usuário {user_id} por {current_user['username']}")
         
         return {"message": "Privilégio revogado com sucesso"}
@@ -621,17 +781,16 @@ def revoke_privilege(user_id: int, privilege_type: str, current_user: Dict[str,
 def get_user_privileges(current_user: Dict[str, Any] = Depends(get_current_user)) -> List[str]:
     """Retorna os privilégios do usuário atual"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT privilege_type 
-            FROM user_privileges 
-            WHERE user_id = ? AND is_active = TRUE
-        """, (current_user['id'],))
+            cursor.execute("""
+                SELECT privilege_type 
+                FROM user_privileges 
+                WHERE user_id = ? AND is_active = TRUE
+            """, (current_user['id'],))
         
-        privileges = [row[0] for row in cursor.fetchall()]
-        conn.close()
+            privileges = [row[0] for row in cursor.fetchall()]
         
         return privileges
         
@@ -640,31 +799,25 @@ def get_user_privileges(current_user: Dict[str, Any] = Depends(get_current_user)
         return []
 
 @app.get("/laudo-viewer/{laudo_id}")
-def get_laudo_for_viewer(laudo_id: int) -> HTMLResponse:
+def get_laudo_for_viewer(laudo_id: int, request: Request) -> Response:
     """Rota pública para visualização de laudos"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Buscar o laudo
-        cursor.execute("""
-            SELECT l.*, u.username as user_name 
-            FROM laudos l 
-            LEFT JOIN users u ON l.user_id = u.id 
-            WHERE l.id = ?
-        """, (laudo_id,))
-        
-        laudo = cursor.fetchone()
-        conn.close()
+        laudo_dict = fetch_laudo_for_render(laudo_id)
         
-        if not laudo:
+        if not laudo_dict:
             return HTMLResponse(content="<h1>Laudo não encontrado</h1>", status_code=404)
         
+        # Cliente já tem esta versão: 304 sem renderizar
+        last_modified = laudo_last_modified(laudo_dict)
+        etag = laudo_etag(laudo_dict, "html")
+        headers = cache_headers(laudo_dict, etag, last_modified, shared=True)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(headers)
+        
         # Gerar HTML do laudo
-        laudo_dict = dict(laudo)
         html_content = generate_laudo_html(laudo_dict, print_mode=False)
         
-        return HTMLResponse(content=html_content)
+        return HTMLResponse(content=html_content, headers=headers)
         
     except Exception as e:
         logger.error(f"Erro ao gerar visualização do laudo {laudo_id}: {e}")
@@ -675,62 +828,64 @@ def get_laudo_for_viewer(laudo_id: int) -> HTMLResponse:
 def update_laudo(laudo_id: int, laudo_data: dict, current_user: Dict[str, Any] = Depends(get_current_user)) -> Dict[str, Any]:
     """Atualiza um laudo existente"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Verificar se o laudo existe
-        cursor.execute("SELECT user_id FROM laudos WHERE id = ?", (laudo_id,))
-        laudo = cursor.fetchone()
+            # Verificar se o laudo existe
+            cursor.execute("SELECT user_id FROM laudos WHERE id = ?", (laudo_id,))
+            laudo = cursor.fetchone()
         
-        if not laudo:
-            raise HTTPException(status_code=404, detail="Laudo não encontrado")
+            if not laudo:
+                raise HTTPException(status_code=404, detail="Laudo não encontrado")
         
-        # Verificar permissões - permitir aprovação para Encarregado e Vendedor
-        if not current_user['is_admin'] and laudo['user_id'] != current_user['id']:
-            # Verificar se o usuário tem permissão de aprovação
-            if current_user['user_type'] not in ['encarregado', 'vendedor']:
-                raise HTTPException(status_code=403, detail="Acesso negado")
+            # Verificar permissões - permitir aprovação para Encarregado e Vendedor
+            if not current_user['is_admin'] and laudo['user_id'] != current_user['id']:
+                # Verificar se o usuário tem permissão de aprovação
+                if current_user['user_type'] not in ['encarregado', 'vendedor']:
+                    raise HTTPException(status_code=403, detail="Acesso negado")
             
-            # Para usuários com permissão de aprovação, verificar se estão apenas alterando o status
-            if 'status' not in laudo_data or len(laudo_data) > 2:  # status + observacoes
-                raise HTTPException(status_code=403, detail="Usuários de aprovação só podem alterar status e observações")
+                # Para usuários com permissão de aprovação, verificar se estão apenas alterando o status
+                if 'status' not in laudo_data or len(laudo_data) > 2:  # status + observacoes
+                    raise HTTPException(status_code=403, detail="Usuários de aprovação só podem alterar status e observações")
         
-        # Sanitizar dados de entrada
-        sanitized_data = {}
-        for field in ['cliente', 'equipamento', 'diagnostico', 'solucao', 'status']:
-            if field in laudo_data:
-                sanitized_data[field] = sanitize_string(str(laudo_data[field]), 1000)
-        
-        # Atualizar o laudo
-        update_fields = []
-        update_values = []
-        
-        for field, value in sanitized_data.items():
-            update_fields.append(f"{field} = ?")
-            update_values.append(value)
-        
-        update_values.append(datetime.now().isoformat())  # updated_at
-        update_values.append(laudo_id)  # WHERE id = ?
-        
-        query = f"""
-            UPDATE laudos 
-            SET {', '.join(update_fields)}, updated_at = ? 
-            WHERE id = ?
-        """
+            # Sanitizar dados de entrada
+            sanitized_data = {}
+            for field in ['cliente', 'equipamento', 'diagnostico', 'solucao', 'status']:
+                if field in laudo_data:
+                    sanitized_data[field] = sanitize_string(str(laudo_data[field]), 1000)
         
-        cursor.execute(query, update_values)
-        conn.commit()
+            # Atualizar o laudo
+            update_fields = []
+            update_values = []
         
-        # Buscar o laudo atualizado
-        cursor.execute("""
-            SELECT l.*, u.username as user_name 
-            FROM laudos l 
-            LEFT JOIN users u ON l.user_id = u.id 
-            WHERE l.id = ?
-        """, (laudo_id,))
+            for field, value in sanitized_data.items():
+                update_fields.append(f"{field} = ?")
+                update_values.append(value)
+        
+            update_values.append(laudo_id)  # WHERE id = ?
+        
+            # updated_at em UTC, como os demais timestamps do banco (CURRENT_TIMESTAMP)
+            query = f"""
+                UPDATE laudos 
+                SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP 
+                WHERE id = ?
+            """
+        
+            cursor.execute(query, update_values)
+            if 'diagnostico' in sanitized_data:
+                # O trigger da migração 7 zerou a categoria: reclassifica na mesma transação
+                store_defect_category(cursor, laudo_id, sanitized_data['diagnostico'])
+            conn.commit()
+        
+            # Buscar o laudo atualizado
+            cursor.execute("""
+                SELECT l.*, u.username as user_name 
+                FROM laudos l 
+                LEFT JOIN users u ON l.user_id = u.id 
+                WHERE l.id = ?
+            """, (laudo_id,))
         
-        updated_laudo = cursor.fetchone()
-        conn.close()
+            updated_laudo = cursor.fetchone()
         
         logger.info(f"Laudo {laudo_id} atualizado pelo usuário {current_user['username']}")
         return dict(updated_laudo)
@@ -746,50 +901,10 @@ def update_laudo(laudo_id: int, laudo_data: dict, current_user: Dict[str, Any] =
 @app.get('/api/notifications')
 def get_notifications(current_user: Dict[str, Any] = Depends(get_current_user)):
     try:
-        # Buscar notificações do usuário atual
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar se a tabela notifications existe
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='notifications'
-        """)
+        # Eventos direcionados ao usuário + broadcasts, mesclados na leitura
+        with db_connection() as conn:
+            notifications = get_user_notifications(conn.cursor(), current_user['id'])
         
-        if not cursor.fetchone():
-            # Se a tabela não existe, criar ela
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS notifications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    type TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    read BOOLEAN DEFAULT FALSE,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            conn.commit()
-        
-        cursor.execute("""
-            SELECT id, type, message, created_at, read 
-            FROM notifications 
-            WHERE user_id = ? 
-            ORDER BY created_at DESC 
-            LIMIT 50
-        """, (current_user['id'],))
-        
-        notifications = []
-        for row in cursor.fetchall():
-            notifications.append({
-                'id': row[0],
-                'type': row[1],
-                'message': row[2],
-                'created_at': row[3],
-                'read': bool(row[4])
-            })
-        
-        conn.close()
         return notifications
     except Exception as e:
         logger.error(f"Erro ao buscar notificações: {e}")
@@ -799,106 +914,109 @@ def get_notifications(current_user: Dict[str, Any] = Depends(get_current_user)):
 @app.put('/api/notifications/{notification_id}/read')
 def mark_notification_read(notification_id: int, current_user: Dict[str, Any] = Depends(get_current_user)):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar se a tabela notifications existe
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name='notifications'
-        """)
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        if not cursor.fetchone():
-            # Se a tabela não existe, criar ela
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS notifications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    type TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    read BOOLEAN DEFAULT FALSE,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
+            mark_read(cursor, current_user['id'], notification_id)
             conn.commit()
         
-        cursor.execute("""
-            UPDATE notifications 
-            SET read = 1 
-            WHERE id = ? AND user_id = ?
-        """, (notification_id, current_user['id']))
-        
-        conn.commit()
-        conn.close()
-        
         return {"message": "Notificação marcada como lida"}
     except Exception as e:
         logger.error(f"Erro ao marcar notificação como lida: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Erro interno")
 
+@app.get('/api/events/stream')
+async def stream_events(
+    request: Request,
+    token: Optional[str] = Query(None, description="JWT (EventSource não envia cabeçalhos)"),
+    last_event_id: Optional[int] = Query(None, description="Retomar após este id")
+):
+    """Stream SSE de notificações, tags, aprovações e finalizações"""
+    auth_header = request.headers.get('Authorization', '')
+    raw_token = token or (auth_header[7:] if auth_header.lower().startswith('bearer ') else None)
+    if not raw_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    current_user = await run_in_threadpool(get_current_user, raw_token)
+    # Assinatura já verificada acima; exp é conferido pelo stream sem sair do event loop
+    expires_at = jwt.get_unverified_claims(raw_token).get('exp')
+    
+    # O stream dura mais que o token: revogação verificada em intervalos (ou se usuários mudarem)
+    async def authorize() -> bool:
+        try:
+            await run_in_threadpool(get_current_user, raw_token)
+            return True
+        except HTTPException:
+            logger.info(f"Stream SSE encerrado: token expirado ou revogado (usuário ID: {current_user['id']})")
+            return False
+    
+    # O navegador reenvia Last-Event-ID automaticamente ao reconectar
+    header_last_id = request.headers.get('Last-Event-ID')
+    if header_last_id and header_last_id.isdigit():
+        last_event_id = int(header_last_id)
+    
+    return StreamingResponse(
+        event_stream(request, current_user['id'], last_event_id, expires_at=expires_at,
+                     authorize=authorize, auth_version=lambda: token_revocations.version),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # desativa buffering em proxies nginx
+        }
+    )
+
 def create_notification(user_id: int, notification_type: str, message: str):
     """Função auxiliar para criar notificações"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO notifications (user_id, type, message, created_at, read)
-            VALUES (?, ?, ?, datetime('now'), 0)
-        """, (user_id, notification_type, message))
-        conn.commit()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            publish_event(cursor, notification_type, message, target_user_id=user_id)
+            conn.commit()
     except Exception as e:
         print(f"Erro ao criar notificação: {e}")
 
 # === ROTAS DE PDF ===
 @app.get("/laudos/{laudo_id}/pdf")
-def generate_laudo_pdf(
+async def generate_laudo_pdf(
     laudo_id: int, 
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user),
     download: bool = Query(False, description="Baixar PDF"),
     print: bool = Query(False, description="Modo impressão")
 ):
     """Gera PDF do laudo técnico"""
     try:
-        # Buscar dados do laudo
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT l.*, u.username as user_name 
-            FROM laudos l 
-            LEFT JOIN users u ON l.user_id = u.id 
-            WHERE l.id = ?
-        """, (laudo_id,))
-        
-        laudo = cursor.fetchone()
-        conn.close()
+        # Buscar dados do laudo (fora do event loop)
+        laudo = await run_in_threadpool(fetch_laudo_for_render, laudo_id)
         
         if not laudo:
             raise HTTPException(status_code=404, detail="Laudo não encontrado")
         
-        # Converter para dicionário
-        laudo_dict = dict(laudo)
+        # Cliente já tem esta versão: 304 sem renderizar
+        last_modified = laudo_last_modified(laudo)
+        etag = laudo_etag(laudo, "print" if print else "pdf")
+        headers = cache_headers(laudo, etag, last_modified, shared=False)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(headers)
         
-        # Gerar HTML do PDF
-        html_content = generate_laudo_html(laudo_dict, print)
-        
-        # Se for download, retornar como arquivo
-        if download:
-            return HTMLResponse(
-                content=html_content,
-                headers={
-                    "Content-Disposition": f"attachment; filename=laudo_{laudo_id}.html"
-                }
-            )
-        
-        # Se for impressão, retornar HTML otimizado para impressão
+        # Se for impressão, retornar HTML otimizado para impressão (window.print no navegador)
         if print:
-            return HTMLResponse(content=html_content)
-        
-        # Retorno normal (visualização)
-        return HTMLResponse(content=html_content)
+            return HTMLResponse(content=generate_laudo_html(laudo, True), headers=headers)
+        
+        # PDF real: renderizado no pool de processos e servido do cache em disco
+        pdf_path = await pdf_service.get_pdf(laudo)
+        disposition = "attachment" if download else "inline"
+        headers["Content-Disposition"] = f"{disposition}; filename=laudo_{laudo_id}.pdf"
+        # ETag/Last-Modified informados prevalecem sobre os gerados pelo FileResponse (mtime do cache)
+        return FileResponse(
+            pdf_path,
+            media_type="application/pdf",
+            headers=headers
+        )
         
     except HTTPException:
         raise
@@ -906,265 +1024,28 @@ def generate_laudo_pdf(
         logger.error(f"Erro ao gerar PDF do laudo {laudo_id}: {e}")
         raise HTTPException(status_code=500, detail="Erro ao gerar PDF")
 
+@app.on_event("shutdown")
+def shutdown_pdf_workers():
+    """Encerra o pool de processos de renderização e o executor de login"""
+    pdf_service.shutdown()
+    login_executor.shutdown(wait=False)
+
+def fetch_laudo_for_render(laudo_id: int) -> Optional[Dict[str, Any]]:
+    """Laudo + nome do técnico, usado pelo PDF e pelo visualizador"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT l.*, u.username as user_name 
+            FROM laudos l 
+            LEFT JOIN users u ON l.user_id = u.id 
+            WHERE l.id = ?
+        """, (laudo_id,))
+        laudo = cursor.fetchone()
+    return dict(laudo) if laudo else None
+
 def generate_laudo_html(laudo: Dict[str, Any], print_mode: bool = False) -> str:
     """Gera HTML formatado para o laudo"""
-    
-    # Formatar data
-    data_criacao = datetime.fromisoformat(laudo['created_at']).strftime('%d/%m/%Y às %H:%M')
-    data_atualizacao = datetime.fromisoformat(laudo['updated_at']).strftime('%d/%m/%Y às %H:%M') if laudo['updated_at'] else 'Não atualizado'
-    
-    # Status com cores
-    status_info = {
-        'em_andamento': {'label': 'Em Andamento', 'color': '#f59e0b'},
-        'pendente': {'label': 'Pendente', 'color': '#3b82f6'},
-        'ap_manutencao': {'label': 'Aprovado - Manutenção', 'color': '#10b981'},
-        'aguardando_orcamento': {'label': 'Aguardando Orçamento', 'color': '#8b5cf6'},
-        'ap_vendas': {'label': 'Aprovado - Vendas', 'color': '#6366f1'},
-        'finalizado': {'label': 'Finalizado', 'color': '#059669'},
-        'reprovado': {'label': 'Reprovado', 'color': '#ef4444'}
-    }
-    
-    status = status_info.get(laudo['status'], {'label': laudo['status'], 'color': '#6b7280'})
-    
-    html = f"""
-    <!DOCTYPE html>
-    <html lang="pt-BR">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Laudo Técnico #{laudo['id']} - RSM Moura</title>
-        <style>
-            @media print {{
-                body {{ margin: 0; padding: 20px; }}
-                .no-print {{ display: none !important; }}
-                .page-break {{ page-break-before: always; }}
-            }}
-            
-            body {{
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 800px;
-                margin: 0 auto;
-                padding: 20px;
-                background-color: #f8fafc;
-            }}
-            
-            .header {{
-                text-align: center;
-                border-bottom: 3px solid #1e40af;
-                padding-bottom: 20px;
-                margin-bottom: 30px;
-            }}
-            
-            .logo {{
-                font-size: 24px;
-                font-weight: bold;
-                color: #1e40af;
-                margin-bottom: 10px;
-            }}
-            
-            .title {{
-                font-size: 28px;
-                font-weight: bold;
-                color: #1f2937;
-                margin-bottom: 5px;
-            }}
-            
-            .subtitle {{
-                font-size: 16px;
-                color: #6b7280;
-                margin-bottom: 20px;
-            }}
-            
-            .laudo-info {{
-                background: white;
-                border-radius: 8px;
-                padding: 20px;
-                margin-bottom: 20px;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-            }}
-            
-            .info-grid {{
-                display: grid;
-                grid-template-columns: 1fr 1fr;
-                gap: 20px;
-                margin-bottom: 20px;
-            }}
-            
-            .info-item {{
-                display: flex;
-                flex-direction: column;
-            }}
-            
-            .info-label {{
-                font-weight: 600;
-                color: #374151;
-                margin-bottom: 5px;
-                font-size: 14px;
-            }}
-            
-            .info-value {{
-                color: #1f2937;
-                font-size: 16px;
-            }}
-            
-            .status-badge {{
-                display: inline-block;
-                padding: 4px 12px;
-                border-radius: 20px;
-                font-size: 14px;
-                font-weight: 600;
-                color: white;
-                background-color: {status['color']};
-            }}
-            
-            .section {{
-                background: white;
-                border-radius: 8px;
-                padding: 20px;
-                margin-bottom: 20px;
-                box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-            }}
-            
-            .section-title {{
-                font-size: 18px;
-                font-weight: 600;
-                color: #1f2937;
-                margin-bottom: 15px;
-                border-bottom: 2px solid #e5e7eb;
-                padding-bottom: 8px;
-            }}
-            
-            .content-text {{
-                color: #374151;
-                line-height: 1.7;
-                text-align: justify;
-            }}
-            
-            .footer {{
-                margin-top: 40px;
-                padding-top: 20px;
-                border-top: 1px solid #e5e7eb;
-                text-align: center;
-                color: #6b7280;
-                font-size: 14px;
-            }}
-            
-            .signature-section {{
-                margin-top: 40px;
-                display: grid;
-                grid-template-columns: 1fr 1fr;
-                gap: 40px;
-            }}
-            
-            .signature-box {{
-                text-align: center;
-                padding: 20px;
-                border-top: 2px solid #1e40af;
-            }}
-            
-            .signature-line {{
-                width: 200px;
-                height: 1px;
-                background-color: #1e40af;
-                margin: 40px auto 10px;
-            }}
-            
-            .print-button {{
-                position: fixed;
-                top: 20px;
-                right: 20px;
-                background: #1e40af;
-                color: white;
-                border: none;
-                padding: 10px 20px;
-                border-radius: 6px;
-                cursor: pointer;
-                font-size: 14px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }}
-            
-            .print-button:hover {{
-                background: #1e3a8a;
-            }}
-        </style>
-    </head>
-    <body>
-        <button class="print-button no-print" onclick="window.print()">🖨️ Imprimir</button>
-        
-        <div class="header">
-            <div class="logo">🔋 RSM - Rede de Serviços Moura</div>
-            <h1 class="title">Laudo Técnico</h1>
-            <p class="subtitle">Sistema de Gestão de Laudos Técnicos</p>
-        </div>
-        
-        <div class="laudo-info">
-            <div class="info-grid">
-                <div class="info-item">
-                    <span class="info-label">Número do Laudo:</span>
-                    <span class="info-value">#{laudo['id']}</span>
-                </div>
-                <div class="info-item">
-                    <span class="info-label">Status:</span>
-                    <span class="status-badge">{status['label']}</span>
-                </div>
-                <div class="info-item">
-                    <span class="info-label">Cliente:</span>
-                    <span class="info-value">{laudo.get('cliente', 'Não informado')}</span>
-                </div>
-                <div class="info-item">
-                    <span class="info-label">Equipamento:</span>
-                    <span class="info-value">{laudo.get('equipamento', 'Não informado')}</span>
-                </div>
-                <div class="info-item">
-                    <span class="info-label">Técnico Responsável:</span>
-                    <span class="info-value">{laudo.get('user_name', 'Não informado')}</span>
-                </div>
-                <div class="info-item">
-                    <span class="info-label">Data de Criação:</span>
-                    <span class="info-value">{data_criacao}</span>
-                </div>
-            </div>
-        </div>
-        
-        <div class="section">
-            <h2 class="section-title">Problema Relatado</h2>
-            <p class="content-text">{laudo.get('problema_relatado', 'Não informado')}</p>
-        </div>
-        
-        <div class="section">
-            <h2 class="section-title">Diagnóstico Técnico</h2>
-            <p class="content-text">{laudo.get('diagnostico', 'Não informado')}</p>
-        </div>
-        
-        <div class="section">
-            <h2 class="section-title">Solução Aplicada</h2>
-            <p class="content-text">{laudo.get('solucao', 'Não informado')}</p>
-        </div>
-        
-        <div class="signature-section">
-            <div class="signature-box">
-                <div class="signature-line"></div>
-                <p><strong>{laudo.get('user_name', 'Técnico Responsável')}</strong></p>
-                <p>Técnico Responsável</p>
-            </div>
-            <div class="signature-box">
-                <div class="signature-line"></div>
-                <p><strong>Cliente</strong></p>
-                <p>Assinatura</p>
-            </div>
-        </div>
-        
-        <div class="footer">
-            <p>Documento gerado automaticamente pelo sistema RSM - Rede de Serviços Moura</p>
-            <p>Última atualização: {data_atualizacao}</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    return html
+    return render_laudo_html(laudo)
 
 # === ROTAS ADMINISTRATIVAS ===
 @app.get("/admin/stats")
@@ -1174,41 +1055,19 @@ def get_admin_stats(current_user: Dict[str, Any] = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Acesso negado")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Total de laudos
-        cursor.execute("SELECT COUNT(*) FROM laudos")
-        total_laudos = cursor.fetchone()[0]
-        
-        # Laudos hoje
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE DATE(created_at) = DATE('now')")
-        laudos_hoje = cursor.fetchone()[0]
-        
-        # Laudos da semana
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE created_at >= DATE('now', '-7 days')")
-        laudos_semana = cursor.fetchone()[0]
-        
-        # Laudos do mês
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE created_at >= DATE('now', '-30 days')")
-        laudos_mes = cursor.fetchone()[0]
+        with db_connection() as conn:
+            counters = read_counters(conn.cursor())
         
-        # Calcular laudos pendentes e aprovados
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE status = 'em_andamento'")
-        laudos_pendentes = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE status IN ('aprovado_manutencao', 'aprovado_vendas', 'finalizado')")
-        laudos_aprovados = cursor.fetchone()[0]
-        
-        conn.close()
+        laudos_pendentes = count_status(counters, PENDING_STATUSES)
+        laudos_aprovados = count_status(counters, APPROVED_STATUSES + ('finalizado',))
         
         return {
-            "total_laudos": total_laudos,
+            "total_laudos": counters['total'],
             "laudos_pendentes": laudos_pendentes,
             "laudos_aprovados": laudos_aprovados,
-            "laudos_hoje": laudos_hoje,
-            "laudos_semana": laudos_semana,
-            "laudos_mes": laudos_mes
+            "laudos_hoje": counters['hoje'],
+            "laudos_semana": counters['semana'],
+            "laudos_mes": counters['mes']
         }
         
     except Exception as e:
@@ -1222,39 +1081,131 @@ def get_defeitos_frequentes(current_user: Dict[str, Any] = Depends(get_current_u
         raise HTTPException(status_code=403, detail="Acesso negado")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Buscar diagnósticos mais frequentes
-        cursor.execute("""
-            SELECT diagnostico, COUNT(*) as quantidade
-            FROM laudos 
-            WHERE diagnostico IS NOT NULL AND diagnostico != ''
-            GROUP BY diagnostico 
-            ORDER BY quantidade DESC 
-            LIMIT 5
-        """)
-        
-        defeitos = []
-        total = 0
-        for row in cursor.fetchall():
-            defeitos.append({
-                "defeito": row[0],
-                "quantidade": row[1]
-            })
-            total += row[1]
-        
-        # Calcular percentuais
-        for defeito in defeitos:
-            defeito["percentual"] = round((defeito["quantidade"] / total) * 100, 1) if total > 0 else 0
-        
-        conn.close()
-        return defeitos
+        # Um GROUP BY no índice de defect_category (categoria calculada na escrita)
+        return LaudoDatabase.get_defeitos_frequentes(limit=5)
         
     except Exception as e:
         logger.error(f"Erro ao buscar defeitos frequentes: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+@app.get("/admin/defeitos-frequentes/regras")
+def get_regras_defeitos(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """Regras de classificação de defeitos, na ordem de avaliação"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        rules = get_defect_rules(cursor)
+        cursor.execute("SELECT COUNT(*) FROM laudos WHERE defect_category IS NULL")
+        pending = cursor.fetchone()[0]
+    
+    return {"rules": rules, "pending": pending}
+
+@app.put("/admin/defeitos-frequentes/regras")
+def update_regras_defeitos(rules: List[DefectRule], current_user: Dict[str, Any] = Depends(get_current_user)):
+    """Substitui as regras; os laudos são reclassificados em lotes pelo backfill"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    with db_connection() as conn:
+        pending = replace_defect_rules(conn, [rule.dict() for rule in rules])
+    
+    logger.info(f"Regras de defeito atualizadas por {current_user['username']}: {len(rules)} regra(s), {pending} laudo(s) para reclassificar")
+    return {"rules": len(rules), "pending": pending}
+
+@app.get("/admin/analytics/baterias")
+def get_battery_analytics(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    group_by: str = Query('modelo', description="Agrupamento: cliente, modelo ou periodo"),
+    cliente: Optional[str] = Query(None, description="Filtrar por cliente"),
+    modelo: Optional[str] = Query(None, description="Filtrar por modelo da bateria"),
+    start: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Período inicial (YYYY-MM)"),
+    end: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Período final (YYYY-MM)")
+):
+    """Estatísticas da frota de baterias: distribuições, desbalanceamento e tendência de degradação"""
+    if not current_user.get('is_admin') and current_user.get('user_type') != 'encarregado':
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    try:
+        return fleet_analytics.fleet_stats(group_by, cliente=cliente, modelo=modelo, start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro na análise de baterias: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+@app.get("/admin/export/laudos")
+def export_laudos(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    export_format: str = Query('csv', alias="format", pattern="^(csv|ndjson)$", description="csv ou ndjson"),
+    status_filter: Optional[str] = Query(None, alias="status", description="Status do laudo"),
+    date_from: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Criado a partir de (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Criado até (YYYY-MM-DD)"),
+    tecnico_id: Optional[int] = Query(None, description="ID do técnico responsável"),
+    gzip: bool = Query(False, description="Compactar o arquivo (gzip)")
+):
+    """Exporta laudos em streaming (memória constante, sem limite de linhas)"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    query, params = build_export_query(status_filter, date_from, date_to, tecnico_id)
+    filename = f"laudos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    media_type = EXPORT_FORMATS[export_format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    logger.info(f"Exportação de laudos ({export_format}{', gzip' if gzip else ''}) iniciada por {current_user['username']}")
+    return StreamingResponse(
+        iter_export(DB_PATH, export_format, query, params, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.post("/admin/import/laudos")
+async def import_laudos(
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    import_format: str = Query('ndjson', alias="format", pattern="^(csv|ndjson)$", description="ndjson ou csv"),
+    tipo: str = Query('simples', pattern="^(simples|avancado)$", description="simples ou avancado")
+):
+    """Importa laudos em massa; o corpo é lido em streaming e gravado em lotes"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    body = request.stream()
+    
+    async def next_chunk() -> Optional[bytes]:
+        try:
+            return await body.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    def chunks():
+        # Roda no threadpool: cada pedaço do corpo é pedido ao event loop sob demanda
+        while True:
+            chunk = anyio.from_thread.run(next_chunk)
+            if chunk is None:
+                break
+            if chunk:
+                yield chunk
+    
+    # Conexão do pool emprestada só durante a gravação de cada lote, não durante o upload
+    def run() -> Dict[str, Any]:
+        return run_import(db_connection, chunks(), import_format, tipo, current_user['id'])
+    
+    try:
+        report = await run_in_threadpool(run)
+    except Exception as e:
+        logger.error(f"Erro na importação de laudos: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+    
+    if tipo == 'avancado' and report['imported']:
+        fleet_analytics.mark_stale()
+    logger.info(f"Importação de laudos ({tipo}) por {current_user['username']}: {report['imported']} importado(s), {report['failed']} rejeitado(s)")
+    return report
+
 @app.get("/admin/laudos-recentes")
 def get_laudos_recentes(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Laudos mais recentes"""
@@ -1262,29 +1213,28 @@ def get_laudos_recentes(current_user: Dict[str, Any] = Depends(get_current_user)
         raise HTTPException(status_code=403, detail="Acesso negado")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute("""
+                SELECT l.id, l.cliente, l.equipamento, l.diagnostico, l.created_at, u.username
+                FROM laudos l
+                LEFT JOIN users u ON l.user_id = u.id
+                ORDER BY l.created_at DESC
+                LIMIT 10
+            """)
+        
+            laudos = []
+            for row in cursor.fetchall():
+                laudos.append({
+                    "id": row[0],
+                    "cliente": row[1],
+                    "equipamento": row[2],
+                    "diagnostico": row[3],
+                    "data": row[4],
+                    "tecnico": row[5]
+                })
         
-        cursor.execute("""
-            SELECT l.id, l.cliente, l.equipamento, l.diagnostico, l.created_at, u.username
-            FROM laudos l
-            LEFT JOIN users u ON l.user_id = u.id
-            ORDER BY l.created_at DESC
-            LIMIT 10
-        """)
-        
-        laudos = []
-        for row in cursor.fetchall():
-            laudos.append({
-                "id": row[0],
-                "cliente": row[1],
-                "equipamento": row[2],
-                "diagnostico": row[3],
-                "data": row[4],
-                "tecnico": row[5]
-            })
-        
-        conn.close()
         return laudos
         
     except Exception as e:
@@ -1299,26 +1249,25 @@ def get_users(current_user: Dict[str, Any] = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Acesso negado")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute("""
+                SELECT id, username, is_admin, user_type, created_at
+                FROM users 
+                ORDER BY username
+            """)
+        
+            users = []
+            for row in cursor.fetchall():
+                users.append({
+                    "id": row[0],
+                    "username": row[1],
+                    "is_admin": bool(row[2]),
+                    "user_type": row[3],
+                    "created_at": row[4]
+                })
         
-        cursor.execute("""
-            SELECT id, username, is_admin, user_type, created_at
-            FROM users 
-            ORDER BY username
-        """)
-        
-        users = []
-        for row in cursor.fetchall():
-            users.append({
-                "id": row[0],
-                "username": row[1],
-                "is_admin": bool(row[2]),
-                "user_type": row[3],
-                "created_at": row[4]
-            })
-        
-        conn.close()
         return users
         
     except Exception as e:
@@ -1350,25 +1299,23 @@ def create_user(user_data: dict, current_user: Dict[str, Any] = Depends(get_curr
         if user_type not in ['tecnico', 'vendedor', 'admin', 'encarregado']:
             raise HTTPException(status_code=400, detail="Tipo de usuário inválido")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Verificar se username já existe
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        if cursor.fetchone():
-            conn.close()
-            raise HTTPException(status_code=400, detail="Username já existe")
+            # Verificar se username já existe
+            cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+            if cursor.fetchone():
+                raise HTTPException(status_code=400, detail="Username já existe")
         
-        # Criar usuário
-        hashed_password = hash_password(password)
-        cursor.execute("""
-            INSERT INTO users (username, password_hash, is_admin, user_type, created_at)
-            VALUES (?, ?, ?, ?, datetime('now'))
-        """, (username, hashed_password, is_admin, user_type))
+            # Criar usuário
+            hashed_password = hash_password(password)
+            cursor.execute("""
+                INSERT INTO users (username, password_hash, is_admin, user_type, created_at)
+                VALUES (?, ?, ?, ?, datetime('now'))
+            """, (username, hashed_password, is_admin, user_type))
         
-        user_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            user_id = cursor.lastrowid
+            conn.commit()
         
         logger.info(f"Usuário {username} criado pelo admin {current_user['username']}")
         return {"message": "Usuário criado com sucesso", "user_id": user_id}
@@ -1387,54 +1334,50 @@ def update_user(user_id: int, user_data: dict, current_user: Dict[str, Any] = De
         raise HTTPException(status_code=403, detail="Acesso negado")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar se usuário existe
-        cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
-        if not cursor.fetchone():
-            conn.close()
-            raise HTTPException(status_code=404, detail="Usuário não encontrado")
-        
-        # Preparar campos para atualização
-        update_fields = []
-        update_values = []
-        
-        if 'username' in user_data:
-            username = user_data['username'].strip()
-            if username:
-                # Verificar se username já existe (exceto o próprio usuário)
-                cursor.execute("SELECT id FROM users WHERE username = ? AND id != ?", (username, user_id))
-                if cursor.fetchone():
-                    conn.close()
-                    raise HTTPException(status_code=400, detail="Username já existe")
-                update_fields.append("username = ?")
-                update_values.append(username)
-        
-        if 'user_type' in user_data:
-            update_fields.append("user_type = ?")
-            update_values.append(user_data['user_type'])
-        
-        if 'is_admin' in user_data:
-            update_fields.append("is_admin = ?")
-            update_values.append(user_data['is_admin'])
-        
-        if 'password' in user_data and user_data['password'].strip():
-            password = user_data['password'].strip()
-            if len(password) < 6:
-                conn.close()
-                raise HTTPException(status_code=400, detail="Senha deve ter pelo menos 6 caracteres")
-            update_fields.append("password_hash = ?")
-            update_values.append(hash_password(password))
-        
-        if update_fields:
-            update_values.append(user_id)
-            query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
-            cursor.execute(query, update_values)
-            conn.commit()
-        
-        conn.close()
-        
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            # Verificar se usuário existe
+            cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
+            if not cursor.fetchone():
+                raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        
+            # Preparar campos para atualização
+            update_fields = []
+            update_values = []
+        
+            if 'username' in user_data:
+                username = user_data['username'].strip()
+                if username:
+                    # Verificar se username já existe (exceto o próprio usuário)
+                    cursor.execute("SELECT id FROM users WHERE username = ? AND id != ?", (username, user_id))
+                    if cursor.fetchone():
+                        raise HTTPException(status_code=400, detail="Username já existe")
+                    update_fields.append("username = ?")
+                    update_values.append(username)
+        
+            if 'user_type' in user_data:
+                update_fields.append("user_type = ?")
+                update_values.append(user_data['user_type'])
+        
+            if 'is_admin' in user_data:
+                update_fields.append("is_admin = ?")
+                update_values.append(user_data['is_admin'])
+        
+            if 'password' in user_data and user_data['password'].strip():
+                password = user_data['password'].strip()
+                if len(password) < 6:
+                    raise HTTPException(status_code=400, detail="Senha deve ter pelo menos 6 caracteres")
+                update_fields.append("password_hash = ?")
+                update_values.append(hash_password(password))
+        
+            if update_fields:
+                update_values.append(user_id)
+                query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = ?"
+                cursor.execute(query, update_values)
+                conn.commit()
+        
+        invalidate_user(user_id)
         logger.info(f"Usuário {user_id} atualizado pelo admin {current_user['username']}")
         return {"message": "Usuário atualizado com sucesso"}
         
@@ -1455,21 +1398,20 @@ def delete_user(user_id: int, current_user: Dict[str, Any] = Depends(get_current
         if user_id == current_user['id']:
             raise HTTPException(status_code=400, detail="Não é possível deletar seu próprio usuário")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Verificar se usuário existe
-        cursor.execute("SELECT username FROM users WHERE id = ?", (user_id,))
-        user = cursor.fetchone()
-        if not user:
-            conn.close()
-            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+            # Verificar se usuário existe
+            cursor.execute("SELECT username FROM users WHERE id = ?", (user_id,))
+            user = cursor.fetchone()
+            if not user:
+                raise HTTPException(status_code=404, detail="Usuário não encontrado")
         
-        # Deletar usuário
-        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        conn.commit()
-        conn.close()
+            # Deletar usuário
+            cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            conn.commit()
         
+        invalidate_user(user_id)
         logger.info(f"Usuário {user[0]} deletado pelo admin {current_user['username']}")
         return {"message": "Usuário deletado com sucesso"}
         
@@ -1540,11 +1482,10 @@ def health_check():
     """Endpoint de health check para monitoramento de produção"""
     try:
         # Verificar conexão com banco
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        cursor.fetchone()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
         
         # Verificar OpenAI se configurada
         openai_status = "configured" if is_openai_configured() else "not_configured"
@@ -1565,6 +1506,21 @@ def health_check():
             "error": str(e)
         }
 
+# Token opcional para o scrape do Prometheus (vazio = endpoint aberto)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+@app.get("/metrics")
+async def prometheus_metrics(request: Request):
+    """Métricas no formato Prometheus (somente memória, sem consultas ao SQLite)"""
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    
+    # Executado no event loop: o limiter do threadpool só é acessível daqui
+    body = render_metrics(anyio.to_thread.current_default_thread_limiter())
+    return Response(content=body, media_type=Exposition.CONTENT_TYPE)
+
 @app.get("/admin/executive-stats")
 def get_executive_stats(current_user: Dict[str, Any] = Depends(get_current_user), period: str = Query("month")):
     """Estatísticas executivas para dashboard"""
@@ -1666,183 +1622,197 @@ def get_alerts(current_user: Dict[str, Any] = Depends(get_current_user), limit:
         logger.error(f"Erro ao obter alertas: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+@app.get("/admin/health-status")
+def get_health_status(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """Score de saúde a partir dos snapshots em memória do monitoramento"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    return health_checker.get_health_status()
+
+@app.get("/admin/metrics/history")
+def get_metrics_history(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    source: str = Query("system", description="system, application ou business"),
+    fields: Optional[str] = Query(None, description="Campos separados por vírgula"),
+    start: Optional[datetime] = Query(None, description="Início (padrão: 24h atrás)"),
+    end: Optional[datetime] = Query(None, description="Fim (padrão: agora)"),
+    resolution: str = Query("auto", description="auto, raw, 5m ou 1h")
+):
+    """Histórico de métricas por intervalo de tempo"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    end = end or datetime.now()
+    start = start or end - timedelta(hours=24)
+    field_list = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+    try:
+        return health_checker.get_metrics_history(source, field_list, start, end, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/admin/db-pool")
+def get_db_pool_stats(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """Utilização do pool de conexões do banco"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    return get_pool_stats()
+
+@app.get("/admin/user-cache")
+def get_user_cache_stats(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """Acertos, falhas e invalidações do cache de usuários deste worker"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    return {**user_cache.stats(), 'token_revocation': token_revocations.stats()}
+
+@app.get("/admin/metrics/requests")
+def get_request_metrics(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    window: int = Query(60, ge=10, le=600, description="Janela em segundos")
+):
+    """Requisições por rota, classes de status e latência p50/p95/p99 deste worker"""
+    if not current_user.get('is_admin'):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+    return request_metrics.snapshot(window)
+
 # ✅ CORREÇÃO: Rota para laudos avançados
 @app.post("/laudos/{laudo_id}/tag")
 def update_laudo_tag(laudo_id: int, tag_data: TagUpdate, current_user: Dict[str, Any] = Depends(get_current_user)):
-    """Atualiza a tag de um laudo e notifica todos os usuários"""
+    """Atualiza a tag de um laudo e notifica todos os usuários (evento broadcast)"""
     try:
-        db = get_db_connection()
-        cursor = db.cursor()
+        with db_connection() as db:
+            cursor = db.cursor()
         
-        # Verificar se o laudo existe
-        cursor.execute("SELECT id, cliente, equipamento FROM laudos WHERE id = ?", (laudo_id,))
-        laudo = cursor.fetchone()
+            # Verificar se o laudo existe
+            cursor.execute("SELECT id, cliente, equipamento FROM laudos WHERE id = ?", (laudo_id,))
+            laudo = cursor.fetchone()
         
-        if not laudo:
-            raise HTTPException(status_code=404, detail="Laudo não encontrado")
-        
-        # Atualizar a tag do laudo
-        cursor.execute(
-            "UPDATE laudos SET tag = ?, tag_description = ?, tag_updated_at = ?, tag_updated_by = ? WHERE id = ?",
-            (tag_data.tag, tag_data.description, datetime.now(), current_user['username'], laudo_id)
-        )
+            if not laudo:
+                raise HTTPException(status_code=404, detail="Laudo não encontrado")
         
-        # Criar notificação para todos os usuários
-        message = f"🏷️ Nova tag '{tag_data.tag}' adicionada ao laudo #{laudo_id} - {laudo[1]} ({laudo[2]}) por {current_user['username']}"
-        if tag_data.description:
-            message += f" - {tag_data.description}"
-        
-        # Buscar todos os usuários
-        cursor.execute("SELECT id FROM users")
-        users = cursor.fetchall()
-        
-        # Criar notificação para cada usuário
-        for user in users:
+            # Atualizar a tag do laudo
             cursor.execute(
-                "INSERT INTO notifications (user_id, type, message, created_at, read) VALUES (?, ?, ?, ?, ?)",
-                (user[0], 'tag_update', message, datetime.now(), 0)
+                "UPDATE laudos SET tag = ?, tag_description = ?, tag_updated_at = ?, tag_updated_by = ? WHERE id = ?",
+                (tag_data.tag, tag_data.description, datetime.now(), current_user['username'], laudo_id)
             )
         
-        db.commit()
+            # Notificar todos os usuários
+            message = f"🏷️ Nova tag '{tag_data.tag}' adicionada ao laudo #{laudo_id} - {laudo[1]} ({laudo[2]}) por {current_user['username']}"
+            if tag_data.description:
+                message += f" - {tag_data.description}"
         
-        logger.info(f"Tag '{tag_data.tag}' adicionada ao laudo {laudo_id} por {current_user['username']}")
+            # Um único evento broadcast (cada usuário o enxerga na leitura)
+            event_id = publish_event(cursor, EVENT_TAG_UPDATE, message, laudo_id=laudo_id, actor_id=current_user['id'])
         
-        return {
-            "success": True,
-            "message": f"Tag '{tag_data.tag}' adicionada com sucesso",
-            "laudo_id": laudo_id,
-            "tag": tag_data.tag,
-            "notifications_sent": len(users)
-        }
+            db.commit()
+        
+            logger.info(f"Tag '{tag_data.tag}' adicionada ao laudo {laudo_id} por {current_user['username']}")
+        
+            return {
+                "success": True,
+                "message": f"Tag '{tag_data.tag}' adicionada com sucesso",
+                "laudo_id": laudo_id,
+                "tag": tag_data.tag,
+                "notification_event_id": event_id
+            }
         
     except Exception as e:
         logger.error(f"Erro ao atualizar tag: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
-    finally:
-        if 'db' in locals():
-            db.close()
 
 @app.get("/stats")
 def get_stats(current_user: Dict[str, Any] = Depends(get_current_user)):
     """Retorna estatísticas gerais do sistema"""
     try:
-        db = get_db_connection()
-        cursor = db.cursor()
-        
-        # Total de laudos
-        cursor.execute("SELECT COUNT(*) FROM laudos")
-        total_laudos = cursor.fetchone()[0]
-        
-        # Laudos hoje
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE DATE(created_at) = DATE('now')")
-        laudos_hoje = cursor.fetchone()[0]
-        
-        # Laudos da semana
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE created_at >= DATE('now', '-7 days')")
-        laudos_semana = cursor.fetchone()[0]
-        
-        # Laudos do mês
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE created_at >= DATE('now', '-30 days')")
-        laudos_mes = cursor.fetchone()[0]
-        
-        # Pendentes de aprovação
-        cursor.execute("SELECT COUNT(*) FROM laudos WHERE status = 'pendente'")
-        pendentes_aprovacao = cursor.fetchone()[0]
+        with db_connection() as db:
+            counters = read_counters(db.cursor())
         
         return {
-            "totalLaudos": total_laudos,
-            "laudosHoje": laudos_hoje,
-            "laudosSemana": laudos_semana,
-            "laudosMes": laudos_mes,
-            "pendentesAprovacao": pendentes_aprovacao
+            "totalLaudos": counters['total'],
+            "laudosHoje": counters['hoje'],
+            "laudosSemana": counters['semana'],
+            "laudosMes": counters['mes'],
+            "pendentesAprovacao": count_status(counters, ('pendente',)),
+            "emAndamento": count_status(counters, PENDING_STATUSES),
+            "aprovados": count_status(counters, APPROVED_STATUSES),
+            "reprovados": count_status(counters, ('reprovado',)),
+            "finalizados": count_status(counters, ('finalizado',))
         }
         
     except Exception as e:
         logger.error(f"Erro ao buscar estatísticas: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
-    finally:
-        if 'db' in locals():
-            db.close()
 
 @app.get("/laudos/tags/recent")
 def get_recent_tags(current_user: Dict[str, Any] = Depends(get_current_user), limit: int = Query(10, ge=1, le=50)):
     """Busca tags recentes para o painel de atualizações"""
     try:
-        db = get_db_connection()
-        cursor = db.cursor()
+        with db_connection() as db:
+            cursor = db.cursor()
         
-        cursor.execute("""
-            SELECT l.id, l.cliente, l.equipamento, l.tag, l.tag_description, 
-                   l.tag_updated_at, l.tag_updated_by, l.status
-            FROM laudos l
-            WHERE l.tag IS NOT NULL AND l.tag != ''
-            ORDER BY l.tag_updated_at DESC
-            LIMIT ?
-        """, (limit,))
-        
-        tags = []
-        for row in cursor.fetchall():
-            tags.append({
-                "laudo_id": row[0],
-                "cliente": row[1],
-                "equipamento": row[2],
-                "tag": row[3],
-                "description": row[4],
-                "updated_at": row[5],
-                "updated_by": row[6],
-                "status": row[7]
-            })
-        
-        return {"tags": tags}
+            cursor.execute("""
+                SELECT l.id, l.cliente, l.equipamento, l.tag, l.tag_description, 
+                       l.tag_updated_at, l.tag_updated_by, l.status
+                FROM laudos l
+                WHERE l.tag IS NOT NULL AND l.tag != ''
+                ORDER BY l.tag_updated_at DESC
+                LIMIT ?
+            """, (limit,))
+        
+            tags = []
+            for row in cursor.fetchall():
+                tags.append({
+                    "laudo_id": row[0],
+                    "cliente": row[1],
+                    "equipamento": row[2],
+                    "tag": row[3],
+                    "description": row[4],
+                    "updated_at": row[5],
+                    "updated_by": row[6],
+                    "status": row[7]
+                })
+        
+            return {"tags": tags}
         
     except Exception as e:
         logger.error(f"Erro ao buscar tags recentes: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno do servidor: {str(e)}")
-    finally:
-        if 'db' in locals():
-            db.close()
 
 @app.post("/laudos/{laudo_id}/finalize")
 def finalize_laudo(laudo_id: int, current_user: Dict[str, Any] = Depends(get_current_user)):
     """Finaliza um laudo - Técnico pode finalizar a qualquer momento"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar se o laudo existe
-        cursor.execute("SELECT user_id, status, cliente, equipamento FROM laudos WHERE id = ?", (laudo_id,))
-        laudo = cursor.fetchone()
-        
-        if not laudo:
-            raise HTTPException(status_code=404, detail="Laudo não encontrado")
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Verificar permissões - Técnico pode finalizar seus próprios laudos, Encarregado pode finalizar qualquer um
-        if not current_user['is_admin'] and laudo['user_id'] != current_user['id']:
-            if current_user['user_type'] != 'encarregado':
-                raise HTTPException(status_code=403, detail="Apenas o técnico responsável ou encarregado pode finalizar este laudo")
-        
-        # Atualizar status para finalizado
-        cursor.execute(
-            "UPDATE laudos SET status = ?, updated_at = ? WHERE id = ?",
-            ('finalizado', datetime.now().isoformat(), laudo_id)
-        )
+            # Verificar se o laudo existe
+            cursor.execute("SELECT user_id, status, cliente, equipamento FROM laudos WHERE id = ?", (laudo_id,))
+            laudo = cursor.fetchone()
         
-        # Criar notificação para todos os usuários
-        message = f"🏁 Laudo #{laudo_id} - {laudo['cliente']} ({laudo['equipamento']}) foi FINALIZADO por {current_user['username']}"
+            if not laudo:
+                raise HTTPException(status_code=404, detail="Laudo não encontrado")
         
-        # Buscar todos os usuários
-        cursor.execute("SELECT id FROM users")
-        users = cursor.fetchall()
+            # Verificar permissões - Técnico pode finalizar seus próprios laudos, Encarregado pode finalizar qualquer um
+            if not current_user['is_admin'] and laudo['user_id'] != current_user['id']:
+                if current_user['user_type'] != 'encarregado':
+                    raise HTTPException(status_code=403, detail="Apenas o técnico responsável ou encarregado pode finalizar este laudo")
         
-        # Criar notificação para cada usuário
-        for user in users:
+            # Atualizar status para finalizado
             cursor.execute(
-                "INSERT INTO notifications (user_id, type, message, created_at, read) VALUES (?, ?, ?, ?, ?)",
-                (user[0], 'laudo_finalizado', message, datetime.now(), 0)
+                "UPDATE laudos SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                ('finalizado', laudo_id)
             )
         
-        conn.commit()
-        conn.close()
+            # Notificar todos os usuários
+            message = f"🏁 Laudo #{laudo_id} - {laudo['cliente']} ({laudo['equipamento']}) foi FINALIZADO por {current_user['username']}"
+        
+            # Um único evento broadcast (cada usuário o enxerga na leitura)
+            event_id = publish_event(cursor, EVENT_LAUDO_FINALIZADO, message, laudo_id=laudo_id, actor_id=current_user['id'])
+        
+            conn.commit()
         
         logger.info(f"Laudo {laudo_id} finalizado pelo usuário {current_user['username']}")
         
@@ -1851,7 +1821,7 @@ def finalize_laudo(laudo_id: int, current_user: Dict[str, Any] = Depends(get_cur
             "message": f"Laudo #{laudo_id} finalizado com sucesso",
             "laudo_id": laudo_id,
             "status": "finalizado",
-            "notifications_sent": len(users)
+            "notification_event_id": event_id
         }
         
     except HTTPException:
@@ -1864,52 +1834,43 @@ def finalize_laudo(laudo_id: int, current_user: Dict[str, Any] = Depends(get_cur
 def approve_laudo(laudo_id: int, approval_type: str, current_user: Dict[str, Any] = Depends(get_current_user)):
     """Aprova um laudo - Encarregado aprova manutenção, Vendedor aprova orçamento"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar se o laudo existe
-        cursor.execute("SELECT user_id, status, cliente, equipamento FROM laudos WHERE id = ?", (laudo_id,))
-        laudo = cursor.fetchone()
-        
-        if not laudo:
-            raise HTTPException(status_code=404, detail="Laudo não encontrado")
-        
-        # Verificar permissões baseado no tipo de aprovação
-        if approval_type == "manutencao":
-            if current_user['user_type'] not in ['encarregado', 'admin']:
-                raise HTTPException(status_code=403, detail="Apenas encarregados podem aprovar manutenção")
-            new_status = "aprovado_manutencao"
-            approval_message = "manutenção"
-        elif approval_type == "vendas":
-            if current_user['user_type'] not in ['vendedor', 'admin']:
-                raise HTTPException(status_code=403, detail="Apenas vendedores podem aprovar orçamento")
-            new_status = "aprovado_vendas"
-            approval_message = "orçamento"
-        else:
-            raise HTTPException(status_code=400, detail="Tipo de aprovação inválido")
-        
-        # Atualizar status
-        cursor.execute(
-            "UPDATE laudos SET status = ?, updated_at = ? WHERE id = ?",
-            (new_status, datetime.now().isoformat(), laudo_id)
-        )
-        
-        # Criar notificação para todos os usuários
-        message = f"✅ Laudo #{laudo_id} - {laudo['cliente']} ({laudo['equipamento']}) teve {approval_message} APROVADO por {current_user['username']}"
-        
-        # Buscar todos os usuários
-        cursor.execute("SELECT id FROM users")
-        users = cursor.fetchall()
-        
-        # Criar notificação para cada usuário
-        for user in users:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+        
+            # Verificar se o laudo existe
+            cursor.execute("SELECT user_id, status, cliente, equipamento FROM laudos WHERE id = ?", (laudo_id,))
+            laudo = cursor.fetchone()
+        
+            if not laudo:
+                raise HTTPException(status_code=404, detail="Laudo não encontrado")
+        
+            # Verificar permissões baseado no tipo de aprovação
+            if approval_type == "manutencao":
+                if current_user['user_type'] not in ['encarregado', 'admin']:
+                    raise HTTPException(status_code=403, detail="Apenas encarregados podem aprovar manutenção")
+                new_status = "aprovado_manutencao"
+                approval_message = "manutenção"
+            elif approval_type == "vendas":
+                if current_user['user_type'] not in ['vendedor', 'admin']:
+                    raise HTTPException(status_code=403, detail="Apenas vendedores podem aprovar orçamento")
+                new_status = "aprovado_vendas"
+                approval_message = "orçamento"
+            else:
+                raise HTTPException(status_code=400, detail="Tipo de aprovação inválido")
+        
+            # Atualizar status
             cursor.execute(
-                "INSERT INTO notifications (user_id, type, message, created_at, read) VALUES (?, ?, ?, ?, ?)",
-                (user[0], 'laudo_aprovado', message, datetime.now(), 0)
+                "UPDATE laudos SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (new_status, laudo_id)
             )
         
-        conn.commit()
-        conn.close()
+            # Notificar todos os usuários
+            message = f"✅ Laudo #{laudo_id} - {laudo['cliente']} ({laudo['equipamento']}) teve {approval_message} APROVADO por {current_user['username']}"
+        
+            # Um único evento broadcast (cada usuário o enxerga na leitura)
+            event_id = publish_event(cursor, EVENT_LAUDO_APROVADO, message, laudo_id=laudo_id, actor_id=current_user['id'])
+        
+            conn.commit()
         
         logger.info(f"Laudo {laudo_id} aprovado ({approval_type}) pelo usuário {current_user['username']}")
         
@@ -1919,7 +1880,7 @@ def approve_laudo(laudo_id: int, approval_type: str, current_user: Dict[str, Any
             "laudo_id": laudo_id,
             "status": new_status,
             "approval_type": approval_type,
-            "notifications_sent": len(users)
+            "notification_event_id": event_id
         }
         
     except HTTPException:
@@ -1941,29 +1902,32 @@ def create_laudo_avancado(laudo_data: dict, current_user: Dict[str, Any] = Depen
             if field not in laudo_data or not laudo_data[field]:
                 raise HTTPException(status_code=400, detail=f"Campo obrigatório: {field}")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Inserir laudo avançado
-        cursor.execute("""
-            INSERT INTO laudos_avancados (
-                user_id, nome_cliente, data, baterias, tecnico_responsavel,
-                manutencao_preventiva, manutencao_corretiva, conclusao_final, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
-        """, (
-            current_user['id'],
-            laudo_data['nomeCliente'],
-            laudo_data['data'],
-            json.dumps(laudo_data['baterias']),
-            laudo_data['tecnicoResponsavel'],
-            json.dumps(laudo_data.get('manutencaoPreventiva', [])),
-            json.dumps(laudo_data.get('manutencaoCorretiva', [])),
-            laudo_data['conclusaoFinal']
-        ))
-        
-        laudo_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            # Inserir laudo avançado
+            cursor.execute("""
+                INSERT INTO laudos_avancados (
+                    user_id, nome_cliente, data, baterias, tecnico_responsavel,
+                    manutencao_preventiva, manutencao_corretiva, conclusao_final, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            """, (
+                current_user['id'],
+                laudo_data['nomeCliente'],
+                laudo_data['data'],
+                json.dumps(laudo_data['baterias']),
+                laudo_data['tecnicoResponsavel'],
+                json.dumps(laudo_data.get('manutencaoPreventiva', [])),
+                json.dumps(laudo_data.get('manutencaoCorretiva', [])),
+                laudo_data['conclusaoFinal']
+            ))
+        
+            laudo_id = cursor.lastrowid
+            # Medições tipadas das baterias na mesma transação do laudo
+            store_baterias(cursor, laudo_id, laudo_data['baterias'])
+            conn.commit()
+        
+        fleet_analytics.mark_stale()
         
         logger.info(f"Laudo avançado {laudo_id} criado pelo usuário {current_user['username']}")
         return {"message": "Laudo avançado criado com sucesso", "laudo_id": laudo_id}
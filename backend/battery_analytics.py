@@ -0,0 +1,367 @@
+"""
+Análise vetorizada da frota de baterias (laudos avançados)
+As medições de laudo_baterias/laudo_bateria_elementos ficam em arrays NumPy em memória;
+novas baterias são anexadas incrementalmente (id crescente) e os resultados por
+agrupamento/filtro ficam em cache até a próxima mudança nos dados.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo entre verificações de dados novos no banco (segundos)
+ANALYTICS_CHECK_INTERVAL = float(os.getenv("BATTERY_ANALYTICS_CHECK_INTERVAL", "5"))
+# Resultados guardados por combinação de agrupamento e filtros
+ANALYTICS_CACHE_SIZE = int(os.getenv("BATTERY_ANALYTICS_CACHE_SIZE", "64"))
+# Diferença máxima entre elementos de uma bateria antes de contar como desbalanceada
+IMBALANCE_VOLTAGE_LIMIT = float(os.getenv("BATTERY_IMBALANCE_VOLTAGE", "0.05"))
+IMBALANCE_DENSITY_LIMIT = float(os.getenv("BATTERY_IMBALANCE_DENSITY", "0.02"))
+
+PERCENTILES = (5, 25, 50, 75, 95)
+GROUP_FIELDS = ('cliente', 'modelo', 'periodo')
+UNKNOWN_LABEL = 'Não informado'
+# Período de agrupamento: 'YYYY-MM'; qualquer outra coisa (ex.: 12/03/2 de 'dd/mm/aaaa') vira UNKNOWN_LABEL
+_PERIOD = re.compile(r'^\d{4}-\d{2}$')
+
+def _period(value: Optional[str]) -> Optional[str]:
+    """'YYYY-MM' com mês válido ou None"""
+    if not value or not _PERIOD.fullmatch(value) or not 1 <= int(value[5:7]) <= 12:
+        return None
+    return value
+
+def _grouped_stats(codes: np.ndarray, values: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+    """count/mean/std/min/max e percentis de `values` por grupo, sem loop por grupo"""
+    valid = ~np.isnan(values)
+    codes = codes[valid]
+    values = values[valid]
+    order = np.lexsort((values, codes))
+    codes = codes[order]
+    values = values[order]
+
+    counts = np.bincount(codes, minlength=n_groups)
+    sums = np.bincount(codes, weights=values, minlength=n_groups)
+    squares = np.bincount(codes, weights=values * values, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts
+        std = np.sqrt(np.maximum(squares / counts - mean * mean, 0.0))
+
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    has_data = counts > 0
+    last = np.where(has_data, starts + counts - 1, 0)
+    padded = np.append(values, np.nan)
+    stats = {
+        'count': counts,
+        'mean': mean,
+        'std': std,
+        'min': np.where(has_data, padded[np.where(has_data, starts, len(values))], np.nan),
+        'max': np.where(has_data, padded[np.where(has_data, last, len(values))], np.nan),
+    }
+    # Percentil com interpolação linear dentro do segmento ordenado de cada grupo
+    for q in PERCENTILES:
+        position = starts + (q / 100.0) * np.maximum(counts - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        lower = np.where(has_data, lower, len(values))
+        upper = np.where(has_data, upper, len(values))
+        fraction = position - np.floor(position)
+        stats[f'p{q}'] = padded[lower] + (padded[upper] - padded[lower]) * fraction
+    return stats
+
+def _segment_spread(owner: np.ndarray, values: np.ndarray, n_owners: int) -> np.ndarray:
+    """max - min de `values` por dono (NaN quando o dono não tem medições)"""
+    valid = ~np.isnan(values)
+    owner = owner[valid]
+    values = values[valid]
+    spread = np.full(n_owners, np.nan)
+    if len(values) == 0:
+        return spread
+    order = np.argsort(owner, kind='stable')
+    owner = owner[order]
+    values = values[order]
+    starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+    spread[owner[starts]] = np.maximum.reduceat(values, starts) - np.minimum.reduceat(values, starts)
+    return spread
+
+def _grouped_slope(codes: np.ndarray, x: np.ndarray, y: np.ndarray, n_groups: int) -> np.ndarray:
+    """Inclinação da regressão linear y ~ x por grupo (mínimos quadrados via somas)"""
+    valid = ~np.isnan(y) & ~np.isnan(x)
+    codes, x, y = codes[valid], x[valid], y[valid]
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    sx = np.bincount(codes, weights=x, minlength=n_groups)
+    sy = np.bincount(codes, weights=y, minlength=n_groups)
+    sxx = np.bincount(codes, weights=x * x, minlength=n_groups)
+    sxy = np.bincount(codes, weights=x * y, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        denominator = n * sxx - sx * sx
+        return np.where(denominator > 0, (n * sxy - sx * sy) / denominator, np.nan)
+
+def _number(value: Any, digits: int = 4) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+def _describe(stats: Dict[str, np.ndarray], index: int, digits: int = 4) -> Dict[str, Any]:
+    return {
+        'count': int(stats['count'][index]),
+        'mean': _number(stats['mean'][index], digits),
+        'std': _number(stats['std'][index], digits),
+        'min': _number(stats['min'][index], digits),
+        'max': _number(stats['max'][index], digits),
+        'percentiles': {f'p{q}': _number(stats[f'p{q}'][index], digits) for q in PERCENTILES}
+    }
+
+class FleetData:
+    """Colunas da frota em arrays; uma posição por bateria / por elemento medido"""
+
+    def __init__(self):
+        self.battery_ids = np.empty(0, dtype=np.int64)
+        self.cliente = np.empty(0, dtype=object)
+        self.modelo = np.empty(0, dtype=object)
+        self.periodo = np.empty(0, dtype=object)
+        self.month_index = np.empty(0, dtype=float)
+        self.voltage_ratio = np.empty(0, dtype=float)
+        self.temperatura = np.empty(0, dtype=float)
+        self.element_owner = np.empty(0, dtype=np.int64)
+        self.element_voltage = np.empty(0, dtype=float)
+        self.element_density = np.empty(0, dtype=float)
+        self.voltage_spread = np.empty(0, dtype=float)
+        self.density_spread = np.empty(0, dtype=float)
+        self.last_id = 0
+
+    def __len__(self) -> int:
+        return len(self.battery_ids)
+
+    def append(self, batteries: List[Tuple], elements: List[Tuple]):
+        """Anexa baterias (ordenadas por id) e seus elementos; recalcula os spreads"""
+        if batteries:
+            ids, clientes, modelos, periodos, tensao_total, tensao_nominal, temperatura = zip(*batteries)
+            periodos = [_period(p) for p in periodos]
+            months = [int(p[:4]) * 12 + int(p[5:7]) - 1 if p else np.nan for p in periodos]
+            total = np.array(tensao_total, dtype=float)
+            nominal = np.array(tensao_nominal, dtype=float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ratio = np.where(nominal > 0, total / nominal, np.nan)
+
+            self.battery_ids = np.concatenate((self.battery_ids, np.array(ids, dtype=np.int64)))
+            self.cliente = np.concatenate((self.cliente, np.array([c or UNKNOWN_LABEL for c in clientes], dtype=object)))
+            self.modelo = np.concatenate((self.modelo, np.array([m or UNKNOWN_LABEL for m in modelos], dtype=object)))
+            self.periodo = np.concatenate((self.periodo, np.array([p or UNKNOWN_LABEL for p in periodos], dtype=object)))
+            self.month_index = np.concatenate((self.month_index, np.array(months, dtype=float)))
+            self.voltage_ratio = np.concatenate((self.voltage_ratio, ratio))
+            self.temperatura = np.concatenate((self.temperatura, np.array(temperatura, dtype=float)))
+            self.last_id = int(self.battery_ids[-1])
+
+        if elements:
+            owner_ids, densidade, tensao = zip(*elements)
+            owners = np.searchsorted(self.battery_ids, np.array(owner_ids, dtype=np.int64))
+            self.element_owner = np.concatenate((self.element_owner, owners))
+            self.element_density = np.concatenate((self.element_density, np.array(densidade, dtype=float)))
+            self.element_voltage = np.concatenate((self.element_voltage, np.array(tensao, dtype=float)))
+
+        self.voltage_spread = _segment_spread(self.element_owner, self.element_voltage, len(self))
+        self.density_spread = _segment_spread(self.element_owner, self.element_density, len(self))
+
+class BatteryFleetAnalytics:
+    """Carga incremental + cache de resultados das estatísticas da frota"""
+
+    def __init__(self, connection_factory: Callable, check_interval: float = ANALYTICS_CHECK_INTERVAL,
+                 cache_size: int = ANALYTICS_CACHE_SIZE):
+        self._connection = connection_factory
+        self.check_interval = check_interval
+        self.cache_size = cache_size
+        self.data = FleetData()
+        self._row_count = 0
+        self._checked_at = 0.0
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.stats = {'full_loads': 0, 'incremental_loads': 0, 'cache_hits': 0, 'cache_misses': 0}
+
+    def _fetch(self, cursor, after_id: int) -> Tuple[List[Tuple], List[Tuple]]:
+        cursor.execute('''
+            SELECT b.id, la.nome_cliente, b.modelo,
+                   SUBSTR(CASE WHEN la.data GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*' THEN la.data
+                               ELSE la.created_at END, 1, 7),
+                   b.tensao_total, b.tensao_nominal, b.temperatura
+            FROM laudo_baterias b
+            JOIN laudos_avancados la ON la.id = b.laudo_avancado_id
+            WHERE b.id > ?
+            ORDER BY b.id
+        ''', (after_id,))
+        batteries = [tuple(row) for row in cursor.fetchall()]
+        cursor.execute('''
+            SELECT e.bateria_id, e.densidade, e.tensao
+            FROM laudo_bateria_elementos e
+            JOIN laudo_baterias b ON b.id = e.bateria_id
+            JOIN laudos_avancados la ON la.id = b.laudo_avancado_id
+            WHERE e.bateria_id > ?
+        ''', (after_id,))
+        elements = [tuple(row) for row in cursor.fetchall()]
+        return batteries, elements
+
+    def mark_stale(self):
+        """Novo laudo avançado neste worker: a próxima consulta verifica o banco imediatamente"""
+        self._checked_at = 0.0
+
+    def _count_after(self, cursor, after_id: int) -> int:
+        cursor.execute('''
+            SELECT COUNT(*) FROM laudo_baterias b
+            JOIN laudos_avancados la ON la.id = b.laudo_avancado_id
+            WHERE b.id > ?
+        ''', (after_id,))
+        return cursor.fetchone()[0]
+
+    def refresh(self, force: bool = False) -> bool:
+        """Sincroniza os arrays com o banco; retorna True se os dados mudaram"""
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = time.monotonic()
+
+            with self._connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT COUNT(*), COALESCE(MAX(b.id), 0) FROM laudo_baterias b
+                    JOIN laudos_avancados la ON la.id = b.laudo_avancado_id
+                ''')
+                count, max_id = cursor.fetchone()
+                if not force and count == self._row_count and max_id == self.data.last_id:
+                    return False
+
+                # Só inserções novas (ids maiores): anexa; remoções/regravações: recarrega tudo
+                new_rows = self._count_after(cursor, self.data.last_id) if max_id > self.data.last_id else 0
+                incremental = not force and len(self.data) > 0 and new_rows > 0 and count == self._row_count + new_rows
+                if incremental:
+                    batteries, elements = self._fetch(cursor, self.data.last_id)
+                    self.data.append(batteries, elements)
+                    self.stats['incremental_loads'] += 1
+                else:
+                    data = FleetData()
+                    data.append(*self._fetch(cursor, 0))
+                    self.data = data
+                    self.stats['full_loads'] += 1
+
+            self._row_count = len(self.data)
+            self._cache.clear()
+            logger.info(f"Análise de baterias: {len(self.data)} bateria(s) em memória "
+                        f"({'incremental' if incremental else 'carga completa'})")
+            return True
+
+    def fleet_stats(self, group_by: str = 'modelo', cliente: Optional[str] = None, modelo: Optional[str] = None,
+                    start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+        """Estatísticas por grupo (cliente, modelo ou período 'YYYY-MM'), com filtros opcionais"""
+        if group_by not in GROUP_FIELDS:
+            raise ValueError(f"Agrupamento inválido: {group_by} (use {', '.join(GROUP_FIELDS)})")
+        self.refresh()
+
+        key = (group_by, cliente, modelo, start, end)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats['cache_hits'] += 1
+                return cached
+            self.stats['cache_misses'] += 1
+            data = self.data
+
+        result = self._compute(data, group_by, cliente, modelo, start, end)
+
+        with self._lock:
+            if self.data is data:
+                self._cache[key] = result
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def _compute(self, data: FleetData, group_by: str, cliente: Optional[str], modelo: Optional[str],
+                 start: Optional[str], end: Optional[str]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        mask = np.ones(len(data), dtype=bool)
+        if cliente:
+            mask &= data.cliente == cliente
+        if modelo:
+            mask &= data.modelo == modelo
+        if start:
+            mask &= (data.periodo != UNKNOWN_LABEL) & (data.periodo >= start)
+        if end:
+            mask &= (data.periodo != UNKNOWN_LABEL) & (data.periodo <= end)
+
+        selected = np.flatnonzero(mask)
+        labels, codes = np.unique(getattr(data, group_by)[selected].astype(str), return_inverse=True)
+        n_groups = len(labels)
+
+        # Elementos das baterias selecionadas, com o código do grupo da bateria
+        battery_code = np.full(len(data), -1, dtype=np.int64)
+        battery_code[selected] = codes
+        element_code = battery_code[data.element_owner]
+        element_mask = element_code >= 0
+        element_code = element_code[element_mask]
+
+        voltage = _grouped_stats(element_code, data.element_voltage[element_mask], n_groups)
+        density = _grouped_stats(element_code, data.element_density[element_mask], n_groups)
+        ratio = _grouped_stats(codes, data.voltage_ratio[selected], n_groups)
+        temperature = _grouped_stats(codes, data.temperatura[selected], n_groups)
+        voltage_spread = _grouped_stats(codes, data.voltage_spread[selected], n_groups)
+        density_spread = _grouped_stats(codes, data.density_spread[selected], n_groups)
+
+        unbalanced = ((data.voltage_spread[selected] > IMBALANCE_VOLTAGE_LIMIT) |
+                      (data.density_spread[selected] > IMBALANCE_DENSITY_LIMIT))
+        unbalanced_count = np.bincount(codes, weights=unbalanced, minlength=n_groups)
+        measured = ~np.isnan(data.voltage_spread[selected]) | ~np.isnan(data.density_spread[selected])
+        measured_count = np.bincount(codes, weights=measured, minlength=n_groups)
+
+        # Degradação: inclinação por mês da razão tensão total / nominal e da densidade média
+        months = data.month_index[selected]
+        ratio_slope = _grouped_slope(codes, months, data.voltage_ratio[selected], n_groups)
+        battery_density = np.full(len(data), np.nan)
+        density_sums = np.bincount(data.element_owner, weights=np.nan_to_num(data.element_density), minlength=len(data))
+        density_counts = np.bincount(data.element_owner, weights=~np.isnan(data.element_density), minlength=len(data))
+        np.divide(density_sums, density_counts, out=battery_density, where=density_counts > 0)
+        density_slope = _grouped_slope(codes, months, battery_density[selected], n_groups)
+
+        battery_counts = np.bincount(codes, minlength=n_groups)
+        groups = []
+        for index in np.argsort(-battery_counts, kind='stable'):
+            groups.append({
+                'key': str(labels[index]),
+                'batteries': int(battery_counts[index]),
+                'element_voltage': _describe(voltage, index),
+                'element_density': _describe(density, index),
+                'voltage_ratio': _describe(ratio, index),
+                'temperature': _describe(temperature, index, 2),
+                'imbalance': {
+                    'voltage_spread': _describe(voltage_spread, index),
+                    'density_spread': _describe(density_spread, index),
+                    'unbalanced_batteries': int(unbalanced_count[index]),
+                    'score': _number(unbalanced_count[index] / measured_count[index] * 100, 2)
+                    if measured_count[index] else None
+                },
+                'degradation': {
+                    'voltage_ratio_per_month': _number(ratio_slope[index], 6),
+                    'density_per_month': _number(density_slope[index], 6)
+                }
+            })
+
+        return {
+            'group_by': group_by,
+            'filters': {'cliente': cliente, 'modelo': modelo, 'start': start, 'end': end},
+            'batteries': int(len(selected)),
+            'elements': int(element_mask.sum()),
+            'thresholds': {'voltage_spread': IMBALANCE_VOLTAGE_LIMIT, 'density_spread': IMBALANCE_DENSITY_LIMIT},
+            'groups': groups,
+            'generated_at': datetime.now().isoformat(),
+            'compute_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+
+def _default_connection():
+    from database import db_connection
+    return db_connection()
+
+fleet_analytics = BatteryFleetAnalytics(_default_connection)
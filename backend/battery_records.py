@@ -0,0 +1,103 @@
+"""
+Medições de baterias dos laudos avançados em tabelas normalizadas
+O JSON de laudos_avancados.baterias continua sendo a fonte do documento; laudo_baterias
+(uma linha por bateria) e laudo_bateria_elementos (uma linha por elemento medido)
+guardam os mesmos dados tipados para consultas de frota em SQL.
+"""
+
+import re
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_NUMBER = re.compile(r'[-+]?\d+(?:[.,]\d+)?')
+
+def parse_number(value: Any) -> Optional[float]:
+    """Número digitado no formulário ('12,5', '2.08 g/cm³', 12) -> float; vazio/inválido -> None"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value))
+    if not match:
+        return None
+    return float(match.group().replace(',', '.'))
+
+def parse_int(value: Any) -> Optional[int]:
+    number = parse_number(value)
+    return int(number) if number is not None else None
+
+def _text(value: Any) -> Optional[str]:
+    text = str(value).strip() if value is not None else ''
+    return text or None
+
+def battery_row(laudo_avancado_id: int, position: int, bateria: Dict[str, Any]) -> Tuple:
+    """Linha de laudo_baterias a partir de um item de LaudoAvancado.baterias"""
+    return (
+        laudo_avancado_id,
+        position,
+        _text(bateria.get('numeroIdentificacao')),
+        _text(bateria.get('modeloTipo')),
+        _text(bateria.get('numeroSerie')),
+        _text(bateria.get('fabricante')),
+        _text(bateria.get('tipoValvula')),
+        _text(bateria.get('tipoPolo')),
+        _text(bateria.get('tipoAtividade')),
+        _text(bateria.get('dataFabricacao')),
+        parse_number(bateria.get('tensaoNominal')),
+        parse_number(bateria.get('capacidadeNominal8h')),
+        parse_int(bateria.get('numeroElementos')),
+        parse_number(bateria.get('tensaoTotal')),
+        parse_number(bateria.get('temperatura'))
+    )
+
+def element_rows(bateria: Dict[str, Any]) -> List[Tuple[int, Optional[float], Optional[float]]]:
+    """(numero, densidade, tensao) dos elementos com ao menos uma medição"""
+    rows = []
+    for index, elemento in enumerate(bateria.get('avaliacaoElementos') or [], 1):
+        if not isinstance(elemento, dict):
+            continue
+        densidade = parse_number(elemento.get('densidade'))
+        tensao = parse_number(elemento.get('tensao'))
+        if densidade is None and tensao is None:
+            continue
+        rows.append((parse_int(elemento.get('numero')) or index, densidade, tensao))
+    return rows
+
+def store_baterias(cursor: sqlite3.Cursor, laudo_avancado_id: int, baterias: Iterable[Dict[str, Any]]) -> int:
+    """Substitui as baterias do laudo (chamar na mesma transação da gravação do laudo)"""
+    cursor.execute("DELETE FROM laudo_baterias WHERE laudo_avancado_id = ?", (laudo_avancado_id,))
+    count = 0
+    for position, bateria in enumerate(baterias or [], 1):
+        if not isinstance(bateria, dict):
+            continue
+        cursor.execute('''
+            INSERT INTO laudo_baterias (
+                laudo_avancado_id, position, numero_identificacao, modelo, numero_serie, fabricante,
+                tipo_valvula, tipo_polo, tipo_atividade, data_fabricacao, tensao_nominal,
+                capacidade_nominal_8h, numero_elementos, tensao_total, temperatura
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', battery_row(laudo_avancado_id, position, bateria))
+        bateria_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT OR REPLACE INTO laudo_bateria_elementos (bateria_id, numero, densidade, tensao) VALUES (?, ?, ?, ?)",
+            [(bateria_id, *row) for row in element_rows(bateria)]
+        )
+        count += 1
+    return count
+
+def backfill_baterias(cursor: sqlite3.Cursor) -> int:
+    """Converte os JSON de laudos_avancados ainda sem baterias normalizadas"""
+    cursor.execute('''
+        SELECT id, baterias FROM laudos_avancados la
+        WHERE NOT EXISTS (SELECT 1 FROM laudo_baterias b WHERE b.laudo_avancado_id = la.id)
+    ''')
+    total = 0
+    for laudo_id, baterias_json in cursor.fetchall():
+        try:
+            baterias = json.loads(baterias_json or '[]')
+        except (TypeError, ValueError):
+            continue
+        if isinstance(baterias, list):
+            total += store_baterias(cursor, laudo_id, baterias)
+    return total
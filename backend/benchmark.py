@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latência dos endpoints mais usados
+Para cada tamanho de base (10k / 100k / 1M laudos) gera um banco sintético com
+create_test_laudos.generate, sobe o app FastAPI em processo (TestClient, um worker)
+apontando para ele via LAUDOS_DB_PATH e mede p50/p95/p99 e vazão por endpoint.
+
+O resultado vai para um JSON de baseline; --comparar aponta regressões contra um baseline anterior.
+
+Exemplos:
+    python benchmark.py --tamanhos 10000,100000 --saida benchmark_baseline.json
+    python benchmark.py --tamanhos 10000 --comparar benchmark_baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import platform
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+DEFAULT_REQUESTS = 200
+DEFAULT_CONCURRENCY = 8
+DEFAULT_WARMUP = 10
+DEFAULT_TOLERANCE = 0.2
+# Data de referência fixa: a mesma base é gerada em qualquer dia
+REFERENCE_DATE = date(2025, 1, 31)
+
+# (nome, método, rota, usuário); {laudo_id} é sorteado a cada requisição.
+# As listagens são medidas paginadas: sem limit elas devolvem a base inteira
+ENDPOINTS: List[Tuple[str, str, str, str]] = [
+    ('login', 'POST', '/login', 'admin'),
+    ('me', 'GET', '/me', 'tecnico'),
+    ('laudos', 'GET', '/laudos?limit=100', 'admin'),
+    ('laudos_approval', 'GET', '/laudos/approval?limit=100', 'encarregado'),
+    ('laudos_finalized', 'GET', '/laudos/finalized?limit=100', 'vendedor'),
+    ('admin_stats', 'GET', '/admin/stats', 'admin'),
+    ('laudo_pdf', 'GET', '/laudos/{laudo_id}/pdf', 'admin'),
+    ('notifications', 'GET', '/api/notifications', 'tecnico'),
+]
+PASSWORD = '123456'
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil por interpolação linear (mesmo método padrão do numpy)"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def summarize(latencies: List[float], elapsed: float, errors: int) -> Dict[str, Any]:
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+        'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+        'throughput_rps': round(len(values) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+def ensure_database(data_dir: Path, size: int, seed: int) -> Path:
+    """Banco sintético do tamanho pedido, reaproveitado entre execuções (mesma semente = mesmos dados)"""
+    from create_test_laudos import generate
+
+    db_path = data_dir / f"bench_{size}_seed{seed}.db"
+    if db_path.exists():
+        return db_path
+    partial = db_path.with_suffix('.partial')
+    for suffix in ('', '-wal', '-shm'):
+        Path(f"{partial}{suffix}").unlink(missing_ok=True)
+    print(f"🔄 Gerando base com {size} laudos em {db_path}...")
+    generate(str(partial), users=max(20, size // 2000), laudos=size, avancados=max(100, size // 50),
+             notificacoes=max(1000, size // 10), seed=seed, end=REFERENCE_DATE, verbose=False)
+    conn = sqlite3.connect(str(partial))
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    partial.rename(db_path)
+    return db_path
+
+def run_endpoint(client, send: Callable[[Any], Any], requests: int, concurrency: int,
+                 warmup: int) -> Dict[str, Any]:
+    """Dispara `requests` chamadas com `concurrency` threads e resume as latências"""
+    for _ in range(warmup):
+        send(client)
+
+    def timed(_):
+        started = time.perf_counter()
+        response = send(client)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for _, status_code in results if status_code >= 400)
+    return summarize([latency for latency, _ in results], elapsed, errors)
+
+def run_size(db_path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Sobe o app contra `db_path` e mede todos os endpoints (roda em um processo próprio)"""
+    os.environ['LAUDOS_DB_PATH'] = db_path
+    os.environ.setdefault('PDF_CACHE_DIR', tempfile.mkdtemp(prefix='bench_pdf_'))
+    # Buckets de login próprios: estado deixado por outras execuções causaria 429
+    os.environ.setdefault('LOGIN_LIMITS_DB', os.path.join(tempfile.mkdtemp(prefix='bench_login_'), 'login_limits.db'))
+    import logging
+    logging.disable(logging.WARNING)
+    from fastapi.testclient import TestClient
+    import app as app_module
+
+    conn = sqlite3.connect(db_path)
+    laudo_count, max_laudo = conn.execute("SELECT COUNT(*), MAX(id) FROM laudos").fetchone()
+    conn.close()
+
+    rng = random.Random(options['seed'])
+    selected = set(options.get('endpoints') or [name for name, _, _, _ in ENDPOINTS])
+    results: Dict[str, Any] = {}
+    with TestClient(app_module.app) as client:
+        tokens: Dict[str, str] = {}
+
+        def headers(username: str) -> Dict[str, str]:
+            if username not in tokens:
+                response = client.post('/login', data={'username': username, 'password': PASSWORD})
+                response.raise_for_status()
+                tokens[username] = response.json()['access_token']
+            return {'Authorization': f"Bearer {tokens[username]}"}
+
+        for name, method, path, username in ENDPOINTS:
+            if name not in selected:
+                continue
+            if method == 'POST':
+                def send(client, username=username):
+                    return client.post('/login', data={'username': username, 'password': PASSWORD})
+            else:
+                auth = headers(username)
+
+                def send(client, path=path, auth=auth):
+                    url = path.format(laudo_id=rng.randint(1, max_laudo)) if '{laudo_id}' in path else path
+                    return client.get(url, headers=auth)
+
+            results[name] = run_endpoint(client, send, options['requests'], options['concurrency'], options['warmup'])
+            print(f"  {name:<18} p50={results[name]['p50_ms']:>8.2f}ms  p95={results[name]['p95_ms']:>8.2f}ms  "
+                  f"p99={results[name]['p99_ms']:>8.2f}ms  {results[name]['throughput_rps']:>8.1f} req/s"
+                  + (f"  ({results[name]['errors']} erro(s))" if results[name]['errors'] else ''))
+    return {'laudos': laudo_count, 'endpoints': results}
+
+def _child(queue, db_path: str, options: Dict[str, Any]):
+    try:
+        queue.put(('ok', run_size(db_path, options)))
+    except Exception as e:
+        queue.put(('error', repr(e)))
+
+def benchmark_size(db_path: Path, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Um processo por tamanho: DB_PATH é lido na importação do app"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, str(db_path), options))
+    process.start()
+    status, payload = queue.get()
+    process.join()
+    if status != 'ok':
+        raise RuntimeError(f"Benchmark de {db_path.name} falhou: {payload}")
+    return payload
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """Diferença de p95 por (tamanho, endpoint); regression=True acima da tolerância"""
+    rows = []
+    for size, result in current.get('sizes', {}).items():
+        previous = baseline.get('sizes', {}).get(size)
+        if not previous:
+            continue
+        for name, stats in result['endpoints'].items():
+            before = previous['endpoints'].get(name)
+            if not before or not before['p95_ms']:
+                continue
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms']
+            rows.append({
+                'size': size,
+                'endpoint': name,
+                'baseline_p95_ms': before['p95_ms'],
+                'p95_ms': stats['p95_ms'],
+                'change': round(change, 3),
+                'regression': change > tolerance,
+            })
+    return rows
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de latência dos endpoints por tamanho de base")
+    parser.add_argument('--tamanhos', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="Quantidades de laudos separadas por vírgula")
+    parser.add_argument('--requisicoes', type=int, default=DEFAULT_REQUESTS, help="Requisições medidas por endpoint")
+    parser.add_argument('--concorrencia', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--aquecimento', type=int, default=DEFAULT_WARMUP, help="Requisições descartadas por endpoint")
+    parser.add_argument('--endpoints', help="Subconjunto de endpoints (nomes separados por vírgula)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dados', default=os.path.join(tempfile.gettempdir(), 'laudos_benchmark'),
+                        help="Diretório das bases geradas (reaproveitadas entre execuções)")
+    parser.add_argument('--saida', default='benchmark_baseline.json', help="Arquivo JSON do resultado")
+    parser.add_argument('--comparar', help="Baseline anterior para comparar")
+    parser.add_argument('--tolerancia', type=float, default=DEFAULT_TOLERANCE, help="Aumento de p95 tolerado (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.tamanhos.split(',') if size.strip()]
+    endpoints = [name.strip() for name in args.endpoints.split(',')] if args.endpoints else None
+    unknown = set(endpoints or []) - {name for name, _, _, _ in ENDPOINTS}
+    if unknown:
+        parser.error(f"Endpoints desconhecidos: {', '.join(sorted(unknown))}")
+
+    data_dir = Path(args.dados)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    options = {
+        'requests': args.requisicoes,
+        'concurrency': args.concorrencia,
+        'warmup': args.aquecimento,
+        'seed': args.seed,
+        'endpoints': endpoints,
+    }
+
+    report: Dict[str, Any] = {
+        'meta': {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            **options,
+        },
+        'sizes': {},
+    }
+    for size in sizes:
+        db_path = ensure_database(data_dir, size, args.seed)
+        print(f"📊 {size} laudos")
+        report['sizes'][str(size)] = benchmark_size(db_path, options)
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Resultado salvo em {args.saida}")
+
+    if not args.comparar:
+        return 0
+    with open(args.comparar, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(baseline, report, args.tolerancia)
+    print(f"\n🔍 Comparação com {args.comparar} (p95)")
+    for row in rows:
+        flag = '❌' if row['regression'] else '  '
+        print(f"{flag} {row['size']:>8} {row['endpoint']:<18} {row['baseline_p95_ms']:>8.2f}ms -> "
+              f"{row['p95_ms']:>8.2f}ms ({row['change']:+.0%})")
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressão(ões) acima de {args.tolerancia:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,217 +1,384 @@
 #!/usr/bin/env python3
 """
-Script para criar laudos de teste para demonstrar o painel de aprovação
-Cria laudos em diferentes status para testar o fluxo de aprovação
+Gerador de dados sintéticos para testes de carga
+Preenche um banco de laudos com usuários, laudos, laudos avançados (com baterias),
+tags e notificações em volume de produção. Não é interativo: tudo vem dos argumentos.
+
+A mesma semente e a mesma data de referência (--ate) geram exatamente os mesmos dados.
+Os inserts são agrupados em transações de --lote linhas.
+
+O banco de destino é obrigatório (--db) e precisa estar vazio: para acrescentar dados
+a um banco que já tem laudos, use --append.
+
+Exemplos:
+    python create_test_laudos.py --laudos 1000000 --db /tmp/carga.db
+    python create_test_laudos.py --db /tmp/carga_seed7.db --usuarios 200 --laudos 100000 --avancados 20000 --seed 7
 """
 
+import json
+import time
+import random
 import sqlite3
-import os
-from datetime import datetime, timedelta
-
-def create_test_laudos():
-    """Cria laudos de teste para demonstrar o painel de aprovação"""
-    db_path = 'laudos.db'
-    
-    conn = sqlite3.connect(db_path)
+import hashlib
+import argparse
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from db_pool import configure_connection
+from migrations import run_migrations
+from defect_categories import classifier
+from battery_records import store_baterias
+
+DEFAULT_BATCH = 10000
+DEFAULT_PASSWORD = '123456'
+
+def _distribution(options: Sequence[Tuple[Any, int]]) -> Tuple[List[Any], List[int]]:
+    """(valores, pesos acumulados) para random.choices"""
+    values, cumulative, total = [], [], 0
+    for value, weight in options:
+        total += weight
+        values.append(value)
+        cumulative.append(total)
+    return values, cumulative
+
+def _weighted(rng: random.Random, distribution: Tuple[List[Any], List[int]]):
+    return rng.choices(distribution[0], cum_weights=distribution[1])[0]
+
+# Distribuições aproximadas de produção (pesos relativos)
+USER_TYPES = _distribution([('tecnico', 70), ('encarregado', 15), ('vendedor', 15)])
+LAUDO_STATUSES = _distribution([
+    ('finalizado', 45), ('em_andamento', 10), ('pendente', 12), ('aprovado_manutencao', 7),
+    ('aprovado_vendas', 6), ('aguardando_orcamento', 6), ('ap_vendas', 6), ('reprovado', 8),
+])
+AVANCADO_STATUSES = _distribution([('pendente', 30), ('aprovado', 20), ('finalizado', 45), ('reprovado', 5)])
+TAG_RATE = 0.15
+READ_RATE = 0.6
+
+EMPRESAS = ['Transportadora', 'Logística', 'Armazém', 'Indústria', 'Distribuidora', 'Comércio',
+            'Metalúrgica', 'Atacadão', 'Frigorífico', 'Porto Seco', 'Centro de Distribuição']
+SUFIXOS = ['Delta', 'Sigma', 'Express', 'Central', 'Norte', 'Sul', 'Paulista', 'Atlântico', 'Horizonte',
+           'Aurora', 'Vale Verde', 'Boa Vista', 'São Jorge', 'Santa Clara', 'Nova Era', 'Primavera']
+EQUIPAMENTOS = ['Empilhadeira Elétrica Toyota 2T', 'Empilhadeira Hyster 1.5T', 'Empilhadeira Still 2T',
+                'Empilhadeira Jungheinrich 1.8T', 'Transpaleteira Elétrica Paletrans', 'Rebocador Linde P30',
+                'Empilhadeira Retrátil Crown', 'Plataforma Elevatória Genie', 'Lavadora de Piso Tennant']
+DIAGNOSTICOS = [
+    'Bateria tracionária descarregada e com perda de capacidade sob carga',
+    'Células com sulfatação avançada e densidade baixa em vários elementos',
+    'Terminais oxidados e cabos com isolamento comprometido',
+    'Vazamento de eletrólito na caixa da bateria',
+    'Carregador não completa o ciclo de carga, falha na placa de controle',
+    'Curto-circuito em elemento, tensão zerada na célula',
+    'Desequilíbrio de tensão entre elementos acima do tolerado',
+    'Nível de água baixo em todas as células, bateria aquecendo na carga',
+    'Sistema de carga operacional, bateria com 80% da capacidade original',
+    'Equipamento sem defeito aparente, revisão preventiva',
+]
+SOLUCOES = [
+    'Substituição completa do banco de baterias',
+    'Equalização e correção de densidade dos elementos',
+    'Troca de cabos e terminais, aplicação de proteção anticorrosiva',
+    'Substituição dos elementos danificados',
+    'Reparo da placa de controle do carregador',
+    'Completar nível de água desmineralizada e nova carga de equalização',
+    'Limpeza geral e check-up preventivo',
+]
+TAGS = [('URGENTE', 'Cliente com equipamento parado'), ('GARANTIA', 'Atendimento em garantia'),
+        ('CONTRATO', 'Cliente com contrato de manutenção'), ('RETORNO', 'Retorno de atendimento anterior'),
+        ('ORCAMENTO', 'Aguardando aprovação de orçamento')]
+MODELOS_BATERIA = [('24V 400Ah', 12, 24.0, 400), ('36V 500Ah', 18, 36.0, 500), ('48V 600Ah', 24, 48.0, 600),
+                   ('48V 775Ah', 24, 48.0, 775), ('80V 700Ah', 40, 80.0, 700)]
+FABRICANTES = ['Moura', 'Enersys', 'Hoppecke', 'Exide', 'Tudor', 'Zapi']
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def _created_series(rng: random.Random, count: int, end: datetime, days: int) -> List[datetime]:
+    """Datas de criação em ordem crescente (os ids acompanham o tempo, como em produção),
+    com mais volume nos meses recentes (crescimento da base) e em horário comercial"""
+    offsets = sorted(
+        int(days * rng.random() ** 0.5) * 86400 + rng.randint(7 * 3600, 19 * 3600 - 1) for _ in range(count)
+    )
+    start = end - timedelta(days=days)
+    return [start + timedelta(seconds=offset) for offset in offsets]
+
+def _batches(rows: Iterator[Tuple], size: int) -> Iterator[List[Tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def ensure_users(cursor: sqlite3.Cursor, rng: random.Random, count: int, created_at: str) -> Dict[str, List[int]]:
+    """Usuários padrão (admin, tecnico, vendedor, encarregado) + `count` usuários sintéticos"""
+    password_hash = hashlib.sha256(DEFAULT_PASSWORD.encode()).hexdigest()
+    defaults = [('admin', True, 'admin'), ('tecnico', False, 'tecnico'),
+                ('vendedor', False, 'vendedor'), ('encarregado', False, 'encarregado')]
+    rows = [(username, password_hash, is_admin, user_type, created_at) for username, is_admin, user_type in defaults]
+    for i in range(1, count + 1):
+        user_type = _weighted(rng, USER_TYPES)
+        rows.append((f"{user_type}_{i:05d}", password_hash, False, user_type, created_at))
+    cursor.executemany('''
+        INSERT OR IGNORE INTO users (username, password_hash, is_admin, user_type, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows)
+
+    users: Dict[str, List[int]] = {}
+    cursor.execute("SELECT id, user_type, is_admin FROM users ORDER BY id")
+    for user_id, user_type, is_admin in cursor.fetchall():
+        users.setdefault('admin' if is_admin else (user_type or 'tecnico'), []).append(user_id)
+    return users
+
+def laudo_rows(rng: random.Random, cursor: sqlite3.Cursor, count: int, tecnicos: List[int],
+               aprovadores: List[int], end: datetime, days: int) -> Iterator[Tuple]:
+    """Linhas de laudos simples, já com defect_category e updated_at"""
+    # O sufixo numérico do diagnóstico não casa com nenhuma regra: classifica só os modelos
+    categories = {text: classifier.classify(cursor, text) for text in DIAGNOSTICOS}
+    for created in _created_series(rng, count, end, days):
+        status = _weighted(rng, LAUDO_STATUSES)
+        diagnostico = rng.choice(DIAGNOSTICOS)
+        if status in ('em_andamento', 'pendente'):
+            updated = created + timedelta(minutes=rng.randint(0, 240))
+        else:
+            updated = created + timedelta(hours=rng.randint(2, 24 * 20))
+        updated = min(updated, end)
+
+        tag = tag_description = tag_updated_at = tag_updated_by = None
+        if rng.random() < TAG_RATE:
+            tag, tag_description = rng.choice(TAGS)
+            tag_updated_at = _timestamp(updated)
+            tag_updated_by = 'admin'
+
+        approved_by = rng.choice(aprovadores) if status not in ('em_andamento', 'pendente') else None
+        yield (
+            rng.choice(tecnicos),
+            f"{rng.choice(EMPRESAS)} {rng.choice(SUFIXOS)} {rng.randint(1, 999):03d}",
+            rng.choice(EQUIPAMENTOS),
+            f"{diagnostico}. Tensão medida {rng.uniform(18, 82):.1f}V.",
+            rng.choice(SOLUCOES),
+            status,
+            approved_by,
+            'Orçamento não aprovado pelo cliente' if status == 'reprovado' else None,
+            tag, tag_description, tag_updated_at, tag_updated_by,
+            categories[diagnostico],
+            _timestamp(created),
+            _timestamp(updated),
+        )
+
+def bateria(rng: random.Random, data_laudo: date) -> Dict[str, Any]:
+    """Uma bateria no formato do formulário de laudo avançado (valores como texto)"""
+    modelo, elementos, tensao_nominal, capacidade = rng.choice(MODELOS_BATERIA)
+    saude = rng.betavariate(5, 2)
+    avaliacao = []
+    tensao_total = 0.0
+    for numero in range(1, elementos + 1):
+        tensao = round(1.85 + 0.3 * saude + rng.gauss(0, 0.03), 3)
+        densidade = round(1.12 + 0.17 * saude + rng.gauss(0, 0.01), 3)
+        tensao_total += tensao
+        avaliacao.append({'numero': numero, 'densidade': f"{densidade:.3f}", 'tensao': f"{tensao:.2f}"})
+    fabricacao = data_laudo - timedelta(days=rng.randint(180, 365 * 6))
+    return {
+        'numeroIdentificacao': f"BT-{rng.randint(1, 99999):05d}",
+        'modeloTipo': modelo,
+        'numeroSerie': f"{rng.choice(FABRICANTES)[:2].upper()}{rng.randint(100000, 999999)}",
+        'fabricante': rng.choice(FABRICANTES),
+        'tipoValvula': rng.choice(['Aquamatic', 'Convencional']),
+        'tipoPolo': rng.choice(['Parafuso', 'Solda']),
+        'tipoAtividade': rng.choice(['Tração', 'Estacionária']),
+        'dataFabricacao': fabricacao.strftime('%m/%Y'),
+        'tensaoNominal': f"{tensao_nominal:.0f}V",
+        'capacidadeNominal8h': f"{capacidade}Ah",
+        'numeroElementos': str(elementos),
+        'tensaoTotal': f"{tensao_total:.1f}".replace('.', ','),
+        'temperatura': f"{rng.uniform(22, 45):.0f}°C",
+        'avaliacaoElementos': avaliacao,
+    }
+
+def insert_laudos_avancados(conn: sqlite3.Connection, rng: random.Random, count: int, tecnicos: List[int],
+                            end: datetime, days: int, batch_size: int) -> int:
+    """Laudos avançados + baterias normalizadas (insert por linha: store_baterias precisa do id)"""
     cursor = conn.cursor()
-    
-    try:
-        print("🔄 Criando laudos de teste para demonstração...")
-        
-        # Buscar IDs dos usuários
-        cursor.execute('SELECT id, username FROM users WHERE user_type IN ("tecnico", "encarregado", "vendedor")')
-        users = cursor.fetchall()
-        
-        if not users:
-            print("❌ Nenhum usuário encontrado. Execute primeiro o script create_users.py")
-            return
-        
-        tecnico_id = None
-        for user_id, username in users:
-            if username == 'tecnico':
-                tecnico_id = user_id
-                break
-        
-        if not tecnico_id:
-            print("❌ Usuário técnico não encontrado")
-            return
-        
-        # Verificar se já existem laudos de teste
-        cursor.execute('SELECT COUNT(*) FROM laudos')
-        total_laudos = cursor.fetchone()[0]
-        
-        if total_laudos > 0:
-            print(f"📋 Já existem {total_laudos} laudos no sistema")
-            response = input("Deseja adicionar mais laudos de teste? (s/n): ")
-            if response.lower() != 's':
-                print("Operação cancelada")
-                return
-        
-        # Dados de teste para diferentes status
-        test_laudos = [
-            # 1. Laudo em andamento (para Encarregado aprovar)
-            {
-                'user_id': tecnico_id,
-                'cliente': 'Empresa ABC Ltda',
-                'equipamento': 'Empilhadeira Elétrica XYZ-200',
-                'diagnostico': 'Bateria tracionária apresentando perda de capacidade significativa após 2 anos de uso. Tensão nominal de 12V caiu para 10.5V sob carga. Células apresentam desequilíbrio de carga.',
-                'solucao': 'Recomendada substituição da bateria por modelo 12V 100Ah com tecnologia AGM. Incluir sistema de equalização automática para prolongar vida útil.',
-                'status': 'em_andamento',
-                'created_at': datetime.now() - timedelta(days=2)
-            },
-            # 2. Laudo em andamento (para Encarregado aprovar)
-            {
-                'user_id': tecnico_id,
-                'cliente': 'Transportadora Delta',
-                'equipamento': 'Empilhadeira Toyota 2T Diesel',
-                'diagnostico': 'Sistema de bateria com células danificadas por sulfatação. Terminais oxidados e cabos com isolamento comprometido. Sistema de carga funcionando adequadamente.',
-                'solucao': 'Substituição completa do banco de baterias 24V 200Ah. Troca de cabos e terminais. Limpeza e proteção dos conectores.',
-                'status': 'em_andamento',
-                'created_at': datetime.now() - timedelta(days=1)
-            },
-            # 3. Laudo aprovado manutenção (para Vendedor aprovar orçamento)
-            {
-                'user_id': tecnico_id,
-                'cliente': 'Armazém Central',
-                'equipamento': 'Empilhadeira Hyster 1.5T',
-                'diagnostico': 'Necessidade de manutenção preventiva. Bateria com 80% da capacidade original. Sistema de carga operacional mas com sinais de desgaste.',
-                'solucao': 'Limpeza de terminais e check-up geral. Substituição de cabos se necessário. Aplicação de proteção anticorrosiva.',
-                'status': 'aprovado_manutencao',
-                'created_at': datetime.now() - timedelta(days=3)
-            },
-            # 4. Laudo aprovado vendas (para finalizar)
-            {
-                'user_id': tecnico_id,
-                'cliente': 'Indústria Sigma',
-                'equipamento': 'Empilhadeira Still 2T',
-                'diagnostico': 'Manutenção corretiva em cabos de alimentação. Isolamento danificado em múltiplos pontos. Risco de curto-circuito.',
-                'solucao': 'Substituição de cabos danificados por modelo de alta qualidade. Instalação de proteção adicional contra abrasão.',
-                'status': 'aprovado_vendas',
-                'created_at': datetime.now() - timedelta(days=4)
-            },
-            # 5. Laudo finalizado
-            {
-                'user_id': tecnico_id,
-                'cliente': 'Logística Express',
-                'equipamento': 'Empilhadeira Jungheinrich 1.8T',
-                'diagnostico': 'Bateria com fim de vida útil. Capacidade reduzida a 30%. Células com vazamento de eletrólito.',
-                'solucao': 'Substituição completa da bateria por modelo 48V 400Ah. Atualização do sistema de carga.',
-                'status': 'finalizado',
-                'created_at': datetime.now() - timedelta(days=7)
-            },
-            # 6. Laudo reprovado
-            {
-                'user_id': tecnico_id,
-                'cliente': 'Comércio Local',
-                'equipamento': 'Empilhadeira Pequena 1T',
-                'diagnostico': 'Problema no sistema de ignição. Bateria em bom estado mas não carrega adequadamente.',
-                'solucao': 'Diagnóstico adicional necessário. Possível problema no alternador ou regulador de tensão.',
-                'status': 'reprovado',
-                'created_at': datetime.now() - timedelta(days=5)
-            }
-        ]
-        
-        created_count = 0
-        for i, laudo in enumerate(test_laudos, 1):
-            try:
-                cursor.execute('''
-                    INSERT INTO laudos (
-                        user_id, cliente, equipamento, diagnostico, solucao, 
-                        status, created_at, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    laudo['user_id'],
-                    laudo['cliente'],
-                    laudo['equipamento'],
-                    laudo['diagnostico'],
-                    laudo['solucao'],
-                    laudo['status'],
-                    laudo['created_at'].strftime('%Y-%m-%d %H:%M:%S'),
-                    laudo['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-                ))
-                created_count += 1
-                print(f"✅ Laudo #{i} criado: {laudo['cliente']} - {laudo['status']}")
-                
-            except Exception as e:
-                print(f"❌ Erro ao criar laudo #{i}: {e}")
-        
+    series = iter(_created_series(rng, count, end, days))
+    inserted = 0
+    while inserted < count:
+        conn.execute("BEGIN")
+        for _ in range(min(batch_size, count - inserted)):
+            created = next(series)
+            baterias = [bateria(rng, created.date()) for _ in range(rng.choice([1, 1, 1, 2, 2, 3, 4, 6]))]
+            user_id = rng.choice(tecnicos)
+            cursor.execute('''
+                INSERT INTO laudos_avancados (
+                    user_id, nome_cliente, data, baterias, tecnico_responsavel, manutencao_preventiva,
+                    manutencao_corretiva, conclusao_final, status, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                user_id,
+                f"{rng.choice(EMPRESAS)} {rng.choice(SUFIXOS)} {rng.randint(1, 999):03d}",
+                created.strftime('%Y-%m-%d'),
+                json.dumps(baterias, ensure_ascii=False),
+                f"Técnico {user_id}",
+                json.dumps(['Limpeza', 'Verificação de nível'] if rng.random() < 0.7 else []),
+                json.dumps(['Troca de elemento'] if rng.random() < 0.3 else []),
+                rng.choice(['Bateria apta para operação', 'Bateria requer equalização',
+                            'Bateria condenada, recomendada substituição']),
+                _weighted(rng, AVANCADO_STATUSES),
+                _timestamp(created),
+                _timestamp(min(created + timedelta(hours=rng.randint(1, 72)), end)),
+            ))
+            store_baterias(cursor, cursor.lastrowid, baterias)
+            inserted += 1
         conn.commit()
-        print(f"\n✅ {created_count} laudos de teste criados com sucesso!")
-        
-        # Mostrar estatísticas
-        cursor.execute("SELECT status, COUNT(*) FROM laudos GROUP BY status")
-        stats = cursor.fetchall()
-        print("\n📊 Estatísticas dos laudos:")
-        for status, count in stats:
-            print(f"  - {status}: {count} laudos")
-        
-        print("\n🎯 Laudos criados para testar o painel de aprovação:")
-        print("  - 2 laudos 'em_andamento' (para Encarregado aprovar)")
-        print("  - 1 laudo 'aprovado_manutencao' (para Vendedor aprovar)")
-        print("  - 1 laudo 'aprovado_vendas' (para finalizar)")
-        print("  - 1 laudo 'finalizado' (exemplo completo)")
-        print("  - 1 laudo 'reprovado' (exemplo de reprovação)")
-        
-    except Exception as e:
-        print(f"❌ Erro ao criar laudos de teste: {e}")
-        conn.rollback()
+    return inserted
+
+def notification_rows(rng: random.Random, count: int, user_ids: List[int], laudo_ids: Sequence[int],
+                      end: datetime, days: int) -> Iterator[Tuple]:
+    """Eventos: ~20% broadcast (tags), o resto direcionado (aprovação/finalização)"""
+    for moment in _created_series(rng, count, end, days):
+        created = _timestamp(moment)
+        laudo_id = rng.choice(laudo_ids) if laudo_ids else None
+        if rng.random() < 0.2:
+            tag, _ = rng.choice(TAGS)
+            yield (None, 'tag_update', f"Laudo #{laudo_id} recebeu a tag {tag}", laudo_id, rng.choice(user_ids), created)
+        elif rng.random() < 0.5:
+            yield (rng.choice(user_ids), 'laudo_aprovado', f"Laudo #{laudo_id} aprovado", laudo_id, rng.choice(user_ids), created)
+        else:
+            yield (rng.choice(user_ids), 'laudo_finalizado', f"Laudo #{laudo_id} finalizado", laudo_id, rng.choice(user_ids), created)
+
+def existing_laudos(db_path: str) -> int:
+    """Laudos já gravados em `db_path` (0 se o arquivo ou a tabela não existem)"""
+    if not Path(db_path).exists():
+        return 0
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM laudos").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
     finally:
         conn.close()
 
-def verify_test_data():
-    """Verifica se os dados de teste estão corretos"""
-    db_path = 'laudos.db'
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+def generate(db_path: str, users: int = 50, laudos: int = 10000, avancados: int = 1000,
+             notificacoes: int = 5000, seed: int = 42, end: Optional[date] = None, days: int = 730,
+             batch_size: int = DEFAULT_BATCH, verbose: bool = True, append: bool = False) -> Dict[str, Any]:
+    """Gera a base sintética em `db_path` (aplicando as migrações) e retorna um resumo.
+
+    Recusa (ValueError) um banco que já tem laudos, salvo com append=True.
+    """
+    if not append:
+        found = existing_laudos(str(db_path))
+        if found:
+            raise ValueError(f"{db_path} já tem {found} laudo(s); use outro arquivo ou append=True (--append)")
+    rng = random.Random(seed)
+    end_date = end or date.today()
+    end_dt = datetime.combine(end_date, datetime.min.time()) + timedelta(days=1)
+    started = time.perf_counter()
+
+    def log(message: str):
+        if verbose:
+            print(f"[{time.perf_counter() - started:7.1f}s] {message}")
+
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    configure_connection(conn)
     try:
-        print("\n🔍 Verificando dados de teste...")
-        
-        # Verificar usuários
-        cursor.execute('SELECT username, user_type FROM users ORDER BY username')
-        users = cursor.fetchall()
-        print(f"👥 Usuários disponíveis:")
-        for username, user_type in users:
-            print(f"  - {username}: {user_type}")
-        
-        # Verificar laudos
-        cursor.execute('''
-            SELECT l.id, l.cliente, l.status, u.username 
-            FROM laudos l 
-            JOIN users u ON l.user_id = u.id 
-            ORDER BY l.created_at DESC
-        ''')
-        laudos = cursor.fetchall()
-        
-        print(f"\n📋 Laudos no sistema:")
-        for laudo_id, cliente, status, username in laudos:
-            print(f"  - #{laudo_id}: {cliente} ({status}) - Técnico: {username}")
-        
-        # Verificar fluxo de aprovação
-        print(f"\n🔄 Fluxo de aprovação testável:")
-        print("  1. Encarregado pode aprovar laudos 'em_andamento'")
-        print("  2. Vendedor pode aprovar laudos 'aprovado_manutencao'")
-        print("  3. Admin pode aprovar qualquer laudo")
-        
-    except Exception as e:
-        print(f"❌ Erro ao verificar dados: {e}")
+        run_migrations(conn)
+        cursor = conn.cursor()
+
+        user_ids = ensure_users(cursor, rng, users, _timestamp(end_dt - timedelta(days=days + 1)))
+        conn.commit()
+        tecnicos = user_ids.get('tecnico', []) or user_ids['admin']
+        aprovadores = user_ids.get('encarregado', []) + user_ids.get('vendedor', []) + user_ids['admin']
+        all_users = [user_id for ids in user_ids.values() for user_id in ids]
+        log(f"{len(all_users)} usuário(s)")
+
+        # Um executemany por lote; os ids (usados pelas notificações) são lidos acima do MAX(id)
+        # anterior ao lote, na mesma transação: com --append o banco pode ter lacunas
+        laudo_ids: List[int] = []
+        for batch in _batches(laudo_rows(rng, cursor, laudos, tecnicos, aprovadores, end_dt, days), batch_size):
+            conn.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM laudos")
+            last_laudo = cursor.fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO laudos (
+                    user_id, cliente, equipamento, diagnostico, solucao, status, approved_by, rejection_reason,
+                    tag, tag_description, tag_updated_at, tag_updated_by, defect_category, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            cursor.execute("SELECT id FROM laudos WHERE id > ? ORDER BY id", (last_laudo,))
+            laudo_ids.extend(row[0] for row in cursor.fetchall())
+            conn.commit()
+            if len(laudo_ids) % (batch_size * 10) == 0 or len(laudo_ids) == laudos:
+                log(f"{len(laudo_ids)}/{laudos} laudos")
+
+        insert_laudos_avancados(conn, rng, avancados, tecnicos, end_dt, days, batch_size)
+        log(f"{avancados} laudo(s) avançado(s)")
+
+        for batch in _batches(notification_rows(rng, notificacoes, all_users, laudo_ids, end_dt, days), batch_size):
+            conn.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM notification_events")
+            last_event = cursor.fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO notification_events (target_user_id, type, message, laudo_id, actor_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', batch)
+            cursor.execute('''
+                SELECT target_user_id, id, created_at FROM notification_events
+                WHERE id > ? AND target_user_id IS NOT NULL ORDER BY id
+            ''', (last_event,))
+            reads = [row for row in cursor.fetchall() if rng.random() < READ_RATE]
+            cursor.executemany("INSERT OR IGNORE INTO notification_reads (user_id, event_id, read_at) VALUES (?, ?, ?)", reads)
+            conn.commit()
+        log(f"{notificacoes} notificação(ões)")
+
+        # Estatísticas do planejador iguais às de uma base de produção
+        conn.execute("ANALYZE")
+        conn.commit()
+        cursor.execute("SELECT status, COUNT(*) FROM laudos GROUP BY status ORDER BY 2 DESC")
+        by_status = {row[0]: row[1] for row in cursor.fetchall()}
     finally:
         conn.close()
 
+    elapsed = time.perf_counter() - started
+    log(f"Concluído em {elapsed:.1f}s")
+    return {
+        'db_path': str(db_path),
+        'seed': seed,
+        'ate': end_date.isoformat(),
+        'usuarios': len(all_users),
+        'laudos': laudos,
+        'laudos_avancados': avancados,
+        'notificacoes': notificacoes,
+        'laudos_por_status': by_status,
+        'elapsed_seconds': round(elapsed, 1),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos determinísticos para testes de carga")
+    parser.add_argument('--db', required=True, help="Arquivo do banco a gerar (novo ou vazio)")
+    parser.add_argument('--append', action='store_true', help="Acrescenta a um banco que já tem laudos")
+    parser.add_argument('--usuarios', type=int, default=50, help="Usuários sintéticos além dos padrão")
+    parser.add_argument('--laudos', type=int, default=10000)
+    parser.add_argument('--avancados', type=int, default=1000, help="Laudos avançados (com baterias)")
+    parser.add_argument('--notificacoes', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ate', type=date.fromisoformat, default=None,
+                        help="Data do laudo mais recente (YYYY-MM-DD, padrão: hoje); fixe para reproduzir a base")
+    parser.add_argument('--dias', type=int, default=730, help="Período de histórico em dias")
+    parser.add_argument('--lote', type=int, default=DEFAULT_BATCH, help="Linhas por transação")
+    args = parser.parse_args(argv)
+
+    print("🎯 Gerando dados sintéticos - Sistema RSM")
+    try:
+        summary = generate(args.db, users=args.usuarios, laudos=args.laudos, avancados=args.avancados,
+                           notificacoes=args.notificacoes, seed=args.seed, end=args.ate, days=args.dias,
+                           batch_size=args.lote, append=args.append)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f"\n📋 Login: admin / {DEFAULT_PASSWORD} (todos os usuários sintéticos usam a mesma senha)")
+    return 0
+
 if __name__ == "__main__":
-    print("🎯 Criação de Laudos de Teste - Sistema RSM")
-    print("=" * 50)
-    
-    create_test_laudos()
-    verify_test_data()
-    
-    print("\n🎉 Processo concluído!")
-    print("\n📋 Para testar o painel de aprovação:")
-    print("  1. Acesse: http://localhost:3000")
-    print("  2. Faça login com diferentes usuários:")
-    print("     - encarregado / 123456")
-    print("     - vendedor / 123456")
-    print("     - admin / 123456")
-    print("  3. Acesse 'Aprovações' no menu lateral")
-    print("  4. Teste o fluxo de aprovação") 
\ No newline at end of file
+    raise SystemExit(main())
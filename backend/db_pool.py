@@ -0,0 +1,261 @@
+"""
+Pool de conexões SQLite para o RSM
+Reaproveita conexões entre requisições, com WAL e PRAGMAs ajustados
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+from prometheus import LabeledHistogram
+
+logger = logging.getLogger(__name__)
+
+# Configuração do pool (sobrescrevível por variáveis de ambiente)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(128 * 1024 * 1024)))
+
+# Duração de cada execute por tipo de comando (SELECT, INSERT, ...), para o /metrics
+query_durations = LabeledHistogram()
+
+_QUERY_KINDS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'PRAGMA', 'BEGIN', 'COMMIT', 'WITH', 'CREATE', 'REPLACE')
+
+def _query_kind(sql: str) -> str:
+    head = sql.lstrip()[:7].upper()
+    for kind in _QUERY_KINDS:
+        if head.startswith(kind):
+            return kind.lower()
+    return 'other'
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor que mede o tempo de execute/executemany (o fetch não entra na conta)"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            query_durations.labels(_query_kind(sql)).observe(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            query_durations.labels(_query_kind(sql)).observe(time.perf_counter() - started)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os implícitos de conn.execute) são instrumentados"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Nenhuma conexão livre dentro do tempo limite"""
+
+class ConnectionPool:
+    """Pool checkout/return de conexões SQLite, reentrante por thread"""
+
+    def __init__(self, db_path: Union[str, Path], max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.db_path = str(db_path)
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+        # Estatísticas de utilização
+        self._created = 0
+        self._in_use = 0
+        self._max_in_use = 0
+        self._checkouts = 0
+        self._reentrant_checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre uma nova conexão já configurada"""
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                               factory=InstrumentedConnection)
+        conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
+        configure_connection(conn)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Retira uma conexão do pool (bloqueia até timeout se esgotado)"""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            # Mesma thread já possui conexão: reutilizar evita deadlock em chamadas aninhadas
+            self._local.depth += 1
+            with self._lock:
+                self._reentrant_checkouts += 1
+            return held
+
+        if self._closed:
+            raise sqlite3.ProgrammingError("Pool de conexões fechado")
+
+        conn = None
+        create = False
+        with self._lock:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                if self._created < self.max_size:
+                    self._created += 1
+                    create = True
+
+        if conn is None and create:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        elif conn is None:
+            started = time.perf_counter()
+            try:
+                conn = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._timeouts += 1
+                raise PoolTimeoutError(f"Timeout aguardando conexão do pool ({self.timeout}s)")
+            finally:
+                with self._lock:
+                    self._waits += 1
+                    self._wait_time += time.perf_counter() - started
+
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._max_in_use = max(self._max_in_use, self._in_use)
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Devolve a conexão ao pool, descartando transações pendentes"""
+        if getattr(self._local, "conn", None) is conn and self._local.depth > 1:
+            self._local.depth -= 1
+            return
+
+        self._local.conn = None
+        self._local.depth = 0
+
+        healthy = True
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            if self._closed or not healthy:
+                self._created -= 1
+                self._discarded += 1
+            else:
+                self._idle.put(conn)
+                return
+
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager: with pool.connection() as conn"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de utilização do pool"""
+        with self._lock:
+            return {
+                'db_path': self.db_path,
+                'max_size': self.max_size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'max_in_use': self._max_in_use,
+                'utilization': round(self._in_use / self.max_size, 3),
+                'checkouts': self._checkouts,
+                'reentrant_checkouts': self._reentrant_checkouts,
+                'waits': self._waits,
+                'avg_wait_ms': round(self._wait_time / self._waits * 1000, 3) if self._waits else 0.0,
+                'wait_seconds_total': round(self._wait_time, 6),
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+            }
+
+    def close(self):
+        """Fecha todas as conexões ociosas (as em uso são fechadas ao retornar)"""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._created -= 1
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+
+def configure_connection(conn: sqlite3.Connection):
+    """Aplica WAL e PRAGMAs de performance a uma conexão"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    # WAL + NORMAL é seguro contra corrupção e evita fsync a cada commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path: Union[str, Path]) -> ConnectionPool:
+    """Retorna (criando se necessário) o pool do arquivo informado"""
+    key = str(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(key)
+                _pools[key] = pool
+                logger.info(f"Pool de conexões criado para {key} (max {pool.max_size})")
+    return pool
+
+def close_pool(db_path: Optional[Union[str, Path]] = None):
+    """Fecha um pool específico ou todos"""
+    with _pools_lock:
+        keys = [str(db_path)] if db_path is not None else list(_pools.keys())
+        for key in keys:
+            pool = _pools.pop(key, None)
+            if pool:
+                pool.close()
@@ -0,0 +1,199 @@
+"""
+Classificação de defeitos dos laudos
+A categoria é calculada na escrita (coluna laudos.defect_category, indexada) a partir das
+regras da tabela defect_rules; o painel de defeitos frequentes vira um GROUP BY no índice.
+
+Padrões usam '%' como curinga (como no LIKE) e são comparados sem acentos e sem
+diferenciar maiúsculas: 'celula%danificada' casa com 'Célula muito danificada'.
+Linhas sem categoria (gravadas por scripts ou após mudança de regras) são
+classificadas em lotes por backfill_defect_categories.
+"""
+
+import os
+import re
+import time
+import logging
+import sqlite3
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Linhas classificadas por transação no backfill
+DEFECT_BACKFILL_BATCH = int(os.getenv("DEFECT_BACKFILL_BATCH", "500"))
+# Intervalo entre execuções do backfill pelo líder do monitoramento (segundos)
+DEFECT_BACKFILL_INTERVAL = float(os.getenv("DEFECT_BACKFILL_INTERVAL", "60"))
+# Lotes por execução no loop do líder: o loop precisa renovar o lease entre execuções
+DEFECT_BACKFILL_MAX_BATCHES = int(os.getenv("DEFECT_BACKFILL_MAX_BATCHES", "20"))
+# Tempo máximo que cada worker mantém as regras em memória (segundos)
+DEFECT_RULES_TTL = float(os.getenv("DEFECT_RULES_TTL", "60"))
+
+# Categoria de diagnósticos que não casam com nenhuma regra
+OTHER_CATEGORY = 'Outros'
+
+def normalize_text(text: Optional[str]) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+def compile_pattern(pattern: str) -> Pattern:
+    """Converte um padrão estilo LIKE ('%' = qualquer trecho) em regex sobre o texto normalizado"""
+    parts = [normalize_text(part) for part in pattern.split('%')]
+    return re.compile('.*'.join(re.escape(part) for part in parts), re.DOTALL)
+
+class DefectClassifier:
+    """Regras compiladas em memória, recarregadas da tabela defect_rules a cada DEFECT_RULES_TTL"""
+
+    def __init__(self, ttl: float = DEFECT_RULES_TTL):
+        self.ttl = ttl
+        self._rules: Optional[List[Tuple[str, Pattern]]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._rules = None
+
+    def _load(self, cursor: sqlite3.Cursor) -> List[Tuple[str, Pattern]]:
+        cursor.execute('''
+            SELECT category, pattern FROM defect_rules
+            WHERE active = 1
+            ORDER BY priority, id
+        ''')
+        return [(row[0], compile_pattern(row[1])) for row in cursor.fetchall()]
+
+    def rules(self, cursor: sqlite3.Cursor) -> List[Tuple[str, Pattern]]:
+        rules = self._rules
+        if rules is None or time.monotonic() - self._loaded_at > self.ttl:
+            with self._lock:
+                rules = self._load(cursor)
+                self._rules = rules
+                self._loaded_at = time.monotonic()
+        return rules
+
+    def classify(self, cursor: sqlite3.Cursor, diagnostico: Optional[str]) -> str:
+        """Primeira regra (por prioridade) que casa com o diagnóstico"""
+        text = normalize_text(diagnostico)
+        if text:
+            for category, regex in self.rules(cursor):
+                if regex.search(text):
+                    return category
+        return OTHER_CATEGORY
+
+classifier = DefectClassifier()
+
+def store_defect_category(cursor: sqlite3.Cursor, laudo_id: int, diagnostico: Optional[str]):
+    """Grava a categoria do laudo (chamar na mesma transação da escrita do diagnóstico)"""
+    cursor.execute(
+        "UPDATE laudos SET defect_category = ? WHERE id = ?",
+        (classifier.classify(cursor, diagnostico), laudo_id)
+    )
+
+def backfill_defect_categories(conn: sqlite3.Connection, batch_size: int = DEFECT_BACKFILL_BATCH,
+                               max_batches: Optional[int] = None) -> int:
+    """Classifica, em lotes de uma transação cada, as linhas sem categoria; retorna quantas"""
+    if conn.in_transaction:
+        conn.commit()
+    cursor = conn.cursor()
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        # idx_laudos_defect_pending: só as linhas pendentes, sem varrer a tabela
+        cursor.execute('''
+            SELECT id, diagnostico FROM laudos
+            WHERE defect_category IS NULL
+            ORDER BY id
+            LIMIT ?
+        ''', (batch_size,))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        cursor.executemany(
+            "UPDATE laudos SET defect_category = ? WHERE id = ? AND defect_category IS NULL",
+            [(classifier.classify(cursor, row[1]), row[0]) for row in rows]
+        )
+        conn.commit()
+        total += len(rows)
+        batches += 1
+
+    if total:
+        logger.info(f"Categorias de defeito: {total} laudo(s) classificado(s)")
+    return total
+
+def get_defect_rules(cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+    """Regras cadastradas, na ordem de avaliação"""
+    cursor.execute('''
+        SELECT id, category, pattern, priority, active FROM defect_rules
+        ORDER BY priority, id
+    ''')
+    return [
+        {'id': row[0], 'category': row[1], 'pattern': row[2], 'priority': row[3], 'active': bool(row[4])}
+        for row in cursor.fetchall()
+    ]
+
+def replace_defect_rules(conn: sqlite3.Connection, rules: List[Dict[str, Any]],
+                         batch_size: int = DEFECT_BACKFILL_BATCH) -> int:
+    """Substitui o conjunto de regras e marca todos os laudos para reclassificação
+
+    As categorias são zeradas em faixas de id de batch_size linhas, uma transação por faixa,
+    para não segurar o lock de escrita do banco durante um UPDATE da tabela inteira.
+    A reclassificação em si fica para o backfill em lotes; retorna quantos laudos foram marcados.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM defect_rules")
+    cursor.executemany(
+        "INSERT INTO defect_rules (category, pattern, priority, active) VALUES (?, ?, ?, ?)",
+        [(rule['category'], rule['pattern'], rule.get('priority', 100), 1 if rule.get('active', True) else 0)
+         for rule in rules]
+    )
+    conn.commit()
+    classifier.invalidate()
+
+    pending = 0
+    last_id = 0
+    while True:
+        cursor.execute("SELECT MAX(id) FROM (SELECT id FROM laudos WHERE id > ? ORDER BY id LIMIT ?)",
+                       (last_id, batch_size))
+        upper = cursor.fetchone()[0]
+        if upper is None:
+            break
+        cursor.execute(
+            "UPDATE laudos SET defect_category = NULL WHERE id > ? AND id <= ? AND defect_category IS NOT NULL",
+            (last_id, upper)
+        )
+        pending += cursor.rowcount
+        conn.commit()
+        last_id = upper
+    return pending
+
+def frequent_defects(cursor: sqlite3.Cursor, limit: int) -> List[Dict[str, Any]]:
+    """Categorias mais frequentes; percentual relativo às categorias retornadas"""
+    # GROUP BY coberto por idx_laudos_defect_category (linhas ainda sem categoria ficam de fora)
+    cursor.execute('''
+        SELECT defect_category, COUNT(*) FROM laudos
+        WHERE defect_category IS NOT NULL
+        GROUP BY defect_category
+        ORDER BY COUNT(*) DESC
+        LIMIT ?
+    ''', (limit,))
+    rows = cursor.fetchall()
+    total = sum(row[1] for row in rows)
+    return [
+        {
+            'defeito': row[0],
+            'quantidade': row[1],
+            'percentual': round(row[1] / total * 100, 1) if total > 0 else 0
+        }
+        for row in rows
+    ]
+
+if __name__ == "__main__":
+    # Backfill completo sob demanda: python defect_categories.py
+    from database import db_connection
+    with db_connection() as conn:
+        print(f"{backfill_defect_categories(conn)} laudo(s) classificado(s)")
@@ -0,0 +1,223 @@
+"""
+Stream de eventos (Server-Sent Events) para notificações, tags, aprovações e finalizações
+O log compartilhado é a tabela notification_events: cada worker do uvicorn roda UM poller
+que faz seek por id e distribui os novos eventos para os assinantes conectados a ele.
+A expiração do token (claim exp) é conferida no event loop a cada POLL_INTERVAL; a revogação, a cada
+AUTH_CHECK_INTERVAL ou quando a versão do cache de usuários muda. Expirado ou revogado, o stream é
+encerrado com um evento auth_expired para o cliente renovar o token e reconectar.
+Um replay maior que REPLAY_LIMIT não é reenviado: o cliente recebe um evento reset e recarrega os dados.
+"""
+
+import os
+import json
+import asyncio
+import logging
+import itertools
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from database import db_connection
+from prometheus import Histogram
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.getenv("SSE_POLL_INTERVAL", "1.0"))
+HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+SUBSCRIBER_QUEUE_SIZE = 256
+REPLAY_LIMIT = 200
+AUTH_CHECK_INTERVAL = float(os.getenv("SSE_AUTH_CHECK_INTERVAL", "30"))
+RETRY_MS = 3000
+# Buckets do número de assinantes que recebem cada evento
+FANOUT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+_EVENT_COLUMNS = "id, target_user_id, type, message, laudo_id, created_at"
+
+def _row_to_event(row) -> Dict[str, Any]:
+    return {
+        'id': row[0],
+        'target_user_id': row[1],
+        'type': row[2],
+        'message': row[3],
+        'laudo_id': row[4],
+        'created_at': row[5],
+        'broadcast': row[1] is None
+    }
+
+def _fetch_after(last_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+    """Todos os eventos com id > last_id (consulta do poller)"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {_EVENT_COLUMNS} FROM notification_events
+            WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, limit))
+        return [_row_to_event(row) for row in cursor.fetchall()]
+
+def _fetch_replay(user_id: int, last_id: int) -> List[Dict[str, Any]]:
+    """Eventos visíveis ao usuário após last_id (retomada via Last-Event-ID).
+
+    Lê um além de REPLAY_LIMIT para o stream saber que o replay ficaria truncado."""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {_EVENT_COLUMNS} FROM notification_events
+            WHERE id > ? AND (target_user_id IS NULL OR target_user_id = ?)
+            ORDER BY id LIMIT ?
+        ''', (last_id, user_id, REPLAY_LIMIT + 1))
+        return [_row_to_event(row) for row in cursor.fetchall()]
+
+def _fetch_max_id() -> int:
+    with db_connection() as conn:
+        row = conn.execute("SELECT MAX(id) FROM notification_events").fetchone()
+        return row[0] or 0
+
+class EventBroker:
+    """Distribui eventos novos para os assinantes SSE deste processo"""
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[int, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+        self._last_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self.events_dispatched = 0
+        self.events_dropped = 0
+        self.fanout_sizes = Histogram(FANOUT_BUCKETS)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self, user_id: int) -> int:
+        """Registra um assinante e garante que o poller está rodando"""
+        sub_id = next(self._ids)
+        self._subscribers[sub_id] = {
+            'user_id': user_id,
+            'queue': asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        }
+        if self._last_id is None:
+            self._last_id = await run_in_threadpool(_fetch_max_id)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll_loop())
+        return sub_id
+
+    def unsubscribe(self, sub_id: int):
+        self._subscribers.pop(sub_id, None)
+
+    def queue_for(self, sub_id: int) -> "asyncio.Queue[Dict[str, Any]]":
+        return self._subscribers[sub_id]['queue']
+
+    def _dispatch(self, event: Dict[str, Any]):
+        delivered = 0
+        for sub in list(self._subscribers.values()):
+            if event['target_user_id'] is not None and event['target_user_id'] != sub['user_id']:
+                continue
+            try:
+                sub['queue'].put_nowait(event)
+                self.events_dispatched += 1
+                delivered += 1
+            except asyncio.QueueFull:
+                # Cliente lento: ele recupera o que perdeu ao reconectar com Last-Event-ID
+                self.events_dropped += 1
+        self.fanout_sizes.observe(delivered)
+
+    async def _poll_loop(self):
+        """Um único seek por intervalo, independente do número de clientes"""
+        while self._subscribers:
+            try:
+                events = await run_in_threadpool(_fetch_after, self._last_id or 0)
+                for event in events:
+                    self._dispatch(event)
+                    self._last_id = event['id']
+            except Exception as e:
+                logger.error(f"Erro no poller de eventos SSE: {e}")
+            await asyncio.sleep(self.poll_interval)
+        # Sem assinantes: na próxima assinatura recomeça do MAX(id) atual
+        self._last_id = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': self.subscriber_count,
+            'last_event_id': self._last_id,
+            'events_dispatched': self.events_dispatched,
+            'events_dropped': self.events_dropped
+        }
+
+broker = EventBroker()
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serializa um evento no formato text/event-stream"""
+    payload = {k: v for k, v in event.items() if k != 'target_user_id'}
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def format_reset(event_id: int) -> str:
+    """Evento reset: o cliente descarta o estado local e recarrega; o id avança o Last-Event-ID"""
+    payload = {'id': event_id, 'reason': 'replay_truncated'}
+    return f"id: {event_id}\nevent: reset\ndata: {json.dumps(payload)}\n\n"
+
+async def event_stream(request, user_id: int, last_event_id: Optional[int] = None,
+                       expires_at: Optional[float] = None,
+                       authorize: Optional[Callable[[], Awaitable[bool]]] = None,
+                       auth_version: Optional[Callable[[], Any]] = None) -> AsyncIterator[str]:
+    """Gerador SSE: replay desde last_event_id, depois eventos ao vivo + heartbeat.
+
+    expires_at (exp do token, epoch) é conferido a cada ciclo sem sair do event loop.
+    authorize (revogação, consulta o banco) roda a cada AUTH_CHECK_INTERVAL ou quando
+    auth_version() muda; quando devolve False o stream termina.
+    """
+    sub_id = await broker.subscribe(user_id)
+    queue = broker.queue_for(sub_id)
+    sent_up_to = last_event_id or 0
+    loop = asyncio.get_running_loop()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+
+        if last_event_id is not None:
+            replay = await run_in_threadpool(_fetch_replay, user_id, last_event_id)
+            if len(replay) > REPLAY_LIMIT:
+                # Desconectado por tempo demais: segue do evento atual e pede recarga completa
+                sent_up_to = await run_in_threadpool(_fetch_max_id)
+                yield format_reset(sent_up_to)
+            else:
+                for event in replay:
+                    yield format_sse(event)
+                    sent_up_to = event['id']
+
+        checked_at = written_at = loop.time()
+        seen_version = auth_version() if auth_version is not None else None
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                event = None
+
+            now = loop.time()
+            if expires_at is not None and time.time() >= expires_at:
+                yield "event: auth_expired\ndata: {}\n\n"
+                break
+            if authorize is not None:
+                version = auth_version() if auth_version is not None else None
+                if now - checked_at >= AUTH_CHECK_INTERVAL or version != seen_version:
+                    checked_at = now
+                    seen_version = version
+                    if not await authorize():
+                        yield "event: auth_expired\ndata: {}\n\n"
+                        break
+
+            if event is None:
+                if await request.is_disconnected():
+                    break
+                if now - written_at >= HEARTBEAT_INTERVAL:
+                    written_at = now
+                    yield ": ping\n\n"
+                continue
+            # Evita duplicar eventos já enviados no replay
+            if event['id'] <= sent_up_to:
+                continue
+            sent_up_to = event['id']
+            written_at = now
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(sub_id)
@@ -0,0 +1,84 @@
+"""
+Respostas condicionais (ETag / Last-Modified / 304) para os documentos de laudo
+A versão de um laudo é (id, updated_at, status, user_name): se o cliente já tem essa versão,
+respondemos 304 sem renderizar HTML/PDF. O nome do técnico vem de users e aparece no documento,
+então renomear o usuário também gera uma nova versão
+"""
+
+import os
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime as format_http_date, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Laudos finalizados não mudam mais: podem ficar em cache no navegador/proxy
+FINALIZED_MAX_AGE = int(os.getenv("LAUDO_CACHE_MAX_AGE", "86400"))
+FINALIZED_STATUSES = {'finalizado'}
+
+def laudo_etag(laudo: Dict[str, Any], variant: str) -> str:
+    """ETag forte por representação (html, print, pdf) de uma versão do laudo"""
+    raw = f"{laudo.get('id')}|{laudo.get('updated_at')}|{laudo.get('status')}|{laudo.get('user_name')}|{variant}"
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()[:24]}"'
+
+def laudo_last_modified(laudo: Dict[str, Any]) -> Optional[datetime]:
+    """updated_at (ou created_at) em UTC, truncado em segundos como no cabeçalho HTTP"""
+    value = laudo.get('updated_at') or laudo.get('created_at')
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    # Timestamps do banco são gravados em UTC (CURRENT_TIMESTAMP; a migração 12 converteu os antigos)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).replace(microsecond=0)
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == '*':
+        return True
+    # If-None-Match usa comparação fraca: W/"x" equivale a "x"
+    candidates = [tag.strip() for tag in header.split(',')]
+    return any(tag[2:] == etag if tag.startswith('W/') else tag == etag for tag in candidates)
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Avalia If-None-Match (prioritário) e If-Modified-Since"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified <= since
+    return False
+
+def cache_headers(laudo: Dict[str, Any], etag: str, last_modified: Optional[datetime],
+                  shared: bool) -> Dict[str, str]:
+    """Cabeçalhos de validação + Cache-Control conforme o status do laudo.
+
+    shared=True libera o cache em proxies (rota pública); rotas autenticadas
+    ficam restritas ao cache do navegador.
+    """
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        headers['Last-Modified'] = format_http_date(last_modified, usegmt=True)
+
+    if laudo.get('status') in FINALIZED_STATUSES:
+        scope = 'public' if shared else 'private'
+        headers['Cache-Control'] = f"{scope}, max-age={FINALIZED_MAX_AGE}"
+    else:
+        # Ainda pode mudar: sempre revalida, mas o 304 evita reenviar o corpo
+        headers['Cache-Control'] = 'no-cache' if shared else 'private, no-cache'
+    return headers
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,91 @@
+"""
+Contadores de laudos para dashboards e estatísticas
+As tabelas laudo_status_counts e laudo_daily_counts são mantidas por triggers em cada
+INSERT/DELETE/mudança de status (migração 6); a leitura custa algumas linhas, não um COUNT(*).
+A reconciliação periódica recalcula tudo a partir de laudos e corrige qualquer divergência.
+"""
+
+import os
+import logging
+import sqlite3
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre reconciliações dos contadores (segundos)
+COUNTERS_RECONCILE_INTERVAL = float(os.getenv("COUNTERS_RECONCILE_INTERVAL", "3600"))
+
+# Status considerados em cada agregado das telas de estatística
+PENDING_STATUSES = ('em_andamento',)
+APPROVED_STATUSES = ('aprovado_manutencao', 'aprovado_vendas')
+
+def read_counters(cursor: sqlite3.Cursor, today: Optional[str] = None) -> Dict[str, Any]:
+    """Total, contagem por status e janelas hoje/7 dias/30 dias
+
+    today: data 'YYYY-MM-DD' de referência (padrão DATE('now'), como nas consultas antigas)
+    """
+    cursor.execute("SELECT status, total FROM laudo_status_counts WHERE total <> 0")
+    by_status = {row[0]: row[1] for row in cursor.fetchall()}
+
+    # Janelas equivalentes a created_at >= DATE(hoje, '-N days'): no máximo ~31 linhas
+    cursor.execute('''
+        SELECT
+            COALESCE(SUM(CASE WHEN day = ref THEN total END), 0),
+            COALESCE(SUM(CASE WHEN day >= DATE(ref, '-7 days') THEN total END), 0),
+            COALESCE(SUM(total), 0)
+        FROM laudo_daily_counts, (SELECT COALESCE(?, DATE('now')) AS ref)
+        WHERE day >= DATE(ref, '-30 days')
+    ''', (today,))
+    hoje, semana, mes = cursor.fetchone()
+
+    return {
+        'total': sum(by_status.values()),
+        'by_status': by_status,
+        'hoje': hoje,
+        'semana': semana,
+        'mes': mes
+    }
+
+def count_status(counters: Dict[str, Any], statuses: Iterable[str]) -> int:
+    """Soma das contagens dos status informados"""
+    return sum(counters['by_status'].get(status, 0) for status in statuses)
+
+def reconcile_counters(conn: sqlite3.Connection) -> int:
+    """Recalcula os contadores a partir de laudos; retorna quantas chaves estavam divergentes"""
+    if conn.in_transaction:
+        conn.commit()
+    # BEGIN IMMEDIATE: nenhuma escrita em laudos entre a contagem e a correção
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = conn.cursor()
+        fixed = 0
+        for table, key, expected_query in (
+            ('laudo_status_counts', 'status',
+             "SELECT COALESCE(status, ''), COUNT(*) FROM laudos GROUP BY COALESCE(status, '')"),
+            ('laudo_daily_counts', 'day',
+             "SELECT DATE(created_at), COUNT(*) FROM laudos WHERE DATE(created_at) IS NOT NULL GROUP BY DATE(created_at)")
+        ):
+            cursor.execute(expected_query)
+            expected = {row[0]: row[1] for row in cursor.fetchall()}
+            cursor.execute(f"SELECT {key}, total FROM {table}")
+            stored = {row[0]: row[1] for row in cursor.fetchall()}
+
+            for name in stored.keys() - expected.keys():
+                if stored[name]:
+                    fixed += 1
+                cursor.execute(f"DELETE FROM {table} WHERE {key} = ?", (name,))
+            for name, total in expected.items():
+                if stored.get(name) != total:
+                    fixed += 1
+                    cursor.execute(f'''
+                        INSERT INTO {table} ({key}, total) VALUES (?, ?)
+                        ON CONFLICT({key}) DO UPDATE SET total = excluded.total
+                    ''', (name, total))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if fixed:
+        logger.warning(f"Contadores de laudos reconciliados: {fixed} chave(s) divergente(s) corrigida(s)")
+    return fixed
@@ -0,0 +1,119 @@
+"""
+Exportação em massa de laudos (CSV ou NDJSON) em streaming
+As linhas saem de um cursor SQLite lido em blocos (fetchmany) por um gerador, então a
+memória fica constante e os primeiros bytes são enviados antes do fim da consulta.
+Usa uma conexão dedicada: o pool é por thread e o StreamingResponse consome o gerador
+em threads diferentes do threadpool.
+"""
+
+import io
+import os
+import csv
+import json
+import zlib
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from db_pool import BUSY_TIMEOUT_MS
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas do cursor por bloco (e por pedaço enviado ao cliente)
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Colunas exportadas (o JSON das baterias fica de fora; ver laudo_baterias)
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ('id', 'l.id'),
+    ('tipo', 'l.tipo'),
+    ('status', 'l.status'),
+    ('user_id', 'l.user_id'),
+    ('user_name', 'u.username'),
+    ('cliente', 'l.cliente'),
+    ('equipamento', 'l.equipamento'),
+    ('diagnostico', 'l.diagnostico'),
+    ('solucao', 'l.solucao'),
+    ('defect_category', 'l.defect_category'),
+    ('tag', 'l.tag'),
+    ('tag_description', 'l.tag_description'),
+    ('nomeCliente', 'l.nomeCliente'),
+    ('tecnicoResponsavel', 'l.tecnicoResponsavel'),
+    ('conclusaoFinal', 'l.conclusaoFinal'),
+    ('numeroTotalBaterias', 'l.numeroTotalBaterias'),
+    ('approved_by', 'l.approved_by'),
+    ('rejection_reason', 'l.rejection_reason'),
+    ('created_at', 'l.created_at'),
+    ('updated_at', 'l.updated_at'),
+]
+
+def build_export_query(status: Optional[str] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None, user_id: Optional[int] = None) -> Tuple[str, List[Any]]:
+    """SELECT das colunas exportadas com os filtros informados, em ordem de id"""
+    columns = ', '.join(f'{expression} AS "{name}"' for name, expression in EXPORT_COLUMNS)
+    query = f"SELECT {columns} FROM laudos l LEFT JOIN users u ON u.id = l.user_id WHERE 1 = 1"
+    params: List[Any] = []
+    if status:
+        query += " AND l.status = ?"
+        params.append(status)
+    if user_id is not None:
+        query += " AND l.user_id = ?"
+        params.append(user_id)
+    if date_from:
+        query += " AND l.created_at >= ?"
+        params.append(date_from)
+    if date_to:
+        query += " AND l.created_at < DATE(?, '+1 day')"
+        params.append(date_to)
+    return query + " ORDER BY l.id", params
+
+def _open_export_connection(db_path: Union[str, Path]) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+def _encode_csv(rows: List[Tuple]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+def _encode_ndjson(rows: List[Tuple]) -> bytes:
+    names = [name for name, _ in EXPORT_COLUMNS]
+    return ''.join(
+        json.dumps(dict(zip(names, row)), ensure_ascii=False, default=str) + '\n' for row in rows
+    ).encode('utf-8')
+
+def iter_export(db_path: Union[str, Path], export_format: str, query: str, params: List[Any],
+                compress: bool = False, fetch_size: int = EXPORT_FETCH_SIZE) -> Iterator[bytes]:
+    """Gera o arquivo exportado em pedaços de `fetch_size` linhas (opcionalmente em gzip)"""
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+
+    def encode(chunk: bytes) -> bytes:
+        if compressor is None:
+            return chunk
+        # Z_SYNC_FLUSH: cada pedaço já sai decodificável, sem esperar o fim do arquivo
+        return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    conn = _open_export_connection(db_path)
+    exported = 0
+    try:
+        cursor = conn.execute(query, params)
+        if export_format == 'csv':
+            yield encode(_encode_csv([[name for name, _ in EXPORT_COLUMNS]]))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            exported += len(rows)
+            yield encode(_encode_csv(rows) if export_format == 'csv' else _encode_ndjson(rows))
+        if compressor is not None:
+            yield compressor.flush()
+        logger.info(f"Exportação de laudos concluída: {exported} linha(s) ({export_format})")
+    finally:
+        conn.close()
@@ -0,0 +1,295 @@
+"""
+Visualização HTML dos laudos (/laudo-viewer e modo impressão)
+O template é compilado uma única vez no import: cada renderização só junta os
+trechos estáticos com os campos variáveis já escapados
+"""
+
+import html
+from string import Template
+from typing import Any, Dict, List, Tuple
+
+from pdf_renderer import format_datetime, status_info
+
+LAUDO_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Laudo Técnico #${id} - RSM Moura</title>
+    <style>
+        @media print {
+            body { margin: 0; padding: 20px; }
+            .no-print { display: none !important; }
+            .page-break { page-break-before: always; }
+        }
+
+        body {
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            max-width: 800px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f8fafc;
+        }
+
+        .header {
+            text-align: center;
+            border-bottom: 3px solid #1e40af;
+            padding-bottom: 20px;
+            margin-bottom: 30px;
+        }
+
+        .logo {
+            font-size: 24px;
+            font-weight: bold;
+            color: #1e40af;
+            margin-bottom: 10px;
+        }
+
+        .title {
+            font-size: 28px;
+            font-weight: bold;
+            color: #1f2937;
+            margin-bottom: 5px;
+        }
+
+        .subtitle {
+            font-size: 16px;
+            color: #6b7280;
+            margin-bottom: 20px;
+        }
+
+        .laudo-info {
+            background: white;
+            border-radius: 8px;
+            padding: 20px;
+            margin-bottom: 20px;
+            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
+        }
+
+        .info-grid {
+            display: grid;
+            grid-template-columns: 1fr 1fr;
+            gap: 20px;
+            margin-bottom: 20px;
+        }
+
+        .info-item {
+            display: flex;
+            flex-direction: column;
+        }
+
+        .info-label {
+            font-weight: 600;
+            color: #374151;
+            margin-bottom: 5px;
+            font-size: 14px;
+        }
+
+        .info-value {
+            color: #1f2937;
+            font-size: 16px;
+        }
+
+        .status-badge {
+            display: inline-block;
+            padding: 4px 12px;
+            border-radius: 20px;
+            font-size: 14px;
+            font-weight: 600;
+            color: white;
+            background-color: ${status_color};
+        }
+
+        .section {
+            background: white;
+            border-radius: 8px;
+            padding: 20px;
+            margin-bottom: 20px;
+            box-shadow: 0 1px 3px rgba(0,0,0,0.1);
+        }
+
+        .section-title {
+            font-size: 18px;
+            font-weight: 600;
+            color: #1f2937;
+            margin-bottom: 15px;
+            border-bottom: 2px solid #e5e7eb;
+            padding-bottom: 8px;
+        }
+
+        .content-text {
+            color: #374151;
+            line-height: 1.7;
+            text-align: justify;
+        }
+
+        .footer {
+            margin-top: 40px;
+            padding-top: 20px;
+            border-top: 1px solid #e5e7eb;
+            text-align: center;
+            color: #6b7280;
+            font-size: 14px;
+        }
+
+        .signature-section {
+            margin-top: 40px;
+            display: grid;
+            grid-template-columns: 1fr 1fr;
+            gap: 40px;
+        }
+
+        .signature-box {
+            text-align: center;
+            padding: 20px;
+            border-top: 2px solid #1e40af;
+        }
+
+        .signature-line {
+            width: 200px;
+            height: 1px;
+            background-color: #1e40af;
+            margin: 40px auto 10px;
+        }
+
+        .print-button {
+            position: fixed;
+            top: 20px;
+            right: 20px;
+            background: #1e40af;
+            color: white;
+            border: none;
+            padding: 10px 20px;
+            border-radius: 6px;
+            cursor: pointer;
+            font-size: 14px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+
+        .print-button:hover {
+            background: #1e3a8a;
+        }
+    </style>
+</head>
+<body>
+    <button class="print-button no-print" onclick="window.print()">🖨️ Imprimir</button>
+
+    <div class="header">
+        <div class="logo">🔋 RSM - Rede de Serviços Moura</div>
+        <h1 class="title">Laudo Técnico</h1>
+        <p class="subtitle">Sistema de Gestão de Laudos Técnicos</p>
+    </div>
+
+    <div class="laudo-info">
+        <div class="info-grid">
+            <div class="info-item">
+                <span class="info-label">Número do Laudo:</span>
+                <span class="info-value">#${id}</span>
+            </div>
+            <div class="info-item">
+                <span class="info-label">Status:</span>
+                <span class="status-badge">${status_label}</span>
+            </div>
+            <div class="info-item">
+                <span class="info-label">Cliente:</span>
+                <span class="info-value">${cliente}</span>
+            </div>
+            <div class="info-item">
+                <span class="info-label">Equipamento:</span>
+                <span class="info-value">${equipamento}</span>
+            </div>
+            <div class="info-item">
+                <span class="info-label">Técnico Responsável:</span>
+                <span class="info-value">${user_name}</span>
+            </div>
+            <div class="info-item">
+                <span class="info-label">Data de Criação:</span>
+                <span class="info-value">${data_criacao}</span>
+            </div>
+        </div>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">Problema Relatado</h2>
+        <p class="content-text">${problema_relatado}</p>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">Diagnóstico Técnico</h2>
+        <p class="content-text">${diagnostico}</p>
+    </div>
+
+    <div class="section">
+        <h2 class="section-title">Solução Aplicada</h2>
+        <p class="content-text">${solucao}</p>
+    </div>
+
+    <div class="signature-section">
+        <div class="signature-box">
+            <div class="signature-line"></div>
+            <p><strong>${assinatura_tecnico}</strong></p>
+            <p>Técnico Responsável</p>
+        </div>
+        <div class="signature-box">
+            <div class="signature-line"></div>
+            <p><strong>Cliente</strong></p>
+            <p>Assinatura</p>
+        </div>
+    </div>
+
+    <div class="footer">
+        <p>Documento gerado automaticamente pelo sistema RSM - Rede de Serviços Moura</p>
+        <p>Última atualização: ${data_atualizacao}</p>
+    </div>
+</body>
+</html>
+"""
+
+def compile_template(source: str) -> Tuple[List[str], List[str]]:
+    """Separa o template em trechos literais e nomes de campo (${campo})"""
+    literals: List[str] = []
+    fields: List[str] = []
+    position = 0
+    for match in Template.pattern.finditer(source):
+        name = match.group('braced') or match.group('named')
+        if name is None:
+            raise ValueError(f"Placeholder inválido no template: {match.group(0)!r}")
+        literals.append(source[position:match.start()])
+        fields.append(name)
+        position = match.end()
+    literals.append(source[position:])
+    return literals, fields
+
+_LITERALS, _FIELDS = compile_template(LAUDO_TEMPLATE)
+
+def _text(value: Any, default: str = 'Não informado') -> str:
+    return html.escape(str(value if value not in (None, '') else default))
+
+def laudo_template_values(laudo: Dict[str, Any]) -> Dict[str, str]:
+    """Campos variáveis do template, escapados para HTML"""
+    status = status_info(laudo.get('status'))
+    return {
+        'id': _text(laudo.get('id')),
+        'status_color': html.escape(status['color']),
+        'status_label': html.escape(status['label']),
+        'cliente': _text(laudo.get('cliente')),
+        'equipamento': _text(laudo.get('equipamento')),
+        'user_name': _text(laudo.get('user_name')),
+        'data_criacao': _text(format_datetime(laudo.get('created_at'))),
+        'problema_relatado': _text(laudo.get('problema_relatado')),
+        'diagnostico': _text(laudo.get('diagnostico')),
+        'solucao': _text(laudo.get('solucao')),
+        'assinatura_tecnico': _text(laudo.get('user_name'), 'Técnico Responsável'),
+        'data_atualizacao': _text(format_datetime(laudo.get('updated_at'), 'Não atualizado'))
+    }
+
+def render_laudo_html(laudo: Dict[str, Any]) -> str:
+    """Renderiza o laudo substituindo apenas os campos variáveis"""
+    values = laudo_template_values(laudo)
+    parts = [_LITERALS[0]]
+    for field, literal in zip(_FIELDS, _LITERALS[1:]):
+        parts.append(values[field])
+        parts.append(literal)
+    return ''.join(parts)
@@ -0,0 +1,326 @@
+"""
+Importação em massa de laudos (NDJSON ou CSV)
+O arquivo é lido em streaming, cada linha é validada com LaudoSimples/LaudoAvancado
+e as linhas válidas são gravadas em transações de IMPORT_CHUNK_SIZE linhas.
+Linhas inválidas não interrompem a importação: entram no relatório com o número da linha.
+A conexão do pool só é emprestada durante a gravação de cada lote: um upload lento não
+prende uma conexão enquanto o corpo da requisição ainda está chegando.
+
+Uso pela linha de comando:
+    python laudo_import.py historico.ndjson --tipo simples --usuario admin
+    python laudo_import.py historico.csv --formato csv --tipo avancado --usuario tecnico
+"""
+
+import os
+import csv
+import json
+import time
+import codecs
+import sqlite3
+import logging
+from datetime import datetime, timezone
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from laudo_models import LaudoSimples, LaudoAvancado, sanitize_string
+from defect_categories import classifier
+from battery_records import store_baterias
+
+logger = logging.getLogger(__name__)
+
+# Linhas gravadas por transação
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# Erros detalhados no relatório (os demais só entram na contagem)
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+IMPORT_TIPOS = ('simples', 'avancado')
+IMPORT_STATUSES = ('em_andamento', 'pendente', 'aprovado_manutencao', 'aprovado_vendas', 'finalizado', 'reprovado')
+
+# Campos de lista do laudo avançado que chegam como texto JSON no CSV
+_JSON_FIELDS = ('baterias', 'manutencaoPreventiva', 'manutencaoCorretiva')
+
+ConnectionFactory = Callable[[], ContextManager[sqlite3.Connection]]
+
+class ImportRowError(ValueError):
+    """Linha rejeitada; args[0] é a lista de mensagens"""
+
+def iter_text_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Linhas de texto (com '\\n') a partir de pedaços de bytes UTF-8 de tamanho qualquer"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+def iter_records(lines: Iterable[str], import_format: str) -> Iterator[Tuple[int, Any]]:
+    """(número da linha, registro) para NDJSON ou CSV; registro inválido vem como ImportRowError"""
+    if import_format == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ImportRowError([f"JSON inválido: {e}"])
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ImportRowError(["Cada linha deve ser um objeto JSON"])
+            continue
+        yield line_number, record
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in item['loc']) or 'linha'}: {item['msg']}" for item in error.errors()]
+
+def _parse_created_at(value: Any) -> str:
+    """Data ISO 8601 no formato do banco (UTC); sem fuso, o valor já é considerado UTC"""
+    try:
+        parsed = datetime.fromisoformat(str(value).strip())
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc)
+        return parsed.strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        raise ImportRowError([f"created_at: data inválida '{value}' (use ISO 8601)"])
+
+class LaudoImporter:
+    """Valida registros e grava em lotes; uma instância por importação"""
+
+    def __init__(self, connection_factory: ConnectionFactory, tipo: str, user_id: int,
+                 chunk_size: int = IMPORT_CHUNK_SIZE, max_errors: int = IMPORT_MAX_ERRORS):
+        if tipo not in IMPORT_TIPOS:
+            raise ValueError(f"Tipo inválido: {tipo} (use {', '.join(IMPORT_TIPOS)})")
+        self.connection_factory = connection_factory
+        self.tipo = tipo
+        self.user_id = user_id
+        self.chunk_size = max(1, chunk_size)
+        self.max_errors = max_errors
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._pending: List[Tuple[int, Tuple]] = []
+        self._started = time.perf_counter()
+        # created_at padrão: o mesmo instante (UTC, como CURRENT_TIMESTAMP) para todas as linhas
+        self._now = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with connection_factory() as conn:
+            self._user_ids: Set[int] = {row[0] for row in conn.execute("SELECT id FROM users")}
+
+    def _error(self, line_number: int, messages: List[str]):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_number, 'errors': messages})
+
+    def _common_fields(self, record: Dict[str, Any]) -> Tuple[int, Optional[str], str]:
+        """user_id, status e created_at opcionais (migração de histórico)"""
+        user_id = self.user_id
+        if record.get('user_id') not in (None, ''):
+            try:
+                user_id = int(record['user_id'])
+            except (TypeError, ValueError):
+                raise ImportRowError([f"user_id: valor inválido '{record['user_id']}'"])
+            if user_id not in self._user_ids:
+                raise ImportRowError([f"user_id: usuário {user_id} não existe"])
+
+        status = record.get('status') or None
+        if status is not None and status not in IMPORT_STATUSES:
+            raise ImportRowError([f"status: valor inválido '{status}'"])
+
+        created_at = record.get('created_at')
+        if created_at in (None, ''):
+            created_at = self._now
+        else:
+            created_at = _parse_created_at(created_at)
+        return user_id, status, created_at
+
+    def _simples_row(self, record: Dict[str, Any]) -> Tuple:
+        record.setdefault('problema_relatado', '')
+        laudo = LaudoSimples(**record)
+        user_id, status, created_at = self._common_fields(record)
+        data = {
+            'cliente': sanitize_string(laudo.cliente, 200),
+            'equipamento': sanitize_string(laudo.equipamento, 200),
+            'diagnostico': sanitize_string(laudo.diagnostico, 1000),
+            'solucao': sanitize_string(laudo.solucao, 1000)
+        }
+        if status is None:
+            # Mesma regra do create_laudo: completo -> pendente, incompleto -> em_andamento
+            status = 'pendente' if all(data.values()) else 'em_andamento'
+        return (user_id, data['cliente'], data['equipamento'], data['diagnostico'], data['solucao'],
+                status, created_at, created_at)
+
+    def _avancado_row(self, record: Dict[str, Any]) -> Tuple:
+        for field in _JSON_FIELDS:
+            if isinstance(record.get(field), str):
+                try:
+                    record[field] = json.loads(record[field]) if record[field].strip() else []
+                except ValueError:
+                    raise ImportRowError([f"{field}: JSON inválido"])
+        laudo = LaudoAvancado(**record)
+        user_id, status, created_at = self._common_fields(record)
+        return (user_id, laudo.nomeCliente, laudo.data, laudo.baterias, laudo.tecnicoResponsavel,
+                laudo.manutencaoPreventiva or [], laudo.manutencaoCorretiva or [], laudo.conclusaoFinal,
+                status or 'pendente', created_at)
+
+    def add(self, line_number: int, record: Any):
+        """Valida um registro (ou ImportRowError do parser) e agenda para gravação"""
+        self.received += 1
+        if isinstance(record, ImportRowError):
+            self._error(line_number, record.args[0])
+            return
+        try:
+            if self.tipo == 'simples':
+                row = self._simples_row(dict(record))
+            else:
+                row = self._avancado_row(dict(record))
+        except ValidationError as e:
+            self._error(line_number, _validation_messages(e))
+            return
+        except ImportRowError as e:
+            self._error(line_number, e.args[0])
+            return
+
+        self._pending.append((line_number, row))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def _insert(self, cursor: sqlite3.Cursor, rows: List[Tuple]):
+        if self.tipo == 'simples':
+            # Categoria classificada aqui: as regras são lidas com a conexão já emprestada.
+            # updated_at explícito: dispensa o trigger que o preencheria linha a linha
+            cursor.executemany('''
+                INSERT INTO laudos (user_id, cliente, equipamento, diagnostico, solucao, status,
+                                    defect_category, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(*row[:6], classifier.classify(cursor, row[3]), *row[6:]) for row in rows])
+            return
+        # Laudo avançado precisa do id de cada linha para as baterias normalizadas
+        for row in rows:
+            (user_id, nome_cliente, data, baterias, tecnico, preventiva, corretiva, conclusao,
+             status, created_at) = row
+            cursor.execute('''
+                INSERT INTO laudos_avancados (
+                    user_id, nome_cliente, data, baterias, tecnico_responsavel,
+                    manutencao_preventiva, manutencao_corretiva, conclusao_final, status, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, nome_cliente, data, json.dumps(baterias), tecnico, json.dumps(preventiva),
+                  json.dumps(corretiva), conclusao, status, created_at, created_at))
+            store_baterias(cursor, cursor.lastrowid, baterias)
+
+    def flush(self):
+        """Grava o lote pendente em uma transação; se o lote falhar, grava linha a linha"""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        with self.connection_factory() as conn:
+            self._write(conn, batch)
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Tuple[int, Tuple]]):
+        if conn.in_transaction:
+            conn.commit()
+        cursor = conn.cursor()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self._insert(cursor, [row for _, row in batch])
+            conn.commit()
+            self.imported += len(batch)
+            return
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.warning(f"Lote de importação rejeitado ({e}); regravando linha a linha")
+
+        conn.execute("BEGIN IMMEDIATE")
+        for line_number, row in batch:
+            cursor.execute("SAVEPOINT import_row")
+            try:
+                self._insert(cursor, [row])
+                cursor.execute("RELEASE import_row")
+                self.imported += 1
+            except sqlite3.Error as e:
+                cursor.execute("ROLLBACK TO import_row")
+                cursor.execute("RELEASE import_row")
+                self._error(line_number, [f"banco de dados: {e}"])
+        conn.commit()
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        return {
+            'tipo': self.tipo,
+            'received': self.received,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'errors_truncated': self.failed > len(self.errors),
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(self.imported / elapsed) if elapsed > 0 else None
+        }
+
+def run_import(connection_factory: ConnectionFactory, chunks: Iterable[bytes], import_format: str, tipo: str,
+               user_id: int, chunk_size: int = IMPORT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Importa um arquivo NDJSON/CSV recebido em pedaços de bytes; retorna o relatório.
+
+    connection_factory (ex.: database.db_connection) é chamada a cada lote gravado."""
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError(f"Formato inválido: {import_format} (use {', '.join(IMPORT_FORMATS)})")
+
+    importer = LaudoImporter(connection_factory, tipo, user_id, chunk_size=chunk_size)
+    for line_number, record in iter_records(iter_text_lines(chunks), import_format):
+        importer.add(line_number, record)
+    importer.flush()
+
+    report = importer.report()
+    logger.info(f"Importação de laudos ({tipo}, {import_format}): {report['imported']} importado(s), "
+                f"{report['failed']} rejeitado(s) em {report['elapsed_seconds']}s")
+    return report
+
+def _read_file(path: str, chunk_size: int = 1 << 16) -> Iterator[bytes]:
+    import sys
+    stream = sys.stdin.buffer if path == '-' else open(path, 'rb')
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+def main(argv: Optional[List[str]] = None, connection_factory: Optional[Callable] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importa laudos em massa (NDJSON ou CSV)")
+    parser.add_argument('arquivo', help="Arquivo a importar ('-' para stdin)")
+    parser.add_argument('--formato', choices=IMPORT_FORMATS, help="Padrão: pela extensão do arquivo")
+    parser.add_argument('--tipo', choices=IMPORT_TIPOS, default='simples')
+    parser.add_argument('--usuario', default='admin', help="Usuário dono dos laudos sem user_id")
+    parser.add_argument('--lote', type=int, default=IMPORT_CHUNK_SIZE, help="Linhas por transação")
+    args = parser.parse_args(argv)
+
+    import_format = args.formato or ('csv' if args.arquivo.lower().endswith('.csv') else 'ndjson')
+    if connection_factory is None:
+        from database import db_connection as connection_factory
+
+    with connection_factory() as conn:
+        row = conn.execute("SELECT id FROM users WHERE username = ?", (args.usuario,)).fetchone()
+    if row is None:
+        print(f"Usuário não encontrado: {args.usuario}")
+        return 1
+    report = run_import(connection_factory, _read_file(args.arquivo), import_format, args.tipo, row[0], args.lote)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report['failed'] == 0 else 2
+
+if __name__ == "__main__":
+    raise SystemExit(main())
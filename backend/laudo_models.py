@@ -0,0 +1,58 @@
+"""
+Modelos de entrada dos laudos e sanitização de texto
+Compartilhados pelos endpoints de criação e pela importação em massa
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, validator
+
+class LaudoSimples(BaseModel):
+    cliente: str
+    equipamento: str
+    problema_relatado: str
+    diagnostico: str
+    solucao: str
+    
+    @validator('cliente', 'equipamento', 'diagnostico')
+    def validate_required_fields(cls, v):
+        if not v or not v.strip():
+            raise ValueError('Campo obrigatório não pode estar vazio')
+        return v.strip()
+
+class LaudoAvancado(BaseModel):
+    nomeCliente: str
+    data: str
+    baterias: List[Dict[str, Any]]
+    tecnicoResponsavel: str
+    manutencaoPreventiva: Optional[List[str]] = []
+    manutencaoCorretiva: Optional[List[str]] = []
+    conclusaoFinal: str
+    
+    @validator('nomeCliente', 'tecnicoResponsavel', 'conclusaoFinal')
+    def validate_required_fields(cls, v):
+        if not v or not v.strip():
+            raise ValueError('Campo obrigatório não pode estar vazio')
+        return v.strip()
+    
+    @validator('baterias')
+    def validate_baterias(cls, v):
+        if not v or len(v) == 0:
+            raise ValueError('Pelo menos uma bateria deve ser informada')
+        return v
+
+def sanitize_string(value: str, max_length: int = 1000) -> str:
+    """Sanitiza string removendo caracteres perigosos"""
+    if not isinstance(value, str):
+        return ""
+    
+    # Remove caracteres potencialmente perigosos
+    cleaned = re.sub(r'[<>"\']', '', value)
+    cleaned = cleaned.strip()
+    
+    # Limita tamanho
+    if len(cleaned) > max_length:
+        cleaned = cleaned[:max_length]
+    
+    return cleaned
@@ -0,0 +1,117 @@
+"""
+Busca textual de laudos (FTS5)
+Combina o ranking bm25 do índice laudos_fts com filtros estruturados e devolve
+trechos destacados em vez do texto completo. Paginação por cursor sobre (score, id).
+
+O bm25 não tem índice: toda consulta pontua todas as correspondências. Por isso o
+ranking é limitado aos SEARCH_MAX_RESULTS mais relevantes (ordenação top-N, só id e
+score) e snippet/colunas do laudo são lidos depois, apenas para os ids da página.
+Buscas com mais correspondências que o limite param de paginar nele: refine os termos
+ou os filtros.
+"""
+
+import os
+import re
+import html
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+from pagination import fetch_keyset_page
+
+# Marcadores internos do snippet: o texto é escapado antes de virar <mark>
+_MARK_OPEN = '\x02'
+_MARK_CLOSE = '\x03'
+SNIPPET_TOKENS = 16
+MAX_QUERY_TERMS = 10
+# Teto de resultados ranqueados por busca (páginas além dele não existem)
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+
+# Pesos do bm25 por coluna: cliente, equipamento, diagnostico, solucao, tag
+COLUMN_WEIGHTS = (4.0, 3.0, 2.0, 1.0, 4.0)
+
+def build_match_query(text: str) -> str:
+    """Converte o texto livre do usuário em uma consulta FTS5 segura
+
+    Cada termo vira uma frase entre aspas com busca por prefixo ("bater"* encontra bateria);
+    os termos são combinados com AND. Operadores e aspas digitados pelo usuário não são interpretados.
+    """
+    terms = re.findall(r'\w+', text or '')[:MAX_QUERY_TERMS]
+    if not terms:
+        raise ValueError("Informe ao menos um termo de busca")
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def render_snippet(value: Optional[str]) -> str:
+    """Escapa o trecho e troca os marcadores internos por <mark>"""
+    if not value:
+        return ''
+    return html.escape(value).replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+def search_laudos(
+    cursor: sqlite3.Cursor,
+    text: str,
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    tag: Optional[str] = None,
+    limit: Optional[int] = None,
+    page_cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Página de resultados ordenada por relevância (maior score primeiro)
+
+    user_id restringe aos laudos de um técnico (visibilidade ou filtro);
+    date_from/date_to são datas 'YYYY-MM-DD' inclusivas sobre created_at.
+    """
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    match = build_match_query(text)
+    ranked = f'''
+        SELECT laudos_fts.rowid AS id, -bm25(laudos_fts, {weights}) AS score
+        FROM laudos_fts
+        JOIN laudos l ON l.id = laudos_fts.rowid
+        WHERE laudos_fts MATCH ?
+    '''
+    params: List[Any] = [match]
+
+    if user_id is not None:
+        ranked += " AND l.user_id = ?"
+        params.append(user_id)
+    if status:
+        ranked += " AND l.status = ?"
+        params.append(status)
+    if tag:
+        ranked += " AND l.tag = ?"
+        params.append(tag)
+    if date_from:
+        ranked += " AND l.created_at >= ?"
+        params.append(date_from)
+    if date_to:
+        ranked += " AND l.created_at < DATE(?, '+1 day')"
+        params.append(date_to)
+    ranked += " ORDER BY score DESC, id DESC LIMIT ?"
+    params.append(SEARCH_MAX_RESULTS)
+
+    # bm25 só pode ser avaliado no SELECT: a página (score, id) é aplicada sobre o top-N já ranqueado
+    query = f"SELECT * FROM ({ranked}) r WHERE 1 = 1"
+    rows, next_cursor = fetch_keyset_page(
+        cursor, query, params, "r.score", id_column="r.id", limit=limit, page_cursor=page_cursor
+    )
+    if not rows:
+        return rows, next_cursor
+
+    # Colunas e snippet só para os ids da página; o + impede o FTS5 de refazer o MATCH por rowid
+    placeholders = ', '.join('?' for _ in rows)
+    cursor.execute(f'''
+        SELECT l.id, l.cliente, l.equipamento, l.status, l.tag, l.created_at, l.updated_at,
+               l.user_id, u.username AS user_name,
+               snippet(laudos_fts, -1, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet
+        FROM laudos_fts
+        JOIN laudos l ON l.id = laudos_fts.rowid
+        LEFT JOIN users u ON u.id = l.user_id
+        WHERE laudos_fts MATCH ? AND +laudos_fts.rowid IN ({placeholders})
+    ''', [_MARK_OPEN, _MARK_CLOSE, match, *(row['id'] for row in rows)])
+    details = {row['id']: dict(row) for row in cursor.fetchall()}
+    rows = [{**details[row['id']], 'score': row['score']} for row in rows if row['id'] in details]
+    for row in rows:
+        row['snippet'] = render_snippet(row['snippet'])
+        row['score'] = round(row['score'], 4)
+    return rows, next_cursor
@@ -0,0 +1,184 @@
+"""
+Limite de tentativas de login (token bucket por usuário e, mais folgado, por IP)
+Cada tentativa falha consome uma ficha do bucket do IP e do bucket do usuário; sem ficha
+disponível o /login responde 429 antes de verificar a senha. O bucket do usuário é o limite
+principal; o do IP só segura varreduras de muitos usuários (um IP pode ser uma rede inteira).
+Atrás de proxy (Railway), o IP do cliente vem do X-Forwarded-For: TRUSTED_PROXY_HOPS diz
+quantas entradas, da direita para a esquerda, foram acrescentadas por proxies confiáveis. O estado fica em um SQLite
+local (login_limits.db, WAL) compartilhado por todos os workers da máquina; os bloqueios
+já conhecidos por este worker ficam também em memória (blocked), consultada sem I/O.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+LOGIN_LIMITS_DB = Path(os.getenv("LOGIN_LIMITS_DB", str(Path(__file__).parent / "login_limits.db")))
+# Rajada permitida e reposição (fichas por minuto) de cada bucket
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "100"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "30"))
+LOGIN_USER_BURST = int(os.getenv("LOGIN_USER_BURST", "5"))
+LOGIN_USER_PER_MINUTE = float(os.getenv("LOGIN_USER_PER_MINUTE", "2"))
+# Buckets cheios há mais que isso são apagados
+LOGIN_BUCKET_PURGE_INTERVAL = float(os.getenv("LOGIN_BUCKET_PURGE_INTERVAL", "300"))
+# Máximo de chaves bloqueadas mantidas em memória por worker
+LOGIN_BLOCKED_CACHE_SIZE = int(os.getenv("LOGIN_BLOCKED_CACHE_SIZE", "10000"))
+# Proxies à frente da API (0 = conexão direta; o X-Forwarded-For é ignorado)
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+def client_ip(forwarded_for: Optional[str], peer: Optional[str], hops: Optional[int] = None) -> Optional[str]:
+    """IP do cliente: a entrada do X-Forwarded-For gravada pelo proxy confiável mais externo.
+
+    As entradas à esquerda dela vêm do próprio cliente e podem ser forjadas; sem proxies
+    configurados (ou cabeçalho incompleto) vale o endereço da conexão."""
+    hops = TRUSTED_PROXY_HOPS if hops is None else hops
+    if hops <= 0 or not forwarded_for:
+        return peer
+    hosts = [host.strip() for host in forwarded_for.split(',') if host.strip()]
+    if len(hosts) < hops:
+        return peer
+    return hosts[-hops]
+
+class LoginRateLimiter:
+    """Token buckets de tentativas de login falhas, por chave ('ip:...' / 'user:...')"""
+
+    def __init__(self, db_path: Path = LOGIN_LIMITS_DB,
+                 ip_limit: Tuple[int, float] = (LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE),
+                 user_limit: Tuple[int, float] = (LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE)):
+        self.db_path = db_path
+        # (capacidade, fichas por segundo)
+        self.limits = {
+            'ip': (ip_limit[0], ip_limit[1] / 60),
+            'user': (user_limit[0], user_limit[1] / 60),
+        }
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._purged_at = time.monotonic()
+        # chave -> instante (time.time) em que o bucket volta a ter uma ficha
+        self._blocked_until: Dict[str, float] = {}
+        self.rejected = 0
+        self.failures = 0
+
+    def _connection(self):
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    with get_pool(self.db_path).connection() as conn:
+                        conn.execute('''
+                            CREATE TABLE IF NOT EXISTS login_buckets (
+                                key TEXT PRIMARY KEY,
+                                tokens REAL NOT NULL,
+                                updated_at REAL NOT NULL
+                            ) WITHOUT ROWID
+                        ''')
+                        conn.commit()
+                    self._initialized = True
+        return get_pool(self.db_path).connection()
+
+    @staticmethod
+    def keys(ip: Optional[str], username: Optional[str]) -> List[Tuple[str, str]]:
+        """(tipo, chave) dos buckets de uma tentativa"""
+        keys = []
+        if ip:
+            keys.append(('ip', f"ip:{ip}"))
+        if username:
+            keys.append(('user', f"user:{username.strip().lower()}"))
+        return keys
+
+    def _refilled(self, kind: str, tokens: float, updated_at: float, now: float) -> float:
+        capacity, rate = self.limits[kind]
+        return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+    def _block(self, key: str, until: float):
+        if len(self._blocked_until) >= LOGIN_BLOCKED_CACHE_SIZE:
+            now = time.time()
+            self._blocked_until = {k: v for k, v in self._blocked_until.items() if v > now}
+            if len(self._blocked_until) >= LOGIN_BLOCKED_CACHE_SIZE:
+                return
+        self._blocked_until[key] = until
+
+    def blocked(self, ip: Optional[str], username: Optional[str]) -> Optional[int]:
+        """Como retry_after, mas só com os bloqueios em memória (sem I/O, para o event loop)"""
+        now = time.time()
+        wait = 0.0
+        for _, key in self.keys(ip, username):
+            until = self._blocked_until.get(key)
+            if until is None:
+                continue
+            if until <= now:
+                self._blocked_until.pop(key, None)
+            else:
+                wait = max(wait, until - now)
+        if wait <= 0:
+            return None
+        self.rejected += 1
+        return max(1, math.ceil(wait))
+
+    def retry_after(self, ip: Optional[str], username: Optional[str]) -> Optional[int]:
+        """Segundos até a próxima tentativa ser aceita, ou None se há ficha nos dois buckets"""
+        keys = self.keys(ip, username)
+        if not keys:
+            return None
+        now = time.time()
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT key, tokens, updated_at FROM login_buckets WHERE key IN ({', '.join('?' * len(keys))})",
+                [key for _, key in keys]
+            ).fetchall()
+        state = {row[0]: (row[1], row[2]) for row in rows}
+
+        wait = 0.0
+        for kind, key in keys:
+            if key not in state:
+                continue
+            tokens = self._refilled(kind, *state[key], now)
+            if tokens < 1:
+                key_wait = (1 - tokens) / self.limits[kind][1]
+                self._block(key, now + key_wait)
+                wait = max(wait, key_wait)
+        if wait <= 0:
+            return None
+        self.rejected += 1
+        return max(1, math.ceil(wait))
+
+    def record_failure(self, ip: Optional[str], username: Optional[str]):
+        """Consome uma ficha de cada bucket (operação atômica no SQLite, segura entre workers)"""
+        now = time.time()
+        self.failures += 1
+        with self._connection() as conn:
+            for kind, key in self.keys(ip, username):
+                capacity, rate = self.limits[kind]
+                tokens = conn.execute('''
+                    INSERT INTO login_buckets (key, tokens, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        tokens = MAX(0, MIN(?, tokens + MAX(0, excluded.updated_at - updated_at) * ?) - 1),
+                        updated_at = excluded.updated_at
+                    RETURNING tokens
+                ''', (key, capacity - 1, now, capacity, rate)).fetchone()[0]
+                if tokens < 1:
+                    self._block(key, now + (1 - tokens) / rate)
+            if time.monotonic() - self._purged_at > LOGIN_BUCKET_PURGE_INTERVAL:
+                self._purged_at = time.monotonic()
+                # Tempo para encher o bucket mais lento: depois disso a linha equivale a não existir
+                idle = max(capacity / rate for capacity, rate in self.limits.values())
+                conn.execute("DELETE FROM login_buckets WHERE updated_at < ?", (now - idle,))
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rejected': self.rejected,
+            'failures': self.failures,
+            'blocked_keys': len(self._blocked_until),
+            'limits': {kind: {'burst': capacity, 'per_minute': round(rate * 60, 3)}
+                       for kind, (capacity, rate) in self.limits.items()}
+        }
+
+login_limiter = LoginRateLimiter()
@@ -0,0 +1,122 @@
+"""
+Endpoint /metrics (formato Prometheus)
+Lê apenas estado em memória deste worker: métricas HTTP, consultas, pool, threadpool,
+SSE, PDF, cache de usuários e o último snapshot do monitoramento - nenhuma consulta ao SQLite
+"""
+
+from dataclasses import fields
+from typing import Any, Optional
+
+from prometheus import Exposition
+from request_metrics import request_metrics, LATENCY_BUCKETS, STATUS_CLASSES
+from db_pool import query_durations, get_pool
+from database import DB_PATH
+from event_stream import broker
+from pdf_renderer import pdf_service
+from monitoring import health_checker
+from user_cache import user_cache
+from login_limiter import login_limiter
+
+def _export_http(out: Exposition):
+    totals = list(request_metrics.totals.items())
+    series = []
+    requests = []
+    for label, stats in totals:
+        method, _, route = label.partition(' ')
+        labels = {'method': method, 'route': route or label}
+        series.append((labels, list(stats.buckets), stats.latency_sum))
+        for status_class, count in zip(STATUS_CLASSES, list(stats.status)):
+            if count:
+                requests.append(({**labels, 'status': status_class}, count))
+
+    out.metric('http_requests_total', 'counter', 'Requisições HTTP por rota e classe de status', requests)
+    out.histogram('http_request_duration_seconds', 'Latência das requisições HTTP', LATENCY_BUCKETS, series)
+    out.gauge('http_requests_in_flight', 'Requisições HTTP em andamento', request_metrics.in_flight)
+
+def _export_db(out: Exposition):
+    children = sorted(query_durations.items())
+    series = []
+    for kind, histogram in children:
+        counts, total = histogram.snapshot()
+        series.append(({'kind': kind}, counts, total))
+    buckets = children[0][1].buckets if children else ()
+    out.metric('db_queries_total', 'counter', 'Comandos SQL executados por tipo',
+               [(labels, sum(counts)) for labels, counts, _ in series])
+    out.histogram('db_query_duration_seconds', 'Duração do execute por tipo de comando', buckets, series)
+
+    pool = get_pool(DB_PATH).stats()
+    out.gauge('db_pool_max_size', 'Tamanho máximo do pool de conexões', pool['max_size'])
+    out.gauge('db_pool_connections', 'Conexões abertas pelo pool', pool['created'])
+    out.gauge('db_pool_in_use', 'Conexões emprestadas no momento', pool['in_use'])
+    out.gauge('db_pool_idle', 'Conexões ociosas no pool', pool['idle'])
+    out.gauge('db_pool_max_in_use', 'Pico de conexões emprestadas', pool['max_in_use'])
+    out.counter('db_pool_checkouts_total', 'Retiradas de conexão do pool', pool['checkouts'])
+    out.counter('db_pool_waits_total', 'Retiradas que precisaram esperar', pool['waits'])
+    out.counter('db_pool_wait_seconds_total', 'Tempo total de espera por conexão', pool['wait_seconds_total'])
+    out.counter('db_pool_timeouts_total', 'Retiradas que estouraram o timeout', pool['timeouts'])
+    out.counter('db_pool_discarded_total', 'Conexões descartadas após erro', pool['discarded'])
+
+def _export_threadpool(out: Exposition, limiter: Any):
+    if limiter is None:
+        return
+    statistics = limiter.statistics()
+    out.gauge('threadpool_size', 'Limite de threads do threadpool de endpoints síncronos', limiter.total_tokens)
+    out.gauge('threadpool_busy', 'Threads ocupadas com endpoints síncronos', statistics.borrowed_tokens)
+    out.gauge('threadpool_waiting', 'Tarefas aguardando thread livre (saturação)', statistics.tasks_waiting)
+
+def _export_events(out: Exposition):
+    stats = broker.stats()
+    counts, total = broker.fanout_sizes.snapshot()
+    out.gauge('sse_subscribers', 'Clientes SSE conectados neste worker', stats['subscribers'])
+    out.counter('sse_events_dispatched_total', 'Eventos entregues a assinantes SSE', stats['events_dispatched'])
+    out.counter('sse_events_dropped_total', 'Eventos descartados por fila cheia', stats['events_dropped'])
+    out.histogram('notification_fanout_size', 'Assinantes que receberam cada evento',
+                  broker.fanout_sizes.buckets, [(None, counts, total)])
+
+def _export_pdf(out: Exposition):
+    stats = pdf_service.stats()
+    counts, total = pdf_service.render_seconds.snapshot()
+    out.counter('pdf_renders_total', 'PDFs renderizados', stats['renders'])
+    out.counter('pdf_cache_hits_total', 'PDFs servidos do cache em disco', stats['cache_hits'])
+    out.counter('pdf_render_failures_total', 'Falhas de renderização de PDF', stats['failures'])
+    out.gauge('pdf_renders_in_flight', 'Renderizações em andamento', stats['inflight'])
+    out.histogram('pdf_render_duration_seconds', 'Tempo de renderização de PDF (pool de processos)',
+                  pdf_service.render_seconds.buckets, [(None, counts, total)])
+
+def _export_user_cache(out: Exposition):
+    stats = user_cache.stats()
+    out.counter('user_cache_hits_total', 'Usuários autenticados servidos do cache', stats['hits'])
+    out.counter('user_cache_misses_total', 'Usuários autenticados lidos do banco', stats['misses'])
+    out.counter('user_cache_evictions_total', 'Entradas removidas por limite de tamanho', stats['evictions'])
+    out.counter('user_cache_invalidations_total', 'Invalidações locais do cache de usuários', stats['invalidations'])
+    out.counter('user_cache_version_changes_total', 'Descartes por mudança de versão no banco', stats['version_changes'])
+    out.gauge('user_cache_size', 'Usuários no cache deste worker', stats['size'])
+
+def _export_login(out: Exposition):
+    stats = login_limiter.stats()
+    out.counter('login_failures_total', 'Tentativas de login com credenciais inválidas', stats['failures'])
+    out.counter('login_rate_limited_total', 'Tentativas de login recusadas com 429', stats['rejected'])
+
+def _export_snapshot(out: Exposition, prefix: str, snapshot: Optional[Any], description: str):
+    """Campos numéricos de um dataclass do monitoramento como gauges"""
+    if snapshot is None:
+        return
+    for field in fields(snapshot):
+        value = getattr(snapshot, field.name)
+        if isinstance(value, (int, float)):
+            out.gauge(f'{prefix}_{field.name}', f'{description}: {field.name}', value)
+    out.gauge(f'{prefix}_timestamp_seconds', f'{description}: horário da coleta', snapshot.timestamp.timestamp())
+
+def render_metrics(thread_limiter: Any = None) -> str:
+    """Texto completo do /metrics"""
+    out = Exposition()
+    _export_http(out)
+    _export_db(out)
+    _export_threadpool(out, thread_limiter)
+    _export_events(out)
+    _export_pdf(out)
+    _export_user_cache(out)
+    _export_login(out)
+    _export_snapshot(out, 'system', health_checker.last_system_metrics, 'Métrica do sistema')
+    _export_snapshot(out, 'business', health_checker.last_business_metrics, 'Métrica de negócio')
+    return out.render()
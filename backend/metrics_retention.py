@@ -0,0 +1,314 @@
+"""
+Retenção e rollups do monitoring.db
+Amostras brutas ficam RAW_RETENTION_HOURS; antes de apagar, viram buckets de
+5 minutos e de 1 hora com min/avg/max. A exclusão é feita em lotes pequenos
+para não segurar o lock de escrita do SQLite.
+"""
+
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+RAW_RETENTION_HOURS = float(os.getenv("METRICS_RAW_RETENTION_HOURS", "24"))
+ROLLUP_5M_RETENTION_DAYS = float(os.getenv("METRICS_5M_RETENTION_DAYS", "7"))
+ROLLUP_1H_RETENTION_DAYS = float(os.getenv("METRICS_1H_RETENTION_DAYS", "365"))
+ALERT_RETENTION_DAYS = float(os.getenv("ALERT_RETENTION_DAYS", "90"))
+RETENTION_BATCH_SIZE = int(os.getenv("METRICS_RETENTION_BATCH_SIZE", "500"))
+MAX_QUERY_POINTS = 5000
+
+RESOLUTION_5M = 300
+RESOLUTION_1H = 3600
+RESOLUTIONS = {'5m': RESOLUTION_5M, '1h': RESOLUTION_1H}
+
+# Fonte (nome exposto na API) -> tabela bruta e colunas numéricas agregáveis
+METRIC_SOURCES: Dict[str, Dict[str, Any]] = {
+    'system': {
+        'table': 'system_metrics',
+        'fields': ('cpu_percent', 'memory_percent', 'disk_percent', 'network_sent', 'network_recv')
+    },
+    'application': {
+        'table': 'app_metrics',
+        'fields': ('active_connections', 'requests_per_minute', 'average_response_time', 'error_rate',
+                   'database_connections', 'p95_response_time', 'p99_response_time')
+    },
+    'business': {
+        'table': 'business_metrics',
+        'fields': ('total_laudos', 'laudos_today', 'pending_approvals', 'active_users', 'conversion_rate')
+    }
+}
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def init_retention_schema(cursor):
+    """Índices de timestamp, tabela de rollups e marcas d'água"""
+    for source in METRIC_SOURCES.values():
+        table = source['table']
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table}(timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON alerts(created_at)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metric_rollups (
+            source TEXT NOT NULL,
+            field TEXT NOT NULL,
+            resolution INTEGER NOT NULL,
+            bucket_start TEXT NOT NULL,
+            min_value REAL,
+            avg_value REAL,
+            max_value REAL,
+            samples INTEGER NOT NULL,
+            PRIMARY KEY (source, field, resolution, bucket_start)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS retention_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+
+def _floor(moment: datetime, seconds: int) -> datetime:
+    epoch = datetime(1970, 1, 1)
+    return epoch + timedelta(seconds=int((moment - epoch).total_seconds()) // seconds * seconds)
+
+def _fmt(moment: datetime) -> str:
+    return moment.strftime(TIMESTAMP_FORMAT)
+
+class MetricsRetention:
+    """Rollup + poda do monitoring.db (executado só pelo líder do monitoramento)"""
+
+    def __init__(self, connection_factory: Callable, batch_size: int = RETENTION_BATCH_SIZE,
+                 clock: Callable[[], datetime] = datetime.now):
+        self._connection = connection_factory
+        self.batch_size = batch_size
+        self.clock = clock
+
+    # === MARCAS D'ÁGUA ===
+
+    def _get_state(self, cursor, key: str) -> Optional[str]:
+        cursor.execute("SELECT value FROM retention_state WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, cursor, key: str, value: str):
+        cursor.execute("INSERT OR REPLACE INTO retention_state (key, value) VALUES (?, ?)", (key, value))
+
+    # === ROLLUPS ===
+
+    def rollup(self) -> int:
+        """Agrega buckets completos desde a última execução; retorna buckets gravados"""
+        now = self.clock()
+        written = 0
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            for name, source in METRIC_SOURCES.items():
+                written += self._rollup_raw(cursor, name, source, _floor(now, RESOLUTION_5M))
+                conn.commit()
+                written += self._rollup_hourly(cursor, name, source)
+                conn.commit()
+        return written
+
+    def _rollup_raw(self, cursor, name: str, source: Dict[str, Any], until: datetime) -> int:
+        """Bruto -> 5 minutos, somente buckets já encerrados"""
+        key = f"{name}:{RESOLUTION_5M}"
+        start = self._get_state(cursor, key)
+        if start is None:
+            cursor.execute(f"SELECT MIN(timestamp) FROM {source['table']}")
+            first = cursor.fetchone()[0]
+            if first is None:
+                return 0
+            start = _fmt(_floor(datetime.fromisoformat(str(first)), RESOLUTION_5M))
+        end = _fmt(until)
+        if start >= end:
+            return 0
+
+        written = 0
+        for field in source['fields']:
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO metric_rollups
+                    (source, field, resolution, bucket_start, min_value, avg_value, max_value, samples)
+                SELECT ?, ?, ?, datetime(bucket, 'unixepoch'), MIN(value), AVG(value), MAX(value), COUNT(value)
+                FROM (
+                    SELECT CAST(strftime('%s', timestamp) AS INTEGER) / ? * ? AS bucket, {field} AS value
+                    FROM {source['table']}
+                    WHERE timestamp >= ? AND timestamp < ? AND {field} IS NOT NULL
+                )
+                GROUP BY bucket
+            ''', (name, field, RESOLUTION_5M, RESOLUTION_5M, RESOLUTION_5M, start, end))
+            written += cursor.rowcount
+        self._set_state(cursor, key, end)
+        return written
+
+    def _rollup_hourly(self, cursor, name: str, source: Dict[str, Any]) -> int:
+        """5 minutos -> 1 hora (média ponderada pelo número de amostras)"""
+        done_5m = self._get_state(cursor, f"{name}:{RESOLUTION_5M}")
+        if done_5m is None:
+            return 0
+        end = _fmt(_floor(datetime.fromisoformat(done_5m), RESOLUTION_1H))
+        key = f"{name}:{RESOLUTION_1H}"
+        start = self._get_state(cursor, key)
+        if start is None:
+            cursor.execute('''
+                SELECT MIN(bucket_start) FROM metric_rollups WHERE source = ? AND resolution = ?
+            ''', (name, RESOLUTION_5M))
+            first = cursor.fetchone()[0]
+            if first is None:
+                return 0
+            start = _fmt(_floor(datetime.fromisoformat(first), RESOLUTION_1H))
+        if start >= end:
+            return 0
+
+        cursor.execute('''
+            INSERT OR REPLACE INTO metric_rollups
+                (source, field, resolution, bucket_start, min_value, avg_value, max_value, samples)
+            SELECT source, field, ?, datetime(CAST(strftime('%s', bucket_start) AS INTEGER) / ? * ?, 'unixepoch'),
+                   MIN(min_value), SUM(avg_value * samples) / SUM(samples), MAX(max_value), SUM(samples)
+            FROM metric_rollups
+            WHERE source = ? AND resolution = ? AND bucket_start >= ? AND bucket_start < ?
+            GROUP BY field, CAST(strftime('%s', bucket_start) AS INTEGER) / ?
+        ''', (RESOLUTION_1H, RESOLUTION_1H, RESOLUTION_1H, name, RESOLUTION_5M, start, end, RESOLUTION_1H))
+        written = cursor.rowcount
+        self._set_state(cursor, key, end)
+        return written
+
+    # === PODA ===
+
+    def _delete_batches(self, conn, table: str, where: str, params: Sequence[Any], key: str = 'id') -> int:
+        """DELETE em lotes de batch_size, com commit (e liberação do lock) entre eles"""
+        deleted = 0
+        while True:
+            # key pode ser composta (tabelas WITHOUT ROWID): compara row values
+            cursor = conn.execute(f'''
+                DELETE FROM {table} WHERE ({key}) IN (
+                    SELECT {key} FROM {table} WHERE {where} LIMIT ?
+                )
+            ''', (*params, self.batch_size))
+            conn.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < self.batch_size:
+                return deleted
+            time.sleep(0.01)
+
+    def prune(self) -> Dict[str, int]:
+        """Apaga dados brutos já agregados e rollups/alertas fora da retenção"""
+        now = self.clock()
+        raw_cutoff = _fmt(now - timedelta(hours=RAW_RETENTION_HOURS))
+        deleted: Dict[str, int] = {}
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            for name, source in METRIC_SOURCES.items():
+                # Nunca apaga amostras que ainda não entraram no rollup de 5 minutos
+                rolled = self._get_state(cursor, f"{name}:{RESOLUTION_5M}")
+                if rolled is None:
+                    continue
+                cutoff = min(raw_cutoff, rolled)
+                deleted[source['table']] = self._delete_batches(
+                    conn, source['table'], "timestamp < ?", (cutoff,)
+                )
+
+            for label, resolution, days in (('rollups_5m', RESOLUTION_5M, ROLLUP_5M_RETENTION_DAYS),
+                                            ('rollups_1h', RESOLUTION_1H, ROLLUP_1H_RETENTION_DAYS)):
+                deleted[label] = self._delete_batches(
+                    conn, 'metric_rollups', "resolution = ? AND bucket_start < ?",
+                    (resolution, _fmt(now - timedelta(days=days))),
+                    key='source, field, resolution, bucket_start'
+                )
+
+            # Alertas abertos nunca são podados, por mais antigos que sejam
+            deleted['alerts'] = self._delete_batches(
+                conn, 'alerts', "is_resolved = 1 AND COALESCE(last_seen, created_at) < ?",
+                (_fmt(now - timedelta(days=ALERT_RETENTION_DAYS)),)
+            )
+        return deleted
+
+    def run(self) -> Dict[str, Any]:
+        """Ciclo completo: rollup primeiro, poda depois"""
+        started = time.perf_counter()
+        rolled = self.rollup()
+        deleted = self.prune()
+        elapsed = time.perf_counter() - started
+        if rolled or any(deleted.values()):
+            logger.info(f"Retenção de métricas: {rolled} buckets agregados, removidos {deleted} em {elapsed:.2f}s")
+        return {'buckets': rolled, 'deleted': deleted, 'seconds': round(elapsed, 3)}
+
+    # === CONSULTA ===
+
+    def query(self, source: str, fields: Optional[Sequence[str]], start: datetime, end: datetime,
+              resolution: str = 'auto') -> Dict[str, Any]:
+        """Série temporal de [start, end) na resolução pedida (auto escolhe pelo intervalo)"""
+        if source not in METRIC_SOURCES:
+            raise ValueError(f"Fonte desconhecida: {source}")
+        available = METRIC_SOURCES[source]['fields']
+        fields = list(fields or available)
+        unknown = [field for field in fields if field not in available]
+        if unknown:
+            raise ValueError(f"Campos desconhecidos para {source}: {', '.join(unknown)}")
+        if end <= start:
+            raise ValueError("O fim do intervalo deve ser posterior ao início")
+
+        if resolution == 'auto':
+            span = end - start
+            raw_floor = self.clock() - timedelta(hours=RAW_RETENTION_HOURS)
+            if span <= timedelta(hours=6) and start >= raw_floor:
+                resolution = 'raw'
+            elif span <= timedelta(days=3):
+                resolution = '5m'
+            else:
+                resolution = '1h'
+
+        if resolution == 'raw':
+            points = self._query_raw(source, fields, start, end)
+        elif resolution in RESOLUTIONS:
+            points = self._query_rollups(source, fields, RESOLUTIONS[resolution], start, end)
+        else:
+            raise ValueError(f"Resolução inválida: {resolution}")
+
+        return {
+            'source': source,
+            'resolution': resolution,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'fields': fields,
+            'points': points,
+            'truncated': len(points) >= MAX_QUERY_POINTS
+        }
+
+    def _query_raw(self, source: str, fields: List[str], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        table = METRIC_SOURCES[source]['table']
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # Seek em idx_<tabela>_timestamp
+            cursor.execute(f'''
+                SELECT timestamp, {', '.join(fields)} FROM {table}
+                WHERE timestamp >= ? AND timestamp < ?
+                ORDER BY timestamp LIMIT ?
+            ''', (start.isoformat(sep=' '), end.isoformat(sep=' '), MAX_QUERY_POINTS))
+            return [
+                {'timestamp': row[0], **{field: row[i + 1] for i, field in enumerate(fields)}}
+                for row in cursor.fetchall()
+            ]
+
+    def _query_rollups(self, source: str, fields: List[str], resolution: int,
+                       start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        placeholders = ', '.join('?' for _ in fields)
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            # Faixa da chave primária (source, field, resolution, bucket_start)
+            cursor.execute(f'''
+                SELECT bucket_start, field, min_value, avg_value, max_value, samples
+                FROM metric_rollups
+                WHERE source = ? AND field IN ({placeholders}) AND resolution = ?
+                  AND bucket_start >= ? AND bucket_start < ?
+                ORDER BY bucket_start
+                LIMIT ?
+            ''', (source, *fields, resolution, _fmt(_floor(start, resolution)), _fmt(end),
+                  MAX_QUERY_POINTS * len(fields)))
+
+            points: Dict[str, Dict[str, Any]] = {}
+            for bucket_start, field, min_value, avg_value, max_value, samples in cursor.fetchall():
+                point = points.setdefault(bucket_start, {'timestamp': bucket_start})
+                point[field] = {'min': min_value, 'avg': avg_value, 'max': max_value, 'samples': samples}
+            return list(points.values())
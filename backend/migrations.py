@@ -0,0 +1,573 @@
+"""
+Migrações versionadas do esquema do banco de laudos
+Cada migração roda uma única vez e sua versão fica registrada em schema_migrations
+"""
+
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Cursor], None]
+
+MIGRATIONS: List[Migration] = []
+
+def migration(version: int, name: str):
+    """Registra uma função como migração de versão `version`"""
+    def decorator(func: Callable[[sqlite3.Cursor], None]):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Versão de migração duplicada: {version}")
+        MIGRATIONS.append(Migration(version, name, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+def _columns(cursor: sqlite3.Cursor, table: str) -> List[str]:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+def add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+    """ALTER TABLE ADD COLUMN idempotente (bancos antigos têm esquemas divergentes)"""
+    if column not in _columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+# === MIGRAÇÕES ===
+
+@migration(1, "esquema_base")
+def _esquema_base(cursor: sqlite3.Cursor):
+    """Tabelas principais (antes em init_database e scripts avulsos)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            is_admin BOOLEAN DEFAULT FALSE,
+            user_type TEXT DEFAULT 'tecnico',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS laudos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            cliente TEXT,
+            equipamento TEXT,
+            diagnostico TEXT,
+            solucao TEXT,
+            status TEXT DEFAULT 'em_andamento',
+            approved_by INTEGER,
+            rejection_reason TEXT,
+            tag TEXT,
+            tag_description TEXT,
+            tag_updated_at TIMESTAMP,
+            tag_updated_by TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (approved_by) REFERENCES users (id)
+        )
+    ''')
+
+    # Tabela de estatísticas (cache para performance)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats_cache (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stat_name TEXT UNIQUE NOT NULL,
+            stat_value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS laudos_avancados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            nome_cliente TEXT NOT NULL,
+            data TEXT NOT NULL,
+            baterias TEXT NOT NULL,
+            tecnico_responsavel TEXT NOT NULL,
+            manutencao_preventiva TEXT,
+            manutencao_corretiva TEXT,
+            conclusao_final TEXT NOT NULL,
+            status TEXT DEFAULT 'pendente',
+            approved_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (approved_by) REFERENCES users (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            read BOOLEAN DEFAULT FALSE,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_privileges (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            privilege_type TEXT NOT NULL,
+            granted_by INTEGER NOT NULL,
+            granted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (granted_by) REFERENCES users (id)
+        )
+    ''')
+
+@migration(2, "colunas_laudos_avancados_e_tags")
+def _colunas_laudos(cursor: sqlite3.Cursor):
+    """Colunas antes adicionadas por update_db_schema.py e update_tags_schema.py"""
+    add_column_if_missing(cursor, 'users', 'user_type', "TEXT DEFAULT 'tecnico'")
+
+    for column, definition in [
+        ('status', "TEXT DEFAULT 'em_andamento'"),
+        ('approved_by', 'INTEGER'),
+        ('rejection_reason', 'TEXT'),
+        ('tipo', "TEXT DEFAULT 'simples'"),
+        ('nomeCliente', 'TEXT'),
+        ('baterias', 'TEXT'),
+        ('tecnicoResponsavel', 'TEXT'),
+        ('manutencaoPreventiva', 'TEXT'),
+        ('manutencaoCorretiva', 'TEXT'),
+        ('conclusaoFinal', 'TEXT'),
+        ('numeroTotalBaterias', 'INTEGER DEFAULT 0'),
+        ('tag', 'TEXT'),
+        ('tag_description', 'TEXT'),
+        ('tag_updated_at', 'TIMESTAMP'),
+        ('tag_updated_by', 'TEXT'),
+        ('updated_at', 'TIMESTAMP'),
+    ]:
+        add_column_if_missing(cursor, 'laudos', column, definition)
+
+@migration(3, "indices_consultas_frequentes")
+def _indices(cursor: sqlite3.Cursor):
+    """Índices usados pelas listagens, dashboards e notificações"""
+    # Listagem geral (admin) e filtros de data das estatísticas
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudos_created_at ON laudos (created_at)")
+    # Listagem por técnico
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudos_user_created ON laudos (user_id, created_at)")
+    # Painel de aprovação e contagens por status
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudos_status_created ON laudos (status, created_at)")
+    # Laudos finalizados (ORDER BY updated_at)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudos_status_updated ON laudos (status, updated_at)")
+    # Painel de atualizações (tags recentes)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudos_tag_updated_at ON laudos (tag_updated_at)")
+    # Laudos avançados
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudos_tipo_created ON laudos (tipo, created_at)")
+    # Sino de notificações
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications (user_id, created_at)")
+    # Privilégios ativos do usuário
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_privileges_user ON user_privileges (user_id, is_active)")
+    # Índices antigos substituídos pelos compostos acima
+    cursor.execute("DROP INDEX IF EXISTS idx_notifications_user_id")
+
+@migration(4, "updated_at_sempre_preenchido")
+def _updated_at_preenchido(cursor: sqlite3.Cursor):
+    """Paginação por (updated_at, id) exige updated_at não nulo"""
+    cursor.execute("UPDATE laudos SET updated_at = created_at WHERE updated_at IS NULL")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudos_updated_at_default
+        AFTER INSERT ON laudos
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE laudos SET updated_at = COALESCE(NEW.created_at, CURRENT_TIMESTAMP) WHERE id = NEW.id;
+        END
+    ''')
+
+@migration(5, "notificacoes_broadcast")
+def _notificacoes_broadcast(cursor: sqlite3.Cursor):
+    """Eventos de notificação (fan-out na leitura) e recibos de leitura por usuário"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            target_user_id INTEGER,
+            type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            laudo_id INTEGER,
+            actor_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (target_user_id) REFERENCES users (id)
+        )
+    ''')
+    # target_user_id NULL = broadcast; o índice cobre as duas consultas do sino
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_notification_events_target ON notification_events (target_user_id, id)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS notification_reads (
+            user_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            read_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, event_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Notificações antigas (uma linha por usuário) viram eventos direcionados, mantendo o id
+    cursor.execute('''
+        INSERT INTO notification_events (id, target_user_id, type, message, created_at)
+        SELECT id, user_id, type, message, created_at FROM notifications
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO notification_reads (user_id, event_id, read_at)
+        SELECT user_id, id, created_at FROM notifications WHERE read
+    ''')
+
+@migration(6, "contadores_laudos")
+def _contadores_laudos(cursor: sqlite3.Cursor):
+    """Contadores de laudos por status e por dia de criação, mantidos por triggers"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS laudo_status_counts (
+            status TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS laudo_daily_counts (
+            day TEXT PRIMARY KEY,
+            total INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+    # Status nulo conta como '' e created_at nulo fica fora da contagem diária
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudo_counts_insert
+        AFTER INSERT ON laudos
+        BEGIN
+            INSERT INTO laudo_status_counts (status, total) VALUES (COALESCE(NEW.status, ''), 1)
+            ON CONFLICT(status) DO UPDATE SET total = total + 1;
+            INSERT INTO laudo_daily_counts (day, total)
+            SELECT DATE(NEW.created_at), 1 WHERE DATE(NEW.created_at) IS NOT NULL
+            ON CONFLICT(day) DO UPDATE SET total = total + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudo_counts_delete
+        AFTER DELETE ON laudos
+        BEGIN
+            UPDATE laudo_status_counts SET total = total - 1 WHERE status = COALESCE(OLD.status, '');
+            UPDATE laudo_daily_counts SET total = total - 1 WHERE day = DATE(OLD.created_at);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudo_counts_status
+        AFTER UPDATE OF status ON laudos
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE laudo_status_counts SET total = total - 1 WHERE status = COALESCE(OLD.status, '');
+            INSERT INTO laudo_status_counts (status, total) VALUES (COALESCE(NEW.status, ''), 1)
+            ON CONFLICT(status) DO UPDATE SET total = total + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudo_counts_created_at
+        AFTER UPDATE OF created_at ON laudos
+        WHEN DATE(OLD.created_at) IS NOT DATE(NEW.created_at)
+        BEGIN
+            UPDATE laudo_daily_counts SET total = total - 1 WHERE day = DATE(OLD.created_at);
+            INSERT INTO laudo_daily_counts (day, total)
+            SELECT DATE(NEW.created_at), 1 WHERE DATE(NEW.created_at) IS NOT NULL
+            ON CONFLICT(day) DO UPDATE SET total = total + 1;
+        END
+    ''')
+
+    # Carga inicial a partir dos laudos existentes
+    cursor.execute("DELETE FROM laudo_status_counts")
+    cursor.execute('''
+        INSERT INTO laudo_status_counts (status, total)
+        SELECT COALESCE(status, ''), COUNT(*) FROM laudos GROUP BY COALESCE(status, '')
+    ''')
+    cursor.execute("DELETE FROM laudo_daily_counts")
+    cursor.execute('''
+        INSERT INTO laudo_daily_counts (day, total)
+        SELECT DATE(created_at), COUNT(*) FROM laudos
+        WHERE DATE(created_at) IS NOT NULL GROUP BY DATE(created_at)
+    ''')
+
+@migration(7, "categoria_defeito")
+def _categoria_defeito(cursor: sqlite3.Cursor):
+    """Categoria de defeito pré-calculada + tabela de regras de classificação"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS defect_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT NOT NULL,
+            pattern TEXT NOT NULL,
+            priority INTEGER NOT NULL DEFAULT 100,
+            active BOOLEAN NOT NULL DEFAULT 1
+        )
+    ''')
+    # Mesmas regras do antigo CASE/LIKE, sem as variantes acentuadas (a comparação ignora acentos)
+    cursor.executemany(
+        "INSERT INTO defect_rules (category, pattern, priority) VALUES (?, ?, ?)",
+        [
+            ('Bateria descarregada', 'bateria%descarregada', 10),
+            ('Sulfatação', 'sulfatacao', 20),
+            ('Célula danificada', 'celula%danificada', 30),
+            ('Terminal oxidado', 'terminal%oxidado', 40),
+            ('Carga lenta', 'carga%lenta', 50),
+            ('Falha geral', 'falha', 60),
+        ]
+    )
+
+    # NULL = ainda não classificado (preenchido em lotes pelo backfill)
+    add_column_if_missing(cursor, 'laudos', 'defect_category', 'TEXT')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudos_defect_category ON laudos (defect_category)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudos_defect_pending ON laudos (id) WHERE defect_category IS NULL")
+
+    # Diagnóstico alterado fora do LaudoDatabase: volta para a fila do backfill
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudos_defect_reset
+        AFTER UPDATE OF diagnostico ON laudos
+        WHEN OLD.diagnostico IS NOT NEW.diagnostico
+        BEGIN
+            UPDATE laudos SET defect_category = NULL WHERE id = NEW.id;
+        END
+    ''')
+
+@migration(8, "busca_texto_laudos")
+def _busca_texto_laudos(cursor: sqlite3.Cursor):
+    """Índice FTS5 (conteúdo externo) sobre os campos de texto dos laudos"""
+    # remove_diacritics: 'sulfatacao' encontra 'Sulfatação'
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS laudos_fts USING fts5(
+            cliente, equipamento, diagnostico, solucao, tag,
+            content='laudos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudos_fts_insert
+        AFTER INSERT ON laudos
+        BEGIN
+            INSERT INTO laudos_fts (rowid, cliente, equipamento, diagnostico, solucao, tag)
+            VALUES (NEW.id, NEW.cliente, NEW.equipamento, NEW.diagnostico, NEW.solucao, NEW.tag);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudos_fts_delete
+        AFTER DELETE ON laudos
+        BEGIN
+            INSERT INTO laudos_fts (laudos_fts, rowid, cliente, equipamento, diagnostico, solucao, tag)
+            VALUES ('delete', OLD.id, OLD.cliente, OLD.equipamento, OLD.diagnostico, OLD.solucao, OLD.tag);
+        END
+    ''')
+    # Só reindexa quando um campo indexado muda (aprovações e tags de status não mexem no índice)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudos_fts_update
+        AFTER UPDATE OF cliente, equipamento, diagnostico, solucao, tag ON laudos
+        BEGIN
+            INSERT INTO laudos_fts (laudos_fts, rowid, cliente, equipamento, diagnostico, solucao, tag)
+            VALUES ('delete', OLD.id, OLD.cliente, OLD.equipamento, OLD.diagnostico, OLD.solucao, OLD.tag);
+            INSERT INTO laudos_fts (rowid, cliente, equipamento, diagnostico, solucao, tag)
+            VALUES (NEW.id, NEW.cliente, NEW.equipamento, NEW.diagnostico, NEW.solucao, NEW.tag);
+        END
+    ''')
+
+    cursor.execute("INSERT INTO laudos_fts (laudos_fts) VALUES ('rebuild')")
+
+@migration(9, "baterias_laudos_avancados")
+def _baterias_laudos_avancados(cursor: sqlite3.Cursor):
+    """Baterias e elementos dos laudos avançados em tabelas tipadas (antes só JSON)"""
+    from battery_records import backfill_baterias
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS laudo_baterias (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            laudo_avancado_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            numero_identificacao TEXT,
+            modelo TEXT,
+            numero_serie TEXT,
+            fabricante TEXT,
+            tipo_valvula TEXT,
+            tipo_polo TEXT,
+            tipo_atividade TEXT,
+            data_fabricacao TEXT,
+            tensao_nominal REAL,
+            capacidade_nominal_8h REAL,
+            numero_elementos INTEGER,
+            tensao_total REAL,
+            temperatura REAL,
+            UNIQUE (laudo_avancado_id, position),
+            FOREIGN KEY (laudo_avancado_id) REFERENCES laudos_avancados (id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudo_baterias_modelo ON laudo_baterias (modelo)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_laudo_baterias_serie ON laudo_baterias (numero_serie)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS laudo_bateria_elementos (
+            bateria_id INTEGER NOT NULL,
+            numero INTEGER NOT NULL,
+            densidade REAL,
+            tensao REAL,
+            PRIMARY KEY (bateria_id, numero),
+            FOREIGN KEY (bateria_id) REFERENCES laudo_baterias (id)
+        ) WITHOUT ROWID
+    ''')
+
+    # foreign_keys fica desligado nas conexões: a remoção em cascata é feita por triggers
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudos_avancados_baterias_delete
+        AFTER DELETE ON laudos_avancados
+        BEGIN
+            DELETE FROM laudo_baterias WHERE laudo_avancado_id = OLD.id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_laudo_baterias_elementos_delete
+        AFTER DELETE ON laudo_baterias
+        BEGIN
+            DELETE FROM laudo_bateria_elementos WHERE bateria_id = OLD.id;
+        END
+    ''')
+
+    converted = backfill_baterias(cursor)
+    logger.info(f"Migração 9: {converted} bateria(s) convertida(s) de JSON")
+
+@migration(10, "versao_cache_usuarios")
+def _versao_cache_usuarios(cursor: sqlite3.Cursor):
+    """Contador de versão lido pelos caches em memória de cada worker (user_cache.py)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('users', 0)")
+
+    # Qualquer escrita em usuários ou privilégios (API, scripts, sqlite3) invalida os caches
+    for table, event in [('users', 'UPDATE'), ('users', 'DELETE'), ('user_privileges', 'INSERT'),
+                         ('user_privileges', 'UPDATE'), ('user_privileges', 'DELETE')]:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_cache_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE cache_versions SET version = version + 1 WHERE name = 'users';
+            END
+        ''')
+
+@migration(11, "versao_tokens_usuarios")
+def _versao_tokens_usuarios(cursor: sqlite3.Cursor):
+    """Versão dos tokens por usuário: incrementada, revoga os JWT emitidos antes (token_revocation.py)"""
+    add_column_if_missing(cursor, 'users', 'token_version', "INTEGER NOT NULL DEFAULT 0")
+
+    # Mudanças que alteram as claims do token (papel, privilégios) ou exigem novo login (senha)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_token_version
+        AFTER UPDATE OF username, password_hash, is_admin, user_type ON users
+        WHEN OLD.username IS NOT NEW.username OR OLD.password_hash IS NOT NEW.password_hash
+            OR OLD.is_admin IS NOT NEW.is_admin OR OLD.user_type IS NOT NEW.user_type
+        BEGIN
+            UPDATE users SET token_version = token_version + 1 WHERE id = NEW.id;
+        END
+    ''')
+    for event, row in [('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')]:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_user_privileges_token_{event.lower()}
+            AFTER {event} ON user_privileges
+            BEGIN
+                UPDATE users SET token_version = token_version + 1 WHERE id = {row}.user_id;
+            END
+        ''')
+
+@migration(12, "updated_at_em_utc")
+def _updated_at_em_utc(cursor: sqlite3.Cursor):
+    """updated_at gravado pela API com datetime.now().isoformat() (horário local, separador 'T')
+    passa para UTC no formato de CURRENT_TIMESTAMP, como os demais escritores"""
+    cursor.execute('''
+        UPDATE laudos SET updated_at = datetime(updated_at, 'utc')
+        WHERE updated_at LIKE '____-__-__T%' AND datetime(updated_at, 'utc') IS NOT NULL
+    ''')
+    logger.info(f"Migração 12: {cursor.rowcount} updated_at convertido(s) para UTC")
+
+@migration(13, "versao_tokens_so_senha")
+def _versao_tokens_so_senha(cursor: sqlite3.Cursor):
+    """token_version só muda com a senha (remoção já invalida pela ausência do usuário).
+
+    Papel, nome e privilégios deixam de revogar a sessão: as claims antigas valem até o access
+    token expirar e o /token/refresh emite as novas, relidas do banco."""
+    cursor.execute("DROP TRIGGER IF EXISTS trg_users_token_version")
+    for event in ('insert', 'update', 'delete'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_user_privileges_token_{event}")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_users_password_token_version
+        AFTER UPDATE OF password_hash ON users
+        WHEN OLD.password_hash IS NOT NEW.password_hash
+        BEGIN
+            UPDATE users SET token_version = token_version + 1 WHERE id = NEW.id;
+        END
+    ''')
+
+@migration(14, "notificacoes_em_utc")
+def _notificacoes_em_utc(cursor: sqlite3.Cursor):
+    """created_at/read_at gravados com datetime.now().isoformat(sep=' ') (horário local, com
+    microssegundos) passam para UTC; os de CURRENT_TIMESTAMP não têm fração e ficam como estão"""
+    for table, column in (('notification_events', 'created_at'), ('notification_reads', 'read_at')):
+        cursor.execute(f'''
+            UPDATE {table} SET {column} = datetime({column}, 'utc')
+            WHERE {column} LIKE '____-__-__ __:__:__.%' AND datetime({column}, 'utc') IS NOT NULL
+        ''')
+        logger.info(f"Migração 14: {cursor.rowcount} {table}.{column} convertido(s) para UTC")
+
+# === EXECUÇÃO ===
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Versão atual do esquema (0 se nenhuma migração foi aplicada)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    ''')
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+    return row[0] or 0
+
+def run_migrations(conn: sqlite3.Connection, migrations: List[Migration] = None) -> int:
+    """Aplica, em ordem, as migrações pendentes. Retorna quantas foram aplicadas"""
+    migrations = MIGRATIONS if migrations is None else migrations
+    if conn.in_transaction:
+        conn.commit()
+
+    current = get_schema_version(conn)
+    conn.commit()
+    pending = [m for m in migrations if m.version > current]
+    if not pending:
+        return 0
+
+    applied = 0
+    for m in pending:
+        # BEGIN IMMEDIATE serializa workers que sobem ao mesmo tempo
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= m.version:
+                conn.rollback()
+                continue
+            m.apply(conn.cursor())
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+                (m.version, m.name, datetime.now().isoformat())
+            )
+            conn.commit()
+            applied += 1
+            logger.info(f"Migração {m.version} ({m.name}) aplicada")
+        except Exception:
+            conn.rollback()
+            logger.error(f"Falha na migração {m.version} ({m.name})")
+            raise
+    return applied
@@ -5,19 +5,45 @@ Monitoramento de performance, alertas e health checks
 
 import time
 import psutil
-import sqlite3
 import logging
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from pathlib import Path
+import os
 import json
+import uuid
+import atexit
+import socket
+
+from request_metrics import request_metrics, RouteStats
+from db_pool import get_pool
+from metrics_retention import MetricsRetention, init_retention_schema
+from alerting import AlertManager, init_alert_schema
+from laudo_counters import (
+    read_counters, count_status, reconcile_counters, PENDING_STATUSES, APPROVED_STATUSES,
+    COUNTERS_RECONCILE_INTERVAL
+)
+from defect_categories import (
+    backfill_defect_categories, DEFECT_BACKFILL_BATCH, DEFECT_BACKFILL_INTERVAL, DEFECT_BACKFILL_MAX_BATCHES
+)
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Banco de métricas/alertas (MONITORING_DB_PATH aponta para outro arquivo, ex.: testes)
+MONITORING_DB_PATH = Path(os.getenv("MONITORING_DB_PATH", str(Path(__file__).parent / "monitoring.db")))
+# Intervalo do amostrador de sistema em segundo plano (segundos)
+SYSTEM_SAMPLE_INTERVAL = float(os.getenv("SYSTEM_SAMPLE_INTERVAL", "5"))
+# Lease de liderança: só um worker coleta e grava métricas/alertas
+MONITOR_LEASE_TTL = float(os.getenv("MONITOR_LEASE_TTL", "30"))
+# Intervalo entre ciclos de rollup/poda do monitoring.db (segundos)
+RETENTION_INTERVAL = float(os.getenv("METRICS_RETENTION_INTERVAL", "600"))
+# Janela de requisições que cada worker publica para o líder somar (segundos)
+REQUEST_WINDOW_SECONDS = 60
+
 @dataclass
 class SystemMetrics:
     """Métricas do sistema"""
@@ -27,6 +53,7 @@ class SystemMetrics:
     network_sent: int
     network_recv: int
     timestamp: datetime
+    process_connections: int = 0
 
 @dataclass
 class ApplicationMetrics:
@@ -37,6 +64,8 @@ class ApplicationMetrics:
     error_rate: float
     database_connections: int
     timestamp: datetime
+    p95_response_time: float = 0.0
+    p99_response_time: float = 0.0
 
 @dataclass
 class BusinessMetrics:
@@ -48,113 +77,279 @@ class BusinessMetrics:
     conversion_rate: float
     timestamp: datetime
 
+class MonitorLease:
+    """Lease em uma linha do monitoring.db; o dono renova antes de expirar.
+
+    Se o líder morre, a linha expira em até `ttl` segundos e o próximo
+    worker que tentar assume (failover automático).
+    """
+    
+    def __init__(self, db_path: Path, name: str = "monitor", ttl: float = MONITOR_LEASE_TTL):
+        self.db_path = db_path
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    
+    def acquire(self) -> bool:
+        """Assume ou renova o lease; retorna True se este processo é o líder"""
+        now = time.time()
+        with get_pool(self.db_path).connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO monitor_leases (name, owner, expires_at, acquired_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    owner = excluded.owner,
+                    expires_at = excluded.expires_at,
+                    acquired_at = CASE WHEN monitor_leases.owner = excluded.owner
+                                       THEN monitor_leases.acquired_at ELSE excluded.acquired_at END
+                WHERE monitor_leases.owner = excluded.owner OR monitor_leases.expires_at < ?
+            ''', (self.name, self.owner, now + self.ttl, now, now))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    def release(self):
+        """Libera o lease (encerramento limpo) para o failover ser imediato"""
+        try:
+            with get_pool(self.db_path).connection() as conn:
+                conn.execute(
+                    "UPDATE monitor_leases SET expires_at = 0 WHERE name = ? AND owner = ?",
+                    (self.name, self.owner)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao liberar lease de monitoramento: {e}")
+    
+    def current(self) -> Optional[Dict[str, Any]]:
+        with get_pool(self.db_path).connection() as conn:
+            row = conn.execute(
+                "SELECT owner, expires_at, acquired_at FROM monitor_leases WHERE name = ?", (self.name,)
+            ).fetchone()
+        return dict(row) if row else None
+
 class RSMHealthCheck:
     """Sistema de health check para o RSM"""
     
     def __init__(self):
-        self.db_path = Path(__file__).parent / "monitoring.db"
+        self.db_path = MONITORING_DB_PATH
         self.init_monitoring_db()
         self.metrics_history: List[Dict[str, Any]] = []
         self.alerts: List[Dict[str, Any]] = []
         self.is_monitoring = False
+        # Última coleta do loop (lida pelo /metrics sem tocar no SQLite)
+        self.last_system_metrics: Optional[SystemMetrics] = None
+        # Janela de requisições do cluster: recalculada só pelo loop, a cada tick
+        self.last_app_metrics: Optional[ApplicationMetrics] = None
+        self.last_business_metrics: Optional[BusinessMetrics] = None
+        # Snapshot mantido pelo amostrador em segundo plano
+        self._system_snapshot: Optional[SystemMetrics] = None
+        self._process = psutil.Process()
+        self._sampler_running = False
+        self.lease = MonitorLease(self.db_path)
+        self.is_leader = False
+        self.retention = MetricsRetention(self._connection)
+        self.alert_manager = AlertManager(self._connection)
         
+    def _connection(self):
+        """Conexão do pool do monitoring.db (WAL, compartilhado entre workers)"""
+        return get_pool(self.db_path).connection()
+    
     def init_monitoring_db(self):
         """Inicializa banco de dados de monitoramento"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._connection() as conn:
+            cursor = conn.cursor()
         
-        # Tabela de métricas do sistema
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS system_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cpu_percent REAL,
-                memory_percent REAL,
-                disk_percent REAL,
-                network_sent INTEGER,
-                network_recv INTEGER,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+            # Tabela de métricas do sistema
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS system_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cpu_percent REAL,
+                    memory_percent REAL,
+                    disk_percent REAL,
+                    network_sent INTEGER,
+                    network_recv INTEGER,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
         
-        # Tabela de métricas da aplicação
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS app_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                active_connections INTEGER,
-                requests_per_minute INTEGER,
-                average_response_time REAL,
-                error_rate REAL,
-                database_connections INTEGER,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+            # Tabela de métricas da aplicação
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS app_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    active_connections INTEGER,
+                    requests_per_minute INTEGER,
+                    average_response_time REAL,
+                    error_rate REAL,
+                    database_connections INTEGER,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
         
-        # Tabela de métricas de negócio
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS business_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                total_laudos INTEGER,
-                laudos_today INTEGER,
-                pending_approvals INTEGER,
-                active_users INTEGER,
-                conversion_rate REAL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+            # Percentis de latência (bancos criados antes do middleware de métricas)
+            cursor.execute("PRAGMA table_info(app_metrics)")
+            app_columns = {row[1] for row in cursor.fetchall()}
+            for column in ('p95_response_time', 'p99_response_time'):
+                if column not in app_columns:
+                    cursor.execute(f"ALTER TABLE app_metrics ADD COLUMN {column} REAL")
         
-        # Tabela de alertas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS alerts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                alert_type TEXT NOT NULL,
-                severity TEXT NOT NULL,
-                message TEXT NOT NULL,
-                is_resolved BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                resolved_at TIMESTAMP
-            )
-        ''')
+            # Tabela de métricas de negócio
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS business_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    total_laudos INTEGER,
+                    laudos_today INTEGER,
+                    pending_approvals INTEGER,
+                    active_users INTEGER,
+                    conversion_rate REAL,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        
+            # Tabela de alertas
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    alert_type TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    is_resolved BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    resolved_at TIMESTAMP
+                )
+            ''')
+        
+            # Lease de liderança entre workers
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS monitor_leases (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    acquired_at REAL NOT NULL
+                )
+            ''')
         
-        conn.commit()
-        conn.close()
+            # Janela de requisições de cada worker (o líder soma todas antes de gravar/alertar)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS worker_request_windows (
+                    owner TEXT PRIMARY KEY,
+                    window_json TEXT NOT NULL,
+                    in_flight INTEGER NOT NULL,
+                    published_at REAL NOT NULL
+                )
+            ''')
+        
+            # Estado dos alertas (deduplicação) + índices de timestamp e rollups
+            init_alert_schema(cursor)
+            init_retention_schema(cursor)
+        
+            conn.commit()
     
-    def get_system_metrics(self) -> SystemMetrics:
-        """Coleta métricas do sistema"""
+    def _count_process_connections(self) -> int:
+        """Conexões de rede deste processo (não percorre os sockets do sistema inteiro)"""
+        # psutil >= 6 renomeou Process.connections para net_connections
+        list_connections = getattr(self._process, 'net_connections', None) or self._process.connections
+        return len(list_connections(kind='inet'))
+    
+    def sample_system_metrics(self) -> SystemMetrics:
+        """Coleta uma amostra sem bloquear e atualiza o snapshot em memória"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # interval=None: delta desde a chamada anterior, retorna imediatamente
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             network = psutil.net_io_counters()
             
-            return SystemMetrics(
+            snapshot = SystemMetrics(
                 cpu_percent=cpu_percent,
                 memory_percent=memory.percent,
                 disk_percent=disk.percent,
                 network_sent=network.bytes_sent,
                 network_recv=network.bytes_recv,
-                timestamp=datetime.now()
+                timestamp=datetime.now(),
+                process_connections=self._count_process_connections()
             )
+            self._system_snapshot = snapshot
+            return snapshot
         except Exception as e:
             logger.error(f"Erro ao coletar métricas do sistema: {e}")
             return SystemMetrics(0, 0, 0, 0, 0, datetime.now())
     
+    def start_system_sampler(self, interval: float = SYSTEM_SAMPLE_INTERVAL):
+        """Inicia a thread que mantém o snapshot de sistema atualizado"""
+        if self._sampler_running:
+            return
+        
+        self._sampler_running = True
+        # Primeira chamada só estabelece a referência do delta de CPU
+        psutil.cpu_percent(interval=None)
+        
+        def sampler_loop():
+            while self._sampler_running:
+                self.sample_system_metrics()
+                time.sleep(interval)
+        
+        threading.Thread(target=sampler_loop, daemon=True, name="rsm-system-sampler").start()
+        logger.info(f"Amostrador de sistema iniciado com intervalo de {interval} segundos")
+    
+    def get_system_metrics(self) -> SystemMetrics:
+        """Último snapshot do sistema (leitura em memória, sem bloquear)"""
+        snapshot = self._system_snapshot
+        if snapshot is None:
+            snapshot = self.sample_system_metrics()
+        return snapshot
+    
+    def publish_request_window(self):
+        """Grava a janela de requisições deste worker para o líder somar (todo worker, a cada ciclo)"""
+        window = request_metrics.window_total(REQUEST_WINDOW_SECONDS)
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute('''
+                INSERT INTO worker_request_windows (owner, window_json, in_flight, published_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(owner) DO UPDATE SET
+                    window_json = excluded.window_json,
+                    in_flight = excluded.in_flight,
+                    published_at = excluded.published_at
+            ''', (self.lease.owner, json.dumps(window.to_dict()), request_metrics.in_flight, now))
+            # Workers encerrados sem limpar a própria linha
+            conn.execute("DELETE FROM worker_request_windows WHERE published_at < ?", (now - 10 * self.lease.ttl,))
+            conn.commit()
+    
+    def cluster_request_window(self) -> Tuple[RouteStats, int]:
+        """Janela de requisições somada de todos os workers: a deste ao vivo + as publicadas
+        pelos outros há menos de um TTL do lease. Retorna (estatísticas, requisições em andamento)"""
+        total = request_metrics.window_total(REQUEST_WINDOW_SECONDS)
+        in_flight = request_metrics.in_flight
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT window_json, in_flight FROM worker_request_windows WHERE owner != ? AND published_at >= ?",
+                (self.lease.owner, time.time() - self.lease.ttl)
+            ).fetchall()
+        for window_json, worker_in_flight in rows:
+            total.merge(RouteStats.from_dict(json.loads(window_json)))
+            in_flight += worker_in_flight
+        return total, in_flight
+    
     def get_application_metrics(self) -> ApplicationMetrics:
-        """Coleta métricas da aplicação"""
+        """Coleta métricas da aplicação (requisições de todos os workers).
+
+        Lê o monitoring.db; chamada só pelo loop de monitoramento. Leitores usam last_app_metrics."""
         try:
-            # Simular métricas da aplicação (em produção, seria coletado do FastAPI)
-            active_connections = len(psutil.net_connections())
-            requests_per_minute = 0  # Seria coletado do middleware
-            average_response_time = 0.15  # Seria calculado
-            error_rate = 0.02  # Seria calculado
-            database_connections = 1  # Seria verificado
+            from database import get_pool_stats
+            
+            # Último minuto registrado pelo RequestMetricsMiddleware de cada worker
+            window, in_flight = self.cluster_request_window()
+            summary = window.summary()
             
             return ApplicationMetrics(
-                active_connections=active_connections,
-                requests_per_minute=requests_per_minute,
-                average_response_time=average_response_time,
-                error_rate=error_rate,
-                database_connections=database_connections,
-                timestamp=datetime.now()
+                active_connections=in_flight,
+                requests_per_minute=window.count,
+                average_response_time=summary['avg'],
+                error_rate=summary['error_rate'],
+                database_connections=get_pool_stats()['in_use'],
+                timestamp=datetime.now(),
+                p95_response_time=summary['p95'],
+                p99_response_time=summary['p99']
             )
         except Exception as e:
             logger.error(f"Erro ao coletar métricas da aplicação: {e}")
@@ -163,35 +358,26 @@ class RSMHealthCheck:
     def get_business_metrics(self) -> BusinessMetrics:
         """Coleta métricas de negócio"""
         try:
-            from database import get_db_connection
-            
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Total de laudos
-            cursor.execute('SELECT COUNT(*) FROM laudos')
-            total_laudos = cursor.fetchone()[0]
-            
-            # Laudos hoje
-            today = datetime.now().strftime('%Y-%m-%d')
-            cursor.execute('SELECT COUNT(*) FROM laudos WHERE DATE(created_at) = ?', (today,))
-            laudos_today = cursor.fetchone()[0]
+            from database import db_connection
             
-            # Pendentes de aprovação
-            cursor.execute('SELECT COUNT(*) FROM laudos WHERE status = "em_andamento"')
-            pending_approvals = cursor.fetchone()[0]
+            with db_connection() as conn:
+                cursor = conn.cursor()
             
-            # Usuários ativos (últimas 24h)
-            yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
-            cursor.execute('SELECT COUNT(DISTINCT user_id) FROM laudos WHERE created_at > ?', (yesterday,))
-            active_users = cursor.fetchone()[0]
+                # Total, hoje, pendentes e aprovados vêm dos contadores mantidos por triggers
+                today = datetime.now().strftime('%Y-%m-%d')
+                counters = read_counters(cursor, today)
+                total_laudos = counters['total']
+                laudos_today = counters['hoje']
+                pending_approvals = count_status(counters, PENDING_STATUSES)
             
-            # Taxa de conversão (aprovados / total)
-            cursor.execute('SELECT COUNT(*) FROM laudos WHERE status IN ("aprovado_manutencao", "aprovado_vendas")')
-            approved = cursor.fetchone()[0]
-            conversion_rate = (approved / total_laudos * 100) if total_laudos > 0 else 0
+                # Usuários ativos (últimas 24h) - faixa no índice de created_at
+                yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+                cursor.execute('SELECT COUNT(DISTINCT user_id) FROM laudos WHERE created_at > ?', (yesterday,))
+                active_users = cursor.fetchone()[0]
             
-            conn.close()
+                # Taxa de conversão (aprovados / total)
+                approved = count_status(counters, APPROVED_STATUSES)
+                conversion_rate = (approved / total_laudos * 100) if total_laudos > 0 else 0
             
             return BusinessMetrics(
                 total_laudos=total_laudos,
@@ -208,120 +394,94 @@ class RSMHealthCheck:
     def save_metrics(self, system_metrics: SystemMetrics, app_metrics: ApplicationMetrics, business_metrics: BusinessMetrics):
         """Salva métricas no banco de dados"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._connection() as conn:
+                cursor = conn.cursor()
             
-            # Salvar métricas do sistema
-            cursor.execute('''
-                INSERT INTO system_metrics (cpu_percent, memory_percent, disk_percent, network_sent, network_recv, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (system_metrics.cpu_percent, system_metrics.memory_percent, system_metrics.disk_percent,
-                  system_metrics.network_sent, system_metrics.network_recv, system_metrics.timestamp))
+                # Salvar métricas do sistema
+                cursor.execute('''
+                    INSERT INTO system_metrics (cpu_percent, memory_percent, disk_percent, network_sent, network_recv, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (system_metrics.cpu_percent, system_metrics.memory_percent, system_metrics.disk_percent,
+                      system_metrics.network_sent, system_metrics.network_recv, system_metrics.timestamp))
             
-            # Salvar métricas da aplicação
-            cursor.execute('''
-                INSERT INTO app_metrics (active_connections, requests_per_minute, average_response_time, error_rate, database_connections, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (app_metrics.active_connections, app_metrics.requests_per_minute, app_metrics.average_response_time,
-                  app_metrics.error_rate, app_metrics.database_connections, app_metrics.timestamp))
+                # Salvar métricas da aplicação
+                cursor.execute('''
+                    INSERT INTO app_metrics (active_connections, requests_per_minute, average_response_time, error_rate,
+                                             database_connections, p95_response_time, p99_response_time, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (app_metrics.active_connections, app_metrics.requests_per_minute, app_metrics.average_response_time,
+                      app_metrics.error_rate, app_metrics.database_connections, app_metrics.p95_response_time,
+                      app_metrics.p99_response_time, app_metrics.timestamp))
             
-            # Salvar métricas de negócio
-            cursor.execute('''
-                INSERT INTO business_metrics (total_laudos, laudos_today, pending_approvals, active_users, conversion_rate, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (business_metrics.total_laudos, business_metrics.laudos_today, business_metrics.pending_approvals,
-                  business_metrics.active_users, business_metrics.conversion_rate, business_metrics.timestamp))
+                # Salvar métricas de negócio
+                cursor.execute('''
+                    INSERT INTO business_metrics (total_laudos, laudos_today, pending_approvals, active_users, conversion_rate, timestamp)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (business_metrics.total_laudos, business_metrics.laudos_today, business_metrics.pending_approvals,
+                      business_metrics.active_users, business_metrics.conversion_rate, business_metrics.timestamp))
             
-            conn.commit()
-            conn.close()
+                conn.commit()
             
         except Exception as e:
             logger.error(f"Erro ao salvar métricas: {e}")
     
     def check_alerts(self, system_metrics: SystemMetrics, app_metrics: ApplicationMetrics, business_metrics: BusinessMetrics):
-        """Verifica e cria alertas baseados nas métricas"""
-        alerts = []
-        
-        # Alertas do sistema
-        if system_metrics.cpu_percent > 80:
-            alerts.append({
-                'type': 'system',
-                'severity': 'warning',
-                'message': f'CPU usage alto: {system_metrics.cpu_percent:.1f}%'
-            })
-        
-        if system_metrics.memory_percent > 85:
-            alerts.append({
-                'type': 'system',
-                'severity': 'critical',
-                'message': f'Memória crítica: {system_metrics.memory_percent:.1f}%'
-            })
-        
-        if system_metrics.disk_percent > 90:
-            alerts.append({
-                'type': 'system',
-                'severity': 'critical',
-                'message': f'Disco quase cheio: {system_metrics.disk_percent:.1f}%'
-            })
-        
-        # Alertas da aplicação
-        if app_metrics.error_rate > 5:
-            alerts.append({
-                'type': 'application',
-                'severity': 'warning',
-                'message': f'Taxa de erro alta: {app_metrics.error_rate:.1f}%'
-            })
-        
-        if app_metrics.average_response_time > 2.0:
-            alerts.append({
-                'type': 'application',
-                'severity': 'warning',
-                'message': f'Tempo de resposta lento: {app_metrics.average_response_time:.2f}s'
-            })
+        """Avalia as regras de alerta (abre uma vez, resolve após normalizar)"""
+        values: Dict[str, float] = {}
+        for metrics in (system_metrics, app_metrics, business_metrics):
+            for name, value in vars(metrics).items():
+                if isinstance(value, (int, float)):
+                    values[name] = value
         
-        # Alertas de negócio
-        if business_metrics.conversion_rate < 70:
-            alerts.append({
-                'type': 'business',
-                'severity': 'warning',
-                'message': f'Taxa de conversão baixa: {business_metrics.conversion_rate:.1f}%'
-            })
-        
-        if business_metrics.pending_approvals > 50:
-            alerts.append({
-                'type': 'business',
-                'severity': 'info',
-                'message': f'Muitos laudos pendentes: {business_metrics.pending_approvals}'
-            })
-        
-        # Salvar alertas
-        if alerts:
-            self.save_alerts(alerts)
+        try:
+            return self.alert_manager.evaluate(values)
+        except Exception as e:
+            logger.error(f"Erro ao avaliar alertas: {e}")
     
-    def save_alerts(self, alerts: List[Dict[str, Any]]):
-        """Salva alertas no banco de dados"""
+    def load_latest_metrics(self):
+        """Seguidores: carrega a última coleta gravada pelo líder"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            for alert in alerts:
+            with self._connection() as conn:
+                cursor = conn.cursor()
                 cursor.execute('''
-                    INSERT INTO alerts (alert_type, severity, message, created_at)
-                    VALUES (?, ?, ?, ?)
-                ''', (alert['type'], alert['severity'], alert['message'], datetime.now()))
-            
-            conn.commit()
-            conn.close()
-            
+                    SELECT total_laudos, laudos_today, pending_approvals, active_users, conversion_rate, timestamp
+                    FROM business_metrics ORDER BY id DESC LIMIT 1
+                ''')
+                row = cursor.fetchone()
+        
+            if row:
+                self.last_business_metrics = BusinessMetrics(
+                    total_laudos=row[0],
+                    laudos_today=row[1],
+                    pending_approvals=row[2],
+                    active_users=row[3],
+                    conversion_rate=row[4],
+                    timestamp=datetime.fromisoformat(str(row[5]))
+                )
+            # Sistema é amostrado localmente (barato); a aplicação é atualizada pelo loop a cada tick
+            self.last_system_metrics = self.get_system_metrics()
         except Exception as e:
-            logger.error(f"Erro ao salvar alertas: {e}")
+            logger.error(f"Erro ao carregar métricas do líder: {e}")
     
     def get_health_status(self) -> Dict[str, Any]:
         """Retorna status geral de saúde do sistema"""
         try:
             system_metrics = self.get_system_metrics()
-            app_metrics = self.get_application_metrics()
-            business_metrics = self.get_business_metrics()
+            # Aplicação e negócio vêm da última coleta do loop (nenhuma consulta a cada leitura)
+            app_metrics = self.last_app_metrics
+            business_metrics = self.last_business_metrics
+            if app_metrics is None or business_metrics is None:
+                return {
+                    'status': 'starting',
+                    'status_color': 'gray',
+                    'health_score': None,
+                    'timestamp': datetime.now().isoformat(),
+                    'message': 'Aguardando a primeira coleta do monitoramento',
+                    'monitor': {
+                        'is_leader': self.is_leader,
+                        'owner': self.lease.owner
+                    }
+                }
             
             # Calcular score de saúde (0-100)
             health_score = 100
@@ -333,6 +493,8 @@ class RSMHealthCheck:
                 health_score -= 15
             if app_metrics.error_rate > 5:
                 health_score -= 10
+            if app_metrics.p95_response_time > 2.0:
+                health_score -= 10
             if business_metrics.conversion_rate < 70:
                 health_score -= 5
             
@@ -357,17 +519,26 @@ class RSMHealthCheck:
                 'system': {
                     'cpu_percent': system_metrics.cpu_percent,
                     'memory_percent': system_metrics.memory_percent,
-                    'disk_percent': system_metrics.disk_percent
+                    'disk_percent': system_metrics.disk_percent,
+                    'process_connections': system_metrics.process_connections,
+                    'sampled_at': system_metrics.timestamp.isoformat()
                 },
                 'application': {
                     'active_connections': app_metrics.active_connections,
+                    'requests_per_minute': app_metrics.requests_per_minute,
                     'error_rate': app_metrics.error_rate,
-                    'average_response_time': app_metrics.average_response_time
+                    'average_response_time': app_metrics.average_response_time,
+                    'p95_response_time': app_metrics.p95_response_time,
+                    'p99_response_time': app_metrics.p99_response_time
                 },
                 'business': {
                     'total_laudos': business_metrics.total_laudos,
                     'laudos_today': business_metrics.laudos_today,
                     'conversion_rate': business_metrics.conversion_rate
+                },
+                'monitor': {
+                    'is_leader': self.is_leader,
+                    'owner': self.lease.owner
                 }
             }
             
@@ -381,75 +552,166 @@ class RSMHealthCheck:
                 'error': str(e)
             }
     
+    def get_metrics_history(self, source: str, fields: Optional[List[str]], start: datetime, end: datetime,
+                            resolution: str = 'auto') -> Dict[str, Any]:
+        """Série temporal para dashboards (bruto, 5 min ou 1 hora, via índices)"""
+        return self.retention.query(source, fields, start, end, resolution)
+    
     def get_recent_alerts(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Retorna alertas recentes"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._connection() as conn:
+                cursor = conn.cursor()
             
-            cursor.execute('''
-                SELECT alert_type, severity, message, created_at, is_resolved
-                FROM alerts
-                ORDER BY created_at DESC
-                LIMIT ?
-            ''', (limit,))
+                cursor.execute('''
+                    SELECT alert_type, severity, message, created_at, is_resolved,
+                           id, alert_key, last_seen, occurrences, resolved_at
+                    FROM alerts
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                ''', (limit,))
             
-            alerts = []
-            for row in cursor.fetchall():
-                alerts.append({
-                    'type': row[0],
-                    'severity': row[1],
-                    'message': row[2],
-                    'created_at': row[3],
-                    'is_resolved': bool(row[4])
-                })
+                alerts = []
+                for row in cursor.fetchall():
+                    alerts.append({
+                        'type': row[0],
+                        'severity': row[1],
+                        'message': row[2],
+                        'created_at': row[3],
+                        'is_resolved': bool(row[4]),
+                        'id': row[5],
+                        'key': row[6],
+                        'last_seen': row[7] or row[3],
+                        'occurrences': row[8] or 1,
+                        'resolved_at': row[9]
+                    })
             
-            conn.close()
             return alerts
             
         except Exception as e:
             logger.error(f"Erro ao obter alertas: {e}")
             return []
     
+    def reconcile_counters(self) -> int:
+        """Recalcula os contadores de laudos a partir da tabela laudos"""
+        from database import db_connection
+        
+        with db_connection() as conn:
+            return reconcile_counters(conn)
+    
+    def backfill_defect_categories(self, max_batches: Optional[int] = DEFECT_BACKFILL_MAX_BATCHES) -> int:
+        """Classifica em lotes os laudos ainda sem categoria de defeito (no máximo max_batches lotes)"""
+        from database import db_connection
+        
+        with db_connection() as conn:
+            return backfill_defect_categories(conn, max_batches=max_batches)
+    
     def start_monitoring(self, interval: int = 60):
         """Inicia monitoramento contínuo"""
         if self.is_monitoring:
             return
         
         self.is_monitoring = True
+        self.start_system_sampler()
+        
+        def collect():
+            # Coletar métricas
+            system_metrics = self.get_system_metrics()
+            app_metrics = self.last_app_metrics
+            business_metrics = self.get_business_metrics()
+            self.last_system_metrics = system_metrics
+            self.last_business_metrics = business_metrics
+            
+            # Salvar métricas
+            self.save_metrics(system_metrics, app_metrics, business_metrics)
+            
+            # Verificar alertas
+            self.check_alerts(system_metrics, app_metrics, business_metrics)
+            
+            logger.info(f"Monitoramento: CPU {system_metrics.cpu_percent:.1f}%, "
+                      f"Memória {system_metrics.memory_percent:.1f}%, "
+                      f"Laudos hoje: {business_metrics.laudos_today}")
         
         def monitor_loop():
+            next_run = 0.0
+            next_retention = 0.0
+            next_reconcile = time.monotonic() + COUNTERS_RECONCILE_INTERVAL
+            next_backfill = 0.0
+            # Renova o lease bem antes de expirar, mesmo com intervalos de coleta longos
+            tick = min(interval, self.lease.ttl / 3)
             while self.is_monitoring:
                 try:
-                    # Coletar métricas
-                    system_metrics = self.get_system_metrics()
-                    app_metrics = self.get_application_metrics()
-                    business_metrics = self.get_business_metrics()
+                    # Todo worker publica suas requisições; só o líder as grava e avalia alertas
+                    self.publish_request_window()
+                except Exception as e:
+                    logger.error(f"Erro ao publicar métricas de requisições: {e}")
+                
+                # Única leitura da janela do cluster; /admin/health-status usa este snapshot
+                self.last_app_metrics = self.get_application_metrics()
+                
+                try:
+                    was_leader = self.is_leader
+                    self.is_leader = self.lease.acquire()
+                    if self.is_leader != was_leader:
+                        # Novo líder recarrega do banco os alertas abertos
+                        self.alert_manager.reset()
+                        logger.info(f"Monitoramento: {'assumiu' if self.is_leader else 'perdeu'} a liderança ({self.lease.owner})")
+                        next_run = 0.0
+                    
+                    if time.monotonic() >= next_run:
+                        if self.is_leader:
+                            collect()
+                        else:
+                            self.load_latest_metrics()
+                        next_run = time.monotonic() + interval
                     
-                    # Salvar métricas
-                    self.save_metrics(system_metrics, app_metrics, business_metrics)
+                    # Rollup e poda também são tarefa exclusiva do líder
+                    if self.is_leader and time.monotonic() >= next_retention:
+                        self.retention.run()
+                        next_retention = time.monotonic() + RETENTION_INTERVAL
                     
-                    # Verificar alertas
-                    self.check_alerts(system_metrics, app_metrics, business_metrics)
+                    # Reconciliação dos contadores de laudos (corrige divergências dos triggers)
+                    if self.is_leader and time.monotonic() >= next_reconcile:
+                        self.reconcile_counters()
+                        next_reconcile = time.monotonic() + COUNTERS_RECONCILE_INTERVAL
                     
-                    logger.info(f"Monitoramento: CPU {system_metrics.cpu_percent:.1f}%, "
-                              f"Memória {system_metrics.memory_percent:.1f}%, "
-                              f"Laudos hoje: {business_metrics.laudos_today}")
+                    # Laudos sem categoria de defeito (scripts, mudança de regras)
+                    # Execução limitada para o tick terminar bem antes do lease expirar; se ainda
+                    # restam pendentes (migração 7, troca de regras), continua no próximo tick
+                    if self.is_leader and time.monotonic() >= next_backfill:
+                        classified = self.backfill_defect_categories()
+                        if classified >= DEFECT_BACKFILL_BATCH * DEFECT_BACKFILL_MAX_BATCHES:
+                            next_backfill = 0.0
+                        else:
+                            next_backfill = time.monotonic() + DEFECT_BACKFILL_INTERVAL
                     
                 except Exception as e:
                     logger.error(f"Erro no loop de monitoramento: {e}")
                 
-                time.sleep(interval)
+                time.sleep(tick)
         
         # Iniciar thread de monitoramento
         monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
         monitor_thread.start()
         
+        atexit.register(self.stop_monitoring)
         logger.info(f"Monitoramento iniciado com intervalo de {interval} segundos")
     
     def stop_monitoring(self):
         """Para o monitoramento"""
+        if not self.is_monitoring:
+            return
         self.is_monitoring = False
+        self._sampler_running = False
+        try:
+            with self._connection() as conn:
+                conn.execute("DELETE FROM worker_request_windows WHERE owner = ?", (self.lease.owner,))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao remover janela de requisições do worker: {e}")
+        if self.is_leader:
+            self.lease.release()
+            self.is_leader = False
         logger.info("Monitoramento parado")
 
 # Instância global do monitoramento
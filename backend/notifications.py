@@ -0,0 +1,75 @@
+"""
+Notificações do RSM (fan-out na leitura)
+Um evento por acontecimento em notification_events; o estado de leitura fica em notification_reads
+created_at e read_at usam CURRENT_TIMESTAMP (UTC), como o restante do banco
+"""
+
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+# Tipos de evento emitidos pelo fluxo de laudos
+EVENT_TAG_UPDATE = 'tag_update'
+EVENT_LAUDO_APROVADO = 'laudo_aprovado'
+EVENT_LAUDO_FINALIZADO = 'laudo_finalizado'
+
+DEFAULT_LIMIT = 50
+
+def publish_event(cursor: sqlite3.Cursor, event_type: str, message: str,
+                  laudo_id: Optional[int] = None, actor_id: Optional[int] = None,
+                  target_user_id: Optional[int] = None) -> int:
+    """Registra um evento (broadcast se target_user_id for None) na transação corrente"""
+    cursor.execute('''
+        INSERT INTO notification_events (target_user_id, type, message, laudo_id, actor_id, created_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ''', (target_user_id, event_type, message, laudo_id, actor_id))
+    return cursor.lastrowid
+
+def get_user_notifications(cursor: sqlite3.Cursor, user_id: int, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+    """Eventos direcionados ao usuário + broadcasts, mais recentes primeiro"""
+    # Cada ramo faz seek no índice (target_user_id, id); o merge fica limitado a 2 * limit linhas
+    cursor.execute('''
+        SELECT e.id, e.type, e.message, e.created_at, e.laudo_id,
+               e.target_user_id IS NULL AS broadcast,
+               EXISTS (
+                   SELECT 1 FROM notification_reads r
+                   WHERE r.user_id = ? AND r.event_id = e.id
+               ) AS read
+        FROM (
+            SELECT * FROM (
+                SELECT id FROM notification_events
+                WHERE target_user_id = ?
+                ORDER BY id DESC LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT id FROM notification_events
+                WHERE target_user_id IS NULL
+                ORDER BY id DESC LIMIT ?
+            )
+        ) ids
+        JOIN notification_events e ON e.id = ids.id
+        ORDER BY e.id DESC
+        LIMIT ?
+    ''', (user_id, user_id, limit, limit, limit))
+
+    return [
+        {
+            'id': row[0],
+            'type': row[1],
+            'message': row[2],
+            'created_at': row[3],
+            'laudo_id': row[4],
+            'broadcast': bool(row[5]),
+            'read': bool(row[6])
+        }
+        for row in cursor.fetchall()
+    ]
+
+def mark_read(cursor: sqlite3.Cursor, user_id: int, event_id: int) -> bool:
+    """Grava o recibo de leitura se o evento for visível ao usuário"""
+    cursor.execute('''
+        INSERT OR IGNORE INTO notification_reads (user_id, event_id, read_at)
+        SELECT ?, id, CURRENT_TIMESTAMP FROM notification_events
+        WHERE id = ? AND (target_user_id IS NULL OR target_user_id = ?)
+    ''', (user_id, event_id, user_id))
+    return cursor.rowcount > 0
@@ -0,0 +1,81 @@
+"""
+Paginação por cursor (keyset) para as listagens de laudos
+O cursor é opaco para o cliente e codifica a última chave (valor de ordenação, id) da página
+"""
+
+import os
+import json
+import base64
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = int(os.getenv("LAUDOS_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("LAUDOS_MAX_PAGE_SIZE", "500"))
+
+# Cabeçalho onde o próximo cursor é devolvido (corpo continua sendo a lista)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursorError(ValueError):
+    """Cursor malformado ou gerado para outra ordenação"""
+
+def encode_cursor(sort_key: str, sort_value: Any, row_id: int) -> str:
+    """Gera o token opaco da próxima página"""
+    payload = json.dumps({'k': sort_key, 'v': sort_value, 'id': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(token: str, sort_key: str) -> Tuple[Any, int]:
+    """Lê um token e valida que pertence à mesma ordenação"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if data['k'] != sort_key:
+            raise InvalidCursorError("Cursor não corresponde a esta listagem")
+        return data['v'], int(data['id'])
+    except InvalidCursorError:
+        raise
+    except Exception:
+        raise InvalidCursorError("Cursor inválido")
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """Limita o tamanho da página ao intervalo permitido"""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+def fetch_keyset_page(
+    cursor: sqlite3.Cursor,
+    base_query: str,
+    params: Sequence[Any],
+    sort_column: str,
+    id_column: str = "l.id",
+    limit: Optional[int] = None,
+    page_cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Executa uma página ordenada por (sort_column, id) DESC.
+
+    base_query deve terminar na cláusula WHERE (sem ORDER BY/LIMIT). A busca
+    usa comparação de row values, então o índice (.., sort_column) faz o seek
+    direto para a posição do cursor em vez de pular linhas com OFFSET.
+    """
+    page_size = clamp_page_size(limit)
+    sort_key = sort_column.split('.')[-1]
+    query = base_query
+    args = list(params)
+
+    if page_cursor:
+        last_value, last_id = decode_cursor(page_cursor, sort_key)
+        query += f" AND ({sort_column}, {id_column}) < (?, ?)"
+        args.extend([last_value, last_id])
+
+    query += f" ORDER BY {sort_column} DESC, {id_column} DESC LIMIT ?"
+    args.append(page_size + 1)
+
+    cursor.execute(query, args)
+    rows = [dict(row) for row in cursor.fetchall()]
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_key, last[sort_key], last['id'])
+    return rows, next_cursor
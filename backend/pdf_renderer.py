@@ -0,0 +1,275 @@
+"""
+Renderização de PDF dos laudos com reportlab
+O layout roda em um pool de processos limitado e o resultado fica em cache no disco,
+indexado por (laudo_id, updated_at, status, user_name) - qualquer alteração no laudo (ou no nome
+do técnico impresso nele) gera uma nova chave
+
+Este módulo não importa app/database: os workers (forkserver ou spawn) carregam apenas ele
+e o reportlab, sem herdar a memória, as threads e as conexões SQLite do processo da API.
+"""
+
+import os
+import io
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+from xml.sax.saxutils import escape
+
+from prometheus import Histogram
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_CACHE_DIR = Path(os.getenv("PDF_CACHE_DIR", str(Path(__file__).parent / "pdf_cache")))
+# fork copiaria o processo da API com threads (monitoramento, pool SQLite) e locks em uso;
+# o forkserver parte de um processo limpo que já importou só o necessário para o layout
+PDF_START_METHOD = os.getenv(
+    "PDF_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# Importados uma vez no forkserver: cada worker nasce com o reportlab carregado
+PDF_PRELOAD_MODULES = ['pdf_renderer', 'reportlab.platypus']
+PDF_RENDER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Incrementar quando o layout mudar, para invalidar o cache inteiro
+RENDER_VERSION = "1"
+
+STATUS_INFO = {
+    'em_andamento': {'label': 'Em Andamento', 'color': '#f59e0b'},
+    'pendente': {'label': 'Pendente', 'color': '#3b82f6'},
+    'ap_manutencao': {'label': 'Aprovado - Manutenção', 'color': '#10b981'},
+    'aguardando_orcamento': {'label': 'Aguardando Orçamento', 'color': '#8b5cf6'},
+    'ap_vendas': {'label': 'Aprovado - Vendas', 'color': '#6366f1'},
+    'finalizado': {'label': 'Finalizado', 'color': '#059669'},
+    'reprovado': {'label': 'Reprovado', 'color': '#ef4444'}
+}
+
+def status_info(status: Optional[str]) -> Dict[str, str]:
+    return STATUS_INFO.get(status, {'label': status or '', 'color': '#6b7280'})
+
+def format_datetime(value: Any, default: str = 'Não informado') -> str:
+    """Formata timestamps do SQLite ('YYYY-MM-DD HH:MM:SS' ou ISO) como dd/mm/aaaa às HH:MM"""
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(str(value)).strftime('%d/%m/%Y às %H:%M')
+    except ValueError:
+        return str(value)
+
+# === LAYOUT (executado nos workers) ===
+
+def render_laudo_pdf(laudo: Dict[str, Any]) -> bytes:
+    """Gera o PDF do laudo e retorna os bytes (função pura, roda no pool de processos)"""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    def text(value: Any, default: str = 'Não informado') -> str:
+        value = value if value not in (None, '') else default
+        return escape(str(value)).replace('\n', '<br/>')
+
+    styles = getSampleStyleSheet()
+    brand = colors.HexColor('#1e40af')
+    logo_style = ParagraphStyle('Logo', parent=styles['Normal'], fontSize=14, textColor=brand,
+                                alignment=TA_CENTER, fontName='Helvetica-Bold')
+    title_style = ParagraphStyle('Titulo', parent=styles['Title'], fontSize=22, spaceAfter=4)
+    subtitle_style = ParagraphStyle('Subtitulo', parent=styles['Normal'], alignment=TA_CENTER,
+                                    textColor=colors.HexColor('#6b7280'))
+    label_style = ParagraphStyle('Rotulo', parent=styles['Normal'], fontName='Helvetica-Bold',
+                                 fontSize=9, textColor=colors.HexColor('#374151'))
+    value_style = ParagraphStyle('Valor', parent=styles['Normal'], fontSize=11)
+    section_style = ParagraphStyle('Secao', parent=styles['Heading2'], fontSize=13,
+                                   textColor=colors.HexColor('#1f2937'), spaceBefore=12, spaceAfter=6)
+    body_style = ParagraphStyle('Corpo', parent=styles['Normal'], fontSize=10.5, leading=15,
+                                alignment=TA_JUSTIFY)
+    footer_style = ParagraphStyle('Rodape', parent=styles['Normal'], fontSize=8.5,
+                                  textColor=colors.HexColor('#6b7280'), alignment=TA_CENTER)
+
+    status = status_info(laudo.get('status'))
+    story = [
+        Paragraph('RSM - Rede de Serviços Moura', logo_style),
+        Spacer(1, 6),
+        Paragraph('Laudo Técnico', title_style),
+        Paragraph('Sistema de Gestão de Laudos Técnicos', subtitle_style),
+        Spacer(1, 14),
+    ]
+
+    def cell(label: str, value: str):
+        return [Paragraph(label, label_style), Paragraph(value, value_style)]
+
+    status_markup = f'<font color="{status["color"]}"><b>{escape(status["label"])}</b></font>'
+    info = Table([
+        [cell('Número do Laudo:', f"#{laudo.get('id')}"), cell('Status:', status_markup)],
+        [cell('Cliente:', text(laudo.get('cliente') or laudo.get('nomeCliente'))),
+         cell('Equipamento:', text(laudo.get('equipamento')))],
+        [cell('Técnico Responsável:', text(laudo.get('user_name') or laudo.get('tecnicoResponsavel'))),
+         cell('Data de Criação:', text(format_datetime(laudo.get('created_at'))))],
+    ], colWidths=[8.5 * cm, 8.5 * cm])
+    info.setStyle(TableStyle([
+        ('BOX', (0, 0), (-1, -1), 0.5, colors.HexColor('#e5e7eb')),
+        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f8fafc')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ]))
+    story.append(info)
+
+    for title, field in [('Problema Relatado', 'problema_relatado'),
+                         ('Diagnóstico Técnico', 'diagnostico'),
+                         ('Solução Aplicada', 'solucao')]:
+        story.append(Paragraph(title, section_style))
+        story.append(Paragraph(text(laudo.get(field)), body_style))
+
+    if laudo.get('conclusaoFinal'):
+        story.append(Paragraph('Conclusão Final', section_style))
+        story.append(Paragraph(text(laudo.get('conclusaoFinal')), body_style))
+
+    signatures = Table([
+        ['', ''],
+        [Paragraph(f"<b>{text(laudo.get('user_name'), 'Técnico Responsável')}</b><br/>Técnico Responsável", footer_style),
+         Paragraph('<b>Cliente</b><br/>Assinatura', footer_style)],
+    ], colWidths=[8.5 * cm, 8.5 * cm], rowHeights=[1.6 * cm, None])
+    signatures.setStyle(TableStyle([
+        ('LINEBELOW', (0, 0), (0, 0), 1, brand),
+        ('LINEBELOW', (1, 0), (1, 0), 1, brand),
+        ('LEFTPADDING', (0, 0), (-1, -1), 18),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 18),
+    ]))
+    story.extend([Spacer(1, 30), signatures, Spacer(1, 24)])
+
+    story.append(Paragraph('Documento gerado automaticamente pelo sistema RSM - Rede de Serviços Moura', footer_style))
+    story.append(Paragraph(f"Última atualização: {escape(format_datetime(laudo.get('updated_at'), 'Não atualizado'))}", footer_style))
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4,
+        leftMargin=2 * cm, rightMargin=2 * cm, topMargin=1.8 * cm, bottomMargin=1.8 * cm,
+        title=f"Laudo Técnico #{laudo.get('id')} - RSM Moura", author='RSM - Rede de Serviços Moura'
+    )
+    doc.build(story)
+    return buffer.getvalue()
+
+# === POOL + CACHE (executado no processo da API) ===
+
+class PDFRenderService:
+    """Pool de processos limitado + cache em disco dos PDFs"""
+
+    def __init__(self, cache_dir: Path = PDF_CACHE_DIR, max_workers: int = PDF_WORKERS):
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._inflight: Dict[str, "asyncio.Future[Path]"] = {}
+
+        # Estatísticas
+        self.renders = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.render_seconds_total = 0.0
+        self.last_render_seconds = 0.0
+        self.render_seconds = Histogram(PDF_RENDER_BUCKETS)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # Criado sob demanda: os workers só executam render_laudo_pdf
+                    context = multiprocessing.get_context(PDF_START_METHOD)
+                    if PDF_START_METHOD == 'forkserver':
+                        context.set_forkserver_preload(PDF_PRELOAD_MODULES)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=context
+                    )
+        return self._executor
+
+    @staticmethod
+    def cache_key(laudo: Dict[str, Any]) -> str:
+        raw = f"{laudo.get('id')}|{laudo.get('updated_at')}|{laudo.get('status')}|{laudo.get('user_name')}|{RENDER_VERSION}"
+        return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+    def cache_path(self, laudo: Dict[str, Any]) -> Path:
+        return self.cache_dir / f"laudo_{laudo.get('id')}_{self.cache_key(laudo)}.pdf"
+
+    def _store(self, laudo: Dict[str, Any], data: bytes) -> Path:
+        """Grava de forma atômica e remove versões antigas do mesmo laudo"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_path(laudo)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        for stale in self.cache_dir.glob(f"laudo_{laudo.get('id')}_*.pdf"):
+            if stale != path:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+        return path
+
+    async def get_pdf(self, laudo: Dict[str, Any]) -> Path:
+        """Caminho do PDF em cache, renderizando no pool se necessário"""
+        path = self.cache_path(laudo)
+        if path.exists():
+            self.cache_hits += 1
+            return path
+
+        # Requisições simultâneas do mesmo laudo aguardam a mesma renderização
+        key = path.name
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Path]" = loop.create_future()
+        self._inflight[key] = future
+        started = time.perf_counter()
+        try:
+            data = await asyncio.wrap_future(self._get_executor().submit(render_laudo_pdf, laudo))
+            path = await loop.run_in_executor(None, self._store, laudo, data)
+            elapsed = time.perf_counter() - started
+            self.renders += 1
+            self.render_seconds_total += elapsed
+            self.last_render_seconds = elapsed
+            self.render_seconds.observe(elapsed)
+            future.set_result(path)
+            return path
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Erro ao renderizar PDF do laudo {laudo.get('id')}: {e}")
+            if isinstance(e, BrokenProcessPool):
+                # Worker morreu: o próximo pedido recria o pool
+                self._executor = None
+            future.set_exception(e)
+            # Marca a exceção como recuperada caso ninguém mais aguarde
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.max_workers,
+            'renders': self.renders,
+            'cache_hits': self.cache_hits,
+            'failures': self.failures,
+            'render_seconds_total': round(self.render_seconds_total, 4),
+            'last_render_seconds': round(self.last_render_seconds, 4),
+            'inflight': len(self._inflight)
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+pdf_service = PDFRenderService()
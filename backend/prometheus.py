@@ -0,0 +1,123 @@
+"""
+Primitivas de métricas no formato de exposição do Prometheus
+Módulo folha (sem dependências do app) para poder ser usado pelo pool, PDF e SSE
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+Labels = Dict[str, str]
+
+# Buckets padrão para durações curtas (consultas, renderizações), em segundos
+DURATION_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+class Histogram:
+    """Histograma cumulativo thread-safe (observe pode vir de qualquer thread)"""
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS):
+        bounds = tuple(sorted(buckets))
+        if not bounds or bounds[-1] != math.inf:
+            bounds += (math.inf,)
+        self.buckets = bounds
+        self._counts = [0] * len(bounds)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """(contagens por bucket, não cumulativas; soma)"""
+        with self._lock:
+            return list(self._counts), self._sum
+
+class LabeledHistogram:
+    """Um Histogram por valor de label (cardinalidade baixa e conhecida)"""
+
+    def __init__(self, buckets: Sequence[float] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._children: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, value: str) -> Histogram:
+        child = self._children.get(value)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(value, Histogram(self.buckets))
+        return child
+
+    def items(self) -> List[Tuple[str, Histogram]]:
+        return list(self._children.items())
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Optional[Labels]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Exposition:
+    """Monta o texto de exposição (text/plain; version=0.0.4)"""
+
+    # O Starlette acrescenta "; charset=utf-8" a tipos text/*
+    CONTENT_TYPE = "text/plain; version=0.0.4"
+
+    def __init__(self, prefix: str = "rsm_"):
+        self.prefix = prefix
+        self._lines: List[str] = []
+
+    def _header(self, name: str, kind: str, help_text: str) -> str:
+        full_name = self.prefix + name
+        self._lines.append(f"# HELP {full_name} {help_text}")
+        self._lines.append(f"# TYPE {full_name} {kind}")
+        return full_name
+
+    def metric(self, name: str, kind: str, help_text: str,
+               samples: Iterable[Tuple[Optional[Labels], float]]):
+        """Counter ou gauge com uma amostra por conjunto de labels"""
+        full_name = self._header(name, kind, help_text)
+        for labels, value in samples:
+            if value is None:
+                continue
+            self._lines.append(f"{full_name}{_format_labels(labels)} {_format_value(value)}")
+
+    def gauge(self, name: str, help_text: str, value: float, labels: Optional[Labels] = None):
+        self.metric(name, 'gauge', help_text, [(labels, value)])
+
+    def counter(self, name: str, help_text: str, value: float, labels: Optional[Labels] = None):
+        self.metric(name, 'counter', help_text, [(labels, value)])
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float],
+                  series: Iterable[Tuple[Optional[Labels], Sequence[int], float]]):
+        """series: (labels, contagens não cumulativas por bucket, soma)"""
+        full_name = self._header(name, 'histogram', help_text)
+        for labels, counts, total in series:
+            labels = labels or {}
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                bucket_labels = {**labels, 'le': _format_value(bound)}
+                self._lines.append(f"{full_name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            self._lines.append(f"{full_name}_sum{_format_labels(labels)} {_format_value(total)}")
+            self._lines.append(f"{full_name}_count{_format_labels(labels)} {cumulative}")
+
+    def render(self) -> str:
+        return '\n'.join(self._lines) + '\n'
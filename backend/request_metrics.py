@@ -0,0 +1,227 @@
+"""
+Métricas de requisições HTTP (middleware ASGI)
+Contagem por rota, classes de status e latência em histogramas de buckets fixos,
+acumulados desde o início do processo e em janelas deslizantes (p50/p95/p99)
+
+Sem locks: o registro acontece sempre na thread do event loop; leitores de outras
+threads (loop do monitoramento) copiam as listas e aceitam uma leitura levemente defasada.
+"""
+
+import os
+import time
+import bisect
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Limites superiores dos buckets de latência, em segundos (último = +Inf)
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+    1.0, 2.5, 5.0, 7.5, 10.0, 30.0, float('inf')
+)
+STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+
+# Cada fatia da janela deslizante cobre SLOT_SECONDS; guardamos WINDOW_SLOTS fatias
+SLOT_SECONDS = int(os.getenv("METRICS_SLOT_SECONDS", "10"))
+WINDOW_SLOTS = int(os.getenv("METRICS_WINDOW_SLOTS", "60"))
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+class RouteStats:
+    """Contadores de uma rota (ou do total) em um intervalo"""
+
+    __slots__ = ('count', 'status', 'buckets', 'latency_sum')
+
+    def __init__(self):
+        self.count = 0
+        self.status = [0] * len(STATUS_CLASSES)
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+
+    def record(self, status_code: int, seconds: Optional[float]):
+        self.count += 1
+        self.status[min(max(status_code // 100, 1), 5) - 1] += 1
+        if seconds is not None:
+            self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.latency_sum += seconds
+
+    def merge(self, other: "RouteStats"):
+        self.count += other.count
+        for i, value in enumerate(list(other.status)):
+            self.status[i] += value
+        for i, value in enumerate(list(other.buckets)):
+            self.buckets[i] += value
+        self.latency_sum += other.latency_sum
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma serializável (publicação da janela no monitoring.db)"""
+        return {'count': self.count, 'status': list(self.status), 'buckets': list(self.buckets),
+                'latency_sum': self.latency_sum}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RouteStats":
+        stats = cls()
+        stats.count = data['count']
+        stats.status = list(data['status'])
+        stats.buckets = list(data['buckets'])
+        stats.latency_sum = data['latency_sum']
+        return stats
+
+    @property
+    def timed_count(self) -> int:
+        return sum(self.buckets)
+
+    def quantile(self, q: float) -> float:
+        """Estimativa do quantil por interpolação linear dentro do bucket"""
+        total = self.timed_count
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(LATENCY_BUCKETS, self.buckets):
+            if count and seen + count >= rank:
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper if upper != float('inf') else lower
+        return lower
+
+    def summary(self) -> Dict[str, Any]:
+        timed = self.timed_count
+        errors = self.status[4]
+        return {
+            'count': self.count,
+            'status': dict(zip(STATUS_CLASSES, self.status)),
+            'error_rate': round(errors / self.count * 100, 2) if self.count else 0.0,
+            'avg': round(self.latency_sum / timed, 4) if timed else 0.0,
+            'p50': round(self.quantile(0.50), 4),
+            'p95': round(self.quantile(0.95), 4),
+            'p99': round(self.quantile(0.99), 4)
+        }
+
+class RequestMetrics:
+    """Registro global de métricas de requisições deste processo"""
+
+    def __init__(self, slot_seconds: int = SLOT_SECONDS, window_slots: int = WINDOW_SLOTS,
+                 clock: Callable[[], float] = time.time):
+        self.slot_seconds = slot_seconds
+        self.window_slots = window_slots
+        self.clock = clock
+        self.started_at = clock()
+        self.in_flight = 0
+        # Acumulado desde o início (base para exportação de contadores)
+        self.totals: Dict[str, RouteStats] = {}
+        # Anel de fatias: índice -> (número da fatia, {rota: RouteStats})
+        self._slots: List[Tuple[int, Dict[str, RouteStats]]] = [(-1, {}) for _ in range(window_slots)]
+
+    def _current_slot(self, now: float) -> Dict[str, RouteStats]:
+        slot_number = int(now // self.slot_seconds)
+        index = slot_number % self.window_slots
+        number, routes = self._slots[index]
+        if number != slot_number:
+            # Fatia expirada: substitui por uma nova (uma atribuição, sem lock)
+            routes = {}
+            self._slots[index] = (slot_number, routes)
+        return routes
+
+    def record(self, route: str, status_code: int, seconds: Optional[float]):
+        """Registra uma requisição concluída (seconds=None para streams longos)"""
+        stats = self.totals.get(route)
+        if stats is None:
+            stats = self.totals[route] = RouteStats()
+        stats.record(status_code, seconds)
+
+        routes = self._current_slot(self.clock())
+        stats = routes.get(route)
+        if stats is None:
+            stats = routes[route] = RouteStats()
+        stats.record(status_code, seconds)
+
+    def window(self, seconds: Optional[int] = None) -> Dict[str, RouteStats]:
+        """Soma por rota das fatias que caem nos últimos `seconds` segundos"""
+        span = self.slot_seconds * self.window_slots if seconds is None else seconds
+        current = int(self.clock() // self.slot_seconds)
+        oldest = current - max(1, -(-span // self.slot_seconds)) + 1
+        merged: Dict[str, RouteStats] = {}
+        for number, routes in list(self._slots):
+            if number < oldest or number > current:
+                continue
+            for route, stats in list(routes.items()):
+                target = merged.get(route)
+                if target is None:
+                    target = merged[route] = RouteStats()
+                target.merge(stats)
+        return merged
+
+    def window_total(self, seconds: Optional[int] = None) -> RouteStats:
+        total = RouteStats()
+        for stats in self.window(seconds).values():
+            total.merge(stats)
+        return total
+
+    def snapshot(self, seconds: int = 60) -> Dict[str, Any]:
+        """Resumo da janela: total + por rota, ordenado por volume"""
+        per_route = self.window(seconds)
+        total = RouteStats()
+        for stats in per_route.values():
+            total.merge(stats)
+        routes = sorted(per_route.items(), key=lambda item: item[1].count, reverse=True)
+        return {
+            'window_seconds': seconds,
+            'in_flight': self.in_flight,
+            'uptime_seconds': round(self.clock() - self.started_at, 1),
+            'total': total.summary(),
+            'routes': {route: stats.summary() for route, stats in routes}
+        }
+
+request_metrics = RequestMetrics()
+
+class RequestMetricsMiddleware:
+    """Middleware ASGI puro: mede cada requisição HTTP e registra pelo template da rota"""
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+        self._route_paths: Dict[Any, str] = {}
+
+    def _route_label(self, scope) -> str:
+        endpoint = scope.get('endpoint')
+        router = scope.get('router')
+        if endpoint is None or router is None:
+            return UNMATCHED_ROUTE
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            # Rotas são fixas após o startup: o mapa é montado uma vez
+            self._route_paths = {
+                getattr(route, 'endpoint', None): getattr(route, 'path', UNMATCHED_ROUTE)
+                for route in router.routes
+            }
+            path = self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+        return f"{scope['method']} {path}"
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, streaming
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                for name, value in message.get('headers', []):
+                    if name.lower() == b'content-type' and value.startswith(b'text/event-stream'):
+                        streaming = True
+            await send(message)
+
+        self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.in_flight -= 1
+            # Conexões SSE duram minutos: contam como requisição, mas não entram na latência
+            elapsed = None if streaming else time.perf_counter() - started
+            self.metrics.record(self._route_label(scope), status_code, elapsed)
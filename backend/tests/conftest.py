@@ -0,0 +1,83 @@
+"""
+Fixtures dos testes do backend
+Todos os bancos (laudos, monitoramento, limite de login, cache de PDFs) ficam em um
+diretório temporário: as variáveis de ambiente são definidas antes de importar o app.
+"""
+
+import os
+import sys
+import hashlib
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(tempfile.mkdtemp(prefix="laudos_tests_"))
+
+os.environ.update({
+    'LAUDOS_DB_PATH': str(DATA_DIR / "laudos.db"),
+    'MONITORING_DB_PATH': str(DATA_DIR / "monitoring.db"),
+    'LOGIN_LIMITS_DB': str(DATA_DIR / "login_limits.db"),
+    'PDF_CACHE_DIR': str(DATA_DIR / "pdf_cache"),
+    # Sem esperas: revogação e cache de usuários relidos a cada requisição, login falho sem delay
+    'TOKEN_REVOCATION_INTERVAL': "0",
+    'USER_CACHE_VERSION_INTERVAL': "0",
+    'LOGIN_FAILURE_DELAY': "0",
+})
+sys.path.insert(0, str(BACKEND_DIR))
+
+PASSWORD = '123456'
+
+from create_test_laudos import generate  # noqa: E402
+
+# Base pequena e determinística: admin, tecnico, vendedor, encarregado + laudos em vários status
+generate(os.environ['LAUDOS_DB_PATH'], users=5, laudos=250, avancados=5, notificacoes=20,
+         seed=7, end=date(2025, 1, 31), verbose=False)
+
+import app as app_module  # noqa: E402
+from database import db_connection  # noqa: E402
+from login_limiter import login_limiter  # noqa: E402
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_module.app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session", autouse=True)
+def stop_monitoring():
+    """O app inicia o monitoramento ao ser importado; para a thread antes de o pytest fechar a saída de log"""
+    yield
+    app_module.health_checker.stop_monitoring()
+
+@pytest.fixture(autouse=True)
+def reset_login_limits():
+    """Cada teste começa com os buckets de login cheios (o IP do TestClient é sempre o mesmo)"""
+    with login_limiter._connection() as conn:
+        conn.execute("DELETE FROM login_buckets")
+        conn.commit()
+    login_limiter._blocked_until.clear()
+    yield
+
+def create_user(username: str, user_type: str = 'tecnico', is_admin: bool = False) -> int:
+    """Usuário novo com a senha padrão; retorna o id"""
+    password_hash = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO users (username, password_hash, is_admin, user_type) VALUES (?, ?, ?, ?)",
+            (username, password_hash, is_admin, user_type)
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+def login(client, username: str, password: str = PASSWORD) -> dict:
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def auth_headers(client, username: str) -> dict:
+    return {'Authorization': f"Bearer {login(client, username)['access_token']}"}
@@ -0,0 +1,95 @@
+"""Alertas com deduplicação e histerese (AlertManager)"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from alerting import AlertManager, AlertRule, init_alert_schema
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2025, 1, 1, 12, 0, 0)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += timedelta(seconds=seconds)
+
+@pytest.fixture
+def manager(tmp_path):
+    db_path = tmp_path / "alerts.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.execute('''
+        CREATE TABLE alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            alert_type TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            message TEXT NOT NULL,
+            is_resolved BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            resolved_at TIMESTAMP
+        )
+    ''')
+    init_alert_schema(conn.cursor())
+    conn.commit()
+    conn.close()
+
+    rule = AlertRule('cpu_teste', 'system', 'warning', 'cpu_percent', 80, 70, 'CPU {value:.0f}%')
+    clock = Clock()
+    alerts = AlertManager(lambda: sqlite3.connect(str(db_path)), rules=[rule], clear_window=60,
+                          touch_interval=300, clock=clock)
+    alerts.clock_control = clock
+    alerts.db_path = db_path
+    return alerts
+
+def _rows(manager):
+    with sqlite3.connect(str(manager.db_path)) as conn:
+        return conn.execute("SELECT alert_key, is_resolved, occurrences FROM alerts ORDER BY id").fetchall()
+
+def test_alert_opens_once_while_condition_persists(manager):
+    assert manager.evaluate({'cpu_percent': 85})['opened'] == ['cpu_teste']
+    for _ in range(5):
+        manager.clock_control.advance(30)
+        assert manager.evaluate({'cpu_percent': 95}) == {'opened': [], 'resolved': []}
+
+    assert len(_rows(manager)) == 1
+
+def test_hysteresis_band_does_not_resolve(manager):
+    manager.evaluate({'cpu_percent': 85})
+    # Entre 70 e 80: nem dispara nem normaliza, por mais tempo que passe
+    for _ in range(10):
+        manager.clock_control.advance(30)
+        assert manager.evaluate({'cpu_percent': 75})['resolved'] == []
+
+    assert _rows(manager)[0][1] == 0
+
+def test_resolves_only_after_clear_window(manager):
+    manager.evaluate({'cpu_percent': 85})
+    manager.clock_control.advance(10)
+    manager.evaluate({'cpu_percent': 60})
+    manager.clock_control.advance(30)
+    assert manager.evaluate({'cpu_percent': 60})['resolved'] == []
+
+    # Volta a disparar: a contagem da janela recomeça
+    manager.evaluate({'cpu_percent': 90})
+    manager.clock_control.advance(30)
+    manager.evaluate({'cpu_percent': 60})
+    manager.clock_control.advance(59)
+    assert manager.evaluate({'cpu_percent': 60})['resolved'] == []
+    manager.clock_control.advance(1)
+    assert manager.evaluate({'cpu_percent': 60})['resolved'] == ['cpu_teste']
+
+    assert _rows(manager) == [('cpu_teste', 1, 2)]
+    # Depois de resolvido, um novo pico abre outro alerta
+    assert manager.evaluate({'cpu_percent': 85})['opened'] == ['cpu_teste']
+    assert len(_rows(manager)) == 2
+
+def test_open_alert_is_reloaded_after_reset(manager):
+    manager.evaluate({'cpu_percent': 85})
+    # Novo líder: estado recarregado do banco, não duplica o alerta aberto
+    manager.reset()
+
+    assert manager.evaluate({'cpu_percent': 85})['opened'] == []
+    assert len(_rows(manager)) == 1
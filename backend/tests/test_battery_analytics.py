@@ -0,0 +1,100 @@
+"""Estatísticas vetorizadas da frota de baterias"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from battery_analytics import PERCENTILES, UNKNOWN_LABEL, BatteryFleetAnalytics, FleetData, _grouped_stats
+from battery_records import store_baterias
+from migrations import run_migrations
+
+def test_grouped_stats_match_numpy_per_group():
+    rng = np.random.default_rng(3)
+    codes = rng.integers(0, 4, size=500)
+    values = rng.normal(2.1, 0.05, size=500)
+    values[rng.random(500) < 0.1] = np.nan
+    # Grupo 4 só com NaN e grupo 5 sem linhas: contagem zero e estatísticas NaN
+    codes = np.append(codes, [4, 4])
+    values = np.append(values, [np.nan, np.nan])
+
+    stats = _grouped_stats(codes, values, 6)
+
+    for group in range(4):
+        sample = values[(codes == group) & ~np.isnan(values)]
+        assert stats['count'][group] == len(sample)
+        assert stats['mean'][group] == pytest.approx(sample.mean())
+        assert stats['std'][group] == pytest.approx(sample.std())
+        assert stats['min'][group] == sample.min()
+        assert stats['max'][group] == sample.max()
+        for q in PERCENTILES:
+            assert stats[f'p{q}'][group] == pytest.approx(np.percentile(sample, q))
+    for group in (4, 5):
+        assert stats['count'][group] == 0
+        assert np.isnan(stats['mean'][group]) and np.isnan(stats['p50'][group]) and np.isnan(stats['max'][group])
+
+def test_single_value_group_percentiles():
+    stats = _grouped_stats(np.array([0]), np.array([2.05]), 1)
+
+    assert [stats[f'p{q}'][0] for q in PERCENTILES] == [2.05] * len(PERCENTILES)
+    assert stats['std'][0] == 0
+
+def test_non_iso_period_is_unknown():
+    data = FleetData()
+    data.append([
+        (1, 'A', 'M', '2025-03', 12.6, 12.0, 25.0),
+        (2, 'A', 'M', '12/03/2', 12.6, 12.0, 25.0),
+        (3, 'A', 'M', '2025-13', 12.6, 12.0, 25.0),
+        (4, 'A', 'M', None, 12.6, 12.0, 25.0),
+    ], [])
+
+    assert list(data.periodo) == ['2025-03', UNKNOWN_LABEL, UNKNOWN_LABEL, UNKNOWN_LABEL]
+    assert data.month_index[0] == 2025 * 12 + 2
+    assert np.isnan(data.month_index[1:]).all()
+
+@pytest.fixture
+def analytics(tmp_path):
+    db_path = tmp_path / "frota.db"
+    conn = sqlite3.connect(str(db_path))
+    run_migrations(conn)
+    conn.execute("INSERT INTO users (id, username, password_hash) VALUES (1, 'tec', 'x')")
+    bateria = {'modeloTipo': '12MF100', 'tensaoNominal': '12', 'tensaoTotal': '12.6',
+               'avaliacaoElementos': [{'numero': 1, 'tensao': '2.10'}, {'numero': 2, 'tensao': '2.20'}]}
+    for data, created_at in (('2025-01-15', '2025-01-15 10:00:00'),
+                             ('15/02/2025', '2025-02-16 10:00:00'),
+                             ('', '2025-02-20 10:00:00')):
+        cursor = conn.execute('''
+            INSERT INTO laudos_avancados (user_id, nome_cliente, data, baterias, tecnico_responsavel,
+                                          conclusao_final, created_at)
+            VALUES (1, 'Cliente', ?, ?, 'tec', 'ok', ?)
+        ''', (data, json.dumps([bateria]), created_at))
+        store_baterias(conn.cursor(), cursor.lastrowid, [bateria])
+    conn.commit()
+    conn.close()
+
+    @contextmanager
+    def connection():
+        with sqlite3.connect(str(db_path)) as conn:
+            yield conn
+
+    return BatteryFleetAnalytics(connection, check_interval=0)
+
+def test_period_falls_back_to_created_at_for_non_iso_data(analytics):
+    result = analytics.fleet_stats(group_by='periodo')
+
+    assert {g['key']: g['batteries'] for g in result['groups']} == {'2025-02': 2, '2025-01': 1}
+    assert analytics.fleet_stats(group_by='periodo', start='2025-02')['batteries'] == 2
+
+def test_fleet_stats_by_model(analytics):
+    result = analytics.fleet_stats(group_by='modelo')
+
+    group = result['groups'][0]
+    assert group['key'] == '12MF100'
+    assert group['batteries'] == 3
+    assert group['element_voltage']['count'] == 6
+    assert group['element_voltage']['percentiles']['p50'] == pytest.approx(2.15)
+    assert group['voltage_ratio']['mean'] == pytest.approx(1.05)
+    # 2,20 - 2,10 = 0,10 > limite de 0,05: as três baterias estão desbalanceadas
+    assert group['imbalance']['unbalanced_batteries'] == 3
@@ -0,0 +1,94 @@
+"""Baterias dos laudos avançados normalizadas em laudo_baterias / laudo_bateria_elementos"""
+
+import json
+import sqlite3
+
+import pytest
+
+from battery_records import backfill_baterias, element_rows, parse_number, store_baterias
+from migrations import run_migrations
+
+BATERIA = {
+    'numeroIdentificacao': ' B-01 ',
+    'modeloTipo': '12MF100',
+    'numeroSerie': 'S123',
+    'fabricante': 'Moura',
+    'tensaoNominal': '12 V',
+    'capacidadeNominal8h': '100,5',
+    'numeroElementos': '6',
+    'tensaoTotal': '',
+    'temperatura': 25,
+    'avaliacaoElementos': [
+        {'numero': '1', 'densidade': '1,215 g/cm³', 'tensao': '2.11'},
+        {'numero': '2', 'densidade': '', 'tensao': ''},
+        {'densidade': '1.180', 'tensao': None},
+        'lixo',
+    ],
+}
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "baterias.db"))
+    conn.row_factory = sqlite3.Row
+    run_migrations(conn)
+    conn.execute("INSERT INTO users (id, username, password_hash) VALUES (1, 'tec', 'x')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+def _laudo_avancado(conn, baterias) -> int:
+    cursor = conn.execute('''
+        INSERT INTO laudos_avancados (user_id, nome_cliente, data, baterias, tecnico_responsavel, conclusao_final)
+        VALUES (1, 'Cliente', '2025-01-10', ?, 'tec', 'ok')
+    ''', (json.dumps(baterias),))
+    return cursor.lastrowid
+
+@pytest.mark.parametrize("value, expected", [
+    ('12,5', 12.5), ('2.08 g/cm³', 2.08), (12, 12.0), ('-3', -3.0),
+    ('', None), ('n/a', None), (None, None), (True, None),
+])
+def test_parse_number(value, expected):
+    assert parse_number(value) == expected
+
+def test_element_rows_skip_empty_measurements_and_number_by_position():
+    assert element_rows(BATERIA) == [(1, 1.215, 2.11), (3, 1.18, None)]
+
+def test_store_baterias_writes_typed_rows_and_replaces_previous(conn):
+    laudo_id = _laudo_avancado(conn, [BATERIA])
+    cursor = conn.cursor()
+
+    assert store_baterias(cursor, laudo_id, [BATERIA, 'não é dict', {'modeloTipo': 'X'}]) == 2
+    row = dict(conn.execute("SELECT * FROM laudo_baterias WHERE position = 1").fetchone())
+    assert row['numero_identificacao'] == 'B-01'
+    assert row['modelo'] == '12MF100'
+    assert (row['tensao_nominal'], row['capacidade_nominal_8h'], row['numero_elementos']) == (12.0, 100.5, 6)
+    assert row['tensao_total'] is None
+    assert row['temperatura'] == 25.0
+    elementos = conn.execute(
+        "SELECT numero, densidade, tensao FROM laudo_bateria_elementos WHERE bateria_id = ? ORDER BY numero",
+        (row['id'],)
+    ).fetchall()
+    assert [tuple(e) for e in elementos] == [(1, 1.215, 2.11), (3, 1.18, None)]
+
+    # Regravar o laudo substitui as baterias (e os elementos, pelo trigger)
+    assert store_baterias(cursor, laudo_id, [{'modeloTipo': 'Y'}]) == 1
+    assert [r[0] for r in conn.execute("SELECT modelo FROM laudo_baterias")] == ['Y']
+    assert conn.execute("SELECT COUNT(*) FROM laudo_bateria_elementos").fetchone()[0] == 0
+
+def test_backfill_converts_only_laudos_without_rows(conn):
+    first = _laudo_avancado(conn, [BATERIA, {'modeloTipo': 'Z'}])
+    _laudo_avancado(conn, [])
+    conn.execute('''
+        INSERT INTO laudos_avancados (user_id, nome_cliente, data, baterias, tecnico_responsavel, conclusao_final)
+        VALUES (1, 'Cliente', '2025-01-10', 'json quebrado', 'tec', 'ok')
+    ''')
+    cursor = conn.cursor()
+
+    assert backfill_baterias(cursor) == 2
+    assert backfill_baterias(cursor) == 0
+    assert conn.execute("SELECT COUNT(*) FROM laudo_bateria_elementos").fetchone()[0] == 2
+
+    # Apagar o laudo avançado remove baterias e elementos em cascata
+    conn.execute("DELETE FROM laudos_avancados WHERE id = ?", (first,))
+    assert conn.execute("SELECT COUNT(*) FROM laudo_baterias").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM laudo_bateria_elementos").fetchone()[0] == 0
@@ -0,0 +1,121 @@
+"""Pool de conexões: checkout/retorno, reentrância por thread, timeout e estatísticas"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeoutError
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", max_size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+def test_connection_is_reused_after_return(pool):
+    with pool.connection() as first:
+        assert pool.stats()['in_use'] == 1
+    with pool.connection() as second:
+        assert second is first
+
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['checkouts'] == 2
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 1
+
+def test_connections_are_configured_for_wal(pool):
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+def test_nested_checkout_in_same_thread_reuses_connection(pool):
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+            with pool.connection() as innermost:
+                assert innermost is outer
+        # Liberar o nível interno não devolve a conexão ao pool
+        assert pool.stats()['in_use'] == 1
+        outer.execute("SELECT 1")
+
+    stats = pool.stats()
+    assert stats['in_use'] == 0
+    assert stats['checkouts'] == 1
+    assert stats['reentrant_checkouts'] == 2
+
+def test_pending_transaction_is_rolled_back_on_return(pool):
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        assert conn.in_transaction
+
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+def test_checkout_times_out_when_pool_is_exhausted(pool):
+    held = threading.Event()
+    done = threading.Event()
+
+    def hold_connection():
+        with pool.connection():
+            held.set()
+            done.wait(5)
+
+    workers = [threading.Thread(target=hold_connection) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    try:
+        while pool.stats()['in_use'] < 2:
+            held.wait(0.01)
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+    finally:
+        done.set()
+        for worker in workers:
+            worker.join()
+
+    stats = pool.stats()
+    assert stats['created'] == 2
+    assert stats['max_in_use'] == 2
+    assert stats['utilization'] == 0
+    assert stats['timeouts'] == 1
+    assert stats['waits'] == 1
+    assert stats['avg_wait_ms'] >= 200
+
+def test_waiting_thread_gets_the_returned_connection(tmp_path):
+    pool = ConnectionPool(tmp_path / "single.db", max_size=1, timeout=5)
+    checked_out = threading.Event()
+    held = []
+
+    def hold_briefly():
+        conn = pool.acquire()
+        held.append(conn)
+        checked_out.set()
+        threading.Event().wait(0.1)
+        pool.release(conn)
+
+    holder = threading.Thread(target=hold_briefly)
+    holder.start()
+    checked_out.wait(5)
+    with pool.connection() as conn:
+        assert conn is held[0]
+    holder.join()
+
+    stats = pool.stats()
+    assert stats['created'] == 1
+    assert stats['waits'] == 1
+    assert stats['timeouts'] == 0
+    pool.close()
+
+def test_closed_pool_refuses_checkouts(pool):
+    with pool.connection():
+        pass
+    pool.close()
+
+    assert pool.stats()['idle'] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        pool.acquire()
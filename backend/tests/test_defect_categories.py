@@ -0,0 +1,95 @@
+"""Classificação de defeitos na escrita, backfill em lotes e troca de regras"""
+
+import sqlite3
+
+import pytest
+
+from conftest import auth_headers
+from database import db_connection
+from defect_categories import (
+    OTHER_CATEGORY, backfill_defect_categories, classifier, compile_pattern, frequent_defects, normalize_text,
+    replace_defect_rules
+)
+from migrations import run_migrations
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "defeitos.db"))
+    conn.row_factory = sqlite3.Row
+    run_migrations(conn)
+    conn.execute("INSERT INTO users (id, username, password_hash) VALUES (1, 'tec', 'x')")
+    conn.commit()
+    # As regras ficam em cache no classificador global: recarrega do banco deste teste
+    classifier.invalidate()
+    yield conn
+    conn.close()
+    classifier.invalidate()
+
+def _insert(conn, diagnosticos):
+    conn.executemany(
+        "INSERT INTO laudos (user_id, cliente, equipamento, diagnostico, solucao) VALUES (1, 'C', 'E', ?, 'S')",
+        [(d,) for d in diagnosticos]
+    )
+    conn.commit()
+
+def _categories(conn):
+    return [row[0] for row in conn.execute("SELECT defect_category FROM laudos ORDER BY id")]
+
+def test_patterns_ignore_accents_case_and_spacing():
+    assert normalize_text('  Célula   MUITO danificada ') == 'celula muito danificada'
+    assert compile_pattern('celula%danificada').search(normalize_text('Célula muito danificada'))
+    assert not compile_pattern('celula%danificada').search(normalize_text('Danificada a célula'))
+
+def test_backfill_uses_rule_priority_and_batches(conn):
+    _insert(conn, ['Bateria descarregada com falha no terminal', 'Sulfatação avançada',
+                   'Terminal  OXIDADO', 'Ruído estranho', None])
+
+    assert backfill_defect_categories(conn, batch_size=2, max_batches=1) == 2
+    assert _categories(conn)[2:] == [None, None, None]
+
+    assert backfill_defect_categories(conn, batch_size=2) == 3
+    assert _categories(conn) == ['Bateria descarregada', 'Sulfatação', 'Terminal oxidado',
+                                 OTHER_CATEGORY, OTHER_CATEGORY]
+    assert backfill_defect_categories(conn) == 0
+
+    assert frequent_defects(conn.cursor(), limit=1) == [
+        {'defeito': OTHER_CATEGORY, 'quantidade': 2, 'percentual': 100.0}
+    ]
+
+def test_diagnostico_change_outside_the_app_requeues_the_laudo(conn):
+    _insert(conn, ['Carga lenta'])
+    backfill_defect_categories(conn)
+
+    conn.execute("UPDATE laudos SET cliente = 'Outro'")
+    assert _categories(conn) == ['Carga lenta']
+    conn.execute("UPDATE laudos SET diagnostico = 'Sulfatação'")
+    assert _categories(conn) == [None]
+
+def test_replace_rules_resets_every_batch(conn):
+    _insert(conn, [f'Falha {n}' for n in range(7)])
+    backfill_defect_categories(conn)
+
+    pending = replace_defect_rules(conn, [{'category': 'Falha nova', 'pattern': 'falha', 'priority': 1}],
+                                   batch_size=3)
+
+    assert pending == 7
+    assert not conn.in_transaction
+    assert _categories(conn) == [None] * 7
+    backfill_defect_categories(conn)
+    assert set(_categories(conn)) == {'Falha nova'}
+
+def test_edit_through_api_keeps_the_laudo_classified(client):
+    headers = auth_headers(client, 'admin')
+    created = client.post('/laudos', headers=headers, json={
+        'cliente': 'C', 'equipamento': 'E', 'problema_relatado': 'x',
+        'diagnostico': 'Carga lenta no carregador', 'solucao': 'S'
+    }).json()
+
+    response = client.put(f"/laudos/{created['id']}", headers=headers,
+                          json={'diagnostico': 'Terminal oxidado no polo positivo'})
+
+    assert response.status_code == 200
+    assert response.json()['defect_category'] == 'Terminal oxidado'
+    with db_connection() as conn:
+        pending = conn.execute("SELECT COUNT(*) FROM laudos WHERE defect_category IS NULL").fetchone()[0]
+    assert pending == 0
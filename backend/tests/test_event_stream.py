@@ -0,0 +1,82 @@
+"""Stream SSE: expiração no event loop, revogação em intervalos e replay truncado"""
+
+import asyncio
+import time
+
+import pytest
+
+import event_stream
+from database import db_connection
+from event_stream import EventBroker, REPLAY_LIMIT
+from notifications import publish_event
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return False
+
+@pytest.fixture(autouse=True)
+def fast_stream(monkeypatch):
+    monkeypatch.setattr(event_stream, 'broker', EventBroker(poll_interval=0.01))
+    monkeypatch.setattr(event_stream, 'POLL_INTERVAL', 0.01)
+
+def _collect(stream, count):
+    async def run():
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            if len(chunks) == count:
+                break
+        await stream.aclose()
+        return chunks
+    return asyncio.run(run())
+
+def test_expired_token_closes_stream_without_authorize():
+    async def authorize():
+        raise AssertionError("exp deve ser verificado sem consultar o banco")
+
+    stream = event_stream.event_stream(FakeRequest(), 1, expires_at=time.time() - 1, authorize=authorize)
+    chunks = _collect(stream, 3)
+
+    assert chunks[-1].startswith("event: auth_expired")
+
+def test_revocation_checked_only_on_interval_or_version_change(monkeypatch):
+    monkeypatch.setattr(event_stream, 'AUTH_CHECK_INTERVAL', 60)
+    calls = []
+    version = {'users': 1}
+
+    async def authorize():
+        calls.append(version['users'])
+        return version['users'] == 1
+
+    async def run():
+        stream = event_stream.event_stream(FakeRequest(), 1, expires_at=time.time() + 60,
+                                           authorize=authorize, auth_version=lambda: version['users'])
+        first = await stream.__anext__()
+        consumer = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.1)
+        # Vários ciclos do poller sem nenhuma verificação de revogação
+        assert calls == []
+        version['users'] = 2
+        chunk = await asyncio.wait_for(consumer, 1)
+        await stream.aclose()
+        return first, chunk
+
+    first, chunk = asyncio.run(run())
+
+    assert first.startswith("retry:")
+    assert chunk.startswith("event: auth_expired")
+    assert calls == [2]
+
+def test_truncated_replay_sends_reset_with_current_id():
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM notification_events").fetchone()[0]
+        for n in range(REPLAY_LIMIT + 5):
+            last = publish_event(cursor, 'tag_update', f'evento {n}')
+        conn.commit()
+
+    chunks = _collect(event_stream.event_stream(FakeRequest(), 1, last_event_id=start), 2)
+    assert chunks[1].startswith(f"id: {last}\nevent: reset\n")
+
+    chunks = _collect(event_stream.event_stream(FakeRequest(), 1, last_event_id=last - 3), 4)
+    assert [chunk.split('\n')[0] for chunk in chunks[1:]] == [f"id: {last - 2}", f"id: {last - 1}", f"id: {last}"]
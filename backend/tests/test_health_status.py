@@ -0,0 +1,27 @@
+"""Health status montado só com os snapshots do loop de monitoramento"""
+
+from datetime import datetime
+
+import monitoring
+from monitoring import ApplicationMetrics, BusinessMetrics, RSMHealthCheck
+
+def test_health_status_reads_only_loop_snapshots(monkeypatch):
+    checker = RSMHealthCheck()
+
+    def unexpected(*args):
+        raise AssertionError("leitura de métricas fora do loop de monitoramento")
+
+    monkeypatch.setattr(checker, 'get_application_metrics', unexpected)
+    monkeypatch.setattr(checker, 'get_business_metrics', unexpected)
+    monkeypatch.setattr(checker, 'cluster_request_window', unexpected)
+    monkeypatch.setattr(monitoring, 'get_pool', unexpected)
+
+    assert checker.get_health_status()['status'] == 'starting'
+
+    checker.last_app_metrics = ApplicationMetrics(3, 120, 0.2, 8.0, 1, datetime.now(), p95_response_time=2.5)
+    checker.last_business_metrics = BusinessMetrics(50, 4, 10, 3, 90.0, datetime.now())
+    status = checker.get_health_status()
+
+    assert status['application']['requests_per_minute'] == 120
+    assert status['business']['total_laudos'] == 50
+    assert status['health_score'] <= 80
@@ -0,0 +1,69 @@
+"""Respostas condicionais (ETag / Last-Modified / 304) dos documentos de laudo"""
+
+from database import db_connection
+
+def _laudo(status: str) -> int:
+    with db_connection() as conn:
+        row = conn.execute("SELECT id FROM laudos WHERE status = ? ORDER BY id LIMIT 1", (status,)).fetchone()
+        return row[0]
+
+def test_etag_and_if_none_match(client):
+    laudo_id = _laudo('em_andamento')
+    first = client.get(f'/laudo-viewer/{laudo_id}')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    cached = client.get(f'/laudo-viewer/{laudo_id}', headers={'If-None-Match': etag})
+    weak = client.get(f'/laudo-viewer/{laudo_id}', headers={'If-None-Match': f'W/{etag}'})
+
+    assert cached.status_code == 304
+    assert cached.content == b''
+    assert weak.status_code == 304
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+def test_last_modified_is_updated_at_in_utc(client):
+    laudo_id = _laudo('finalizado')
+    with db_connection() as conn:
+        conn.execute("UPDATE laudos SET updated_at = '2025-01-10 13:00:00' WHERE id = ?", (laudo_id,))
+        conn.commit()
+
+    response = client.get(f'/laudo-viewer/{laudo_id}')
+
+    assert response.headers['Last-Modified'] == 'Fri, 10 Jan 2025 13:00:00 GMT'
+    assert response.headers['Cache-Control'].startswith('public, max-age=')
+    same = client.get(f'/laudo-viewer/{laudo_id}', headers={'If-Modified-Since': 'Fri, 10 Jan 2025 13:00:00 GMT'})
+    older = client.get(f'/laudo-viewer/{laudo_id}', headers={'If-Modified-Since': 'Fri, 10 Jan 2025 12:59:59 GMT'})
+    assert same.status_code == 304
+    assert older.status_code == 200
+
+def test_update_changes_the_etag(client):
+    laudo_id = _laudo('pendente')
+    etag = client.get(f'/laudo-viewer/{laudo_id}').headers['ETag']
+
+    with db_connection() as conn:
+        conn.execute("UPDATE laudos SET updated_at = '2030-01-01 00:00:00' WHERE id = ?", (laudo_id,))
+        conn.commit()
+
+    response = client.get(f'/laudo-viewer/{laudo_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_renaming_the_technician_changes_the_etag(client):
+    laudo_id = _laudo('em_andamento')
+    etag = client.get(f'/laudo-viewer/{laudo_id}').headers['ETag']
+    with db_connection() as conn:
+        user_id, username = conn.execute(
+            "SELECT u.id, u.username FROM laudos l JOIN users u ON u.id = l.user_id WHERE l.id = ?", (laudo_id,)
+        ).fetchone()
+        conn.execute("UPDATE users SET username = ? WHERE id = ?", (f'{username}_novo', user_id))
+        conn.commit()
+    try:
+        response = client.get(f'/laudo-viewer/{laudo_id}', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert f'{username}_novo' in response.text
+        assert response.headers['ETag'] != etag
+    finally:
+        with db_connection() as conn:
+            conn.execute("UPDATE users SET username = ? WHERE id = ?", (username, user_id))
+            conn.commit()
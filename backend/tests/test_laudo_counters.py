@@ -0,0 +1,83 @@
+"""Contadores de laudos mantidos por triggers (migração 6) e reconciliação"""
+
+import sqlite3
+
+import pytest
+
+from laudo_counters import count_status, read_counters, reconcile_counters
+from migrations import run_migrations
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "counters.db"))
+    conn.row_factory = sqlite3.Row
+    run_migrations(conn)
+    conn.execute("INSERT INTO users (id, username, password_hash) VALUES (1, 'tec', 'x')")
+    conn.commit()
+    yield conn
+    conn.close()
+
+def _insert(conn, status, created_at):
+    cursor = conn.execute(
+        "INSERT INTO laudos (user_id, cliente, equipamento, diagnostico, solucao, status, created_at) "
+        "VALUES (1, 'Cliente', 'Bateria', 'diag', 'sol', ?, ?)", (status, created_at)
+    )
+    conn.commit()
+    return cursor.lastrowid
+
+def _expected(conn, today):
+    """Mesmos números calculados com COUNT(*) sobre laudos"""
+    by_status = {row[0]: row[1] for row in conn.execute(
+        "SELECT COALESCE(status, ''), COUNT(*) FROM laudos GROUP BY COALESCE(status, '')")}
+    hoje, semana, mes = conn.execute('''
+        SELECT SUM(DATE(created_at) = ?), SUM(created_at >= DATE(?, '-7 days')), SUM(created_at >= DATE(?, '-30 days'))
+        FROM laudos
+    ''', (today, today, today)).fetchone()
+    return by_status, hoje or 0, semana or 0, mes or 0
+
+def _assert_matches_table(conn, today):
+    counters = read_counters(conn.cursor(), today=today)
+    by_status, hoje, semana, mes = _expected(conn, today)
+    assert counters['by_status'] == {k: v for k, v in by_status.items() if v}
+    assert counters['total'] == sum(by_status.values())
+    assert (counters['hoje'], counters['semana'], counters['mes']) == (hoje, semana, mes)
+
+def test_triggers_follow_insert_update_and_delete(conn):
+    today = '2025-03-31'
+    first = _insert(conn, 'em_andamento', '2025-03-31 09:00:00')
+    second = _insert(conn, 'em_andamento', '2025-03-27 15:00:00')
+    _insert(conn, 'finalizado', '2025-03-10 08:00:00')
+    _insert(conn, None, '2025-01-05 08:00:00')
+    _assert_matches_table(conn, today)
+
+    conn.execute("UPDATE laudos SET status = 'aprovado_manutencao' WHERE id = ?", (first,))
+    # Atualizar outra coluna não mexe nos contadores
+    conn.execute("UPDATE laudos SET cliente = 'Outro' WHERE id = ?", (second,))
+    conn.execute("UPDATE laudos SET created_at = '2025-02-01 10:00:00' WHERE id = ?", (second,))
+    conn.commit()
+    _assert_matches_table(conn, today)
+
+    conn.execute("DELETE FROM laudos WHERE id = ?", (first,))
+    conn.commit()
+    _assert_matches_table(conn, today)
+
+    counters = read_counters(conn.cursor(), today=today)
+    assert count_status(counters, ('em_andamento',)) == 1
+    assert counters['by_status'].get('') == 1
+    assert 'aprovado_manutencao' not in counters['by_status']
+
+def test_reconcile_fixes_drifted_counters(conn):
+    _insert(conn, 'em_andamento', '2025-03-31 09:00:00')
+    _insert(conn, 'finalizado', '2025-03-30 09:00:00')
+    assert reconcile_counters(conn) == 0
+
+    # Divergências que os triggers não corrigem: escrita direta, chave órfã, dia faltando
+    conn.execute("UPDATE laudo_status_counts SET total = 7 WHERE status = 'em_andamento'")
+    conn.execute("INSERT INTO laudo_status_counts (status, total) VALUES ('fantasma', 3)")
+    conn.execute("DELETE FROM laudo_daily_counts WHERE day = '2025-03-30'")
+    conn.commit()
+
+    assert reconcile_counters(conn) == 3
+    _assert_matches_table(conn, '2025-03-31')
+    assert conn.execute("SELECT COUNT(*) FROM laudo_status_counts WHERE status = 'fantasma'").fetchone()[0] == 0
+    assert reconcile_counters(conn) == 0
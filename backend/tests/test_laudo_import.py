@@ -0,0 +1,87 @@
+"""Importação em massa: linhas válidas gravadas, inválidas no relatório com o número da linha"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+
+from database import db_connection
+from laudo_import import run_import
+from migrations import run_migrations
+
+from conftest import auth_headers
+
+def _ndjson(*records) -> bytes:
+    return ''.join((record if isinstance(record, str) else json.dumps(record)) + '\n' for record in records).encode()
+
+def test_ndjson_import_reports_rejected_lines(client):
+    body = _ndjson(
+        {'cliente': 'Importado A', 'equipamento': 'Empilhadeira', 'diagnostico': 'Bateria fraca', 'solucao': 'Troca'},
+        '{"cliente": "quebrado"',
+        {'cliente': 'Importado B', 'equipamento': 'Rebocador', 'diagnostico': 'Cabo solto', 'solucao': 'Reaperto',
+         'status': 'finalizado', 'created_at': '2024-05-01T12:00:00+02:00'},
+        {'cliente': 'Importado C', 'equipamento': 'Rebocador', 'diagnostico': 'Cabo solto', 'solucao': 'Reaperto', 'status': 'inexistente'},
+        '[1, 2]',
+    )
+
+    response = client.post('/admin/import/laudos', headers=auth_headers(client, 'admin'), content=body,
+                           params={'format': 'ndjson', 'tipo': 'simples'})
+
+    assert response.status_code == 200
+    report = response.json()
+    assert (report['received'], report['imported'], report['failed']) == (5, 2, 3)
+    assert [error['line'] for error in report['errors']] == [2, 4, 5]
+    assert 'status' in report['errors'][1]['errors'][0]
+
+    with db_connection() as conn:
+        rows = dict(conn.execute(
+            "SELECT cliente, status || '|' || created_at FROM laudos WHERE cliente LIKE 'Importado %'"
+        ).fetchall())
+    # Completo sem status -> pendente; created_at com fuso gravado em UTC
+    assert rows['Importado A'].startswith('pendente|')
+    assert rows['Importado B'] == 'finalizado|2024-05-01 10:00:00'
+
+def test_csv_import_counts_lines_from_header(client):
+    body = (
+        "cliente,equipamento,diagnostico,solucao,user_id\n"
+        "CSV A,Empilhadeira,Bateria,Troca,\n"
+        "CSV B,Empilhadeira,Bateria,Troca,999999\n"
+    ).encode()
+
+    response = client.post('/admin/import/laudos', headers=auth_headers(client, 'admin'), content=body,
+                           params={'format': 'csv'})
+
+    report = response.json()
+    assert (report['imported'], report['failed']) == (1, 1)
+    assert report['errors'][0]['line'] == 3
+
+def test_import_requires_admin(client):
+    response = client.post('/admin/import/laudos', headers=auth_headers(client, 'tecnico'), content=b'')
+
+    assert response.status_code == 403
+
+def test_connection_is_borrowed_only_while_writing_batches(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "import.db"))
+    run_migrations(conn)
+    conn.execute("INSERT INTO users (id, username, password_hash) VALUES (1, 'admin', 'x')")
+    conn.commit()
+    borrowed = []
+
+    @contextmanager
+    def connection_factory():
+        borrowed.append(True)
+        try:
+            yield conn
+        finally:
+            borrowed.pop()
+
+    def chunks():
+        for n in range(5):
+            # Enquanto o corpo chega, nenhuma conexão está emprestada
+            assert not borrowed
+            yield _ndjson({'cliente': f'Lote {n}', 'equipamento': 'E', 'diagnostico': 'D', 'solucao': 'S'})
+
+    report = run_import(connection_factory, chunks(), 'ndjson', 'simples', 1, chunk_size=2)
+
+    assert (report['imported'], report['failed']) == (5, 0)
+    assert conn.execute("SELECT COUNT(*) FROM laudos WHERE defect_category IS NOT NULL").fetchone()[0] == 5
+    conn.close()
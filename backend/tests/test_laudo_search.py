@@ -0,0 +1,79 @@
+"""Busca FTS5 em /laudos/search: sincronização por triggers, visibilidade, snippets e teto de resultados"""
+
+import laudo_search
+from conftest import auth_headers, create_user
+from database import db_connection
+from pagination import NEXT_CURSOR_HEADER
+
+def _create(client, headers, **fields) -> int:
+    laudo = {'cliente': 'Cliente', 'equipamento': 'Empilhadeira', 'problema_relatado': 'x',
+             'diagnostico': 'Diagnóstico', 'solucao': 'Solução', **fields}
+    response = client.post('/laudos', json=laudo, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()['id']
+
+def _search(client, headers, **params):
+    response = client.get('/laudos/search', headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_index_follows_insert_update_and_delete(client):
+    headers = auth_headers(client, 'admin')
+    laudo_id = _create(client, headers, cliente='Frigorífico Quixadá')
+
+    assert [r['id'] for r in _search(client, headers, q='quixada')] == [laudo_id]
+
+    with db_connection() as conn:
+        conn.execute("UPDATE laudos SET cliente = 'Laticínio Jaguaribe' WHERE id = ?", (laudo_id,))
+        conn.commit()
+    assert _search(client, headers, q='quixada') == []
+    assert [r['id'] for r in _search(client, headers, q='jaguaribe')] == [laudo_id]
+
+    with db_connection() as conn:
+        conn.execute("DELETE FROM laudos WHERE id = ?", (laudo_id,))
+        conn.commit()
+    assert _search(client, headers, q='jaguaribe') == []
+
+def test_technician_only_finds_own_laudos(client):
+    create_user('busca_tec_a')
+    create_user('busca_tec_b')
+    own = _create(client, auth_headers(client, 'busca_tec_a'), diagnostico='Borne zincronado oxidado')
+    other = _create(client, auth_headers(client, 'busca_tec_b'), diagnostico='Borne zincronado solto')
+    headers = auth_headers(client, 'busca_tec_a')
+
+    assert [r['id'] for r in _search(client, headers, q='zincronado')] == [own]
+    assert _search(client, headers, q='zincronado', tecnico_id=other) == []
+    admin = auth_headers(client, 'admin')
+    assert {r['id'] for r in _search(client, admin, q='zincronado')} == {own, other}
+
+def test_results_carry_escaped_snippet_instead_of_text(client):
+    headers = auth_headers(client, 'admin')
+    laudo_id = _create(client, headers)
+    # Texto gravado sem passar pelo sanitize_string (importação, scripts)
+    with db_connection() as conn:
+        conn.execute("UPDATE laudos SET diagnostico = 'Conector <b>derretido</b> no cabo' WHERE id = ?", (laudo_id,))
+        conn.commit()
+
+    [result] = _search(client, headers, q='derretido')
+
+    assert result['id'] == laudo_id
+    assert 'diagnostico' not in result
+    assert '&lt;b&gt;<mark>derretido</mark>&lt;/b&gt;' in result['snippet']
+
+def test_pages_stop_at_search_max_results(client, monkeypatch):
+    headers = auth_headers(client, 'admin')
+    ids = [_create(client, headers, solucao=f'Troca do retificador trifásico {n}') for n in range(7)]
+    monkeypatch.setattr(laudo_search, 'SEARCH_MAX_RESULTS', 5)
+
+    seen, cursor = [], None
+    while True:
+        response = client.get('/laudos/search', headers=headers,
+                              params={'q': 'retificador', 'limit': 2, **({'cursor': cursor} if cursor else {})})
+        seen.extend(r['id'] for r in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+    assert set(seen) <= set(ids)
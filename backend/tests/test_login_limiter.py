@@ -0,0 +1,93 @@
+"""Limite de tentativas de login (token bucket por IP e por usuário)"""
+
+import app as app_module
+import login_limiter as login_limiter_module
+from login_limiter import LoginRateLimiter, client_ip
+
+from conftest import PASSWORD, create_user
+
+def _limiter(tmp_path) -> LoginRateLimiter:
+    # 1 ficha por segundo nos dois buckets
+    return LoginRateLimiter(tmp_path / "limits.db", ip_limit=(5, 60), user_limit=(3, 60))
+
+def test_bucket_empties_after_burst(tmp_path):
+    limiter = _limiter(tmp_path)
+    for _ in range(2):
+        limiter.record_failure('10.0.0.1', 'Alice')
+        assert limiter.retry_after('10.0.0.1', 'alice') is None
+
+    limiter.record_failure('10.0.0.1', 'alice ')
+
+    # Usuário normalizado: 'Alice', 'alice' e 'alice ' são o mesmo bucket
+    assert limiter.retry_after('10.0.0.1', 'alice') == 1
+    assert limiter.blocked('10.0.0.2', 'ALICE') == 1
+    # Outro usuário no mesmo IP ainda tem fichas
+    assert limiter.retry_after('10.0.0.1', 'bob') is None
+
+def test_ip_bucket_is_shared_across_usernames(tmp_path):
+    limiter = _limiter(tmp_path)
+    for i in range(5):
+        limiter.record_failure('10.0.0.9', f"user{i}")
+
+    assert limiter.retry_after('10.0.0.9', 'outro') is not None
+    assert limiter.retry_after('10.0.0.8', 'outro') is None
+
+def test_bucket_refills_over_time(tmp_path):
+    limiter = _limiter(tmp_path)
+    for _ in range(3):
+        limiter.record_failure(None, 'carol')
+    assert limiter.retry_after(None, 'carol') is not None
+
+    # Simula 2 segundos passados (2 fichas repostas)
+    with limiter._connection() as conn:
+        conn.execute("UPDATE login_buckets SET updated_at = updated_at - 2")
+        conn.commit()
+
+    assert limiter.retry_after(None, 'carol') is None
+
+def test_state_is_shared_between_instances(tmp_path):
+    first, second = _limiter(tmp_path), _limiter(tmp_path)
+    for _ in range(3):
+        first.record_failure(None, 'dave')
+
+    # Outro worker: nada em memória, mas o SQLite já tem o bucket vazio
+    assert second.blocked(None, 'dave') is None
+    assert second.retry_after(None, 'dave') is not None
+    assert second.blocked(None, 'dave') is not None
+
+def test_login_endpoint_returns_429_with_retry_after(client):
+    create_user('limite_login')
+    for _ in range(5):
+        response = client.post('/login', data={'username': 'limite_login', 'password': 'errada'})
+        assert response.status_code == 401
+
+    response = client.post('/login', data={'username': 'limite_login', 'password': PASSWORD})
+
+    # Bloqueado mesmo com a senha certa, antes de verificar a senha
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+def test_client_ip_trusts_only_proxy_appended_entries():
+    # Sem proxy configurado o cabeçalho (forjável) é ignorado
+    assert client_ip('1.2.3.4', '10.0.0.1', hops=0) == '10.0.0.1'
+    # Railway acrescenta o IP que viu à direita; o que vem antes foi enviado pelo cliente
+    assert client_ip('6.6.6.6, 200.1.1.1', '10.0.0.1', hops=1) == '200.1.1.1'
+    assert client_ip('6.6.6.6, 200.1.1.1, 10.0.0.5', '10.0.0.1', hops=2) == '200.1.1.1'
+    assert client_ip('200.1.1.1', '10.0.0.1', hops=2) == '10.0.0.1'
+    assert client_ip(None, '10.0.0.1', hops=1) == '10.0.0.1'
+
+def test_login_limits_the_forwarded_client_not_the_proxy(client, monkeypatch):
+    monkeypatch.setattr(login_limiter_module, 'TRUSTED_PROXY_HOPS', 1)
+    monkeypatch.setattr(app_module.login_limiter, 'limits', {'ip': (3, 1 / 60), 'user': (50, 1 / 60)})
+    for i in range(3):
+        response = client.post('/login', data={'username': f'varredura{i}', 'password': 'errada'},
+                               headers={'X-Forwarded-For': f'9.9.9.{i}, 200.1.1.1'})
+        assert response.status_code == 401
+
+    blocked = client.post('/login', data={'username': 'admin', 'password': PASSWORD},
+                          headers={'X-Forwarded-For': '200.1.1.1'})
+    other_client = client.post('/login', data={'username': 'admin', 'password': PASSWORD},
+                               headers={'X-Forwarded-For': '200.2.2.2'})
+
+    assert blocked.status_code == 429
+    assert other_client.status_code == 200
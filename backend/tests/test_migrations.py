@@ -0,0 +1,78 @@
+"""Migrações versionadas: aplicação em ordem, idempotência e conversões para UTC (12, 14)"""
+
+import sqlite3
+
+from migrations import MIGRATIONS, get_schema_version, run_migrations
+from notifications import mark_read, publish_event
+
+def _connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def test_fresh_database_reaches_latest_version(tmp_path):
+    conn = _connect(tmp_path / "fresh.db")
+
+    assert run_migrations(conn) == len(MIGRATIONS)
+    assert get_schema_version(conn) == MIGRATIONS[-1].version
+
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_laudos_status_created', 'idx_laudos_status_updated', 'idx_laudos_user_created'} <= indexes
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    assert 'token_version' in columns
+
+def test_second_run_applies_nothing(tmp_path):
+    conn = _connect(tmp_path / "twice.db")
+    run_migrations(conn)
+
+    assert run_migrations(conn) == 0
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert versions == [m.version for m in MIGRATIONS]
+
+def test_local_iso_updated_at_is_converted_to_utc(tmp_path):
+    conn = _connect(tmp_path / "utc.db")
+    run_migrations(conn, [m for m in MIGRATIONS if m.version < 12])
+    conn.execute("INSERT INTO users (username, password_hash) VALUES ('u', 'x')")
+    conn.execute("INSERT INTO laudos (user_id, cliente, updated_at) VALUES (1, 'local', '2025-01-10T10:00:00.123456')")
+    conn.execute("INSERT INTO laudos (user_id, cliente, updated_at) VALUES (1, 'utc', '2025-01-10 10:00:00')")
+    conn.commit()
+    expected = conn.execute("SELECT datetime('2025-01-10T10:00:00.123456', 'utc')").fetchone()[0]
+
+    run_migrations(conn)
+
+    rows = dict(conn.execute("SELECT cliente, updated_at FROM laudos").fetchall())
+    assert rows == {'local': expected, 'utc': '2025-01-10 10:00:00'}
+
+def test_local_notification_timestamps_are_converted_to_utc(tmp_path):
+    conn = _connect(tmp_path / "notificacoes.db")
+    run_migrations(conn, [m for m in MIGRATIONS if m.version < 14])
+    conn.execute("INSERT INTO users (username, password_hash) VALUES ('u', 'x')")
+    conn.execute("INSERT INTO notification_events (type, message, created_at) VALUES ('a', 'local', '2025-01-10 10:00:00.123456')")
+    conn.execute("INSERT INTO notification_events (type, message, created_at) VALUES ('a', 'utc', '2025-01-10 10:00:00')")
+    conn.execute("INSERT INTO notification_reads (user_id, event_id, read_at) VALUES (1, 1, '2025-01-10 11:00:00.5')")
+    conn.commit()
+    expected = conn.execute("SELECT datetime('2025-01-10 10:00:00.123456', 'utc')").fetchone()[0]
+
+    run_migrations(conn)
+
+    rows = dict(conn.execute("SELECT message, created_at FROM notification_events").fetchall())
+    assert rows == {'local': expected, 'utc': '2025-01-10 10:00:00'}
+    read_at = conn.execute("SELECT read_at FROM notification_reads").fetchone()[0]
+    assert read_at == conn.execute("SELECT datetime('2025-01-10 11:00:00.5', 'utc')").fetchone()[0]
+
+def test_published_events_use_utc_current_timestamp(tmp_path):
+    conn = _connect(tmp_path / "eventos.db")
+    run_migrations(conn)
+    conn.execute("INSERT INTO users (username, password_hash) VALUES ('u', 'x')")
+    event_id = publish_event(conn.cursor(), 'tag_update', 'mensagem', target_user_id=1)
+    assert mark_read(conn.cursor(), 1, event_id)
+
+    # Mesmo formato e relógio de CURRENT_TIMESTAMP (UTC, sem fração)
+    drift = conn.execute('''
+        SELECT (julianday('now') - julianday(e.created_at)) * 86400, (julianday('now') - julianday(r.read_at)) * 86400,
+               e.created_at GLOB '????-??-?? ??:??:??', r.read_at GLOB '????-??-?? ??:??:??'
+        FROM notification_events e JOIN notification_reads r ON r.event_id = e.id
+    ''').fetchone()
+
+    assert 0 <= drift[0] < 5 and 0 <= drift[1] < 5
+    assert drift[2] == drift[3] == 1
@@ -0,0 +1,32 @@
+"""Renderização de PDF no pool de processos (forkserver por padrão) e cache em disco"""
+
+import asyncio
+
+import pdf_renderer
+from pdf_renderer import PDFRenderService
+
+LAUDO = {
+    'id': 42, 'status': 'finalizado', 'cliente': 'Cliente <Teste>', 'equipamento': 'Bateria 12V',
+    'user_name': 'tecnico', 'created_at': '2025-01-10 08:00:00', 'updated_at': '2025-01-11 09:30:00',
+    'problema_relatado': 'Não liga', 'diagnostico': 'Célula em curto', 'solucao': 'Troca'
+}
+
+def test_default_start_method_does_not_fork_the_api_process():
+    assert pdf_renderer.PDF_START_METHOD in ('forkserver', 'spawn')
+
+def test_render_in_pool_and_serve_from_cache(tmp_path):
+    service = PDFRenderService(cache_dir=tmp_path, max_workers=1)
+    try:
+        path = asyncio.run(service.get_pdf(LAUDO))
+        assert path.read_bytes().startswith(b'%PDF')
+        assert asyncio.run(service.get_pdf(LAUDO)) == path
+
+        # Nova versão do laudo: nova chave, arquivo antigo removido
+        updated = asyncio.run(service.get_pdf({**LAUDO, 'updated_at': '2025-01-12 10:00:00'}))
+        assert updated != path
+        assert not path.exists()
+    finally:
+        service.shutdown()
+
+    assert service.stats()['renders'] == 2
+    assert service.stats()['cache_hits'] == 1
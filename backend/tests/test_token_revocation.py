@@ -0,0 +1,72 @@
+"""Revogação de JWT por token_version (troca de senha, remoção do usuário)"""
+
+from jose import jwt
+
+from database import db_connection
+
+from conftest import auth_headers, create_user, login
+
+def test_claims_are_carried_in_the_access_token(client):
+    create_user('claims_user', user_type='vendedor')
+    headers = auth_headers(client, 'claims_user')
+
+    me = client.get('/me', headers=headers).json()
+
+    assert me['username'] == 'claims_user'
+    assert me['user_type'] == 'vendedor'
+    assert me['is_admin'] is False
+
+def test_password_change_revokes_access_and_refresh_tokens(client):
+    user_id = create_user('revoga_senha')
+    tokens = login(client, 'revoga_senha')
+    headers = {'Authorization': f"Bearer {tokens['access_token']}"}
+    assert client.get('/me', headers=headers).status_code == 200
+
+    with db_connection() as conn:
+        conn.execute("UPDATE users SET password_hash = 'outra' WHERE id = ?", (user_id,))
+        conn.commit()
+
+    assert client.get('/me', headers=headers).status_code == 401
+    assert client.post('/token/refresh', json={'refresh_token': tokens['refresh_token']}).status_code == 401
+
+def test_privilege_and_role_changes_do_not_revoke_but_refresh_updates_claims(client):
+    user_id = create_user('muda_privilegio')
+    tokens = login(client, 'muda_privilegio')
+    headers = {'Authorization': f"Bearer {tokens['access_token']}"}
+
+    granted = client.post('/admin/privileges', headers=auth_headers(client, 'admin'),
+                          json={'user_id': user_id, 'privilege_type': 'aprovar_laudos'})
+    assert granted.status_code == 200
+    with db_connection() as conn:
+        conn.execute("UPDATE users SET user_type = 'vendedor', username = 'renomeado' WHERE id = ?", (user_id,))
+        conn.commit()
+
+    # Sessão continua válida com as claims da emissão até o access token expirar
+    assert client.get('/me', headers=headers).json()['user_type'] == 'tecnico'
+    response = client.post('/token/refresh', json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+    claims = jwt.get_unverified_claims(response.json()['access_token'])
+    assert claims['privileges'] == ['aprovar_laudos']
+    assert (claims['user_type'], claims['username'], claims['tv']) == ('vendedor', 'renomeado', 0)
+
+def test_refresh_issues_a_working_pair(client):
+    create_user('renova_token')
+    tokens = login(client, 'renova_token')
+
+    response = client.post('/token/refresh', json={'refresh_token': tokens['refresh_token']})
+
+    assert response.status_code == 200
+    headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+    assert client.get('/me', headers=headers).json()['username'] == 'renova_token'
+    # Access token não serve como refresh token
+    assert client.post('/token/refresh', json={'refresh_token': tokens['access_token']}).status_code == 401
+
+def test_deleted_user_token_is_rejected(client):
+    user_id = create_user('removido')
+    headers = auth_headers(client, 'removido')
+
+    with db_connection() as conn:
+        conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        conn.commit()
+
+    assert client.get('/me', headers=headers).status_code == 401
@@ -0,0 +1,100 @@
+"""
+Revogação de JWT por versão de token
+Cada token carrega "tv" (users.token_version no momento da emissão). Este worker mantém em
+memória a versão atual de cada usuário, recarregada quando cache_versions.users muda
+(lido no máximo a cada TOKEN_REVOCATION_INTERVAL segundos). Token com "tv" diferente
+da versão atual, ou de usuário removido, é recusado sem consultar o banco a cada requisição.
+A versão só muda quando a senha é trocada (migração 13); papel e privilégios chegam ao token
+no próximo /token/refresh.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from database import db_connection
+from user_cache import read_version
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_INTERVAL = float(os.getenv("TOKEN_REVOCATION_INTERVAL", "5"))
+
+def read_token_version(cursor: sqlite3.Cursor, user_id: int) -> Optional[int]:
+    """Versão atual dos tokens do usuário (None se ele não existir)"""
+    cursor.execute("SELECT token_version FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def user_from_claims(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """current_user a partir das claims de um access token"""
+    return {
+        'id': int(payload['sub']),
+        'username': payload.get('username'),
+        'is_admin': bool(payload.get('is_admin')),
+        'user_type': payload.get('user_type') or 'tecnico',
+        'privileges': list(payload.get('privileges') or []),
+        'token_version': payload.get('tv', 0)
+    }
+
+class TokenRevocationList:
+    """Versões atuais dos tokens por usuário, renovadas do banco em intervalos"""
+
+    def __init__(self, interval: float = TOKEN_REVOCATION_INTERVAL):
+        self.interval = interval
+        self._versions: Dict[int, int] = {}
+        self._cache_version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.rejected = 0
+
+    @property
+    def version(self) -> Optional[int]:
+        """cache_versions.users da última recarga (muda quando algum usuário é alterado)"""
+        return self._cache_version
+
+    def mark_stale(self):
+        """Força a releitura na próxima verificação (após alterar usuários neste worker)"""
+        self._checked_at = 0.0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.interval:
+                return
+            with db_connection() as conn:
+                cursor = conn.cursor()
+                version = read_version(cursor)
+                if version != self._cache_version:
+                    cursor.execute("SELECT id, token_version FROM users")
+                    self._versions = {row[0]: row[1] for row in cursor.fetchall()}
+                    self._cache_version = version
+                    self.reloads += 1
+            self._checked_at = time.monotonic()
+
+    def check(self, user_id: int, token_version: int) -> Optional[bool]:
+        """True = válido, False = revogado, None = usuário fora da lista (consultar o banco)"""
+        self._refresh()
+        current = self._versions.get(user_id)
+        if current is None:
+            return None
+        if current != token_version:
+            self.rejected += 1
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'users': len(self._versions),
+            'version': self._cache_version,
+            'reloads': self.reloads,
+            'rejected': self.rejected,
+            'interval_seconds': self.interval
+        }
+
+token_revocations = TokenRevocationList()
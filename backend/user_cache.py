@@ -0,0 +1,144 @@
+"""
+Cache em memória dos usuários autenticados (get_current_user)
+LRU com TTL por entrada. Escritas neste worker invalidam na hora (invalidate);
+escritas em outros workers ou scripts incrementam cache_versions.users (triggers
+da migração 10), lido no máximo a cada USER_CACHE_VERSION_INTERVAL segundos.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from database import db_connection
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_VERSION_INTERVAL = float(os.getenv("USER_CACHE_VERSION_INTERVAL", "1"))
+
+def load_user(cursor: sqlite3.Cursor, user_id: int) -> Optional[Dict[str, Any]]:
+    """Registro do usuário no formato de current_user, com os privilégios ativos"""
+    cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+    user = cursor.fetchone()
+    if user is None:
+        return None
+    cursor.execute(
+        "SELECT privilege_type FROM user_privileges WHERE user_id = ? AND is_active = TRUE ORDER BY privilege_type",
+        (user_id,)
+    )
+    return {
+        'id': user['id'],
+        'username': user['username'],
+        'is_admin': bool(user['is_admin']),
+        'user_type': user['user_type'] if 'user_type' in user.keys() else 'tecnico',
+        'privileges': [row[0] for row in cursor.fetchall()],
+        'token_version': user['token_version'] if 'token_version' in user.keys() else 0
+    }
+
+def read_version(cursor: sqlite3.Cursor) -> int:
+    cursor.execute("SELECT version FROM cache_versions WHERE name = 'users'")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+class UserCache:
+    """LRU/TTL de usuários por id; devolve cópias para que o chamador possa alterá-las"""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_SIZE,
+                 version_interval: float = USER_CACHE_VERSION_INTERVAL):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version_interval = version_interval
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrementado a cada invalidação: uma carga iniciada antes dela não é guardada
+        self._generation = 0
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.version_changes = 0
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._version_checked_at < self.version_interval:
+            return
+        self._version_checked_at = now
+        with db_connection() as conn:
+            version = read_version(conn.cursor())
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._entries.clear()
+                self._generation += 1
+                self.version_changes += 1
+                logger.debug(f"Cache de usuários descartado (versão {self._version} -> {version})")
+            self._version = version
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Usuário do cache ou do banco; None se não existir"""
+        if self.ttl <= 0 or self.max_size <= 0:
+            with db_connection() as conn:
+                return load_user(conn.cursor(), user_id)
+
+        # Acerto não toca no banco (salvo a leitura periódica da versão)
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return self._copy(entry[1])
+            self.misses += 1
+            generation = self._generation
+
+        with db_connection() as conn:
+            user = load_user(conn.cursor(), user_id)
+
+        if user is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[user_id] = (time.monotonic() + self.ttl, user)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            user = self._copy(user)
+        return user
+
+    @staticmethod
+    def _copy(user: Dict[str, Any]) -> Dict[str, Any]:
+        return {**user, 'privileges': list(user['privileges'])}
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Remove um usuário (ou todos) deste worker; chamar após o commit da alteração"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'version_changes': self.version_changes,
+                'version': self._version
+            }
+
+user_cache = UserCache()
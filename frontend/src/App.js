@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import './App.css';
+import api from './api';
 import './ModernDesign.css';
 import './DesignSystem.css';
 import Login from './Login';
@@ -98,20 +99,10 @@ function App() {
 
   const fetchUserInfo = async () => {
     try {
-      const response = await fetch('/me', {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        }
-      });
-      
-      if (response.ok) {
-        const userData = await response.json();
-        setUserInfo(userData);
-        setIsLoggedIn(true);
-      } else {
-        localStorage.removeItem('token');
-        localStorage.removeItem('userInfo');
-      }
+      // Access token expirado ao reabrir a aplicação: o interceptor renova com o refresh token
+      const response = await api.get('/me');
+      setUserInfo(response.data);
+      setIsLoggedIn(true);
     } catch (error) {
       console.error('Erro ao buscar informações do usuário:', error);
       localStorage.removeItem('token');
@@ -130,6 +121,7 @@ function App() {
     setUserInfo(null);
     setCurrentView('dashboard');
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('userInfo');
   };
 
@@ -42,6 +42,9 @@ const Login = ({ onLogin }) => {
       if (response.ok) {
         const data = await response.json();
         localStorage.setItem('token', data.access_token);
+        if (data.refresh_token) {
+          localStorage.setItem('refreshToken', data.refresh_token);
+        }
         
         // ✅ CORREÇÃO: Usando proxy configurado no package.json
         const userResponse = await fetch('/me', {
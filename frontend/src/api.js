@@ -28,12 +28,41 @@ api.interceptors.request.use(
   }
 );
 
+// Access token é curto: no primeiro 401 tenta renovar com o refresh token e repete a requisição
+let refreshing = null;
+
+const refreshAccessToken = async () => {
+  const refreshToken = localStorage.getItem('refreshToken');
+  if (!refreshToken) {
+    throw new Error('Sem refresh token');
+  }
+  const { data } = await axios.post(`${API_BASE_URL}/token/refresh`, { refresh_token: refreshToken });
+  localStorage.setItem('token', data.access_token);
+  localStorage.setItem('refreshToken', data.refresh_token);
+  return data.access_token;
+};
+
 // Interceptor para tratamento de erros
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 401 && original && !original._retry) {
+      original._retry = true;
+      try {
+        refreshing = refreshing || refreshAccessToken();
+        const token = await refreshing;
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch (refreshError) {
+        // Refresh expirado ou revogado: segue para o login
+      } finally {
+        refreshing = null;
+      }
+    }
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
+      localStorage.removeItem('refreshToken');
       localStorage.removeItem('user');
       window.location.href = '/login';
     }
@@ -41,4 +70,122 @@ api.interceptors.response.use(
   }
 );
 
+// Listagens de laudos (/laudos, /laudos/approval, /laudos/finalized) são paginadas por cursor:
+// cada página traz no máximo `limit` laudos e o cursor da próxima vem no cabeçalho X-Next-Cursor
+// (ausente na última página).
+export const LAUDOS_PAGE_SIZE = 100;
+
+export const fetchLaudosPage = async (path, { cursor = null, limit = LAUDOS_PAGE_SIZE } = {}) => {
+  const params = { limit };
+  if (cursor) {
+    params.cursor = cursor;
+  }
+  const response = await api.get(path, { params });
+  return { laudos: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
+// Stream de eventos (SSE) para notificações, tags, aprovações e finalizações.
+// O EventSource reconecta sozinho e reenvia Last-Event-ID, mas o token vai na URL:
+// quando ele expira (evento auth_expired ou conexão recusada), renova o token e abre
+// um novo EventSource a partir do último id recebido.
+// Sem suporte a EventSource, cai para polling a cada 30 segundos.
+const SSE_RECONNECT_DELAY = 3000;
+
+export const subscribeToEvents = (eventTypes, onEvent) => {
+  const startPolling = () => {
+    const interval = setInterval(() => onEvent(null), 30000);
+    return () => clearInterval(interval);
+  };
+  if (!localStorage.getItem('token') || typeof window.EventSource === 'undefined') {
+    return startPolling();
+  }
+
+  let source = null;
+  let lastEventId = null;
+  let closed = false;
+  let reconnectTimer = null;
+  let stopPolling = null;
+
+  const handler = (message) => {
+    if (message.lastEventId) {
+      lastEventId = message.lastEventId;
+    }
+    try {
+      onEvent(JSON.parse(message.data));
+    } catch (error) {
+      onEvent(null);
+    }
+  };
+
+  // Replay truncado no servidor: segue do id atual e recarrega tudo
+  const onReset = (message) => {
+    if (message.lastEventId) {
+      lastEventId = message.lastEventId;
+    }
+    onEvent(null);
+  };
+
+  const open = (token) => {
+    const resume = lastEventId ? `&last_event_id=${encodeURIComponent(lastEventId)}` : '';
+    source = new EventSource(
+      `${API_BASE_URL}/api/events/stream?token=${encodeURIComponent(token)}${resume}`
+    );
+    eventTypes.forEach((type) => source.addEventListener(type, handler));
+    source.addEventListener('reset', onReset);
+    source.addEventListener('auth_expired', reconnect);
+    source.onerror = () => {
+      // CONNECTING = o navegador já está reconectando; CLOSED = recusado (401) ou desistiu
+      if (source.readyState === EventSource.CLOSED) {
+        reconnect();
+      }
+    };
+  };
+
+  const close = () => {
+    if (source) {
+      eventTypes.forEach((type) => source.removeEventListener(type, handler));
+      source.removeEventListener('reset', onReset);
+      source.removeEventListener('auth_expired', reconnect);
+      source.onerror = null;
+      source.close();
+      source = null;
+    }
+  };
+
+  function reconnect() {
+    close();
+    if (closed || reconnectTimer) {
+      return;
+    }
+    reconnectTimer = setTimeout(async () => {
+      reconnectTimer = null;
+      try {
+        refreshing = refreshing || refreshAccessToken();
+        const token = await refreshing;
+        if (!closed) {
+          open(token);
+          // Eventos perdidos durante a troca chegam pelo replay; recarrega por garantia
+          onEvent(null);
+        }
+      } catch (error) {
+        // Refresh expirado ou revogado: o polling leva ao login pelo interceptor de 401
+        if (!closed) {
+          stopPolling = startPolling();
+        }
+      } finally {
+        refreshing = null;
+      }
+    }, SSE_RECONNECT_DELAY);
+  }
+
+  open(localStorage.getItem('token'));
+
+  return () => {
+    closed = true;
+    clearTimeout(reconnectTimer);
+    close();
+    if (stopPolling) stopPolling();
+  };
+};
+
 export default api;
\ No newline at end of file
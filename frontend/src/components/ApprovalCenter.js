@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api';
+import api, { fetchLaudosPage } from '../api';
+import LoadMoreButton from './LoadMoreButton';
 
 // === SISTEMA DE LOGGING PROFISSIONAL ===
 const Logger = {
@@ -30,6 +31,9 @@ function ApprovalCenter({ userInfo }) {
   const [laudosParaAprovacao, setLaudosParaAprovacao] = useState([]);
   const [laudosAprovados, setLaudosAprovados] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [laudosCarregados, setLaudosCarregados] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showRejectModal, setShowRejectModal] = useState(false);
   const [selectedLaudoId, setSelectedLaudoId] = useState(null);
   const [rejectReason, setRejectReason] = useState('');
@@ -56,6 +60,74 @@ function ApprovalCenter({ userInfo }) {
     }
   }, [userInfo, approvalType]);
 
+  // ✅ Separar os laudos carregados entre pendentes e aprovados conforme o tipo de aprovação
+  const filtrarPorAprovacao = (allLaudos) => {
+    let pendingForUser = [];
+    let approvedForUser = [];
+
+    // ✅ CORREÇÃO: Filtrar laudos baseado no tipo de aprovação
+    switch (approvalType) {
+      case 'admin':
+        // Admin pode aprovar tudo
+        pendingForUser = allLaudos.filter(laudo => 
+          laudo.status === 'em_andamento'
+        );
+        approvedForUser = allLaudos.filter(laudo => 
+          ['aprovado_manutencao', 'aprovado_vendas', 'finalizado'].includes(laudo.status)
+        );
+        break;
+        
+      case 'manutencao':
+        // Encarregado aprova manutenção
+        pendingForUser = allLaudos.filter(laudo => 
+          laudo.status === 'em_andamento'
+        );
+        approvedForUser = allLaudos.filter(laudo => 
+          ['aprovado_manutencao', 'finalizado'].includes(laudo.status)
+        );
+        break;
+        
+      case 'vendas':
+        // Vendedor aprova orçamento
+        pendingForUser = allLaudos.filter(laudo => 
+          laudo.status === 'aprovado_manutencao'
+        );
+        approvedForUser = allLaudos.filter(laudo => 
+          ['aprovado_vendas', 'finalizado'].includes(laudo.status)
+        );
+        break;
+        
+      default:
+        pendingForUser = [];
+        approvedForUser = [];
+    }
+
+    Logger.debug('Laudos filtrados por tipo de aprovação', {
+      approvalType: approvalType,
+      pending: pendingForUser.length,
+      approved: approvedForUser.length
+    });
+
+    setLaudosParaAprovacao(pendingForUser);
+    setLaudosAprovados(approvedForUser);
+    return { pendingForUser, approvedForUser };
+  };
+
+  const buscarMaisLaudos = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await fetchLaudosPage('/laudos', { cursor: nextCursor });
+      const allLaudos = [...laudosCarregados, ...page.laudos];
+      setLaudosCarregados(allLaudos);
+      setNextCursor(page.nextCursor);
+      filtrarPorAprovacao(allLaudos);
+    } catch (error) {
+      Logger.error('Erro ao buscar mais laudos', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const buscarLaudosParaAprovacao = async () => {
     if (!userInfo || !approvalType) return;
     
@@ -66,57 +138,12 @@ function ApprovalCenter({ userInfo }) {
         isAdmin: userInfo?.is_admin
       });
 
-      const allLaudosRes = await api.get('/laudos');
-      const allLaudos = allLaudosRes.data || [];
-
-      let pendingForUser = [];
-      let approvedForUser = [];
-
-      // ✅ CORREÇÃO: Filtrar laudos baseado no tipo de aprovação
-      switch (approvalType) {
-        case 'admin':
-          // Admin pode aprovar tudo
-          pendingForUser = allLaudos.filter(laudo => 
-            laudo.status === 'em_andamento'
-          );
-          approvedForUser = allLaudos.filter(laudo => 
-            ['aprovado_manutencao', 'aprovado_vendas', 'finalizado'].includes(laudo.status)
-          );
-          break;
-          
-        case 'manutencao':
-          // Encarregado aprova manutenção
-          pendingForUser = allLaudos.filter(laudo => 
-            laudo.status === 'em_andamento'
-          );
-          approvedForUser = allLaudos.filter(laudo => 
-            ['aprovado_manutencao', 'finalizado'].includes(laudo.status)
-          );
-          break;
-          
-        case 'vendas':
-          // Vendedor aprova orçamento
-          pendingForUser = allLaudos.filter(laudo => 
-            laudo.status === 'aprovado_manutencao'
-          );
-          approvedForUser = allLaudos.filter(laudo => 
-            ['aprovado_vendas', 'finalizado'].includes(laudo.status)
-          );
-          break;
-          
-        default:
-          pendingForUser = [];
-          approvedForUser = [];
-      }
+      const page = await fetchLaudosPage('/laudos');
+      const allLaudos = page.laudos || [];
+      setLaudosCarregados(allLaudos);
+      setNextCursor(page.nextCursor);
 
-      Logger.debug('Laudos filtrados por tipo de aprovação', {
-        approvalType: approvalType,
-        pending: pendingForUser.length,
-        approved: approvedForUser.length
-      });
-
-      setLaudosParaAprovacao(pendingForUser);
-      setLaudosAprovados(approvedForUser);
+      const { pendingForUser, approvedForUser } = filtrarPorAprovacao(allLaudos);
       
       Logger.info('Aprovações carregadas com sucesso', {
         pendingCount: pendingForUser.length,
@@ -389,6 +416,8 @@ function ApprovalCenter({ userInfo }) {
         </div>
       </div>
 
+      <LoadMoreButton nextCursor={nextCursor} loading={loadingMore} onClick={buscarMaisLaudos} />
+
       {/* Modal de Reprovação */}
       {showRejectModal && (
         <div className="modal-overlay">
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api';
+import api, { fetchLaudosPage } from '../api';
+import LoadMoreButton from './LoadMoreButton';
 import { canUserFinalize } from '../utils/laudoStatus';
 
 // === SISTEMA DE LOGGING PROFISSIONAL ===
@@ -31,6 +32,9 @@ function ApprovalPanel({ userInfo }) {
   const [laudosPendentes, setLaudosPendentes] = useState([]);
   const [laudosAprovados, setLaudosAprovados] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [laudosCarregados, setLaudosCarregados] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedLaudo, setSelectedLaudo] = useState(null);
   const [showModal, setShowModal] = useState(false);
   const [approvalNote, setApprovalNote] = useState('');
@@ -61,6 +65,21 @@ function ApprovalPanel({ userInfo }) {
     }
   }, [userInfo, approvalType]);
 
+  const carregarMaisLaudos = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await fetchLaudosPage('/laudos/approval', { cursor: nextCursor });
+      const allLaudos = [...laudosCarregados, ...page.laudos];
+      setLaudosCarregados(allLaudos);
+      setNextCursor(page.nextCursor);
+      separarLaudos(allLaudos);
+    } catch (error) {
+      Logger.error('Erro ao carregar mais laudos', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const carregarPrivilegios = async () => {
     try {
       const response = await api.get('/user/privileges');
@@ -71,80 +90,88 @@ function ApprovalPanel({ userInfo }) {
     }
   };
 
-  const carregarLaudos = async () => {
-    if (!userInfo || !approvalType) return;
-    
-    try {
-      setLoading(true);
-      Logger.debug('Carregando laudos para aprovação', { approvalType });
-
-      const response = await api.get('/laudos/approval');
-      const allLaudos = response.data || [];
-
-      let pendentes = [];
-      let aprovados = [];
+  // ✅ Separar os laudos carregados entre pendentes e aprovados conforme o tipo de aprovação
+  const separarLaudos = (allLaudos) => {
+    let pendentes = [];
+    let aprovados = [];
 
-      // ✅ Filtrar laudos baseado no tipo de aprovação
-      switch (approvalType) {
-        case 'admin':
-          // Admin pode aprovar tudo
-          pendentes = allLaudos.filter(laudo => 
-            ['em_andamento', 'aprovado_manutencao'].includes(laudo.status)
-          );
-          aprovados = allLaudos.filter(laudo => 
-            ['aprovado_vendas', 'finalizado'].includes(laudo.status)
-          );
-          break;
-          
-        case 'manutencao':
-          // Encarregado aprova manutenção e pode finalizar
+    // ✅ Filtrar laudos baseado no tipo de aprovação
+    switch (approvalType) {
+      case 'admin':
+        // Admin pode aprovar tudo
+        pendentes = allLaudos.filter(laudo => 
+          ['em_andamento', 'aprovado_manutencao'].includes(laudo.status)
+        );
+        aprovados = allLaudos.filter(laudo => 
+          ['aprovado_vendas', 'finalizado'].includes(laudo.status)
+        );
+        break;
+        
+      case 'manutencao':
+        // Encarregado aprova manutenção e pode finalizar
+        pendentes = allLaudos.filter(laudo => 
+          ['em_andamento', 'aprovado_vendas'].includes(laudo.status)
+        );
+        aprovados = allLaudos.filter(laudo => 
+          ['aprovado_manutencao', 'finalizado'].includes(laudo.status)
+        );
+        break;
+        
+      case 'vendas':
+        // Vendedor aprova orçamento
+        pendentes = allLaudos.filter(laudo => 
+          ['em_andamento', 'aprovado_manutencao'].includes(laudo.status)
+        );
+        aprovados = allLaudos.filter(laudo => 
+          ['aprovado_vendas', 'finalizado'].includes(laudo.status)
+        );
+        break;
+        
+      case 'finalizacao':
+        // Técnicos só podem finalizar seus próprios laudos (se tiverem privilégio)
+        if (userInfo?.user_type === 'tecnico') {
           pendentes = allLaudos.filter(laudo => 
-            ['em_andamento', 'aprovado_vendas'].includes(laudo.status)
+            laudo.status === 'aprovado_vendas' && 
+            laudo.user_id === userInfo.id &&
+            canUserFinalize(userInfo?.user_type, laudo.status, userPrivileges)
           );
           aprovados = allLaudos.filter(laudo => 
-            ['aprovado_manutencao', 'finalizado'].includes(laudo.status)
+            laudo.status === 'finalizado' && laudo.user_id === userInfo.id
           );
-          break;
-          
-        case 'vendas':
-          // Vendedor aprova orçamento
+        } else if (userInfo?.user_type === 'encarregado') {
+          // Encarregados podem finalizar qualquer laudo
           pendentes = allLaudos.filter(laudo => 
-            ['em_andamento', 'aprovado_manutencao'].includes(laudo.status)
+            laudo.status === 'aprovado_vendas'
           );
           aprovados = allLaudos.filter(laudo => 
-            ['aprovado_vendas', 'finalizado'].includes(laudo.status)
+            laudo.status === 'finalizado'
           );
-          break;
-          
-        case 'finalizacao':
-          // Técnicos só podem finalizar seus próprios laudos (se tiverem privilégio)
-          if (userInfo?.user_type === 'tecnico') {
-            pendentes = allLaudos.filter(laudo => 
-              laudo.status === 'aprovado_vendas' && 
-              laudo.user_id === userInfo.id &&
-              canUserFinalize(userInfo?.user_type, laudo.status, userPrivileges)
-            );
-            aprovados = allLaudos.filter(laudo => 
-              laudo.status === 'finalizado' && laudo.user_id === userInfo.id
-            );
-          } else if (userInfo?.user_type === 'encarregado') {
-            // Encarregados podem finalizar qualquer laudo
-            pendentes = allLaudos.filter(laudo => 
-              laudo.status === 'aprovado_vendas'
-            );
-            aprovados = allLaudos.filter(laudo => 
-              laudo.status === 'finalizado'
-            );
-          }
-          break;
-          
-        default:
-          pendentes = [];
-          aprovados = [];
-      }
+        }
+        break;
+        
+      default:
+        pendentes = [];
+        aprovados = [];
+    }
+
+    setLaudosPendentes(pendentes);
+    setLaudosAprovados(aprovados);
+    return { pendentes, aprovados };
+  };
 
-      setLaudosPendentes(pendentes);
-      setLaudosAprovados(aprovados);
+  const carregarLaudos = async () => {
+    if (!userInfo || !approvalType) return;
+    
+    try {
+      setLoading(true);
+      Logger.debug('Carregando laudos para aprovação', { approvalType });
+
+      const page = await fetchLaudosPage('/laudos/approval');
+      const allLaudos = page.laudos || [];
+      setLaudosCarregados(allLaudos);
+      setNextCursor(page.nextCursor);
+
+      const { pendentes, aprovados } = separarLaudos(allLaudos);
       
       Logger.info('Laudos carregados com sucesso', {
         pendentes: pendentes.length,
@@ -543,6 +570,8 @@ function ApprovalPanel({ userInfo }) {
             </div>
           )}
         </div>
+
+        <LoadMoreButton nextCursor={nextCursor} loading={loadingMore} onClick={carregarMaisLaudos} />
       </div>
 
       {/* Modal de Aprovação/Reprovação */}
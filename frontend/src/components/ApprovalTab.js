@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api';
+import api, { fetchLaudosPage } from '../api';
 import { StatusBadge, CompletionBadge } from '../utils/statusLabels';
+import LoadMoreButton from './LoadMoreButton';
 
 const ApprovalTab = ({ userInfo }) => {
   const [pendingLaudos, setPendingLaudos] = useState([]);
@@ -11,14 +12,31 @@ const ApprovalTab = ({ userInfo }) => {
   const [rejectedLaudos, setRejectedLaudos] = useState([]); // 'pending' ou 'approved'
   const [selectedTechnician, setSelectedTechnician] = useState('all');
   const [technicians, setTechnicians] = useState([]);
+  const [laudosCarregados, setLaudosCarregados] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchLaudos();
   }, []);
 
-  const fetchLaudos = async () => {
+  // Página de /laudos; com cursor, acrescenta aos laudos já carregados
+  const fetchLaudosPages = async (cursor) => {
+    const page = await fetchLaudosPage('/laudos', { cursor });
+    const allLaudos = cursor ? [...laudosCarregados, ...page.laudos] : page.laudos;
+    setLaudosCarregados(allLaudos);
+    setNextCursor(page.nextCursor);
+    return allLaudos;
+  };
+
+  // cursor: continua a listagem a partir da página seguinte (botão "Carregar mais")
+  const fetchLaudos = async (cursor = null) => {
     try {
-      setLoading(true);
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
       setError('');
       
       console.log('🎯 Carregando laudos para aprovação...');
@@ -35,8 +53,7 @@ const ApprovalTab = ({ userInfo }) => {
       }
               // VENDEDOR: busca apenas laudos aguardando orçamento
         else if (userInfo?.userType === 'vendedor') {
-          const allLaudosResponse = await api.get('/laudos');
-          const allLaudos = allLaudosResponse.data;
+          const allLaudos = await fetchLaudosPages(cursor);
           
           // Pendentes para vendedor: laudos aguardando orçamento
           pendingRes = { data: allLaudos.filter(l => l.status === 'aguardando_orcamento') };
@@ -53,8 +70,7 @@ const ApprovalTab = ({ userInfo }) => {
         }
         // TÉCNICO: busca apenas laudos com orçamento aprovado para execução
         else if (userInfo?.userType === 'tecnico') {
-          const allLaudosResponse = await api.get('/laudos');
-          const allLaudos = allLaudosResponse.data;
+          const allLaudos = await fetchLaudosPages(cursor);
           
           // Pendentes para técnico: laudos com orçamento aprovado (aguardando execução)
           pendingRes = { data: allLaudos.filter(l => l.status === 'orcamento_aprovado') };
@@ -83,6 +99,7 @@ const ApprovalTab = ({ userInfo }) => {
       setTechnicians(uniqueTechnicians);
       
       setLoading(false);
+      setLoadingMore(false);
     } catch (err) {
       console.error('❌ Erro ao carregar laudos:', err);
       
@@ -97,6 +114,7 @@ const ApprovalTab = ({ userInfo }) => {
       }
       
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -455,6 +473,8 @@ const ApprovalTab = ({ userInfo }) => {
           ))
         )}
       </div>
+
+      <LoadMoreButton nextCursor={nextCursor} loading={loadingMore} onClick={() => fetchLaudos(nextCursor)} />
     </div>
   );
 };
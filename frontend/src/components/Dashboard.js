@@ -1,5 +1,9 @@
 import React, { useState, useEffect } from 'react';
 import UpdatesPanel from './UpdatesPanel';
+import api, { fetchLaudosPage } from '../api';
+
+// Página máxima aceita pelo backend: menos requisições ao percorrer os laudos do técnico
+const STATS_PAGE_SIZE = 500;
 
 const Dashboard = ({ userInfo }) => {
   const [stats, setStats] = useState({
@@ -25,45 +29,52 @@ const Dashboard = ({ userInfo }) => {
 
   const fetchDashboardData = async () => {
     try {
-      const token = localStorage.getItem('token');
-      
-      // Buscar laudos para calcular estatísticas
-      const laudosResponse = await fetch('/laudos', {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      
-      if (laudosResponse.ok) {
-        const laudosData = await laudosResponse.json();
-        
-        // ✅ Filtrar laudos baseado no perfil do usuário
-        let filteredLaudos = laudosData;
-        if (!isAdmin) {
-          // Técnicos só veem seus próprios laudos
-          filteredLaudos = laudosData.filter(laudo => 
-            laudo.user_id === userInfo?.id || laudo.user_name === userInfo?.username
-          );
-        }
-        
-        setRecentLaudos(filteredLaudos.slice(0, 5));
-        
-        // ✅ Calcular estatísticas dos laudos filtrados
-        const today = new Date().toISOString().split('T')[0];
-        const weekAgo = new Date(Date.now() - 7 * 24 * 60 * 60 * 1000).toISOString().split('T')[0];
-        const monthAgo = new Date(Date.now() - 30 * 24 * 60 * 60 * 1000).toISOString().split('T')[0];
-        
-        const calculatedStats = {
-          totalLaudos: filteredLaudos.length,
-          laudosHoje: filteredLaudos.filter(l => l.created_at?.startsWith(today)).length,
-          laudosSemana: filteredLaudos.filter(l => l.created_at >= weekAgo).length,
-          laudosMes: filteredLaudos.filter(l => l.created_at >= monthAgo).length,
-          pendentesAprovacao: filteredLaudos.filter(l => l.status === 'em_andamento').length,
-          aprovados: filteredLaudos.filter(l => ['aprovado_manutencao', 'aprovado_vendas'].includes(l.status)).length,
-          reprovados: filteredLaudos.filter(l => l.status === 'reprovado').length,
-          finalizados: filteredLaudos.filter(l => l.status === 'finalizado').length
-        };
-        
-        setStats(calculatedStats);
+      // Últimos laudos: só a primeira página da listagem
+      const recent = await fetchLaudosPage('/laudos', { limit: 5 });
+      setRecentLaudos(recent.laudos);
+
+      if (isAdmin) {
+        // ✅ Administrador: contadores mantidos no banco, sem percorrer os laudos
+        const { data } = await api.get('/stats');
+        setStats({
+          totalLaudos: data.totalLaudos,
+          laudosHoje: data.laudosHoje,
+          laudosSemana: data.laudosSemana,
+          laudosMes: data.laudosMes,
+          pendentesAprovacao: data.emAndamento,
+          aprovados: data.aprovados,
+          reprovados: data.reprovados,
+          finalizados: data.finalizados
+        });
+        return;
       }
+
+      // ✅ Técnicos: /laudos já traz só os próprios laudos; percorre as páginas pelo cursor
+      let filteredLaudos = [];
+      let cursor = null;
+      do {
+        const page = await fetchLaudosPage('/laudos', { cursor, limit: STATS_PAGE_SIZE });
+        filteredLaudos = filteredLaudos.concat(page.laudos);
+        cursor = page.nextCursor;
+      } while (cursor);
+
+      // ✅ Calcular estatísticas dos laudos do técnico
+      const today = new Date().toISOString().split('T')[0];
+      const weekAgo = new Date(Date.now() - 7 * 24 * 60 * 60 * 1000).toISOString().split('T')[0];
+      const monthAgo = new Date(Date.now() - 30 * 24 * 60 * 60 * 1000).toISOString().split('T')[0];
+
+      const calculatedStats = {
+        totalLaudos: filteredLaudos.length,
+        laudosHoje: filteredLaudos.filter(l => l.created_at?.startsWith(today)).length,
+        laudosSemana: filteredLaudos.filter(l => l.created_at >= weekAgo).length,
+        laudosMes: filteredLaudos.filter(l => l.created_at >= monthAgo).length,
+        pendentesAprovacao: filteredLaudos.filter(l => l.status === 'em_andamento').length,
+        aprovados: filteredLaudos.filter(l => ['aprovado_manutencao', 'aprovado_vendas'].includes(l.status)).length,
+        reprovados: filteredLaudos.filter(l => l.status === 'reprovado').length,
+        finalizados: filteredLaudos.filter(l => l.status === 'finalizado').length
+      };
+
+      setStats(calculatedStats);
     } catch (error) {
       console.log('Erro ao buscar dados do dashboard:', error.message);
       // Usar dados padrão em caso de erro
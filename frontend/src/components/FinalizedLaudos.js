@@ -1,9 +1,12 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api';
+import api, { fetchLaudosPage } from '../api';
+import LoadMoreButton from './LoadMoreButton';
 
 const FinalizedLaudos = ({ userInfo }) => {
   const [laudosFinalizados, setLaudosFinalizados] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [filterStatus, setFilterStatus] = useState('todos');
   const [selectedLaudo, setSelectedLaudo] = useState(null);
@@ -13,8 +16,9 @@ const FinalizedLaudos = ({ userInfo }) => {
   const carregarLaudosFinalizados = async () => {
     try {
       setLoading(true);
-      const response = await api.get('/laudos/finalized');
-      setLaudosFinalizados(response.data || []);
+      const page = await fetchLaudosPage('/laudos/finalized');
+      setLaudosFinalizados(page.laudos || []);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Erro ao carregar laudos finalizados:', error);
     } finally {
@@ -22,6 +26,19 @@ const FinalizedLaudos = ({ userInfo }) => {
     }
   };
 
+  const carregarMaisLaudos = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await fetchLaudosPage('/laudos/finalized', { cursor: nextCursor });
+      setLaudosFinalizados(prev => [...prev, ...page.laudos]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Erro ao carregar mais laudos finalizados:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     carregarLaudosFinalizados();
   }, []);
@@ -267,6 +284,8 @@ const FinalizedLaudos = ({ userInfo }) => {
                 </div>
               )}
             </div>
+
+            <LoadMoreButton nextCursor={nextCursor} loading={loadingMore} onClick={carregarMaisLaudos} />
           </div>
         </div>
       </div>
@@ -1,4 +1,5 @@
 import React, { useState, useRef } from 'react';
+import api from '../api';
 import '../ModernLaudoForm.css';
 
 const FormularioLaudoAvancado = ({ userInfo, onClose }) => {
@@ -293,8 +294,6 @@ const FormularioLaudoAvancado = ({ userInfo, onClose }) => {
     setIsSubmitting(true);
 
     try {
-      const token = localStorage.getItem('token');
-      
       // Preparar dados para envio
       const submitData = {
         ...formData,
@@ -302,31 +301,22 @@ const FormularioLaudoAvancado = ({ userInfo, onClose }) => {
         status: 'pendente'
       };
 
-      const response = await fetch('/laudos', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
-        },
-        body: JSON.stringify(submitData)
-      });
-
-      if (response.ok) {
-        const result = await response.json();
-        alert('✅ Laudo avançado criado com sucesso!');
-        onClose();
-        
-        // Disparar evento para atualizar a lista de laudos
-        window.dispatchEvent(new CustomEvent('laudo-created', { 
-          detail: { laudoId: result.id } 
-        }));
-      } else {
-        const errorData = await response.json();
-        alert(`❌ Erro ao criar laudo: ${errorData.message || 'Erro desconhecido'}`);
-      }
+      const { data: result } = await api.post('/laudos', submitData);
+      alert('✅ Laudo avançado criado com sucesso!');
+      onClose();
+      
+      // Disparar evento para atualizar a lista de laudos
+      window.dispatchEvent(new CustomEvent('laudo-created', { 
+        detail: { laudoId: result.id } 
+      }));
     } catch (error) {
       console.error('Erro ao criar laudo:', error);
-      alert('❌ Erro de conexão. Verifique sua internet e tente novamente.');
+      if (error.response) {
+        const errorData = error.response.data || {};
+        alert(`❌ Erro ao criar laudo: ${errorData.message || errorData.detail || 'Erro desconhecido'}`);
+      } else {
+        alert('❌ Erro de conexão. Verifique sua internet e tente novamente.');
+      }
     } finally {
       setIsSubmitting(false);
     }
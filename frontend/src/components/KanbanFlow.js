@@ -1,9 +1,13 @@
 import React, { useState, useEffect } from 'react';
 import '../KanbanFlow.css';
+import api, { fetchLaudosPage } from '../api';
+import LoadMoreButton from './LoadMoreButton';
 
 const KanbanFlow = ({ userInfo }) => {
   const [laudos, setLaudos] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Colunas do Kanban baseadas no fluxo
   const columns = [
@@ -47,13 +51,9 @@ const KanbanFlow = ({ userInfo }) => {
 
   const fetchLaudos = async () => {
     try {
-      const response = await fetch('/laudos', {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        }
-      });
-      const data = await response.json();
-      setLaudos(data);
+      const page = await fetchLaudosPage('/laudos');
+      setLaudos(page.laudos);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Erro ao buscar laudos:', error);
     } finally {
@@ -61,6 +61,19 @@ const KanbanFlow = ({ userInfo }) => {
     }
   };
 
+  const fetchMoreLaudos = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await fetchLaudosPage('/laudos', { cursor: nextCursor });
+      setLaudos(prev => [...prev, ...page.laudos]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Erro ao buscar mais laudos:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getLaudosForColumn = (column) => {
     return laudos.filter(laudo => column.statuses.includes(laudo.status));
   };
@@ -97,19 +110,9 @@ const KanbanFlow = ({ userInfo }) => {
         'finalizar_execucao': `/admin/laudo/${laudoId}/finalizar-execucao`
       };
 
-      const response = await fetch(endpoints[action], {
-        method: 'POST',
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        }
-      });
-
-      if (response.ok) {
-        await fetchLaudos(); // Atualizar dados
-        alert('✅ Ação realizada com sucesso!');
-      } else {
-        throw new Error('Erro na aprovação');
-      }
+      await api.post(endpoints[action]);
+      await fetchLaudos(); // Atualizar dados
+      alert('✅ Ação realizada com sucesso!');
     } catch (error) {
       console.error('Erro:', error);
       alert('❌ Erro ao processar ação');
@@ -222,6 +225,8 @@ const KanbanFlow = ({ userInfo }) => {
           );
         })}
       </div>
+
+      <LoadMoreButton nextCursor={nextCursor} loading={loadingMore} onClick={fetchMoreLaudos} />
       
       <div className="kanban-legend">
         <h4>📋 Legenda do Fluxo:</h4>
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import api from '../api';
 
 const LaudoEditor = ({ laudoId, onClose, onSave }) => {
   const [laudo, setLaudo] = useState(null);
@@ -18,20 +19,15 @@ const LaudoEditor = ({ laudoId, onClose, onSave }) => {
       setLoading(true);
       setError('');
       
-      const token = localStorage.getItem('token');
-      const response = await fetch(`/laudos/${laudoId}`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-
-      if (response.ok) {
-        const data = await response.json();
-        setLaudo(data);
-      } else {
-        setError('Erro ao carregar laudo. Verifique se o laudo existe.');
-      }
+      const response = await api.get(`/laudos/${laudoId}`);
+      setLaudo(response.data);
     } catch (err) {
       console.error('Erro ao buscar laudo:', err);
-      setError('Erro de conexão. Verifique sua internet.');
+      if (err.response) {
+        setError('Erro ao carregar laudo. Verifique se o laudo existe.');
+      } else {
+        setError('Erro de conexão. Verifique sua internet.');
+      }
     } finally {
       setLoading(false);
     }
@@ -47,26 +43,16 @@ const LaudoEditor = ({ laudoId, onClose, onSave }) => {
   const handleSave = async () => {
     setSaving(true);
     try {
-      const token = localStorage.getItem('token');
-      const response = await fetch(`/laudos/${laudoId}`, {
-        method: 'PUT',
-        headers: {
-          'Authorization': `Bearer ${token}`,
-          'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(laudo)
-      });
-
-      if (response.ok) {
-        if (onSave) onSave();
-        onClose();
-      } else {
-        const errorData = await response.json();
-        setError('Erro ao salvar alterações: ' + (errorData.detail || 'Erro desconhecido'));
-      }
+      await api.put(`/laudos/${laudoId}`, laudo);
+      if (onSave) onSave();
+      onClose();
     } catch (err) {
       console.error('Erro ao salvar laudo:', err);
-      setError('Erro de conexão ao salvar. Verifique sua internet.');
+      if (err.response) {
+        setError('Erro ao salvar alterações: ' + (err.response.data?.detail || 'Erro desconhecido'));
+      } else {
+        setError('Erro de conexão ao salvar. Verifique sua internet.');
+      }
     } finally {
       setSaving(false);
     }
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import api from '../api';
 
 const LaudoViewer = ({ laudoId, onClose }) => {
   const [laudo, setLaudo] = useState(null);
@@ -19,20 +20,15 @@ const LaudoViewer = ({ laudoId, onClose }) => {
       setLoading(true);
       setError('');
       
-      const token = localStorage.getItem('token');
-      const response = await fetch(`/laudos/${laudoId}`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-
-      if (response.ok) {
-        const data = await response.json();
-        setLaudo(data);
-      } else {
-        setError('Erro ao carregar laudo. Verifique se o laudo existe.');
-      }
+      const response = await api.get(`/laudos/${laudoId}`);
+      setLaudo(response.data);
     } catch (err) {
       console.error('Erro ao buscar laudo:', err);
-      setError('Erro de conexão. Verifique sua internet.');
+      if (err.response) {
+        setError('Erro ao carregar laudo. Verifique se o laudo existe.');
+      } else {
+        setError('Erro de conexão. Verifique sua internet.');
+      }
     } finally {
       setLoading(false);
     }
@@ -1,12 +1,15 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api';
+import api, { fetchLaudosPage } from '../api';
 import { StatusBadge, CompletionBadge } from '../utils/statusLabels';
 import TagManager from './TagManager';
+import LoadMoreButton from './LoadMoreButton';
 
 const LaudosList = ({ isAdmin = false, userType = 'tecnico', onEditLaudo }) => {
   const [laudos, setLaudos] = useState([]);
   const [filteredLaudos, setFilteredLaudos] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [searchId, setSearchId] = useState('');
   const [searchTerm, setSearchTerm] = useState('');
@@ -24,9 +27,10 @@ const LaudosList = ({ isAdmin = false, userType = 'tecnico', onEditLaudo }) => {
       setIsLoading(true);
       setError('');
       
-      const response = await api.get('/laudos');
-      console.log('🎯 Laudos carregados:', response.data);
-      setLaudos(response.data);
+      const page = await fetchLaudosPage('/laudos');
+      console.log('🎯 Laudos carregados:', page.laudos);
+      setLaudos(page.laudos);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       console.error('Erro ao carregar laudos:', err);
       if (err.response?.status === 401) {
@@ -39,6 +43,19 @@ const LaudosList = ({ isAdmin = false, userType = 'tecnico', onEditLaudo }) => {
     }
   };
 
+  const loadMoreLaudos = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await fetchLaudosPage('/laudos', { cursor: nextCursor });
+      setLaudos(prev => [...prev, ...page.laudos]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Erro ao carregar mais laudos:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filterLaudos = () => {
     let filtered = [...laudos];
 
@@ -414,6 +431,8 @@ const LaudosList = ({ isAdmin = false, userType = 'tecnico', onEditLaudo }) => {
           </div>
         ))
       )}
+
+      <LoadMoreButton nextCursor={nextCursor} loading={loadingMore} onClick={loadMoreLaudos} />
     </div>
   );
 };
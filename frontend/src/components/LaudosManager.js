@@ -1,9 +1,13 @@
 import React, { useState, useEffect } from 'react';
 import LaudoGallery from './LaudoGallery';
+import LoadMoreButton from './LoadMoreButton';
+import { fetchLaudosPage } from '../api';
 
 const LaudosManager = ({ userInfo, onShowAdvancedForm, onShowModernForm, onShowRecorder, onViewLaudo, onEditLaudo }) => {
   const [laudos, setLaudos] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
   const [viewMode, setViewMode] = useState('gallery'); // ✅ CORREÇÃO: Estado para alternância
@@ -14,15 +18,9 @@ const LaudosManager = ({ userInfo, onShowAdvancedForm, onShowModernForm, onShowR
 
   const fetchLaudos = async () => {
     try {
-      const token = localStorage.getItem('token');
-      const response = await fetch('/laudos', {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-
-      if (response.ok) {
-        const data = await response.json();
-        setLaudos(data);
-      }
+      const page = await fetchLaudosPage('/laudos');
+      setLaudos(page.laudos);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Erro ao buscar laudos:', error);
     } finally {
@@ -30,6 +28,19 @@ const LaudosManager = ({ userInfo, onShowAdvancedForm, onShowModernForm, onShowR
     }
   };
 
+  const fetchMoreLaudos = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await fetchLaudosPage('/laudos', { cursor: nextCursor });
+      setLaudos(prev => [...prev, ...page.laudos]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Erro ao buscar mais laudos:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getStatusColor = (status) => {
     const statusColors = {
       'em_andamento': '#f59e0b',
@@ -297,6 +308,8 @@ const LaudosManager = ({ userInfo, onShowAdvancedForm, onShowModernForm, onShowR
                 )}
               </div>
             )}
+
+            <LoadMoreButton nextCursor={nextCursor} loading={loadingMore} onClick={fetchMoreLaudos} />
           </div>
         </div>
       </div>
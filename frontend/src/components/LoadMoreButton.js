@@ -0,0 +1,30 @@
+import React from 'react';
+
+// Botão "Carregar mais" das listagens paginadas por cursor (some na última página)
+const LoadMoreButton = ({ nextCursor, loading, onClick }) => {
+  if (!nextCursor) {
+    return null;
+  }
+
+  return (
+    <div style={{ textAlign: 'center', padding: '1rem' }}>
+      <button
+        onClick={onClick}
+        disabled={loading}
+        style={{
+          background: 'var(--moura-blue)',
+          color: 'white',
+          border: 'none',
+          padding: '0.6rem 1.5rem',
+          borderRadius: '8px',
+          cursor: loading ? 'wait' : 'pointer',
+          opacity: loading ? 0.7 : 1
+        }}
+      >
+        {loading ? 'Carregando...' : '⬇️ Carregar mais'}
+      </button>
+    </div>
+  );
+};
+
+export default LoadMoreButton;
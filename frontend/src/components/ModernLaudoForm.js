@@ -1,4 +1,5 @@
 import React, { useState, useRef } from 'react';
+import api from '../api';
 import '../ModernLaudoForm.css';
 
 const ModernLaudoForm = ({ userInfo, onClose }) => {
@@ -42,22 +43,9 @@ const ModernLaudoForm = ({ userInfo, onClose }) => {
     setIsSubmitting(true);
 
     try {
-      const token = localStorage.getItem('token');
-      const response = await fetch('/laudos', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${token}`
-        },
-        body: JSON.stringify(formData)
-      });
-
-      if (response.ok) {
-        alert('✅ Laudo técnico criado com sucesso!');
-        onClose();
-      } else {
-        throw new Error('Erro ao criar laudo');
-      }
+      await api.post('/laudos', formData);
+      alert('✅ Laudo técnico criado com sucesso!');
+      onClose();
     } catch (error) {
       console.error('Erro:', error);
       alert('❌ Erro ao criar laudo técnico');
@@ -1,4 +1,5 @@
 import React, { useState, useEffect } from 'react';
+import api from '../api';
 
 const Reports = ({ userInfo }) => {
   const [reportData, setReportData] = useState({
@@ -45,15 +46,8 @@ const Reports = ({ userInfo }) => {
   const fetchReportData = async () => {
     setLoading(true);
     try {
-      const token = localStorage.getItem('token');
-      const response = await fetch(`/admin/reports?period=${selectedPeriod}`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-
-      if (response.ok) {
-        const data = await response.json();
-        setReportData(prev => ({ ...prev, ...data }));
-      }
+      const response = await api.get('/admin/reports', { params: { period: selectedPeriod } });
+      setReportData(prev => ({ ...prev, ...response.data }));
     } catch (error) {
       console.error('Erro ao buscar relatórios:', error);
     } finally {
@@ -63,22 +57,18 @@ const Reports = ({ userInfo }) => {
 
   const exportReport = async (format) => {
     try {
-      const token = localStorage.getItem('token');
-      const response = await fetch(`/admin/export-report?format=${format}&period=${selectedPeriod}`, {
-        headers: { 'Authorization': `Bearer ${token}` }
+      const response = await api.get('/admin/export-report', {
+        params: { format, period: selectedPeriod },
+        responseType: 'blob'
       });
-
-      if (response.ok) {
-        const blob = await response.blob();
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `relatorio_${selectedPeriod}.${format}`;
-        document.body.appendChild(a);
-        a.click();
-        document.body.removeChild(a);
-        window.URL.revokeObjectURL(url);
-      }
+      const url = window.URL.createObjectURL(response.data);
+      const a = document.createElement('a');
+      a.href = url;
+      a.download = `relatorio_${selectedPeriod}.${format}`;
+      document.body.appendChild(a);
+      a.click();
+      document.body.removeChild(a);
+      window.URL.revokeObjectURL(url);
     } catch (error) {
       alert('Erro ao exportar relatório: ' + error.message);
     }
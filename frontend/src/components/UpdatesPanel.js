@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import api from '../api';
+import api, { subscribeToEvents } from '../api';
 
 const UpdatesPanel = ({ userInfo }) => {
   const [recentTags, setRecentTags] = useState([]);
@@ -9,14 +9,17 @@ const UpdatesPanel = ({ userInfo }) => {
   useEffect(() => {
     loadRecentTags();
     
-    // Auto-refresh a cada 30 segundos se habilitado
-    let interval;
+    // Auto-refresh por push (SSE): recarrega só quando chega um evento relevante
+    let unsubscribe;
     if (autoRefresh) {
-      interval = setInterval(loadRecentTags, 30000);
+      unsubscribe = subscribeToEvents(
+        ['tag_update', 'laudo_aprovado', 'laudo_finalizado'],
+        loadRecentTags
+      );
     }
     
     return () => {
-      if (interval) clearInterval(interval);
+      if (unsubscribe) unsubscribe();
     };
   }, [autoRefresh]);
 